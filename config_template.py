@@ -29,7 +29,121 @@ DATABASE_CONFIG = {
     'USER': os.getenv('DB_USER', ''),
     'PASSWORD': os.getenv('DB_PASSWORD', ''),
     'DB': os.getenv('DB_NAME', 'trade2'),
-    'CHARSET': "utf8mb4"
+    'CHARSET': "utf8mb4",
+    # 连接池配置（models/db_connection.py 使用）
+    'POOL_SIZE': 5,            # 常驻的空闲连接数量
+    'MAX_OVERFLOW': 10,        # 繁忙时可额外创建的连接数量
+    'POOL_TIMEOUT': 30,        # 等待可用连接的超时时间（秒）
+    'POOL_RECYCLE': 3600,      # 连接最长使用时间（秒），超过后重建
+    'POOL_PRE_PING': 30,       # 连接空闲超过该秒数后，取出前先ping检查
+    # 表结构快照文件（generate_models.py 生成在 models/schema_snapshot.json），为空时启动后从数据库加载一次
+    'SCHEMA_SNAPSHOT': '',
+}
+
+# Redis配置（lib/tool/redis_pool.py 共享连接池使用）
+REDIS_CONFIG = {
+    'ADDR': os.getenv('REDIS_ADDR', 'localhost:6379'),
+    'PASSWORD': os.getenv('REDIS_PASSWORD', ''),
+    'MAX_CONNECTIONS': 20,     # 连接池最大连接数
+    'RETRY_INTERVAL': 10,      # Redis不可用时的降级秒数，期间不再尝试连接
+    'LOCAL_TTL': {             # 进程内缓存的热点键及缓存秒数
+        'trade_mul': 5,
+    },
+}
+
+# K线并发获取配置（multi_timeframe_system.py 使用）
+KLINE_FETCH_CONFIG = {
+    'MAX_IN_FLIGHT': 8,        # 同时在途的最大请求数
+    'RATE_PER_SECOND': 15,     # 令牌桶每秒补充的令牌数（OKX公共行情限速约20次/秒）
+    'BURST': 20,               # 令牌桶容量
+    'MAX_RETRIES': 3,          # 单个请求的最大重试次数
+    'BACKOFF_BASE': 0.5,       # 指数退避基础等待时间（秒）
+    'BACKOFF_MAX': 8.0         # 单次退避最长等待时间（秒）
+}
+
+# 增量K线缓存配置（每次扫描只获取上次扫描之后的新K线）
+OHLCV_CACHE_CONFIG = {
+    'ENABLED': True,                       # 是否启用增量缓存
+    'CACHE_DIR': 'reports/ohlcv_cache',    # 缓存目录
+    'MAX_BARS': 1000                       # 每个(交易对, 周期)最多保留的K线数量
+}
+
+# WebSocket K线行情配置（订阅K线和tickers频道，扫描时读取内存中的K线缓冲区，替代REST轮询）
+WS_CANDLE_FEED_CONFIG = {
+    'ENABLED': True,                                         # 是否启用WebSocket行情，未安装websockets时自动使用REST
+    'CANDLE_URL': 'wss://ws.okx.com:8443/ws/v5/business',    # K线频道地址
+    'TICKER_URL': 'wss://ws.okx.com:8443/ws/v5/public',      # tickers频道地址
+    'MAX_BARS': 1000,                                        # 每个(交易对, 周期)最多保留的K线数量
+    'MAX_LAG_BARS': 1,                                       # 缓冲区最多落后的K线根数，超过时通过REST补齐
+    'RECONNECT_MAX_DELAY': 30,                               # 重连的最长等待时间（秒）
+    'RECORD_PATH': None                                      # 录制原始推送消息的JSONL文件路径，用于回放测试
+}
+
+# 策略执行器配置（扫描器中策略分析步骤的执行方式）
+STRATEGY_EXECUTOR_CONFIG = {
+    'MODE': 'thread',                      # inline: 当前线程逐个执行; thread: 线程池; process: 进程池（共享内存传递K线，绕开GIL）
+    'MAX_WORKERS': 5,                      # 工作线程/进程数量，0表示使用CPU核心数
+    'START_METHOD': 'spawn',               # 进程启动方式
+    'CHUNK_SIZE': 8,                       # 进程模式下每个任务包含的(交易对, 策略)数量
+    'CROSS_SECTIONAL': False               # 策略提供analyze_universe时（如test3），所有交易对一次性横截面计算评分
+}
+
+# 指标缓存配置（condition_analyzer中各评分函数共享的指标计算结果）
+INDICATOR_CACHE_CONFIG = {
+    'MAX_ENTRIES': 4096                    # 最多缓存的指标序列数量，超出时按LRU淘汰
+}
+
+# 增量指标配置（扫描器按交易对/时间框架保存指标状态，新K线收盘时O(1)更新）
+INCREMENTAL_INDICATOR_CONFIG = {
+    'ENABLED': True,                       # 是否启用增量指标，关闭后每轮扫描全量计算
+    'MAX_STREAMS': 20000                   # 最多保存的指标状态数量，超出时按LRU淘汰
+}
+
+# 仓位快照服务配置（lib/tool/position_service.py，策略仓位过滤与持仓分析共用同一个仓位快照）
+POSITION_SERVICE_CONFIG = {
+    'MAX_AGE': 5,                                            # 默认可接受的快照年龄（秒），各调用方可通过 get(max_age) 单独指定
+    'FETCH_TIMEOUT': 30,                                     # 等待其他线程获取仓位的最长时间（秒）
+    'WS_ENABLED': False,                                     # 是否订阅OKX私有WebSocket positions频道，推送实时更新快照
+    'WS_URL': 'wss://ws.okx.com:8443/ws/v5/private',         # 私有频道地址
+    'WS_INST_TYPE': 'SWAP',                                  # 订阅的产品类型
+    'RECONNECT_MAX_DELAY': 60                                # 重连的最长等待时间（秒）
+}
+
+# 交易信号发送配置（lib/tool/signal_dispatcher.py，信号先写入磁盘队列，由后台线程带重试发送）
+SIGNAL_DISPATCH_CONFIG = {
+    'URL': 'http://149.129.66.131:81/myOrder',               # 下单接口地址
+    'ASYNC': True,                                           # 是否异步发送，False时在扫描线程内发送
+    'WORKERS': 4,                                            # 发送线程数
+    'CONNECT_TIMEOUT': 3,                                    # 连接超时（秒）
+    'READ_TIMEOUT': 10,                                      # 读取超时（秒）
+    'MAX_RETRIES': 3,                                        # 最大重试次数（默认只重试连接失败/连接超时，同一幂等键）
+    'IDEMPOTENT_RECEIVER': False,                            # 接收端是否按Idempotency-Key去重，True时读取超时/429/5xx也重试、重启后重新发送未完成的请求
+    'MAX_AGE': 600,                                          # 信号有效期（秒），重启后超过有效期的信号不再发送
+    'SPOOL_PATH': 'reports/signal_spool.jsonl'               # 磁盘队列文件，为空时不落盘
+}
+
+# 扫描器常驻模式配置（python multi_timeframe_system.py --daemon，在K线收盘时刻扫描）
+SCANNER_DAEMON_CONFIG = {
+    'CLOSE_DELAY': 2,                      # K线收盘后延迟多少秒再扫描（等待交易所生成收盘K线）
+    'STRATEGY_REFRESH': 900                # 检查策略文件是否修改的间隔（秒），修改后重新加载策略
+}
+
+# 交易对池缓存配置（lib/tool/market_universe.py，扫描器、回测和报告查看器共用同一个快照文件）
+MARKET_UNIVERSE_CONFIG = {
+    'MARKETS_TTL': 6 * 3600,               # 交易对元数据有效期（秒）
+    'TICKERS_TTL': 60,                     # ticker（24小时成交量）有效期（秒）
+    'QUOTE': 'USDT',                       # 交易对池的计价币种
+    'MARKET_TYPE': 'spot',                 # 交易对池的市场类型
+    'PERSIST': True,                       # 是否把快照保存到磁盘（重启后在有效期内直接使用）
+    'SNAPSHOT_PATH': 'reports/market_universe.json'
+}
+
+# 交易信号归档配置（models/signal_archive.py，每轮扫描的分析结果追加写入SQLite，报告查看器的"历史信号"页面查询）
+SIGNAL_ARCHIVE_CONFIG = {
+    'ENABLED': True,                       # 扫描器是否归档每轮的分析结果
+    'PATH': 'reports/signal_archive.db',   # 数据库文件（相对路径基于项目根目录）
+    'INCLUDE_NEUTRAL': True,               # 是否归档综合操作为观望的分析结果
+    'BATCH_SIZE': 1000                     # 每次批量写入的行数
 }
 
 # 验证配置
@@ -66,6 +180,7 @@ TRADING_CONFIG = {
     
     # 持仓控制配置
     'MAX_POSITIONS': 10,      # 最大持仓数量限制，超过此数量将放弃新的交易机会
+    'POSITION_MAX_AGE': None,  # 仓位快照可接受的最大年龄（秒），None使用POSITION_SERVICE_CONFIG['MAX_AGE']
     
     # 交易机制ID
     'MECHANISM_ID': 13,        # 交易机制唯一标识
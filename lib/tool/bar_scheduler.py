@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+K线收盘对齐调度模块
+扫描器常驻模式（multi_timeframe_system.py --daemon）使用: 在策略所需时间框架的K线收盘时刻唤醒，
+返回本次收盘的时间框架，只重新评估使用这些时间框架的策略；策略注册表按较慢的周期刷新
+（交易对列表和成交量由 lib/tool/market_universe.py 按各自的有效期缓存）
+
+K线收盘时刻按UTC纪元对齐（OKX的分钟/小时K线均按UTC整点对齐）
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lib.tool.ohlcv_cache import timeframe_to_ms
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_SCANNER_DAEMON_CONFIG = {
+    'CLOSE_DELAY': 2,              # K线收盘后延迟多少秒再扫描（等待交易所生成收盘K线）
+    'STRATEGY_REFRESH': 900,       # 检查策略文件是否修改的间隔（秒），修改后重新加载策略
+}
+
+
+class BarCloseScheduler:
+    """按K线收盘时刻唤醒的调度器"""
+
+    def __init__(self, timeframes: Iterable[str], close_delay: float = 2.0,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            timeframes: 需要调度的时间框架，如 ['15m', '1h', '4h']
+            close_delay: 收盘后延迟唤醒的秒数
+            clock: 当前时间（秒）的函数，便于测试
+        """
+        self.close_delay = close_delay
+        self.clock = clock
+        self.periods: Dict[str, int] = {}
+        self.set_timeframes(timeframes)
+
+    def set_timeframes(self, timeframes: Iterable[str]):
+        """更新调度的时间框架（策略重新加载后调用）"""
+        self.periods = {tf: timeframe_to_ms(tf) // 1000 for tf in timeframes}
+
+    def next_close(self, now: Optional[float] = None) -> Tuple[int, List[str]]:
+        """
+        计算下一个收盘时刻
+
+        Args:
+            now: 当前时间（秒），默认使用clock()
+
+        Returns:
+            (收盘时刻的秒级时间戳, 在该时刻收盘的时间框架列表（按周期从小到大）)
+        """
+        if not self.periods:
+            raise ValueError("没有需要调度的时间框架")
+        now = self.clock() if now is None else now
+        # 已过了收盘时刻但还在延迟期内时，仍然属于该收盘时刻
+        reference = now - self.close_delay
+        closes = {tf: (int(reference // period) + 1) * period for tf, period in self.periods.items()}
+        close_ts = min(closes.values())
+        due = sorted((tf for tf, ts in closes.items() if ts == close_ts), key=lambda tf: self.periods[tf])
+        return close_ts, due
+
+    def wait_next(self, stop_event: Optional[threading.Event] = None) -> Optional[Tuple[int, List[str]]]:
+        """
+        阻塞到下一个收盘时刻（加上close_delay）
+
+        Returns:
+            (收盘时刻, 收盘的时间框架列表)；stop_event被设置时返回None
+        """
+        stop_event = stop_event or threading.Event()
+        close_ts, due = self.next_close()
+        wake_at = close_ts + self.close_delay
+        while True:
+            remaining = wake_at - self.clock()
+            if remaining <= 0:
+                return close_ts, due
+            # 分段等待，系统时间被校正时也能及时唤醒
+            if stop_event.wait(min(remaining, 30)):
+                return None
+
+
+class RefreshTimer:
+    """按固定间隔刷新的计时器（从未刷新过时立即到期）"""
+
+    def __init__(self, interval: float, clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self.last = None
+
+    def due(self) -> bool:
+        return self.last is None or self.clock() - self.last >= self.interval
+
+    def mark(self):
+        self.last = self.clock()
+
+    def reset(self):
+        self.last = None
+
+
+def due_strategies(required_timeframes: Dict[str, Iterable[str]], due_timeframes: Iterable[str]) -> List[str]:
+    """
+    本次收盘需要重新评估的策略
+
+    Args:
+        required_timeframes: {策略名: 策略使用的时间框架}
+        due_timeframes: 本次收盘的时间框架
+
+    Returns:
+        使用了任一收盘时间框架的策略名列表
+    """
+    due = set(due_timeframes)
+    return [name for name, timeframes in required_timeframes.items() if due & set(timeframes)]
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+紧凑K线容器模块
+CandleArray 用连续的 float64 NumPy 数组保存开/高/低/收/量，用 int64 数组保存毫秒时间戳，
+从交易所返回的OHLCV列表构造时只做一次数组转换，切片返回零拷贝视图；需要pandas计算时再通过 to_frame() 惰性转换（结果缓存）
+
+扫描器、回测引擎、condition_analyzer 和 strategy_executor 都接受 CandleArray 或 DataFrame，
+需要DataFrame的地方统一调用 as_frame() 转换
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+VALUE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleArray:
+    """数组形式的K线数据，按时间升序"""
+
+    __slots__ = ('timestamp', '_values', 'attrs', '_frame')
+
+    def __init__(self, timestamp: np.ndarray, values: np.ndarray, attrs: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            timestamp: int64 毫秒时间戳数组，长度n
+            values: float64 数组，形状 (5, n)，每一行依次为 open/high/low/close/volume（每一列数据在内存中连续）
+            attrs: 附加信息（symbol/timeframe/live等，转换为DataFrame时复制到df.attrs）
+        """
+        self.timestamp = timestamp
+        self._values = values
+        self.attrs = attrs if attrs is not None else {}
+        self._frame = None
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv: Sequence[Sequence[float]], attrs: Optional[Dict[str, Any]] = None) -> 'CandleArray':
+        """从 [[时间戳, 开, 高, 低, 收, 量], ...] 列表构造（交易所/WebSocket缓冲区返回的格式）"""
+        if len(ohlcv) == 0:
+            return cls.create_empty(attrs)
+        array = np.asarray(ohlcv, dtype='float64')[:, :6]
+        # 转置后复制，使每一列在内存中连续
+        columns = np.ascontiguousarray(array.T)
+        return cls(columns[0].astype('int64'), columns[1:], attrs)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], attrs: Optional[Dict[str, Any]] = None) -> 'CandleArray':
+        """从 {列名: 数组} 构造（CandleStore.read 返回的格式）"""
+        timestamp = np.asarray(columns['timestamp'], dtype='int64')
+        values = np.empty((len(VALUE_COLUMNS), len(timestamp)), dtype='float64')
+        for row, column in enumerate(VALUE_COLUMNS):
+            values[row] = columns[column]
+        return cls(timestamp, values, attrs)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'CandleArray':
+        """从DataFrame构造（时间取自DatetimeIndex、timestamp列或datetime列）"""
+        if isinstance(df.index, pd.DatetimeIndex):
+            timestamp = df.index.to_numpy(dtype='datetime64[ms]').astype('int64')
+        elif 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            timestamp = df['timestamp'].to_numpy(dtype='int64')
+        else:
+            column = 'timestamp' if 'timestamp' in df.columns else 'datetime'
+            timestamp = df[column].to_numpy(dtype='datetime64[ms]').astype('int64')
+        values = np.ascontiguousarray(df[list(VALUE_COLUMNS)].to_numpy(dtype='float64').T)
+        return cls(timestamp, values, dict(df.attrs))
+
+    @classmethod
+    def create_empty(cls, attrs: Optional[Dict[str, Any]] = None) -> 'CandleArray':
+        """构造没有K线的CandleArray（empty属性用于判断是否为空，不能与构造函数同名）"""
+        return cls(np.empty(0, dtype='int64'), np.empty((len(VALUE_COLUMNS), 0), dtype='float64'), attrs)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.timestamp) == 0
+
+    @property
+    def columns(self) -> List[str]:
+        return list(VALUE_COLUMNS)
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamp.nbytes + self._values.nbytes
+
+    def __getitem__(self, key: Union[str, slice]) -> Union[np.ndarray, 'CandleArray']:
+        """
+        列名返回数组视图（'timestamp'为毫秒时间戳，'datetime'为datetime64[ms]），切片返回新的CandleArray视图
+        """
+        if isinstance(key, slice):
+            return CandleArray(self.timestamp[key], self._values[:, key], self.attrs)
+        if key == 'timestamp':
+            return self.timestamp
+        if key == 'datetime':
+            return self.timestamp.astype('datetime64[ms]')
+        try:
+            return self._values[VALUE_COLUMNS.index(key)]
+        except ValueError:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in VALUE_COLUMNS or key in ('timestamp', 'datetime')
+
+    def tail(self, n: int) -> 'CandleArray':
+        """最后n根K线的视图"""
+        return self[max(0, len(self) - n):]
+
+    def last(self, column: str = 'close') -> float:
+        """最后一根K线的某一列"""
+        return float(self[column][-1])
+
+    def to_frame(self, time_index: bool = True) -> pd.DataFrame:
+        """
+        转换为DataFrame
+
+        Args:
+            time_index: True 返回以时间（名为timestamp的DatetimeIndex）为索引的DataFrame（扫描器格式，结果缓存）；
+                        False 返回包含 timestamp(毫秒)/OHLCV/datetime 列的DataFrame（回测格式）
+        """
+        if time_index and self._frame is not None:
+            return self._frame
+        data = {column: self._values[row] for row, column in enumerate(VALUE_COLUMNS)}
+        if time_index:
+            index = pd.DatetimeIndex(self.timestamp.astype('datetime64[ms]').astype('datetime64[ns]'), name='timestamp')
+            df = pd.DataFrame(data, index=index, copy=False)
+        else:
+            df = pd.DataFrame({'timestamp': self.timestamp, **data}, copy=False)
+            df['datetime'] = pd.to_datetime(self.timestamp, unit='ms')
+        df.attrs.update(self.attrs)
+        if time_index:
+            self._frame = df
+        return df
+
+    def to_ohlcv(self) -> List[List[float]]:
+        """转换回 [[时间戳, 开, 高, 低, 收, 量], ...] 列表"""
+        return [[int(ts)] + row for ts, row in zip(self.timestamp, self._values.T.tolist())]
+
+
+def as_frame(data: Union[pd.DataFrame, CandleArray], time_index: bool = True) -> pd.DataFrame:
+    """CandleArray转换为DataFrame，DataFrame原样返回"""
+    if isinstance(data, CandleArray):
+        return data.to_frame(time_index)
+    return data
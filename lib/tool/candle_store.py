@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+列式K线存储模块
+按 交易对/时间框架/月份 分区，每列保存为一个 .npy 文件（读取时内存映射），
+支持区间查询、只追加更新和缺口检测，用于替代回测中的Excel历史数据缓存
+
+目录结构:
+    root/
+        BTC-USDT/
+            15m/
+                2024-01/
+                    timestamp.npy  (int64, 毫秒)
+                    open.npy / high.npy / low.npy / close.npy / volume.npy  (float64)
+                2024-02/
+                ...
+                known_gaps.json   交易所本身缺失数据的区间，避免重复请求
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lib.tool.ohlcv_cache import timeframe_to_ms
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 列名与数据类型
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+CANDLE_COLUMNS = ['timestamp'] + PRICE_COLUMNS
+
+
+def month_key(ts_ms: np.ndarray) -> np.ndarray:
+    """将毫秒时间戳数组转换为 'YYYY-MM' 分区键数组"""
+    return np.asarray(ts_ms, dtype='int64').astype('datetime64[ms]').astype('datetime64[M]').astype(str)
+
+
+def month_range(start_ms: int, end_ms: int) -> List[str]:
+    """返回 [start_ms, end_ms] 覆盖的所有月份分区键"""
+    start_month = np.datetime64(int(start_ms), 'ms').astype('datetime64[M]')
+    end_month = np.datetime64(int(end_ms), 'ms').astype('datetime64[M]')
+    return [str(m) for m in np.arange(start_month, end_month + 1)]
+
+
+class CandleStore:
+    """按 交易对/时间框架/月份 分区的列式K线存储"""
+
+    def __init__(self, root: str):
+        """
+        初始化存储
+
+        Args:
+            root: 存储根目录
+        """
+        self.root = root
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # 统计信息：读取的分区数、API补齐的缺口数、写入的K线数
+        self.stats = {'partitions_read': 0, 'gaps_fetched': 0, 'bars_written': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _lock_for(self, symbol: str, timeframe: str) -> threading.Lock:
+        key = (symbol, timeframe)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _series_dir(self, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.root, safe_symbol, timeframe)
+
+    def _partition_dir(self, symbol: str, timeframe: str, month: str) -> str:
+        return os.path.join(self._series_dir(symbol, timeframe), month)
+
+    def list_partitions(self, symbol: str, timeframe: str) -> List[str]:
+        """列出已存在的月份分区（升序）"""
+        series_dir = self._series_dir(symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        return sorted(name for name in os.listdir(series_dir)
+                      if os.path.isfile(os.path.join(series_dir, name, 'timestamp.npy')))
+
+    def _load_partition(self, symbol: str, timeframe: str, month: str, mmap: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """读取单个月份分区，列长度不一致（写入中断）时视为不存在"""
+        partition_dir = self._partition_dir(symbol, timeframe, month)
+        if not os.path.isfile(os.path.join(partition_dir, 'timestamp.npy')):
+            return None
+        try:
+            columns = {col: np.load(os.path.join(partition_dir, f'{col}.npy'), mmap_mode='r' if mmap else None)
+                       for col in CANDLE_COLUMNS}
+        except Exception as e:
+            logger.warning(f"读取K线分区失败 {partition_dir}: {e}")
+            return None
+        lengths = {len(arr) for arr in columns.values()}
+        if len(lengths) != 1:
+            logger.warning(f"K线分区列长度不一致 {partition_dir}: {lengths}，忽略该分区")
+            return None
+        self.stats['partitions_read'] += 1
+        return columns
+
+    def _write_partition(self, symbol: str, timeframe: str, month: str, columns: Dict[str, np.ndarray]):
+        """写入单个月份分区，每列先写临时文件再原子替换；timestamp列最后写入"""
+        partition_dir = self._partition_dir(symbol, timeframe, month)
+        os.makedirs(partition_dir, exist_ok=True)
+        for col in PRICE_COLUMNS + ['timestamp']:
+            path = os.path.join(partition_dir, f'{col}.npy')
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(columns[col]))
+            os.replace(tmp_path, path)
+
+    def write(self, symbol: str, timeframe: str, bars) -> int:
+        """
+        写入K线，只追加/覆盖对应月份分区，时间戳相同的K线以新数据为准
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间框架
+            bars: n×6 数组或列表，列顺序为 [timestamp, open, high, low, close, volume]
+
+        Returns:
+            写入的K线数量
+        """
+        bars = np.asarray(bars, dtype='float64')
+        if bars.size == 0:
+            return 0
+        bars = bars[:, :len(CANDLE_COLUMNS)]
+        ts = bars[:, 0].astype('int64')
+        months = month_key(ts)
+        with self._lock_for(symbol, timeframe):
+            for month in np.unique(months):
+                mask = months == month
+                new_ts = ts[mask]
+                new_values = {col: bars[mask, i + 1] for i, col in enumerate(PRICE_COLUMNS)}
+                existing = self._load_partition(symbol, timeframe, month, mmap=False)
+                if existing is not None and len(existing['timestamp']) > 0:
+                    all_ts = np.concatenate([existing['timestamp'], new_ts])
+                    all_values = {col: np.concatenate([existing[col], new_values[col]]) for col in PRICE_COLUMNS}
+                else:
+                    all_ts = new_ts
+                    all_values = new_values
+                # 按时间排序并去重，保留最后写入的数据
+                order = np.argsort(all_ts, kind='stable')
+                all_ts = all_ts[order]
+                keep = np.ones(len(all_ts), dtype=bool)
+                keep[:-1] = all_ts[1:] != all_ts[:-1]
+                columns = {'timestamp': all_ts[keep]}
+                for col in PRICE_COLUMNS:
+                    columns[col] = all_values[col][order][keep]
+                self._write_partition(symbol, timeframe, month, columns)
+            self.stats['bars_written'] += len(ts)
+        return len(ts)
+
+    def read(self, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> Dict[str, np.ndarray]:
+        """
+        区间查询，只读取覆盖 [start_ms, end_ms] 的月份分区
+
+        Returns:
+            {列名: 数组}，列为 CANDLE_COLUMNS，按时间升序；无数据时各列为空数组
+        """
+        parts = {col: [] for col in CANDLE_COLUMNS}
+        existing_months = set(self.list_partitions(symbol, timeframe))
+        for month in month_range(start_ms, end_ms):
+            if month not in existing_months:
+                continue
+            columns = self._load_partition(symbol, timeframe, month)
+            if columns is None:
+                continue
+            ts = columns['timestamp']
+            # 分区内按时间有序，用二分查找确定切片范围
+            lo = int(np.searchsorted(ts, start_ms, side='left'))
+            hi = int(np.searchsorted(ts, end_ms, side='right'))
+            if hi <= lo:
+                continue
+            for col in CANDLE_COLUMNS:
+                parts[col].append(columns[col][lo:hi])
+        result = {}
+        for col in CANDLE_COLUMNS:
+            dtype = 'int64' if col == 'timestamp' else 'float64'
+            result[col] = np.concatenate(parts[col]) if parts[col] else np.empty(0, dtype=dtype)
+        return result
+
+    def coverage(self, symbol: str, timeframe: str) -> Optional[Tuple[int, int]]:
+        """返回已存储数据的 (最早时间戳, 最晚时间戳)，无数据时返回None"""
+        months = self.list_partitions(symbol, timeframe)
+        if not months:
+            return None
+        first = self._load_partition(symbol, timeframe, months[0])
+        last = self._load_partition(symbol, timeframe, months[-1])
+        if first is None or last is None or len(first['timestamp']) == 0 or len(last['timestamp']) == 0:
+            return None
+        return int(first['timestamp'][0]), int(last['timestamp'][-1])
+
+    def _known_gaps_path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self._series_dir(symbol, timeframe), 'known_gaps.json')
+
+    def _load_known_gaps(self, symbol: str, timeframe: str) -> List[Tuple[int, int]]:
+        path = self._known_gaps_path(symbol, timeframe)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return [tuple(gap) for gap in json.load(f)]
+        except Exception as e:
+            logger.warning(f"读取已知缺口文件失败 {path}: {e}")
+            return []
+
+    def _save_known_gaps(self, symbol: str, timeframe: str, gaps: List[Tuple[int, int]]):
+        path = self._known_gaps_path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(set(gaps)), f)
+        except Exception as e:
+            logger.warning(f"写入已知缺口文件失败 {path}: {e}")
+
+    def find_gaps(self, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """
+        检测 [start_ms, end_ms] 内缺失的K线区间（不含已登记的交易所缺口）
+
+        Returns:
+            [(缺口开始时间戳, 缺口结束时间戳), ...]，时间戳为缺失的第一根/最后一根K线的开盘时间
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        # 对齐到K线开盘时间
+        first_expected = -(-int(start_ms) // tf_ms) * tf_ms
+        last_expected = (int(end_ms) // tf_ms) * tf_ms
+        if last_expected < first_expected:
+            return []
+
+        ts = self.read(symbol, timeframe, first_expected, last_expected)['timestamp']
+        gaps = []
+        if len(ts) == 0:
+            gaps.append((first_expected, last_expected))
+        else:
+            if ts[0] > first_expected:
+                gaps.append((first_expected, int(ts[0]) - tf_ms))
+            # 相邻K线间隔大于一个周期的位置即为缺口
+            jumps = np.nonzero(np.diff(ts) > tf_ms)[0]
+            for i in jumps:
+                gaps.append((int(ts[i]) + tf_ms, int(ts[i + 1]) - tf_ms))
+            if ts[-1] < last_expected:
+                gaps.append((int(ts[-1]) + tf_ms, last_expected))
+
+        known = self._load_known_gaps(symbol, timeframe)
+        if known:
+            gaps = [gap for gap in gaps if not any(k_start <= gap[0] and gap[1] <= k_end for k_start, k_end in known)]
+        return gaps
+
+    def get_range(self, symbol: str, timeframe: str, start_ms: int, end_ms: int,
+                  fetch_fn: Callable[[int, int], List[List[float]]]) -> Dict[str, np.ndarray]:
+        """
+        获取 [start_ms, end_ms] 区间的K线，只向API请求存储中缺失的区间
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间框架
+            start_ms: 开始时间（毫秒时间戳）
+            end_ms: 结束时间（毫秒时间戳）
+            fetch_fn: 获取函数 fetch_fn(start_ms, end_ms)，返回 [[ts, o, h, l, c, v], ...]；
+                请求失败时返回None（或抛出异常），该区间不会登记为已知缺口，下次重新请求
+
+        Returns:
+            {列名: 数组}，按时间升序
+        """
+        gaps = self.find_gaps(symbol, timeframe, start_ms, end_ms)
+        if gaps:
+            logger.info(f"{symbol} {timeframe} 检测到 {len(gaps)} 个数据缺口，开始补齐")
+            new_known_gaps = []
+            now_ms = int(time.time() * 1000)
+            for gap_start, gap_end in gaps:
+                bars = fetch_fn(gap_start, gap_end)
+                self.stats['gaps_fetched'] += 1
+                if bars is None:
+                    logger.warning(f"{symbol} {timeframe} 缺口 {gap_start}~{gap_end} 获取失败，下次重新请求")
+                    continue
+                self.write(symbol, timeframe, bars)
+                # 请求成功但已经过去的区间交易所也没有数据时登记为已知缺口，下次不再请求
+                inside = [bar for bar in bars if gap_start <= bar[0] <= gap_end]
+                if not inside and gap_end < now_ms - timeframe_to_ms(timeframe):
+                    new_known_gaps.append((gap_start, gap_end))
+            if new_known_gaps:
+                with self._lock_for(symbol, timeframe):
+                    self._save_known_gaps(symbol, timeframe, self._load_known_gaps(symbol, timeframe) + new_known_gaps)
+        return self.read(symbol, timeframe, start_ms, end_ms)
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+增量指标引擎
+按 (交易对, 时间框架, 指标, 参数) 保存指标状态，新K线收盘时以O(1)更新 EMA / RSI / ATR / 滚动均值 / 标准差 / 最小值 / 最大值，
+避免每轮扫描都在300根K线的窗口上重新计算
+
+使用方式:
+    扫描器在DataFrame上设置 df.attrs['symbol'] / df.attrs['timeframe']，最后一根K线未收盘时设置 df.attrs['live'] = True，
+    indicator_cache 和 lib2.calculate_atr 会自动通过 incremental_engine 获取指标序列；未设置这些属性的DataFrame（例如回测）仍走批量计算
+
+说明:
+    状态在首次计算后持续递推，返回前按当前窗口对齐（align），与在该窗口上批量计算的结果一致：
+    滚动类指标在窗口前 min_periods-1 根返回NaN（RSI第一根涨跌幅按0计），
+    EMA按 W_t = E_t + (1-alpha)^(t-s) * (x_s - E_s) 换算成从窗口起点 s 重新初始化的结果
+"""
+
+import math
+import logging
+import threading
+from collections import deque, OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# 尝试导入配置文件，如果不存在则使用默认值
+try:
+    from config import INCREMENTAL_INDICATOR_CONFIG
+except ImportError:
+    INCREMENTAL_INDICATOR_CONFIG = {}
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_INCREMENTAL_INDICATOR_CONFIG = {
+    'ENABLED': True,         # 是否启用增量指标
+    'MAX_STREAMS': 20000,    # 最多保存的指标状态数量，超出时按LRU淘汰
+}
+
+NAN = float('nan')
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class EMAState:
+    """指数移动平均（adjust=False）"""
+
+    def __init__(self, span: int, column: str = 'close'):
+        self.alpha = 2.0 / (span + 1)
+        self.column = column
+        self.value = None
+
+    def update(self, row: Dict[str, float]) -> float:
+        x = row[self.column]
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def peek(self, row: Dict[str, float]) -> float:
+        x = row[self.column]
+        return x if self.value is None else self.value + self.alpha * (x - self.value)
+
+    def seed(self, columns: Dict[str, np.ndarray], batch_values: np.ndarray):
+        """从批量计算结果初始化：EMA只需要最后一个值"""
+        self.value = float(batch_values[-1]) if len(batch_values) else None
+
+    def align(self, columns: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+        """换算成从窗口第一根K线重新初始化的EMA（两者满足同一递推式，差值按(1-alpha)衰减）"""
+        if len(values):
+            decay = (1.0 - self.alpha) ** np.arange(len(values))
+            values += decay * (columns[self.column][0] - values[0])
+        return values
+
+
+class RollingState:
+    """滚动均值/标准差（标准差ddof=1，与pandas一致），窗口未满时返回NaN"""
+
+    # 每更新这么多次后重新求和，避免浮点误差累积
+    RESUM_INTERVAL = 1024
+
+    def __init__(self, window: int, column: str = 'close', kind: str = 'mean'):
+        self.window = window
+        self.column = column
+        self.kind = kind
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._updates = 0
+
+    def _push(self, x: float):
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        self._updates += 1
+        if self._updates >= self.RESUM_INTERVAL:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+            self._updates = 0
+
+    def _result(self, count: int, total: float, total_sq: float) -> float:
+        if count < self.window:
+            return NAN
+        mean = total / count
+        if self.kind == 'mean':
+            return mean
+        if count < 2:
+            return NAN
+        variance = max(0.0, (total_sq - count * mean * mean) / (count - 1))
+        return math.sqrt(variance)
+
+    def update(self, row: Dict[str, float]) -> float:
+        self._push(row[self.column])
+        return self._result(len(self.values), self.total, self.total_sq)
+
+    def peek(self, row: Dict[str, float]) -> float:
+        x = row[self.column]
+        total, total_sq, count = self.total + x, self.total_sq + x * x, len(self.values) + 1
+        if count > self.window:
+            old = self.values[0]
+            total, total_sq, count = total - old, total_sq - old * old, count - 1
+        return self._result(count, total, total_sq)
+
+    def seed(self, columns: Dict[str, np.ndarray], batch_values: np.ndarray):
+        for x in columns[self.column][-self.window:]:
+            self._push(float(x))
+
+    def align(self, columns: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+        """窗口内不足window根时为NaN"""
+        values[:self.window - 1] = NAN
+        return values
+
+
+class ExtremeState:
+    """滚动最小值/最大值（单调队列，均摊O(1)）"""
+
+    def __init__(self, window: int, column: str, kind: str = 'min'):
+        self.window = window
+        self.column = column
+        self.is_min = kind == 'min'
+        self.queue = deque()  # (序号, 值)，值单调
+        self.count = 0
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a <= b if self.is_min else a >= b
+
+    def update(self, row: Dict[str, float]) -> float:
+        x = row[self.column]
+        while self.queue and self._dominates(x, self.queue[-1][1]):
+            self.queue.pop()
+        self.queue.append((self.count, x))
+        self.count += 1
+        while self.queue[0][0] <= self.count - 1 - self.window:
+            self.queue.popleft()
+        return self.queue[0][1] if self.count >= self.window else NAN
+
+    def peek(self, row: Dict[str, float]) -> float:
+        x = row[self.column]
+        if self.count + 1 < self.window:
+            return NAN
+        # 新K线加入后最早的一根移出窗口
+        expire_index = self.count - self.window
+        for index, value in self.queue:
+            if index > expire_index:
+                return value if self._dominates(value, x) else x
+        return x
+
+    def seed(self, columns: Dict[str, np.ndarray], batch_values: np.ndarray):
+        values = columns[self.column]
+        # 只需推入最后window根，序号从完整历史中的位置开始，保证窗口是否已满的判断正确
+        self.count = max(0, len(values) - self.window)
+        for x in values[-self.window:]:
+            self.update({self.column: float(x)})
+
+    def align(self, columns: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+        """窗口内不足window根时为NaN"""
+        values[:self.window - 1] = NAN
+        return values
+
+
+class RSIState:
+    """RSI（涨跌幅使用简单移动平均，与condition_analyzer一致）"""
+
+    def __init__(self, window: int):
+        self.gains = RollingState(window, 'v')
+        self.losses = RollingState(window, 'v')
+        self.prev_close = None
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if loss == 0:
+            return 100.0 if gain > 0 else NAN
+        return 100 - (100 / (1 + gain / loss))
+
+    def _split(self, close: float) -> Tuple[float, float]:
+        # 第一根K线没有涨跌幅，按0计入（与pandas中where(delta > 0, 0)的行为一致）
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        return (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+
+    def update(self, row: Dict[str, float]) -> float:
+        gain, loss = self._split(row['close'])
+        self.prev_close = row['close']
+        return self._rsi(self.gains.update({'v': gain}), self.losses.update({'v': loss}))
+
+    def peek(self, row: Dict[str, float]) -> float:
+        gain, loss = self._split(row['close'])
+        return self._rsi(self.gains.peek({'v': gain}), self.losses.peek({'v': loss}))
+
+    def seed(self, columns: Dict[str, np.ndarray], batch_values: np.ndarray):
+        close = columns['close']
+        tail = close[-(self.gains.window + 1):]
+        if len(tail) < len(close):
+            # 窗口之前的一根K线只用于计算第一根涨跌幅
+            self.prev_close = float(tail[0])
+            tail = tail[1:]
+        for x in tail:
+            self.update({'close': float(x)})
+
+    def align(self, columns: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+        """窗口内不足window根时为NaN；第window根的均值包含窗口第一根按0计的涨跌幅，单独重新计算"""
+        window = self.gains.window
+        values[:window - 1] = NAN
+        if len(values) >= window:
+            delta = np.diff(columns['close'][:window])
+            gain = float(np.sum(np.where(delta > 0, delta, 0.0))) / window
+            loss = float(np.sum(np.where(delta < 0, -delta, 0.0))) / window
+            values[window - 1] = self._rsi(gain, loss)
+        return values
+
+
+class ATRState:
+    """ATR（真实波动幅度的简单移动平均，与lib2.calculate_atr一致）"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.tr = RollingState(period, 'v')
+        self.prev_close = None
+
+    def _true_range(self, row: Dict[str, float]) -> Optional[float]:
+        if self.prev_close is None:
+            return None
+        return max(row['high'] - row['low'], abs(row['high'] - self.prev_close), abs(row['low'] - self.prev_close))
+
+    def update(self, row: Dict[str, float]) -> float:
+        tr = self._true_range(row)
+        self.prev_close = row['close']
+        # 第一根K线的TR为NaN，不计入窗口
+        return NAN if tr is None else self.tr.update({'v': tr})
+
+    def peek(self, row: Dict[str, float]) -> float:
+        tr = self._true_range(row)
+        return NAN if tr is None else self.tr.peek({'v': tr})
+
+    def seed(self, columns: Dict[str, np.ndarray], batch_values: np.ndarray):
+        n = len(columns['close'])
+        start = max(0, n - self.period - 1)
+        if start > 0:
+            self.prev_close = float(columns['close'][start - 1])
+        for i in range(start, n):
+            self.update({'high': float(columns['high'][i]), 'low': float(columns['low'][i]), 'close': float(columns['close'][i])})
+
+    def align(self, columns: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+        """窗口第一根K线没有前收盘价（TR为NaN），前period根为NaN"""
+        values[:self.period] = NAN
+        return values
+
+
+def create_state(name: str, params: Tuple):
+    """根据指标名和参数创建状态对象，不支持的指标（或非K线原始列上的指标）返回None"""
+    if name in ('ema', 'sma', 'std', 'min', 'max') and params[0] not in OHLCV_FIELDS:
+        return None
+    if name == 'ema':
+        column, span = params
+        return EMAState(span, column)
+    if name in ('sma', 'std'):
+        column, window = params
+        return RollingState(window, column, 'mean' if name == 'sma' else 'std')
+    if name in ('min', 'max'):
+        column, window = params
+        return ExtremeState(window, column, name)
+    if name == 'rsi':
+        return RSIState(params[0])
+    if name == 'atr':
+        return ATRState(params[0])
+    return None
+
+
+class IndicatorStream:
+    """单个 (交易对, 时间框架, 指标, 参数) 的状态和已收盘K线的指标历史"""
+
+    def __init__(self, state, capacity: int):
+        self.state = state
+        self.capacity = capacity
+        self.ts = np.empty(capacity, dtype='int64')
+        self.values = np.empty(capacity, dtype='float64')
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self.ts[self.size - 1]) if self.size else None
+
+    def append(self, ts: int, value: float):
+        if self.size == self.capacity:
+            # 环形缓冲区满时整体左移一半，保持最近的数据连续
+            keep = self.capacity // 2
+            self.ts[:keep] = self.ts[self.size - keep:self.size]
+            self.values[:keep] = self.values[self.size - keep:self.size]
+            self.size = keep
+        self.ts[self.size] = ts
+        self.values[self.size] = value
+        self.size += 1
+
+    def tail(self, first_ts: int, count: int) -> Optional[np.ndarray]:
+        """返回以first_ts开头的最近count个指标值，历史不覆盖时返回None"""
+        if count == 0:
+            return np.empty(0)
+        if count > self.size or int(self.ts[self.size - count]) != first_ts:
+            return None
+        return self.values[self.size - count:self.size]
+
+
+class IncrementalIndicatorEngine:
+    """增量指标引擎"""
+
+    def __init__(self, config: Dict = None):
+        self.config = {**DEFAULT_INCREMENTAL_INDICATOR_CONFIG, **(config or {})}
+        self.enabled = bool(self.config['ENABLED'])
+        self._streams: "OrderedDict[Tuple, IndicatorStream]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 统计信息：增量更新的K线数、重建次数、未收盘K线的预估次数
+        self.stats = {'updates': 0, 'rebuilds': 0, 'peeks': 0}
+
+    def supports(self, df: pd.DataFrame) -> bool:
+        """DataFrame是否带有增量计算所需的交易对/时间框架信息"""
+        return self.enabled and bool(df.attrs.get('symbol')) and bool(df.attrs.get('timeframe')) and len(df) > 0
+
+    @staticmethod
+    def _timestamps(df: pd.DataFrame) -> np.ndarray:
+        if isinstance(df.index, pd.DatetimeIndex):
+            return df.index.to_numpy(dtype='datetime64[ms]').astype('int64')
+        if 'timestamp' in df.columns:
+            values = df['timestamp']
+            if pd.api.types.is_datetime64_any_dtype(values):
+                return values.to_numpy(dtype='datetime64[ms]').astype('int64')
+            return values.to_numpy(dtype='int64')
+        return df['datetime'].to_numpy(dtype='datetime64[ms]').astype('int64')
+
+    def _get_stream(self, key: Tuple) -> Optional[IndicatorStream]:
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self._streams.move_to_end(key)
+            return stream
+
+    def _put_stream(self, key: Tuple, stream: IndicatorStream):
+        with self._lock:
+            self._streams[key] = stream
+            self._streams.move_to_end(key)
+            while len(self._streams) > self.config['MAX_STREAMS']:
+                self._streams.popitem(last=False)
+
+    def series(self, df: pd.DataFrame, name: str, params: Tuple, batch_fn: Callable[[], pd.Series]) -> pd.Series:
+        """
+        获取df上的指标序列，已有状态时只增量处理新收盘的K线
+
+        Args:
+            df: 带有 attrs['symbol'] / attrs['timeframe'] 的K线数据，attrs['live']为True表示最后一根K线未收盘
+            name: 指标名（ema/sma/std/min/max/rsi/atr）
+            params: 指标参数
+            batch_fn: 批量计算函数，首次计算或数据不连续时使用
+
+        Returns:
+            与df索引对齐的指标序列
+        """
+        if not self.supports(df):
+            return batch_fn()
+        key = (df.attrs['symbol'], df.attrs['timeframe'], name, params)
+        live = bool(df.attrs.get('live', False))
+        ts = self._timestamps(df)
+        closed_count = len(df) - 1 if live else len(df)
+
+        stream = self._get_stream(key)
+        if stream is None:
+            state = create_state(name, params)
+            if state is None:
+                return batch_fn()
+            stream = IndicatorStream(state, capacity=max(2 * len(df), 512))
+            self._put_stream(key, stream)
+
+        with stream.lock:
+            columns = None
+            last_ts = stream.last_ts
+            # 已有状态且新数据与之连续时增量更新，否则用批量结果重建
+            if last_ts is not None and closed_count > 0 and ts[0] <= last_ts <= ts[closed_count - 1]:
+                start = int(np.searchsorted(ts[:closed_count], last_ts, side='right'))
+                if int(ts[start - 1]) == last_ts:
+                    if start < closed_count:
+                        columns = self._columns(df)
+                        for i in range(start, closed_count):
+                            value = stream.state.update(self._row(columns, i))
+                            stream.append(int(ts[i]), value)
+                        with self._lock:
+                            self.stats['updates'] += closed_count - start
+                    history = stream.tail(int(ts[0]), closed_count)
+                    if history is not None:
+                        columns = columns or self._columns(df)
+                        values = history.copy()
+                        if live:
+                            values = np.append(values, stream.state.peek(self._row(columns, len(df) - 1)))
+                            with self._lock:
+                                self.stats['peeks'] += 1
+                        # 按当前窗口对齐，与在df上批量计算的结果一致
+                        return pd.Series(stream.state.align(columns, values), index=df.index)
+
+            # 重建：批量计算一次，用已收盘部分初始化状态
+            batch = batch_fn()
+            columns = self._columns(df)
+            batch_values = batch.to_numpy(dtype='float64')
+            closed_columns = {col: arr[:closed_count] for col, arr in columns.items()}
+            stream.state = create_state(name, params)
+            stream.state.seed(closed_columns, batch_values[:closed_count])
+            stream.size = 0
+            if closed_count > stream.capacity:
+                stream.capacity = 2 * closed_count
+                stream.ts = np.empty(stream.capacity, dtype='int64')
+                stream.values = np.empty(stream.capacity, dtype='float64')
+            stream.ts[:closed_count] = ts[:closed_count]
+            stream.values[:closed_count] = batch_values[:closed_count]
+            stream.size = closed_count
+            with self._lock:
+                self.stats['rebuilds'] += 1
+            return batch
+
+    @staticmethod
+    def _columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        return {col: df[col].to_numpy(dtype='float64') for col in OHLCV_FIELDS if col in df.columns}
+
+    @staticmethod
+    def _row(columns: Dict[str, np.ndarray], i: int) -> Dict[str, float]:
+        return {col: float(arr[i]) for col, arr in columns.items()}
+
+    def get_stats(self) -> Dict[str, int]:
+        """返回统计信息（包含当前状态数量）"""
+        with self._lock:
+            return {**self.stats, 'streams': len(self._streams)}
+
+    def reset_stats(self):
+        """重置统计（每轮扫描开始时调用）"""
+        with self._lock:
+            self.stats = {'updates': 0, 'rebuilds': 0, 'peeks': 0}
+
+
+# 全局增量指标引擎实例
+incremental_engine = IncrementalIndicatorEngine(INCREMENTAL_INDICATOR_CONFIG)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+交易对标识模块
+系统中同一个标的有多种写法: ccxt现货 BTC/USDT、ccxt永续 BTC/USDT:USDT、OKX instId BTC-USDT / BTC-USDT-SWAP，
+配置中还可能是小写或 BTCUSDT。原来各处在循环中用 upper()/replace() 逐个比较，这里统一解析:
+    - parse_instrument: 解析为 InstrumentId（base、quote、settle、类型），结果缓存
+    - pair_key: 标的键 BASE/QUOTE（忽略现货/合约区别，用于判断是否已持仓、是否禁用），返回驻留（intern）的字符串
+    - SymbolSet / SymbolIndex: 按标的键建立的集合和哈希索引，任意写法的交易对都可以O(1)查找
+"""
+
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+# 没有分隔符的写法（如 BTCUSDT）按这些计价币种拆分，较长的在前
+KNOWN_QUOTES = ('USDT', 'USDC', 'USD', 'BTC', 'ETH', 'EUR')
+
+
+class InstrumentId(NamedTuple):
+    """交易对标识"""
+    base: str
+    quote: str
+    settle: str = ''       # 合约的结算币种，现货为空
+    kind: str = 'spot'     # spot / swap / future
+    expiry: str = ''       # 交割合约的到期日（如 240628）
+
+    @property
+    def pair(self) -> str:
+        """标的键 BASE/QUOTE"""
+        return pair_key(f"{self.base}/{self.quote}")
+
+    @property
+    def symbol(self) -> str:
+        """ccxt统一格式，例如 BTC/USDT、BTC/USDT:USDT、BTC/USDT:USDT-240628"""
+        if self.kind == 'spot':
+            return f"{self.base}/{self.quote}"
+        symbol = f"{self.base}/{self.quote}:{self.settle or self.quote}"
+        return f"{symbol}-{self.expiry}" if self.expiry else symbol
+
+    @property
+    def inst_id(self) -> str:
+        """OKX instId，例如 BTC-USDT、BTC-USDT-SWAP、BTC-USDT-240628"""
+        if self.kind == 'swap':
+            return f"{self.base}-{self.quote}-SWAP"
+        if self.kind == 'future':
+            return f"{self.base}-{self.quote}-{self.expiry}"
+        return f"{self.base}-{self.quote}"
+
+
+@lru_cache(maxsize=16384)
+def parse_instrument(symbol: str) -> InstrumentId:
+    """
+    解析任意写法的交易对
+
+    Args:
+        symbol: BTC/USDT、BTC/USDT:USDT、BTC-USDT-SWAP、btc-usdt、BTCUSDT 等
+
+    Returns:
+        InstrumentId；无法拆分出计价币种时 quote 为空
+    """
+    text = (symbol or '').strip().upper()
+    if ':' in text:
+        # ccxt合约: BASE/QUOTE:SETTLE 或 BASE/QUOTE:SETTLE-YYMMDD
+        pair, _, settle = text.partition(':')
+        settle, _, expiry = settle.partition('-')
+        base, _, quote = pair.partition('/')
+        return InstrumentId(base, quote, settle, 'future' if expiry else 'swap', expiry)
+    if '/' in text:
+        base, _, quote = text.partition('/')
+        return InstrumentId(base, quote)
+    if '-' in text:
+        # OKX instId: BASE-QUOTE、BASE-QUOTE-SWAP、BASE-QUOTE-YYMMDD
+        parts = text.split('-')
+        base, quote = parts[0], parts[1]
+        if len(parts) >= 3 and parts[2] == 'SWAP':
+            return InstrumentId(base, quote, quote, 'swap')
+        if len(parts) >= 3 and parts[2].isdigit():
+            return InstrumentId(base, quote, quote, 'future', parts[2])
+        return InstrumentId(base, quote)
+    for quote in KNOWN_QUOTES:
+        if text.endswith(quote) and len(text) > len(quote):
+            return InstrumentId(text[:-len(quote)], quote)
+    return InstrumentId(text, '')
+
+
+@lru_cache(maxsize=16384)
+def pair_key(symbol: str) -> str:
+    """
+    标的键: 把各种写法统一为 BASE/QUOTE 大写形式（驻留字符串，比较时先比较地址）
+    例如 BTC/USDT:USDT、BTC-USDT-SWAP、btc-usdt、BTCUSDT 都转换为 BTC/USDT
+    """
+    instrument = parse_instrument(symbol)
+    key = f"{instrument.base}/{instrument.quote}" if instrument.quote else instrument.base
+    return sys.intern(key)
+
+
+def to_ccxt_symbol(symbol: str) -> str:
+    """任意写法转换为ccxt统一格式，例如 BTC-USDT-SWAP → BTC/USDT:USDT"""
+    return parse_instrument(symbol).symbol
+
+
+@lru_cache(maxsize=16384)
+def to_okx_inst_id(symbol: str) -> str:
+    """任意写法转换为OKX instId，例如 BTC/USDT → BTC-USDT，BTC/USDT:USDT → BTC-USDT-SWAP"""
+    return parse_instrument(symbol).inst_id
+
+
+class SymbolSet:
+    """按标的键建立的交易对集合，任意写法的交易对都可以O(1)判断是否包含"""
+
+    __slots__ = ('keys',)
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.keys = frozenset(pair_key(symbol) for symbol in symbols if symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return bool(symbol) and pair_key(symbol) in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+
+class SymbolIndex:
+    """按标的键建立的哈希索引: 标的键 -> 对象列表（保持原顺序）"""
+
+    def __init__(self, items: Iterable[Any] = (), symbol_of: Optional[Callable[[Any], str]] = None):
+        """
+        Args:
+            items: 交易机会、持仓等对象
+            symbol_of: 取对象交易对的函数，默认取 symbol 属性（字典取 'symbol' 键）
+        """
+        self.symbol_of = symbol_of or _default_symbol_of
+        self._index: Dict[str, List[Any]] = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Any):
+        symbol = self.symbol_of(item)
+        if symbol:
+            self._index.setdefault(pair_key(symbol), []).append(item)
+
+    def get_all(self, symbol: str) -> List[Any]:
+        """该标的的所有对象"""
+        return self._index.get(pair_key(symbol), []) if symbol else []
+
+    def first(self, symbol: str) -> Optional[Any]:
+        """该标的的第一个对象，没有时返回None"""
+        items = self.get_all(symbol)
+        return items[0] if items else None
+
+    def __contains__(self, symbol: str) -> bool:
+        return bool(symbol) and pair_key(symbol) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def _default_symbol_of(item: Any) -> str:
+    if isinstance(item, dict):
+        return item.get('symbol', '')
+    return getattr(item, 'symbol', '')
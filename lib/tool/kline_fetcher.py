@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+K线并发获取模块
+使用有界线程池 + 令牌桶限流并发调用 exchange.fetch_ohlcv，替代逐个交易对、逐个周期的串行请求
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+# OKX公共行情接口限速约为 40次/2秒（按IP），这里默认留出余量
+DEFAULT_KLINE_FETCH_CONFIG = {
+    'MAX_IN_FLIGHT': 8,        # 同时在途的最大请求数
+    'RATE_PER_SECOND': 15,     # 令牌桶每秒补充的令牌数
+    'BURST': 20,               # 令牌桶容量（允许的突发请求数）
+    'MAX_RETRIES': 3,          # 单个请求失败后的最大重试次数
+    'BACKOFF_BASE': 0.5,       # 指数退避的基础等待时间（秒）
+    'BACKOFF_MAX': 8.0,        # 单次退避的最长等待时间（秒）
+}
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """按流逝时间补充令牌（调用方需持有锁）"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0):
+        """阻塞直到获取到指定数量的令牌"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                # 计算还需等待的时间
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class KlineFetcher:
+    """有界并发的K线获取引擎"""
+
+    def __init__(self, exchange, config: Dict[str, Any] = None, logger_param: logging.Logger = None):
+        """
+        初始化K线获取引擎
+
+        Args:
+            exchange: ccxt交易所实例（或实现了fetch_ohlcv的对象）
+            config: 并发与重试配置，未提供的键使用DEFAULT_KLINE_FETCH_CONFIG中的默认值
+            logger_param: 可选的日志记录器
+        """
+        self.exchange = exchange
+        self.config = {**DEFAULT_KLINE_FETCH_CONFIG, **(config or {})}
+        self.logger = logger_param or logger
+        self.bucket = TokenBucket(self.config['RATE_PER_SECOND'], self.config['BURST'])
+        # 统计信息
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def call_with_retry(self, func: Callable[[], Any], description: str = '') -> Any:
+        """
+        带限流、重试和指数退避地执行一次请求
+
+        Args:
+            func: 无参请求函数
+            description: 用于日志的请求描述
+
+        Returns:
+            请求函数的返回值
+
+        Raises:
+            最后一次失败时的异常
+        """
+        max_retries = int(self.config['MAX_RETRIES'])
+        backoff_base = float(self.config['BACKOFF_BASE'])
+        backoff_max = float(self.config['BACKOFF_MAX'])
+
+        for attempt in range(max_retries + 1):
+            self.bucket.acquire()
+            self._incr('requests')
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= max_retries:
+                    self._incr('failures')
+                    raise
+                self._incr('retries')
+                # 指数退避 + 随机抖动，避免多个线程同时重试
+                wait_time = min(backoff_max, backoff_base * (2 ** attempt)) * (0.5 + random.random() / 2)
+                self.logger.warning(f"请求 {description} 失败（第{attempt + 1}次）: {e}，{wait_time:.2f}秒后重试")
+                time.sleep(wait_time)
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int, since: Optional[int] = None) -> List[List[float]]:
+        """获取单个交易对单个周期的K线（带重试）"""
+        if since is None:
+            request = lambda: self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        else:
+            request = lambda: self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+        return self.call_with_retry(request, f"{symbol} {timeframe}")
+
+    def fetch_window(self, symbol: str, timeframe: str, limit: int, cache=None) -> List[List[float]]:
+        """获取最近limit根K线；提供缓存时只增量获取最后一根已缓存K线之后的数据"""
+        if cache is None:
+            return self.fetch_ohlcv(symbol, timeframe, limit)
+        fetch_fn = lambda since, count: self.fetch_ohlcv(symbol, timeframe, count, since=since)
+        return cache.get_window(symbol, timeframe, limit, fetch_fn)
+
+    def fetch_all(self, symbols: List[str], limits: Dict[str, int], cache=None) -> Dict[str, Dict[str, List[List[float]]]]:
+        """
+        并发获取所有交易对、所有周期的K线数据
+
+        Args:
+            symbols: 交易对列表
+            limits: 时间框架到获取数量的映射，例如 {'15m': 309, '1h': 309}
+            cache: 可选的OHLCVCache实例，提供时只获取增量K线
+
+        Returns:
+            {symbol: {timeframe: ohlcv列表}}，获取失败的周期为空列表
+        """
+        results: Dict[str, Dict[str, List[List[float]]]] = {symbol: {} for symbol in symbols}
+        tasks: List[Tuple[str, str, int]] = [(symbol, tf, limit) for symbol in symbols for tf, limit in limits.items()]
+        results.update(self.fetch_tasks(tasks, cache))
+        return results
+
+    def fetch_tasks(self, tasks: List[Tuple[str, str, int]], cache=None) -> Dict[str, Dict[str, List[List[float]]]]:
+        """
+        并发获取指定的 (交易对, 周期, 数量) 列表
+
+        Args:
+            tasks: (symbol, timeframe, limit) 列表
+            cache: 可选的OHLCVCache实例
+
+        Returns:
+            {symbol: {timeframe: ohlcv列表}}，获取失败的周期为空列表
+        """
+        results: Dict[str, Dict[str, List[List[float]]]] = {}
+        if not tasks:
+            return results
+
+        max_workers = max(1, int(self.config['MAX_IN_FLIGHT']))
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.fetch_window, symbol, tf, limit, cache): (symbol, tf) for symbol, tf, limit in tasks}
+            for future in as_completed(futures):
+                symbol, tf = futures[future]
+                try:
+                    results.setdefault(symbol, {})[tf] = future.result() or []
+                except Exception as e:
+                    self.logger.error(f"获取 {symbol} 的 {tf} 数据失败: {e}")
+                    results.setdefault(symbol, {})[tf] = []
+
+        elapsed = time.time() - start_time
+        self.logger.info(f"并发获取K线完成: {len(tasks)} 个请求, 用时 {elapsed:.2f}秒, 统计: {self.stats}")
+        return results
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+交易对池缓存模块
+扫描器每轮都调用 fetch_markets() 获取交易对列表、fetch_tickers() 获取24小时成交量做流动性筛选，
+test/ultimate_profit_system.py 也会重复同样的请求。交易对元数据很少变化，成交量只需要秒级新鲜度，
+MarketUniverse 把两者分开缓存:
+    - 交易对元数据按 MARKETS_TTL（小时级）刷新，ticker 按 TICKERS_TTL（秒级）刷新
+    - 每次刷新ticker时预先计算按成交量降序的交易对列表，按成交量阈值筛选时只需二分查找
+    - 快照持久化到磁盘（SNAPSHOT_PATH），重启后在有效期内直接使用；
+      扫描器、回测和报告查看器读取同一个快照文件，文件被其它进程更新后自动重新加载
+    - 交易所请求失败时继续使用过期的快照
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 尝试导入配置文件
+try:
+    from config import MARKET_UNIVERSE_CONFIG
+except ImportError:
+    MARKET_UNIVERSE_CONFIG = {}
+
+# 默认配置
+DEFAULT_MARKET_UNIVERSE_CONFIG = {
+    'MARKETS_TTL': 6 * 3600,       # 交易对元数据有效期（秒）
+    'TICKERS_TTL': 60,             # ticker（24小时成交量）有效期（秒）
+    'QUOTE': 'USDT',               # 交易对池的计价币种
+    'MARKET_TYPE': 'spot',         # 交易对池的市场类型
+    'PERSIST': True,               # 是否把快照保存到磁盘
+    'SNAPSHOT_PATH': 'reports/market_universe.json',   # 相对路径相对于项目根目录（各进程的工作目录不同时仍共用同一个文件）
+}
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SNAPSHOT_VERSION = 1
+
+# 快照中保留的字段（ccxt返回的info等原始字段不保存）
+MARKET_FIELDS = ('symbol', 'id', 'base', 'quote', 'settle', 'type', 'active', 'contractSize', 'precision')
+TICKER_FIELDS = ('last', 'bid', 'ask', 'quoteVolume', 'baseVolume', 'percentage', 'timestamp')
+
+
+class MarketUniverse:
+    """交易对元数据和ticker的分级缓存，附带按成交量排序的交易对列表"""
+
+    def __init__(self, exchange: Any = None, config: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            exchange: ccxt交易所实例；为None时只读取磁盘快照（回测、报告查看器等不需要刷新的场景）
+            config: 配置，覆盖 MARKET_UNIVERSE_CONFIG 和默认配置
+            clock: 当前时间（秒）的函数，便于测试；快照中的时间为该时钟的时间戳
+        """
+        self.config = {**DEFAULT_MARKET_UNIVERSE_CONFIG, **MARKET_UNIVERSE_CONFIG, **(config or {})}
+        self.exchange = exchange
+        self.clock = clock
+        self.snapshot_path = os.path.join(PROJECT_ROOT, self.config['SNAPSHOT_PATH'])
+        self._lock = threading.RLock()
+        self._markets: List[Dict[str, Any]] = []
+        self._markets_at = 0.0
+        self._active: List[str] = []
+        self._active_set = frozenset()
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._tickers_at = 0.0
+        self._ranked: List[str] = []
+        self._ranked_keys: List[float] = []   # 成交量取负数，升序，用于二分查找
+        self._snapshot_key = None
+        self.stats = {'markets_fetched': 0, 'tickers_fetched': 0, 'tickers_pushed': 0,
+                      'snapshot_loaded': 0, 'snapshot_saved': 0, 'stale_served': 0}
+        self._sync_snapshot()
+
+    def attach(self, exchange: Any):
+        """设置用于刷新的交易所实例（已设置时不替换）"""
+        if self.exchange is None:
+            self.exchange = exchange
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def markets(self) -> List[Dict[str, Any]]:
+        """所有交易对的元数据（只包含 MARKET_FIELDS 中的字段）"""
+        self._ensure_markets()
+        return self._markets
+
+    def active_symbols(self) -> List[str]:
+        """交易对池: 可交易的、计价币种为QUOTE、类型为MARKET_TYPE的交易对"""
+        self._ensure_markets()
+        return self._active
+
+    def tickers(self, symbols: Optional[Iterable[str]] = None,
+                source: Optional[Callable[[List[str]], Dict[str, Dict]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        交易对池的ticker（只包含 TICKER_FIELDS 中的字段）
+
+        Args:
+            symbols: 只返回这些交易对，默认返回全部
+            source: 可选的ticker来源（如WebSocket推送的ticker），参数为交易对列表；
+                    返回了所有交易对时不再请求REST接口
+        """
+        self._ensure_tickers(source)
+        if symbols is None:
+            return self._tickers
+        return {symbol: self._tickers[symbol] for symbol in symbols if symbol in self._tickers}
+
+    def liquid_symbols(self, volume_threshold: float = 0, symbols: Optional[Iterable[str]] = None,
+                       source: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+                       limit: Optional[int] = None) -> List[str]:
+        """
+        24小时成交量（quoteVolume）不低于阈值的交易对，按成交量降序
+
+        Args:
+            volume_threshold: 成交量阈值（计价币种）
+            symbols: 只在这些交易对中筛选，默认为整个交易对池
+            source: 同 tickers()
+            limit: 最多返回的交易对数量
+        """
+        self._ensure_tickers(source)
+        with self._lock:
+            ranked, keys, active = self._ranked, self._ranked_keys, self._active_set
+        count = bisect.bisect_right(keys, -volume_threshold)
+        allowed = active if symbols is None else active.intersection(symbols)
+        result = [symbol for symbol in ranked[:count] if symbol in allowed]
+        return result[:limit] if limit else result
+
+    def age(self, part: str = 'tickers') -> float:
+        """markets / tickers 的数据年龄（秒），从未获取过时为无穷大"""
+        fetched_at = self._markets_at if part == 'markets' else self._tickers_at
+        return self.clock() - fetched_at if fetched_at else float('inf')
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        """快照概况（报告查看器使用）"""
+        self._sync_snapshot()
+        return {
+            'markets': len(self._markets),
+            'active_symbols': len(self._active),
+            'tickers': len(self._tickers),
+            'markets_age': None if not self._markets_at else round(self.age('markets'), 1),
+            'tickers_age': None if not self._tickers_at else round(self.age('tickers'), 1),
+            'top': [{'symbol': symbol, **self._tickers.get(symbol, {})} for symbol in self._ranked[:top]],
+            'stats': dict(self.stats),
+        }
+
+    # ------------------------------------------------------------------
+    # 刷新
+    # ------------------------------------------------------------------
+
+    def _ensure_markets(self):
+        self._sync_snapshot()
+        if self.age('markets') < self.config['MARKETS_TTL']:
+            return
+        with self._lock:
+            # 等待锁期间其它线程可能已经刷新
+            if self.age('markets') < self.config['MARKETS_TTL']:
+                return
+            if self.exchange is None:
+                self._serve_stale('markets')
+                return
+            try:
+                raw = self.exchange.fetch_markets()
+            except Exception as e:
+                if not self._markets:
+                    raise
+                logger.warning(f"获取交易对列表失败，继续使用{self.age('markets'):.0f}秒前的快照: {e}")
+                self.stats['stale_served'] += 1
+                return
+            self.stats['markets_fetched'] += 1
+            self._set_markets([{key: market.get(key) for key in MARKET_FIELDS} for market in raw], self.clock())
+            self._save_snapshot()
+
+    def _ensure_tickers(self, source=None):
+        self._ensure_markets()
+        if self.age('tickers') < self.config['TICKERS_TTL']:
+            return
+        with self._lock:
+            if self.age('tickers') < self.config['TICKERS_TTL']:
+                return
+            symbols = self._active
+            raw = source(symbols) if source is not None else {}
+            if symbols and len(raw) >= len(symbols):
+                self.stats['tickers_pushed'] += 1
+            elif self.exchange is None:
+                self._serve_stale('tickers')
+                return
+            else:
+                try:
+                    raw = self.exchange.fetch_tickers(symbols)
+                except Exception as e:
+                    if not self._tickers:
+                        raise
+                    logger.warning(f"获取ticker失败，继续使用{self.age('tickers'):.0f}秒前的快照: {e}")
+                    self.stats['stale_served'] += 1
+                    return
+                self.stats['tickers_fetched'] += 1
+            tickers = {symbol: {key: ticker.get(key) for key in TICKER_FIELDS}
+                       for symbol, ticker in raw.items() if isinstance(ticker, dict) and symbol in self._active_set}
+            self._set_tickers(tickers, self.clock())
+            self._save_snapshot()
+
+    def _serve_stale(self, part: str):
+        """没有交易所实例时使用快照中的数据（可能已过期）"""
+        self.stats['stale_served'] += 1
+        if part == 'markets' and not self._markets:
+            logger.warning(f"没有交易对快照（{self.snapshot_path}）且未设置交易所实例")
+
+    def _set_markets(self, markets: List[Dict[str, Any]], fetched_at: float):
+        quote, market_type = self.config['QUOTE'], self.config['MARKET_TYPE']
+        active = [market['symbol'] for market in markets
+                  if market.get('active') and market.get('quote') == quote and market.get('type') == market_type]
+        with self._lock:
+            self._markets = markets
+            self._markets_at = fetched_at
+            self._active = active
+            self._active_set = frozenset(active)
+
+    def _set_tickers(self, tickers: Dict[str, Dict[str, Any]], fetched_at: float):
+        ranked = sorted(tickers, key=lambda symbol: tickers[symbol].get('quoteVolume') or 0, reverse=True)
+        keys = [-(tickers[symbol].get('quoteVolume') or 0) for symbol in ranked]
+        with self._lock:
+            self._tickers = tickers
+            self._tickers_at = fetched_at
+            self._ranked = ranked
+            self._ranked_keys = keys
+
+    # ------------------------------------------------------------------
+    # 磁盘快照
+    # ------------------------------------------------------------------
+
+    def _file_key(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _sync_snapshot(self):
+        """快照文件被其它进程（或重启前的本进程）更新后，加载其中比内存中更新的部分"""
+        if not self.config['PERSIST']:
+            return
+        key = self._file_key()
+        if key is None or key == self._snapshot_key:
+            return
+        with self._lock:
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取交易对快照失败: {e}")
+                self._snapshot_key = key
+                return
+            self._snapshot_key = key
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                return
+            markets = snapshot.get('markets') or {}
+            if markets.get('fetched_at', 0) > self._markets_at:
+                self._set_markets(markets.get('data', []), markets['fetched_at'])
+            tickers = snapshot.get('tickers') or {}
+            if tickers.get('fetched_at', 0) > self._tickers_at:
+                self._set_tickers(tickers.get('data', {}), tickers['fetched_at'])
+            self.stats['snapshot_loaded'] += 1
+
+    def _save_snapshot(self):
+        if not self.config['PERSIST']:
+            return
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'markets': {'fetched_at': self._markets_at, 'data': self._markets},
+            'tickers': {'fetched_at': self._tickers_at, 'data': self._tickers},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.snapshot_path)
+            self._snapshot_key = self._file_key()
+            self.stats['snapshot_saved'] += 1
+        except Exception as e:
+            logger.warning(f"保存交易对快照失败: {e}")
+
+
+_universe: Optional[MarketUniverse] = None
+_universe_lock = threading.Lock()
+
+
+def get_market_universe(exchange: Any = None) -> MarketUniverse:
+    """
+    获取进程内共享的MarketUniverse（交易对和ticker为公共数据，不区分账户）
+
+    Args:
+        exchange: ccxt交易所实例，用于刷新；首次传入后共用该实例
+    """
+    global _universe
+    if _universe is None:
+        with _universe_lock:
+            if _universe is None:
+                _universe = MarketUniverse(exchange)
+    if exchange is not None:
+        _universe.attach(exchange)
+    return _universe
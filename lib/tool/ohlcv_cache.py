@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+增量OHLCV缓存模块
+按 (交易对, 时间框架) 持久化保存K线，每次只获取最后一根已存K线之后的新数据并合并
+"""
+
+import os
+import time
+import logging
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# K线列顺序: [timestamp(ms), open, high, low, close, volume]
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# 默认配置
+DEFAULT_OHLCV_CACHE_CONFIG = {
+    'ENABLED': True,                               # 是否启用增量缓存
+    'CACHE_DIR': os.path.join('reports', 'ohlcv_cache'),  # 缓存目录
+    'MAX_BARS': 1000,                              # 每个(交易对, 周期)最多保留的K线数量
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """将时间框架字符串转换为毫秒数，支持 15m / 1h / 1H / 4h / 1d / 1D / 1w 等格式"""
+    unit = timeframe[-1]
+    amount = int(timeframe[:-1])
+    if unit == 'm':
+        return amount * 60 * 1000
+    if unit in ('h', 'H'):
+        return amount * 60 * 60 * 1000
+    if unit in ('d', 'D'):
+        return amount * 24 * 60 * 60 * 1000
+    if unit in ('w', 'W'):
+        return amount * 7 * 24 * 60 * 60 * 1000
+    raise ValueError(f"无法解析时间框架: {timeframe}")
+
+
+class OHLCVCache:
+    """按 (交易对, 时间框架) 持久化的增量K线缓存"""
+
+    def __init__(self, cache_dir: str, max_bars: Optional[int] = 1000, persist: bool = True):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存文件目录
+            max_bars: 每个(交易对, 周期)最多保留的K线数量，None表示不限制
+            persist: 是否将缓存写入磁盘
+        """
+        self.cache_dir = cache_dir
+        self.max_bars = max_bars
+        self.persist = persist
+        self._store: Dict[Tuple[str, str], np.ndarray] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # 统计信息：全量获取次数、增量获取次数、获取到的K线数
+        self.stats = {'full_fetches': 0, 'incremental_fetches': 0, 'bars_fetched': 0}
+        if self.persist:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _lock_for(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _path_for(self, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.cache_dir, f"{safe_symbol}_{timeframe}.npy")
+
+    def load(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        """读取缓存的K线数组（n×6），不存在时返回None"""
+        key = (symbol, timeframe)
+        if key in self._store:
+            return self._store[key]
+        if not self.persist:
+            return None
+        path = self._path_for(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        try:
+            bars = np.load(path)
+            if bars.ndim != 2 or bars.shape[1] != len(OHLCV_COLUMNS):
+                raise ValueError(f"缓存数据形状异常: {bars.shape}")
+            self._store[key] = bars
+            return bars
+        except Exception as e:
+            logger.warning(f"读取K线缓存失败 {path}: {e}，将重新获取")
+            return None
+
+    def _save(self, symbol: str, timeframe: str, bars: np.ndarray):
+        self._store[(symbol, timeframe)] = bars
+        if not self.persist:
+            return
+        path = self._path_for(symbol, timeframe)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, bars)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入K线缓存失败 {path}: {e}")
+
+    def merge(self, symbol: str, timeframe: str, new_bars: List[List[float]]) -> np.ndarray:
+        """
+        将新K线合并进缓存，时间戳相同的K线以新数据为准（用于覆盖未收盘的K线）
+
+        Returns:
+            合并后的K线数组
+        """
+        existing = self.load(symbol, timeframe)
+        if not new_bars:
+            return existing if existing is not None else np.empty((0, len(OHLCV_COLUMNS)))
+        incoming = np.asarray(new_bars, dtype='float64')[:, :len(OHLCV_COLUMNS)]
+        if existing is None or len(existing) == 0:
+            merged = incoming
+        else:
+            merged = np.concatenate([existing, incoming])
+        # 按时间戳排序并去重，保留最后出现（最新获取）的K线
+        order = np.argsort(merged[:, 0], kind='stable')
+        merged = merged[order]
+        keep = np.ones(len(merged), dtype=bool)
+        keep[:-1] = merged[1:, 0] != merged[:-1, 0]
+        merged = merged[keep]
+        if self.max_bars is not None and len(merged) > self.max_bars:
+            merged = merged[-self.max_bars:]
+        self._save(symbol, timeframe, merged)
+        return merged
+
+    def get_window(self, symbol: str, timeframe: str, limit: int,
+                   fetch_fn: Callable[[Optional[int], int], List[List[float]]]) -> List[List[float]]:
+        """
+        获取最近limit根K线，只向交易所请求最后一根已缓存K线之后的数据
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间框架
+            limit: 需要的K线数量
+            fetch_fn: 获取函数 fetch_fn(since, limit)，since为None时获取最新limit根
+
+        Returns:
+            OHLCV列表，按时间升序
+        """
+        key = (symbol, timeframe)
+        with self._lock_for(key):
+            existing = self.load(symbol, timeframe)
+            tf_ms = timeframe_to_ms(timeframe)
+            now_ms = int(time.time() * 1000)
+
+            need_full = existing is None or len(existing) < limit
+            if not need_full:
+                last_ts = int(existing[-1, 0])
+                # 缓存与当前时间的间隔超过所需窗口时，增量获取无法补齐，直接全量获取
+                missing_bars = (now_ms - last_ts) // tf_ms + 1
+                need_full = missing_bars >= limit
+
+            if need_full:
+                bars = fetch_fn(None, limit)
+            else:
+                # 从最后一根已缓存K线开始获取（包含该K线，用于覆盖其未收盘时的数据）
+                bars = fetch_fn(last_ts, int(min(limit, missing_bars + 1)))
+            # 不同交易对的获取在线程池中并发执行，统计信息在全局锁下更新
+            with self._locks_guard:
+                self.stats['full_fetches' if need_full else 'incremental_fetches'] += 1
+                self.stats['bars_fetched'] += len(bars or [])
+
+            merged = self.merge(symbol, timeframe, bars or [])
+            return merged[-limit:].tolist()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+仓位快照服务模块
+同一账户在一轮扫描中多处需要当前仓位（各策略的 filter_by_positions、扫描器的 _analyze_and_report_positions），
+PositionService 把这些请求合并为一次交易所调用:
+    - 单飞（single-flight）: 同一时刻只有一个线程向交易所请求，其它线程等待并共用同一结果
+    - 时效预算: 每个调用方传入可以接受的最大数据年龄（秒），快照足够新时直接返回
+    - 版本化快照: 每次更新生成新的不可变 PositionSnapshot（版本号递增），附带按标准化交易对建立的集合，O(1) 判断是否已持仓
+    - 推送更新: 可接收OKX私有WebSocket positions频道的推送（PositionStream），推送流正常时快照视为实时
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# 标的键: 把各种格式的交易对统一为 BASE/QUOTE 大写形式，用于判断是否已持仓
+# 例如 BTC/USDT:USDT、BTC-USDT-SWAP、btc-usdt 都转换为 BTC/USDT
+from lib.tool.instrument_id import pair_key as normalize_symbol, to_ccxt_symbol
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 尝试导入配置文件
+try:
+    from config import POSITION_SERVICE_CONFIG
+except ImportError:
+    POSITION_SERVICE_CONFIG = {}
+
+# 默认配置
+DEFAULT_POSITION_SERVICE_CONFIG = {
+    'MAX_AGE': 5,              # 调用方未指定时可接受的快照最大年龄（秒）
+    'FETCH_TIMEOUT': 30,       # 等待其它线程获取仓位的最长时间（秒）
+    'WS_ENABLED': False,       # 是否订阅OKX私有WebSocket positions频道
+    'WS_URL': 'wss://ws.okx.com:8443/ws/v5/private',
+    'WS_INST_TYPE': 'SWAP',
+    'RECONNECT_MAX_DELAY': 60,
+}
+
+
+class PositionSnapshot:
+    """某一时刻的仓位快照（创建后不再修改）"""
+
+    __slots__ = ('version', 'positions', 'held', 'fetched_at', 'timestamp', 'source')
+
+    def __init__(self, version: int, positions: List[Dict[str, Any]], source: str):
+        """
+        Args:
+            version: 版本号，每次更新递增
+            positions: 格式化后的仓位列表（与 lib2.get_okx_positions 返回的格式一致）
+            source: 数据来源，rest / ws
+        """
+        self.version = version
+        self.positions = positions
+        self.held: FrozenSet[str] = frozenset(normalize_symbol(p.get('symbol', '')) for p in positions if p.get('symbol'))
+        self.fetched_at = time.monotonic()
+        self.timestamp = time.time()
+        self.source = source
+
+    @property
+    def age(self) -> float:
+        """快照年龄（秒）"""
+        return time.monotonic() - self.fetched_at
+
+    @property
+    def count(self) -> int:
+        """有交易对的仓位数量（多空双向持仓分别计数）"""
+        return sum(1 for p in self.positions if p.get('symbol'))
+
+    def is_held(self, symbol: str) -> bool:
+        """交易对是否已持仓"""
+        return normalize_symbol(symbol) in self.held
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+class PositionService:
+    """带单飞合并和时效预算的仓位快照服务（线程安全）"""
+
+    def __init__(self, fetch_fn: Callable[[], List[Dict[str, Any]]], config: Optional[Dict[str, Any]] = None,
+                 logger_param: Optional[logging.Logger] = None):
+        """
+        Args:
+            fetch_fn: 从交易所获取格式化仓位列表的函数，失败时抛出异常
+            config: 配置，未提供的键使用DEFAULT_POSITION_SERVICE_CONFIG中的默认值
+            logger_param: 可选的日志记录器
+        """
+        self.fetch_fn = fetch_fn
+        self.config = {**DEFAULT_POSITION_SERVICE_CONFIG, **(config or {})}
+        self.logger = logger_param or logger
+        self._snapshot: Optional[PositionSnapshot] = None
+        self._version = 0
+        self._stale = False
+        self._lock = threading.Lock()
+        self._inflight: Optional[threading.Event] = None
+        self._inflight_error: Optional[Exception] = None
+        # 推送流状态: 已收到完整快照且连接正常时为True
+        self._push_live = False
+        self._push_positions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.stats = {'requests': 0, 'fetches': 0, 'coalesced': 0, 'fresh_hits': 0, 'pushes': 0, 'errors': 0}
+
+    def _incr(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    @property
+    def snapshot(self) -> Optional[PositionSnapshot]:
+        """当前快照（可能为None或已过期）"""
+        return self._snapshot
+
+    def _publish(self, positions: List[Dict[str, Any]], source: str) -> PositionSnapshot:
+        with self._lock:
+            self._version += 1
+            self._stale = False
+            self._snapshot = PositionSnapshot(self._version, positions, source)
+            return self._snapshot
+
+    def get(self, max_age: Optional[float] = None) -> PositionSnapshot:
+        """
+        获取仓位快照
+
+        Args:
+            max_age: 可接受的快照最大年龄（秒），None使用配置MAX_AGE，0表示强制重新获取
+
+        Returns:
+            PositionSnapshot: 仓位快照；获取失败时返回旧快照，没有旧快照时抛出异常
+        """
+        max_age = self.config['MAX_AGE'] if max_age is None else max_age
+        with self._lock:
+            self.stats['requests'] += 1
+            snapshot = self._snapshot
+            if snapshot is not None and not self._stale and (self._push_live and max_age > 0 or snapshot.age <= max_age):
+                self.stats['fresh_hits'] += 1
+                return snapshot
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+                self._inflight_error = None
+        if not leader:
+            # 其它线程正在获取，等待其结果
+            self._incr('coalesced')
+            if not event.wait(self.config['FETCH_TIMEOUT']):
+                raise TimeoutError(f"等待仓位数据超时（{self.config['FETCH_TIMEOUT']}秒）")
+            if self._inflight_error is not None and self._snapshot is None:
+                raise self._inflight_error
+            return self._snapshot
+        try:
+            self._incr('fetches')
+            start_time = time.time()
+            positions = self.fetch_fn()
+            snapshot = self._publish(positions, 'rest')
+            self.logger.info(f"仓位快照已更新: 版本 {snapshot.version}, {len(positions)} 个仓位, 用时 {time.time() - start_time:.2f}秒")
+            return snapshot
+        except Exception as e:
+            self._incr('errors')
+            self._inflight_error = e
+            if self._snapshot is not None:
+                self.logger.warning(f"获取仓位失败，使用 {self._snapshot.age:.0f} 秒前的快照: {e}")
+                return self._snapshot
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def positions(self, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """获取仓位列表"""
+        return self.get(max_age).positions
+
+    def is_held(self, symbol: str, max_age: Optional[float] = None) -> bool:
+        """交易对是否已持仓"""
+        return self.get(max_age).is_held(symbol)
+
+    def invalidate(self):
+        """使当前快照失效（例如下单后），下一次get会重新获取"""
+        with self._lock:
+            self._stale = True
+
+    # ---------------- 推送更新 ----------------
+
+    def apply_push(self, data: Iterable[Dict[str, Any]], full: bool = False) -> PositionSnapshot:
+        """
+        应用OKX positions频道推送的仓位（原始格式）
+
+        Args:
+            data: 推送消息中的data列表
+            full: 是否为完整快照（首次推送），True时替换全部仓位，否则按 (instId, posSide) 合并，pos为0的删除
+        """
+        with self._lock:
+            if full:
+                self._push_positions = {}
+            for raw in data:
+                key = (raw.get('instId', ''), raw.get('posSide', ''))
+                if float(raw.get('pos') or 0) == 0:
+                    self._push_positions.pop(key, None)
+                else:
+                    self._push_positions[key] = format_ws_position(raw)
+            positions = list(self._push_positions.values())
+            self.stats['pushes'] += 1
+        return self._publish(positions, 'ws')
+
+    def set_push_live(self, live: bool):
+        """推送流状态变化（断线时快照恢复按时效预算判断）"""
+        self._push_live = live
+
+
+def format_ws_position(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """把OKX原始仓位（REST/WebSocket格式）转换为与 lib2.format_okx_positions 相同的格式"""
+    symbol = to_ccxt_symbol(raw.get('instId', ''))
+    pos = float(raw.get('pos') or 0)
+    side = raw.get('posSide', '')
+    if side not in ('long', 'short'):
+        side = 'long' if pos > 0 else 'short'
+    timestamp = int(raw.get('uTime') or raw.get('cTime') or 0)
+    return {
+        'symbol': symbol,
+        'posSide': side,
+        'amount': abs(pos),
+        'entry_price': float(raw.get('avgPx') or 0),
+        'current_price': 0,
+        'profit_percent': 0,
+        'datetime': datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S') if timestamp else '',
+    }
+
+
+class PositionStream:
+    """订阅OKX私有WebSocket positions频道，把推送应用到PositionService（后台线程运行）"""
+
+    def __init__(self, service: PositionService, api_key: str, secret_key: str, passphrase: str,
+                 config: Optional[Dict[str, Any]] = None):
+        self.service = service
+        self.api_key, self.secret_key, self.passphrase = api_key, secret_key, passphrase
+        self.config = {**service.config, **(config or {})}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._running = False
+        self._first_push = True
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_loop, name='okx-position-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._loop is not None and self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.websocket.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run_loop(self):
+        # WsPrivateAsync在构造时调用asyncio.get_event_loop()，需要先为本线程设置事件循环
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        from okx.websocket.WsPrivateAsync import WsPrivateAsync
+        delay = 1.0
+        while self._running:
+            try:
+                self._client = WsPrivateAsync(self.api_key, self.passphrase, self.secret_key, self.config['WS_URL'], False)
+                await self._client.connect()
+                # 每次连接后的第一条推送是完整仓位
+                self._first_push = True
+                await self._client.subscribe([{'channel': 'positions', 'instType': self.config['WS_INST_TYPE']}], self._on_message)
+                delay = 1.0
+                await self._client.consume()
+            except Exception as e:
+                if self._running:
+                    logger.warning(f"仓位WebSocket连接异常: {e}")
+            finally:
+                self.service.set_push_live(False)
+            if self._running:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, float(self.config['RECONNECT_MAX_DELAY']))
+
+    def _on_message(self, message: str):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get('event') == 'error':
+            logger.error(f"仓位WebSocket返回错误: {payload.get('code')} {payload.get('msg')}")
+            return
+        if (payload.get('arg') or {}).get('channel') != 'positions' or 'data' not in payload:
+            return
+        self.service.apply_push(payload['data'], full=self._first_push)
+        if self._first_push:
+            self._first_push = False
+            self.service.set_push_live(True)
+            logger.info(f"已收到仓位WebSocket完整快照: {len(payload['data'])} 个仓位")
+
+
+_services: Dict[str, PositionService] = {}
+_services_lock = threading.Lock()
+
+
+def get_position_service(exchange: Any, fetch_fn: Optional[Callable[[], List[Dict[str, Any]]]] = None) -> PositionService:
+    """
+    获取账户共享的PositionService（按API Key区分账户，同一账户的多个交易所实例共用一个服务）；
+    exchange自带position_service属性时（例如回测的模拟账户）直接返回该服务，不登记到全局表中
+
+    Args:
+        exchange: ccxt交易所实例
+        fetch_fn: 可选的仓位获取函数，默认调用 exchange.fetch_positions() 并用 lib2.format_okx_positions 格式化
+    """
+    own_service = getattr(exchange, 'position_service', None)
+    if isinstance(own_service, PositionService):
+        return own_service
+    key = getattr(exchange, 'apiKey', '') or str(id(exchange))
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                if fetch_fn is None:
+                    def fetch_fn():
+                        from lib2 import format_okx_positions
+                        return format_okx_positions(exchange.fetch_positions())
+                service = PositionService(fetch_fn, POSITION_SERVICE_CONFIG)
+                if service.config['WS_ENABLED'] and getattr(exchange, 'apiKey', ''):
+                    PositionStream(service, exchange.apiKey, exchange.secret, exchange.password).start()
+                _services[key] = service
+    return service
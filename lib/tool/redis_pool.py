@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+共享Redis连接池模块
+lib2、策略和 report_viewer_python 通过 get_redis_pool() 共用同一个按需创建的连接池（相同地址只创建一次），
+不再每次调用都新建 redis.Redis 并 ping
+
+功能:
+    - 连接池: 多线程共用，连接按需创建、用完归还
+    - mget: 用pipeline一次往返读取多个键
+    - 进程内TTL缓存: trade_mul 等热点键在本地缓存几秒，避免每个信号都访问Redis
+    - 降级模式: Redis不可用时，在 RETRY_INTERVAL 秒内不再尝试连接，读取返回本地缓存中的旧值或默认值，写入返回False
+    - 可注入客户端: RedisPool(config, client=fakeredis.FakeRedis(decode_responses=True)) 便于测试
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 尝试导入配置文件
+try:
+    from config import REDIS_CONFIG
+except ImportError:
+    REDIS_CONFIG = {'ADDR': 'localhost:6379', 'PASSWORD': ''}
+
+# 默认配置（可在REDIS_CONFIG中覆盖）
+DEFAULT_REDIS_POOL_CONFIG = {
+    'DB': 0,
+    'MAX_CONNECTIONS': 20,          # 连接池最大连接数
+    'SOCKET_TIMEOUT': 2,            # 读写超时（秒）
+    'CONNECT_TIMEOUT': 2,           # 连接超时（秒）
+    'HEALTH_CHECK_INTERVAL': 30,    # 连接空闲超过该秒数后，使用前先检查
+    'RETRY_INTERVAL': 10,           # 连接失败后进入降级模式的秒数，期间不再尝试访问Redis
+    'LOCAL_TTL': {                  # 进程内缓存的热点键及缓存秒数
+        'trade_mul': 5,
+    },
+}
+
+_MISSING = object()
+
+
+def parse_addr(addr: str) -> Tuple[str, int]:
+    """解析 host:port 格式的地址"""
+    if ':' in addr:
+        host, port = addr.rsplit(':', 1)
+        return host, int(port)
+    return addr, 6379
+
+
+class RedisPool:
+    """带进程内TTL缓存和降级模式的Redis客户端"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, client: Any = None):
+        """
+        Args:
+            config: Redis配置（ADDR/PASSWORD 以及 DEFAULT_REDIS_POOL_CONFIG 中的键），默认使用REDIS_CONFIG
+            client: 可选的已创建客户端（如fakeredis），需要返回str（decode_responses=True）
+        """
+        self.config = {**DEFAULT_REDIS_POOL_CONFIG, **(config if config is not None else REDIS_CONFIG)}
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._local: Dict[str, Tuple[float, Any]] = {}
+        # 保护本地缓存和统计信息
+        self._local_lock = threading.Lock()
+        self._down_until = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'local_hits': 0, 'errors': 0, 'degraded_skips': 0}
+
+    def _incr(self, key: str, value: int = 1):
+        with self._local_lock:
+            self.stats[key] += value
+
+    @property
+    def client(self):
+        """按需创建连接池和客户端（第一次使用时才导入redis库）"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import redis
+                    host, port = parse_addr(self.config.get('ADDR', 'localhost:6379'))
+                    pool = redis.ConnectionPool(
+                        host=host,
+                        port=port,
+                        password=self.config.get('PASSWORD') or None,
+                        db=self.config['DB'],
+                        max_connections=self.config['MAX_CONNECTIONS'],
+                        socket_timeout=self.config['SOCKET_TIMEOUT'],
+                        socket_connect_timeout=self.config['CONNECT_TIMEOUT'],
+                        health_check_interval=self.config['HEALTH_CHECK_INTERVAL'],
+                        decode_responses=True,
+                    )
+                    self._client = redis.Redis(connection_pool=pool)
+        return self._client
+
+    # ---------------- 降级模式 ----------------
+
+    @property
+    def degraded(self) -> bool:
+        """是否处于降级模式（最近一次访问Redis失败且未超过RETRY_INTERVAL）"""
+        return time.monotonic() < self._down_until
+
+    def _call(self, operation: str, func: Callable[[], Any], default: Any = None) -> Any:
+        """执行Redis操作，失败时进入降级模式并返回默认值"""
+        if self.degraded:
+            self._incr('degraded_skips')
+            return default
+        try:
+            result = func()
+            if self._down_until:
+                self._down_until = 0.0
+                logger.info("Redis连接已恢复")
+            return result
+        except Exception as e:
+            self._incr('errors')
+            self._down_until = time.monotonic() + self.config['RETRY_INTERVAL']
+            logger.warning(f"Redis {operation} 失败，{self.config['RETRY_INTERVAL']}秒内使用降级模式: {e}")
+            return default
+
+    # ---------------- 进程内缓存 ----------------
+
+    def _local_ttl(self, key: str, local_ttl: Optional[float]) -> float:
+        if local_ttl is not None:
+            return local_ttl
+        return self.config['LOCAL_TTL'].get(key, 0)
+
+    def _local_get(self, key: str, allow_stale: bool = False) -> Any:
+        entry = self._local.get(key)
+        if entry is None:
+            return _MISSING
+        expire_at, value = entry
+        if allow_stale or time.monotonic() < expire_at:
+            return value
+        return _MISSING
+
+    def _local_set(self, key: str, value: Any, ttl: float):
+        if ttl > 0:
+            with self._local_lock:
+                self._local[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key: Optional[str] = None):
+        """清除本地缓存的某个键（或全部键）"""
+        with self._local_lock:
+            if key is None:
+                self._local.clear()
+            else:
+                self._local.pop(key, None)
+
+    # ---------------- 读写 ----------------
+
+    def get(self, key: str, default: Any = None, local_ttl: Optional[float] = None) -> Any:
+        """
+        读取一个键
+
+        Args:
+            key: 键名
+            default: 键不存在或Redis不可用时的返回值
+            local_ttl: 本地缓存秒数，默认使用配置LOCAL_TTL中该键的设置（未配置则不缓存）
+
+        Returns:
+            键的值（str）或默认值；Redis不可用时优先返回本地缓存中的旧值
+        """
+        ttl = self._local_ttl(key, local_ttl)
+        if ttl > 0:
+            value = self._local_get(key)
+            if value is not _MISSING:
+                self._incr('local_hits')
+                return default if value is None else value
+        value = self._call('GET', lambda: self.client.get(key), _MISSING)
+        if value is _MISSING:
+            stale = self._local_get(key, allow_stale=True)
+            return default if stale is _MISSING or stale is None else stale
+        self._incr('hits' if value is not None else 'misses')
+        self._local_set(key, value, ttl)
+        return default if value is None else value
+
+    def mget(self, keys: Iterable[str], local_ttl: Optional[float] = None) -> Dict[str, Any]:
+        """
+        用一个pipeline读取多个键
+
+        Returns:
+            Dict[str, Any]: {键: 值}，不存在的键值为None
+        """
+        keys = list(keys)
+        result = {}
+        pending = []
+        for key in keys:
+            value = self._local_get(key) if self._local_ttl(key, local_ttl) > 0 else _MISSING
+            if value is _MISSING:
+                pending.append(key)
+            else:
+                self._incr('local_hits')
+                result[key] = value
+        if pending:
+            def run():
+                pipe = self.client.pipeline(transaction=False)
+                for key in pending:
+                    pipe.get(key)
+                return pipe.execute()
+            values = self._call('MGET', run, None)
+            for i, key in enumerate(pending):
+                if values is None:
+                    stale = self._local_get(key, allow_stale=True)
+                    result[key] = None if stale is _MISSING else stale
+                    continue
+                result[key] = values[i]
+                self._incr('hits' if values[i] is not None else 'misses')
+                self._local_set(key, values[i], self._local_ttl(key, local_ttl))
+        return {key: result.get(key) for key in keys}
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        """
+        写入一个键（同时更新本地缓存）
+
+        Args:
+            key: 键名
+            value: 值
+            ex: 可选的过期秒数
+
+        Returns:
+            bool: 是否写入成功，Redis不可用时返回False
+        """
+        ok = self._call('SET', lambda: self.client.set(key, value, ex=ex), False)
+        if ok:
+            self._local_set(key, str(value) if not isinstance(value, (str, bytes)) else value, self._local_ttl(key, None))
+        return bool(ok)
+
+    def setex(self, key: str, seconds: int, value: Any) -> bool:
+        """写入一个带过期时间的键"""
+        return self.set(key, value, ex=seconds)
+
+    def get_float(self, key: str, default: float) -> float:
+        """读取数值类型的键（如trade_mul），无法解析时返回默认值"""
+        value = self.get(key)
+        try:
+            return float(value) if value not in (None, '') else default
+        except (TypeError, ValueError):
+            logger.warning(f"Redis键 {key} 的值无法转换为数字: {value}")
+            return default
+
+    def ping(self) -> bool:
+        """检查Redis是否可用（降级模式下直接返回False）"""
+        return bool(self._call('PING', lambda: self.client.ping(), False))
+
+
+_pools: Dict[Tuple, RedisPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_redis_pool(config: Optional[Dict[str, Any]] = None) -> RedisPool:
+    """
+    获取共享的RedisPool（相同地址/密码/库只创建一个）
+
+    Args:
+        config: Redis配置，默认使用config.py中的REDIS_CONFIG
+    """
+    config = config if config is not None else REDIS_CONFIG
+    key = (config.get('ADDR', 'localhost:6379'), config.get('PASSWORD') or '', config.get('DB', 0))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = RedisPool(config)
+                _pools[key] = pool
+    return pool
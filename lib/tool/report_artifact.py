@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+分析报告结构化产物模块
+策略生成 multi_timeframe_analysis_new.txt 的同时，在同一目录写入同名的 .jsonl 文件:
+    - 第一行为报告头部 {"type": "header", "analysisTime", "timeframeDimensions", "strategy", "totalOpportunities", "version"}
+    - 之后每行一个交易机会，字段与报告查看器（report_viewer_python）使用的格式相同
+报告查看器优先读取 .jsonl（比txt新时），不再对每个【机会】块执行正则解析；没有 .jsonl 或已过期时仍解析txt
+
+数值按txt报告中的精度保存（评分3位小数、价格6位小数），两种方式得到的数据相同
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+ARTIFACT_VERSION = 1
+DEFAULT_DIMENSIONS = '周线→日线→4小时→1小时→15分钟'
+
+
+def artifact_path(report_path: str) -> str:
+    """txt报告对应的结构化产物路径（同目录同名，扩展名为 .jsonl）"""
+    return os.path.splitext(report_path)[0] + '.jsonl'
+
+
+def _rounded(value: Any, digits: int) -> float:
+    """与txt报告中 f"{value:.Nf}" 的精度相同"""
+    try:
+        return float(f"{float(value):.{digits}f}")
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _percent(price: float, current_price: float) -> float:
+    if current_price > 0 and price > 0:
+        return round((price - current_price) / current_price * 100, 2)
+    return 0
+
+
+def opportunity_record(opportunity: Any) -> Dict[str, Any]:
+    """
+    把交易信号对象转换为报告查看器的交易机会格式
+
+    Args:
+        opportunity: MultiTimeframeSignal等带有symbol/overall_action/total_score等属性的对象
+
+    Returns:
+        Dict[str, Any]: 与ReportControl解析txt报告得到的字典字段相同
+    """
+    reasoning = getattr(opportunity, 'reasoning', [])
+    current_price = _rounded(getattr(opportunity, 'entry_price', 0.0), 6)
+    target_price = _rounded(getattr(opportunity, 'target_short', 0.0), 6)
+    stop_loss_price = _rounded(getattr(opportunity, 'stop_loss', 0.0), 6)
+    return {
+        'symbol': getattr(opportunity, 'symbol', ''),
+        'action': getattr(opportunity, 'overall_action', ''),
+        'confidence': getattr(opportunity, 'confidence_level', ''),
+        'totalScore': _rounded(getattr(opportunity, 'total_score', 0.0), 3),
+        'currentPrice': current_price,
+        'weeklySignal': getattr(opportunity, 'weekly_trend', '观望'),
+        'dailySignal': getattr(opportunity, 'daily_trend', '观望'),
+        'h4Signal': getattr(opportunity, 'h4_signal', ''),
+        'h1Signal': getattr(opportunity, 'h1_signal', ''),
+        'm15Signal': getattr(opportunity, 'm15_signal', ''),
+        'targetPrice': target_price,
+        'stopLossPrice': stop_loss_price,
+        'shortPct': _percent(target_price, current_price),
+        'stopPct': _percent(stop_loss_price, current_price),
+        'analysisReason': '; '.join(reasoning) if isinstance(reasoning, list) else str(reasoning),
+    }
+
+
+def write_report_artifact(report_path: str, opportunities: Iterable[Any], analysis_time: str, strategy_name: str = '',
+                          dimensions: str = DEFAULT_DIMENSIONS) -> Optional[str]:
+    """
+    写入txt报告对应的结构化产物（先写临时文件再替换，查看器不会读到写了一半的文件）
+
+    Args:
+        report_path: txt报告路径
+        opportunities: 已排序的交易信号对象（与写入txt的顺序相同）
+        analysis_time: 报告头部的分析时间
+        strategy_name: 策略名称
+        dimensions: 时间框架维度描述
+
+    Returns:
+        产物路径，写入失败时返回None（不影响txt报告）
+    """
+    path = artifact_path(report_path)
+    records = [opportunity_record(opportunity) for opportunity in opportunities if hasattr(opportunity, 'symbol')]
+    header = {'type': 'header', 'version': ARTIFACT_VERSION, 'analysisTime': analysis_time,
+              'timeframeDimensions': dimensions, 'strategy': strategy_name, 'totalOpportunities': len(records)}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        logger.warning(f"写入结构化报告失败: {e}")
+        return None
+
+
+def read_report_artifact(path: str) -> Dict[str, Any]:
+    """
+    读取结构化产物
+
+    Returns:
+        Dict[str, Any]: 与ReportControl.parse_report_content相同格式的报告数据
+
+    Raises:
+        ValueError: 文件格式或版本不正确
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('type') != 'header' or header.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"不支持的结构化报告格式: {path}")
+        opportunities: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+    opportunities = [opp for opp in opportunities if opp.get('symbol') and opp.get('action')]
+    return {
+        'analysisTime': header.get('analysisTime', ''),
+        'generated_at': header.get('analysisTime', ''),
+        'timeframeDimensions': header.get('timeframeDimensions') or DEFAULT_DIMENSIONS,
+        'totalOpportunities': len(opportunities),
+        'opportunities': opportunities,
+    }
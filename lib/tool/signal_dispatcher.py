@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+交易信号异步发送模块
+lib2.send_trading_signal_to_api / send_position_info_to_api 把请求放入发送队列后立即返回，
+由后台工作线程通过保持连接的HTTP会话并发发送，下单接口变慢时不再阻塞扫描
+
+功能:
+    - 连接池: 共用一个 requests.Session，连接保持复用
+    - 并发发送: WORKERS 个工作线程
+    - 重试: 默认只重试确定没有到达服务器的请求（连接失败、连接超时），按指数退避重试；每个请求带固定的幂等键
+      （Idempotency-Key请求头），接收端按幂等键去重时可开启IDEMPOTENT_RECEIVER，读取超时、429和5xx也重试
+    - 磁盘队列: 请求先追加写入JSONL文件，发送完成后写入完成记录；开启IDEMPOTENT_RECEIVER时进程重启后重新发送
+      未完成的请求（超过MAX_AGE的信号丢弃），未开启时只记录日志不再发送（无法确定上次是否已下单）
+    - 延迟直方图: 记录每次HTTP请求和从入队到完成的耗时
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_SIGNAL_DISPATCH_CONFIG = {
+    'URL': 'http://149.129.66.131:81/myOrder',               # 下单接口地址
+    'ASYNC': True,                                           # 是否异步发送，False时在调用线程内发送（仍使用连接池和重试）
+    'WORKERS': 4,                                            # 发送线程数
+    'POOL_SIZE': 8,                                          # HTTP连接池大小
+    'CONNECT_TIMEOUT': 3,                                    # 连接超时（秒）
+    'READ_TIMEOUT': 10,                                      # 读取超时（秒）
+    'MAX_RETRIES': 3,                                        # 单个请求的最大重试次数
+    'BACKOFF_BASE': 0.5,                                     # 指数退避基础等待时间（秒）
+    'BACKOFF_MAX': 8.0,                                      # 单次退避最长等待时间（秒）
+    'MAX_AGE': 600,                                          # 信号有效期（秒），超过后不再发送
+    'SPOOL_PATH': os.path.join('reports', 'signal_spool.jsonl'),  # 磁盘队列文件，为空时不落盘
+    'SPOOL_COMPACT_EVERY': 200,                              # 每完成多少个请求压缩一次磁盘队列文件
+    'IDEMPOTENCY_HEADER': 'Idempotency-Key',                 # 幂等键请求头
+    'IDEMPOTENT_RECEIVER': False,                            # 接收端是否按幂等键去重，True时读取超时/429/5xx也重试、重启后重新发送未完成的请求
+    'EXIT_FLUSH_TIMEOUT': 15,                                # 进程退出时等待队列发送完成的最长时间（秒）
+}
+
+# 尝试导入配置文件
+try:
+    from config import SIGNAL_DISPATCH_CONFIG
+except ImportError:
+    SIGNAL_DISPATCH_CONFIG = {}
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图（线程安全）"""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """记录一次耗时（秒）"""
+        ms = seconds * 1000
+        index = len(self.BUCKETS_MS)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += ms
+            self._max = max(self._max, ms)
+
+    def percentile(self, p: float) -> float:
+        """估算分位数（返回所在分桶的上界，不超过实际最大值，毫秒；落在最后一个分桶时返回最大值）"""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = p / 100.0 * self._count
+            seen = 0
+            for i, count in enumerate(self._counts):
+                seen += count
+                if seen >= target and count:
+                    return min(float(self.BUCKETS_MS[i]), self._max) if i < len(self.BUCKETS_MS) else self._max
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回直方图摘要"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._sum, self._max
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            'count': count,
+            'avg_ms': round(total / count, 1) if count else 0.0,
+            'max_ms': round(maximum, 1),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': {label: n for label, n in zip(labels, counts) if n},
+        }
+
+
+def _request_not_sent(error: Exception) -> bool:
+    """请求是否确定没有到达服务器（连接失败或连接超时），只有这种情况可以在接收端不去重时安全重试"""
+    try:
+        from requests.exceptions import ConnectTimeout, ConnectionError as RequestsConnectionError
+        from urllib3.exceptions import ConnectTimeoutError
+    except ImportError:
+        return False
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, RequestsConnectionError) and error.args:
+        # 连接被拒绝、DNS解析失败等为 MaxRetryError(reason=NewConnectionError)，NewConnectionError是ConnectTimeoutError的子类；
+        # 已建立连接后断开（Connection aborted）时请求可能已经发出，不算
+        return isinstance(getattr(error.args[0], 'reason', None), ConnectTimeoutError)
+    return False
+
+
+class SignalSpool:
+    """追加写入的JSONL磁盘队列（add记录入队，done记录完成）"""
+
+    def __init__(self, path: str, compact_every: int = 200):
+        self.path = path
+        self.compact_every = compact_every
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._done_since_compact = 0
+        self._lock = threading.Lock()
+
+    def _append(self, record: Dict[str, Any]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+
+    def load(self) -> List[Dict[str, Any]]:
+        """读取文件中未完成的请求（跳过进程崩溃时写了一半的行），并压缩文件"""
+        with self._lock:
+            self._pending.clear()
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if record.get('op') == 'add':
+                            self._pending[record['id']] = record['job']
+                        elif record.get('op') == 'done':
+                            self._pending.pop(record.get('id'), None)
+            self._compact()
+            return list(self._pending.values())
+
+    def add(self, job: Dict[str, Any]):
+        with self._lock:
+            self._pending[job['id']] = job
+            self._append({'op': 'add', 'id': job['id'], 'job': job})
+
+    def done(self, job_id: str, status: str):
+        with self._lock:
+            if self._pending.pop(job_id, None) is None:
+                return
+            self._append({'op': 'done', 'id': job_id, 'status': status, 'time': time.time()})
+            self._done_since_compact += 1
+            if self._done_since_compact >= self.compact_every:
+                self._compact()
+
+    def _compact(self):
+        """只保留未完成的请求重写文件（调用方需持有锁）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for job_id, job in self._pending.items():
+                f.write(json.dumps({'op': 'add', 'id': job_id, 'job': job}, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        self._done_since_compact = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class SignalDispatcher:
+    """交易信号发送队列"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, session: Any = None,
+                 logger_param: Optional[logging.Logger] = None):
+        """
+        Args:
+            config: 配置，未提供的键使用DEFAULT_SIGNAL_DISPATCH_CONFIG中的默认值，默认使用SIGNAL_DISPATCH_CONFIG
+            session: 可选的HTTP会话（需提供与requests.Session相同的post方法），默认按需创建requests.Session
+            logger_param: 可选的日志记录器
+        """
+        self.config = {**DEFAULT_SIGNAL_DISPATCH_CONFIG, **(config if config is not None else SIGNAL_DISPATCH_CONFIG)}
+        self.logger = logger_param or logger
+        self._session = session
+        self._session_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.spool = SignalSpool(self.config['SPOOL_PATH'], self.config['SPOOL_COMPACT_EVERY']) if self.config['SPOOL_PATH'] else None
+        self._recovered = False
+        self.histograms = {'request': LatencyHistogram(), 'end_to_end': LatencyHistogram()}
+        self.stats = {'submitted': 0, 'sent': 0, 'retries': 0, 'failed': 0, 'expired': 0, 'recovered': 0, 'dropped': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """按需创建保持连接的HTTP会话（连接池大小为POOL_SIZE，重试由发送队列处理）"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config['POOL_SIZE'], max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ---------------- 队列 ----------------
+
+    def start(self):
+        """恢复磁盘队列中未完成的请求并启动发送线程（首次发送时自动调用）"""
+        with self._start_lock:
+            if not self._recovered:
+                self._recovered = True
+                self._recover()
+            if self.config['ASYNC'] and not self._workers:
+                self._stop_event.clear()
+                for i in range(max(1, self.config['WORKERS'])):
+                    worker = threading.Thread(target=self._worker_loop, name=f"signal-dispatch-{i}", daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+
+    def _recover(self):
+        if self.spool is None:
+            return
+        try:
+            jobs = self.spool.load()
+        except Exception as e:
+            self.logger.error(f"读取信号磁盘队列失败，跳过恢复: {e}")
+            return
+        if not jobs:
+            return
+        if not self.config['IDEMPOTENT_RECEIVER']:
+            # 上次可能已经发出但没有收到响应，接收端不去重时重新发送可能重复下单
+            self._count('dropped', len(jobs))
+            for job in jobs:
+                self.logger.warning(f"磁盘队列中有未完成的请求，无法确定是否已下单，不再发送: "
+                                    f"{job['kind']}: {job.get('description', '')}, 参数 {job['payload']}")
+                self._finish(job, 'dropped')
+            return
+        self.logger.info(f"从磁盘队列恢复 {len(jobs)} 个未完成的请求")
+        self._count('recovered', len(jobs))
+        for job in jobs:
+            if self.config['ASYNC']:
+                self._queue.put(job)
+            else:
+                self._deliver(job)
+
+    def dispatch(self, payload: Dict[str, Any], kind: str = '交易信号', description: str = '',
+                 logger_param: Optional[logging.Logger] = None) -> bool:
+        """
+        发送一个请求
+
+        Args:
+            payload: 表单参数
+            kind: 请求类型（交易信号 / 持仓信息），用于日志和统计
+            description: 日志中显示的描述，如 "BTC/USDT (买入)"
+            logger_param: 可选的日志记录器
+
+        Returns:
+            bool: 异步模式下为是否已入队；同步模式下为是否发送成功
+        """
+        logger_used = logger_param or self.logger
+        self.start()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'payload': payload,
+            'description': description,
+            'created': time.time(),
+        }
+        self._count('submitted')
+        if self.spool is not None:
+            try:
+                self.spool.add(job)
+            except Exception as e:
+                logger_used.warning(f"写入信号磁盘队列失败，仅在内存中发送: {e}")
+        if not self.config['ASYNC']:
+            return self._deliver(job, logger_used)
+        self._queue.put(job)
+        logger_used.info(f"{kind}已加入发送队列: {description}（待发送 {self._queue.unfinished_tasks} 个）")
+        return True
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._deliver(job)
+            except Exception as e:
+                self.logger.error(f"发送线程处理请求时发生异常: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的请求发送完成
+
+        Returns:
+            bool: 超时前是否全部完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """等待发送完成后停止发送线程（未完成的请求保留在磁盘队列中，开启IDEMPOTENT_RECEIVER时下次启动时发送）"""
+        self.flush(timeout)
+        self._stop_event.set()
+        workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join(timeout=1)
+
+    # ---------------- 发送 ----------------
+
+    def _post(self, job: Dict[str, Any]) -> Tuple[bool, bool, str]:
+        """
+        发送一次HTTP请求
+
+        Returns:
+            (是否成功, 是否可重试, 说明)
+        """
+        start_time = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.config['URL'],
+                data=job['payload'],
+                headers={self.config['IDEMPOTENCY_HEADER']: job['id']},
+                timeout=(self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT']),
+            )
+        except Exception as e:
+            self.histograms['request'].observe(time.perf_counter() - start_time)
+            retryable = _request_not_sent(e) or self.config['IDEMPOTENT_RECEIVER']
+            return False, retryable, f"{type(e).__name__}: {e}"
+        self.histograms['request'].observe(time.perf_counter() - start_time)
+        status = response.status_code
+        if status == 200:
+            return True, False, response.text
+        retryable = (status == 429 or status >= 500) and self.config['IDEMPOTENT_RECEIVER']
+        return False, retryable, f"状态码 {status}, 响应 {response.text[:200]}"
+
+    def _deliver(self, job: Dict[str, Any], logger_param: Optional[logging.Logger] = None) -> bool:
+        """发送一个请求（含重试），完成后写入磁盘队列的完成记录"""
+        logger_used = logger_param or self.logger
+        description = f"{job['kind']}: {job.get('description', '')}"
+        attempt = 0
+        while True:
+            if time.time() - job['created'] > self.config['MAX_AGE']:
+                self._count('expired')
+                self._finish(job, 'expired')
+                logger_used.warning(f"请求已超过有效期 {self.config['MAX_AGE']} 秒，放弃发送: {description}")
+                return False
+            ok, retryable, detail = self._post(job)
+            if ok:
+                self._count('sent')
+                self._finish(job, 'sent')
+                logger_used.info(f"成功发送 {description}")
+                return True
+            if not retryable or attempt >= self.config['MAX_RETRIES']:
+                self._count('failed')
+                self._finish(job, 'failed')
+                logger_used.error(f"发送失败 {description}（尝试 {attempt + 1} 次）: {detail}, 参数 {job['payload']}")
+                return False
+            delay = min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * (2 ** attempt))
+            delay *= random.uniform(0.8, 1.2)
+            attempt += 1
+            self._count('retries')
+            logger_used.warning(f"发送 {description} 失败，{delay:.1f}秒后第{attempt}次重试: {detail}")
+            if self._stop_event.wait(delay):
+                # 正在关闭: 请求保留在磁盘队列中，开启IDEMPOTENT_RECEIVER时下次启动时发送
+                return False
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        self.histograms['end_to_end'].observe(time.time() - job['created'])
+        if self.spool is not None:
+            try:
+                self.spool.done(job['id'], status)
+            except Exception as e:
+                self.logger.warning(f"写入信号磁盘队列完成记录失败: {e}")
+
+    def summary(self) -> Dict[str, Any]:
+        """统计信息和延迟直方图"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['queued'] = self._queue.unfinished_tasks
+        stats['spooled'] = len(self.spool) if self.spool is not None else 0
+        stats['latency'] = {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+        return stats
+
+
+_dispatcher: Optional[SignalDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_signal_dispatcher() -> SignalDispatcher:
+    """获取进程内共享的SignalDispatcher（进程退出时等待队列发送完成）"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = SignalDispatcher()
+                atexit.register(_flush_on_exit, _dispatcher)
+    return _dispatcher
+
+
+def _flush_on_exit(dispatcher: SignalDispatcher):
+    if dispatcher.stats['submitted'] or dispatcher.stats['recovered']:
+        if not dispatcher.flush(dispatcher.config['EXIT_FLUSH_TIMEOUT']):
+            logger.warning(f"退出时仍有 {dispatcher._queue.unfinished_tasks} 个请求未发送完成，已保留在磁盘队列中")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+启动耗时分析模块
+multi_timeframe_system.py --profile-startup 使用: 在导入其它模块之前调用 startup_profiler.start()，
+记录每个模块的导入耗时（包含子模块的累计耗时和自身耗时）以及各启动阶段的耗时，启动完成后输出明细
+
+只统计通过 import 语句导入的模块（importlib.import_module 导入的策略模块计入"加载策略"阶段）
+"""
+
+import sys
+import time
+import builtins
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+class StartupProfiler:
+    """导入耗时和启动阶段耗时统计"""
+
+    def __init__(self):
+        self.enabled = False
+        self.started_at = time.perf_counter()
+        self.imports: Dict[str, List[float]] = {}   # 模块名 -> [累计耗时, 自身耗时]
+        self.phases: List[Tuple[str, float]] = []
+        self._stack: List[float] = []
+        self._original_import = None
+
+    def start(self):
+        """开始统计导入耗时"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        """停止统计导入耗时"""
+        if self.enabled:
+            builtins.__import__ = self._original_import
+            self.enabled = False
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        # 已导入的模块直接返回，不计时
+        if level == 0 and name in sys.modules and not fromlist:
+            return original(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            if elapsed > 1e-4:
+                if level:
+                    package = (globals or {}).get('__package__') or ''
+                    name = f"{package}.{name}" if name else package
+                record = self.imports.setdefault(name, [0.0, 0.0])
+                record[0] += elapsed
+                record[1] += elapsed - children
+
+    @contextmanager
+    def phase(self, name: str):
+        """统计一个启动阶段的耗时（未启用时也可以使用，只记录阶段耗时）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, top: int = 25, printer=print, min_ms: float = 1.0):
+        """
+        输出启动耗时明细
+
+        Args:
+            top: 输出自身耗时最长的前几个模块
+            printer: 输出函数，默认print
+            min_ms: 小于该毫秒数的模块不输出
+        """
+        total = time.perf_counter() - self.started_at
+        printer(f"=== 启动耗时: {total:.3f}秒 ===")
+        for name, seconds in self.phases:
+            printer(f"  阶段 {name}: {seconds:.3f}秒")
+        # 按顶层包汇总自身耗时
+        packages: Dict[str, float] = {}
+        for name, (_, self_time) in self.imports.items():
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0.0) + self_time
+        printer("--- 按顶层包汇总的导入耗时 ---")
+        for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            if seconds * 1000 >= min_ms:
+                printer(f"  {package:<30} {seconds * 1000:9.1f}毫秒")
+        printer(f"--- 自身耗时最长的{top}个模块（累计 / 自身） ---")
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (cumulative, self_time) in ranked:
+            if self_time * 1000 >= min_ms:
+                printer(f"  {name:<50} {cumulative * 1000:9.1f}毫秒 / {self_time * 1000:9.1f}毫秒")
+
+
+# 进程内共享的分析器
+startup_profiler = StartupProfiler()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+策略执行器模块
+为扫描器的策略分析步骤提供可切换的执行方式:
+    inline  - 在当前线程中逐个执行（便于调试）
+    thread  - 线程池执行（原有方式，受GIL限制）
+    process - 进程池执行：每个工作进程启动时实例化一次策略；每轮扫描的K线数据写入一块共享内存，
+              任务只传递 (共享内存名, 交易对, 策略名)，工作进程直接在共享内存上构造DataFrame，不再逐任务pickle DataFrame
+    CROSS_SECTIONAL - 可与以上方式同时开启：提供analyze_universe的策略对所有交易对只调用一次，
+              其它策略仍按MODE执行
+
+说明:
+    进程模式下每个工作进程有独立的指标缓存和增量指标状态，同一交易对可能被不同进程处理，增量指标会退化为批量计算；
+    分析结果无法pickle时，失败的任务在当前进程用线程池重新执行，并且之后改用thread模式
+"""
+
+import os
+import sys
+import time
+import pickle
+import logging
+import importlib
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from lib.tool.candle_frame import CandleArray
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_STRATEGY_EXECUTOR_CONFIG = {
+    'MODE': 'thread',          # 执行方式: inline / thread / process
+    'MAX_WORKERS': 5,          # 工作线程/进程数量，0或None表示使用CPU核心数
+    'START_METHOD': 'spawn',   # 进程启动方式，扫描器中有后台线程（WebSocket行情等），默认不使用fork
+    'CHUNK_SIZE': 8,           # 进程模式下每个任务包含的 (交易对, 策略) 数量，减少进程间往返次数
+    'CROSS_SECTIONAL': False,  # 策略提供analyze_universe时，在当前进程对所有交易对一次性横截面计算
+}
+
+VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class SharedCandleData:
+    """
+    将一轮扫描的所有K线（DataFrame或CandleArray）写入一块共享内存
+
+    内存布局: [清单长度(int64)] [pickle后的清单] [对齐填充] [时间戳int64数组] [数值float64数组(行数×5)]
+    清单: {'rows': 总行数, 'frames': {交易对: {时间框架: (起始行, 行数, attrs)}}}
+    """
+
+    def __init__(self, all_data: Dict[str, Dict[str, Any]]):
+        frames = {}
+        total_rows = 0
+        for symbol, data in all_data.items():
+            frames[symbol] = {}
+            for tf, df in data.items():
+                if df is None or df.empty:
+                    continue
+                frames[symbol][tf] = (total_rows, len(df), dict(df.attrs))
+                total_rows += len(df)
+        manifest = pickle.dumps({'rows': total_rows, 'frames': frames})
+        header = 8 + len(manifest)
+        self.data_offset = (header + 63) // 64 * 64
+        size = self.data_offset + total_rows * 8 * (1 + len(VALUE_COLUMNS))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.name = self.shm.name
+
+        buf = self.shm.buf
+        buf[:8] = np.int64(len(manifest)).tobytes()
+        buf[8:header] = manifest
+        timestamps, values = _views(self.shm, self.data_offset, total_rows)
+        for symbol, data in all_data.items():
+            for tf, (start, length, _) in frames[symbol].items():
+                df = data[tf]
+                if isinstance(df, CandleArray):
+                    # CandleArray直接拷贝数组，主进程中不需要构造DataFrame
+                    timestamps[start:start + length] = df.timestamp * 1_000_000
+                    for column, name in enumerate(VALUE_COLUMNS):
+                        values[start:start + length, column] = df[name]
+                else:
+                    timestamps[start:start + length] = _index_to_ns(df)
+                    values[start:start + length] = df[VALUE_COLUMNS].to_numpy(dtype='float64')
+
+    def close(self):
+        """释放共享内存（工作进程已映射的部分在其关闭前仍然有效）"""
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _index_to_ns(df: pd.DataFrame) -> np.ndarray:
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.to_numpy(dtype='datetime64[ns]').astype('int64')
+    return pd.to_datetime(df['timestamp'], unit='ms').to_numpy(dtype='datetime64[ns]').astype('int64')
+
+
+def _is_pickling_error(error: Exception) -> bool:
+    """是否为进程间传递对象时的pickle错误（动态创建的类等会抛出PicklingError、AttributeError或TypeError）"""
+    return isinstance(error, pickle.PicklingError) or 'pickle' in str(error).lower()
+
+
+def _views(shm: shared_memory.SharedMemory, offset: int, rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    timestamps = np.ndarray((rows,), dtype='int64', buffer=shm.buf, offset=offset)
+    values = np.ndarray((rows, len(VALUE_COLUMNS)), dtype='float64', buffer=shm.buf, offset=offset + rows * 8)
+    return timestamps, values
+
+
+# ---------------- 工作进程 ----------------
+
+# 工作进程内的全局状态：策略实例和当前附加的共享内存
+_worker_strategies: Dict[str, Any] = {}
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_manifest: Dict[str, Any] = {}
+_worker_frames: Dict[str, Dict[str, pd.DataFrame]] = {}
+
+
+def _init_worker(strategy_specs: Dict[str, Tuple[str, str]]):
+    """工作进程初始化：每个进程只实例化一次策略"""
+    for name, (module_path, class_name) in strategy_specs.items():
+        try:
+            module = importlib.import_module(module_path)
+            _worker_strategies[name] = getattr(module, class_name)()
+        except Exception as e:
+            logger.error(f"工作进程 {os.getpid()} 初始化策略 {name} 失败: {e}")
+
+
+def _attach(shm_name: str):
+    """附加到本轮扫描的共享内存（名字变化时释放上一轮的映射）"""
+    global _worker_shm, _worker_manifest
+    if _worker_shm is not None and _worker_shm.name == shm_name:
+        return
+    if _worker_shm is not None:
+        _worker_frames.clear()
+        try:
+            _worker_shm.close()
+        except BufferError:
+            pass
+    # 共享内存只由主进程unlink：工作进程与主进程共用同一个resource_tracker，重复注册不影响主进程的清理，
+    # 工作进程不能再unregister（否则会删掉主进程的注册，主进程unlink时resource_tracker报KeyError）
+    if sys.version_info >= (3, 13):
+        _worker_shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    else:
+        _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    length = int(np.frombuffer(_worker_shm.buf[:8], dtype='int64')[0])
+    _worker_manifest = pickle.loads(bytes(_worker_shm.buf[8:8 + length]))
+    _worker_manifest['offset'] = (8 + length + 63) // 64 * 64
+
+
+def _symbol_frames(symbol: str) -> Dict[str, pd.DataFrame]:
+    """在共享内存上构造交易对的各时间框架DataFrame（同一轮内缓存）"""
+    data = _worker_frames.get(symbol)
+    if data is not None:
+        return data
+    timestamps, values = _views(_worker_shm, _worker_manifest['offset'], _worker_manifest['rows'])
+    data = {}
+    for tf, (start, length, attrs) in _worker_manifest['frames'].get(symbol, {}).items():
+        index = pd.DatetimeIndex(timestamps[start:start + length].view('datetime64[ns]'), name='timestamp')
+        df = pd.DataFrame(values[start:start + length], index=index, columns=VALUE_COLUMNS, copy=False)
+        df.attrs.update(attrs)
+        data[tf] = df
+    _worker_frames[symbol] = data
+    return data
+
+
+def shared_symbol_frames(shm_name: str, symbol: str) -> Dict[str, pd.DataFrame]:
+    """
+    在工作进程中读取SharedCandleData里某个交易对的K线（其它进程池复用同一份共享内存时使用，如回测参数扫描）
+
+    Returns:
+        {时间框架: 以时间为索引的DataFrame}，直接引用共享内存，同一共享内存内按交易对缓存
+    """
+    _attach(shm_name)
+    return _symbol_frames(symbol)
+
+
+def _run_chunk(shm_name: str, chunk: List[Tuple[str, str]]) -> List[Tuple[Tuple[str, str], Any, Optional[str]]]:
+    """在工作进程中执行一批 (交易对, 策略名) 分析任务"""
+    _attach(shm_name)
+    results = []
+    for symbol, strategy_name in chunk:
+        try:
+            strategy = _worker_strategies[strategy_name]
+            results.append(((symbol, strategy_name), strategy.analyze(symbol, _symbol_frames(symbol)), None))
+        except Exception as e:
+            results.append(((symbol, strategy_name), None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+# ---------------- 主进程 ----------------
+
+class StrategyExecutor:
+    """可切换执行方式的策略执行器"""
+
+    def __init__(self, strategies: Dict[str, Any], strategy_specs: Dict[str, Tuple[str, str]] = None,
+                 config: Dict[str, Any] = None, logger_param: logging.Logger = None):
+        """
+        初始化执行器
+
+        Args:
+            strategies: {策略名: 策略实例}，inline/thread模式直接使用
+            strategy_specs: {策略名: (模块路径, 类名)}，process模式用于在工作进程中实例化策略
+            config: 配置，未提供的键使用DEFAULT_STRATEGY_EXECUTOR_CONFIG中的默认值
+            logger_param: 可选的日志记录器
+        """
+        self.config = {**DEFAULT_STRATEGY_EXECUTOR_CONFIG, **(config or {})}
+        self.mode = str(self.config['MODE']).lower()
+        if self.mode not in ('inline', 'thread', 'process'):
+            raise ValueError(f"不支持的执行方式: {self.mode}")
+        self.max_workers = int(self.config['MAX_WORKERS'] or os.cpu_count() or 1)
+        self.strategies = strategies
+        self.strategy_specs = strategy_specs or {}
+        self.logger = logger_param or logger
+        self._pool = None
+
+    def _get_pool(self):
+        """创建执行池（进程池在多轮扫描之间复用，策略只在工作进程启动时实例化一次）"""
+        if self._pool is None:
+            if self.mode == 'thread':
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            elif self.mode == 'process':
+                missing = [name for name in self.strategies if name not in self.strategy_specs]
+                if missing:
+                    raise ValueError(f"进程模式缺少策略的模块信息: {missing}")
+                context = multiprocessing.get_context(self.config['START_METHOD'])
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=(self.strategy_specs,))
+        return self._pool
+
+    def run(self, tasks: List[Tuple[str, str]], all_data: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[Tuple[str, str], Tuple[Any, Optional[str]]]:
+        """
+        执行分析任务
+
+        Args:
+            tasks: (交易对, 策略名) 列表
+            all_data: {交易对: {时间框架: DataFrame}}
+
+        Returns:
+            {(交易对, 策略名): (分析结果, 错误信息)}，成功时错误信息为None
+        """
+        if not tasks:
+            return {}
+        start_time = time.time()
+        results = {}
+        if self.config['CROSS_SECTIONAL']:
+            results, tasks = self._run_cross_sectional(tasks, all_data)
+        if tasks and self.mode == 'inline':
+            results.update(self._run_local(task, all_data) for task in tasks)
+        elif tasks and self.mode == 'thread':
+            pool = self._get_pool()
+            futures = [pool.submit(self._run_local, task, all_data) for task in tasks]
+            results.update(future.result() for future in futures)
+        elif tasks:
+            results.update(self._run_process(tasks, all_data))
+        self.logger.info(f"策略执行器({self.mode}, {self.max_workers}个工作单元): {len(results)} 个任务, 用时 {time.time() - start_time:.2f}秒")
+        return results
+
+    def _run_cross_sectional(self, tasks, all_data):
+        """
+        对提供analyze_universe的策略一次性分析所有交易对
+
+        Returns:
+            (已完成任务的结果, 仍需逐个执行的任务)；没有触发信号的交易对结果为None，
+            analyze_universe失败时该策略的任务全部回退为逐个执行
+        """
+        by_strategy: Dict[str, List[str]] = {}
+        for symbol, strategy_name in tasks:
+            by_strategy.setdefault(strategy_name, []).append(symbol)
+        results = {}
+        remaining = []
+        for strategy_name, symbols in by_strategy.items():
+            strategy = self.strategies.get(strategy_name)
+            if not hasattr(strategy, 'analyze_universe'):
+                remaining.extend((symbol, strategy_name) for symbol in symbols)
+                continue
+            try:
+                signals = strategy.analyze_universe({symbol: all_data[symbol] for symbol in symbols})
+            except Exception as e:
+                self.logger.error(f"策略 {strategy_name} 横截面分析失败，回退到逐个交易对分析: {e}")
+                remaining.extend((symbol, strategy_name) for symbol in symbols)
+                continue
+            for symbol in symbols:
+                results[(symbol, strategy_name)] = (signals.get(symbol), None)
+        return results, remaining
+
+    def _run_local(self, task: Tuple[str, str], all_data):
+        symbol, strategy_name = task
+        try:
+            return task, (self.strategies[strategy_name].analyze(symbol, all_data[symbol]), None)
+        except Exception as e:
+            return task, (None, f"{type(e).__name__}: {e}")
+
+    def _run_process(self, tasks, all_data):
+        pool = self._get_pool()
+        symbols = {symbol for symbol, _ in tasks}
+        shared = SharedCandleData({symbol: all_data[symbol] for symbol in symbols})
+        try:
+            # 按交易对排序后分块，同一交易对的多个策略尽量落在同一进程，复用构造好的DataFrame
+            ordered = sorted(tasks)
+            chunk_size = max(1, int(self.config['CHUNK_SIZE']))
+            chunks = [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+            futures = [pool.submit(_run_chunk, shared.name, chunk) for chunk in chunks]
+            results = {}
+            unpicklable = []
+            for chunk, future in zip(chunks, futures):
+                try:
+                    for task, result, error in future.result():
+                        results[task] = (result, error)
+                except Exception as e:
+                    if _is_pickling_error(e):
+                        unpicklable.extend(chunk)
+                    else:
+                        self.logger.error(f"工作进程执行失败: {e}")
+        finally:
+            shared.close()
+        if unpicklable:
+            self.logger.warning(f"分析结果无法在进程间传递（{len(unpicklable)} 个任务），回退到thread模式执行")
+            self.shutdown()
+            self.mode = 'thread'
+            pool = self._get_pool()
+            futures = [pool.submit(self._run_local, task, all_data) for task in unpicklable]
+            results.update(future.result() for future in futures)
+        for task in tasks:
+            results.setdefault(task, (None, "工作进程执行失败"))
+        return results
+
+    def shutdown(self):
+        """关闭执行池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
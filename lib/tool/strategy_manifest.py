@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+策略清单模块
+启动时不再为了 inspect.getmembers 导入 strategies 目录下的每个模块: 用AST解析每个文件中定义的类及其基类，
+找出（直接或间接）继承BaseStrategy的策略类，结果按文件的修改时间/大小/内容哈希缓存在清单文件中，
+之后只导入启用的策略所在的模块
+
+缓存校验:
+    - 修改时间和大小都未变: 直接使用缓存，不读取文件
+    - 修改时间变化但内容哈希相同（如git checkout）: 使用缓存并更新修改时间
+    - 内容变化: 重新解析该文件
+"""
+
+import os
+import ast
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+MANIFEST_VERSION = 1
+
+
+def parse_classes(source: bytes, filename: str = '<strategy>') -> Dict[str, List[str]]:
+    """
+    解析模块顶层定义的类及其基类名
+
+    Returns:
+        Dict[str, List[str]]: {类名: [基类名]}，基类为 module.Class 形式时取 Class
+    """
+    classes = {}
+    for node in ast.parse(source, filename).body:
+        if isinstance(node, ast.ClassDef):
+            bases = []
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    bases.append(base.id)
+                elif isinstance(base, ast.Attribute):
+                    bases.append(base.attr)
+            classes[node.name] = bases
+    return classes
+
+
+class StrategyManifest:
+    """按文件缓存的策略类清单"""
+
+    def __init__(self, strategies_dir: str, exclude_files: Iterable[str] = (), cache_path: Optional[str] = None,
+                 base_class: str = 'BaseStrategy'):
+        """
+        Args:
+            strategies_dir: 策略目录
+            exclude_files: 不作为策略模块的文件（base_strategy.py、工具模块等）
+            cache_path: 清单缓存文件，默认 <项目根目录>/reports/strategy_manifest.json
+            base_class: 策略基类名
+        """
+        self.strategies_dir = strategies_dir
+        self.exclude_files = set(exclude_files)
+        self.cache_path = cache_path or os.path.join(os.path.dirname(os.path.abspath(strategies_dir)), 'reports', 'strategy_manifest.json')
+        self.base_class = base_class
+        self.stats = {'cached': 0, 'hashed': 0, 'parsed': 0}
+
+    def _read_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == MANIFEST_VERSION:
+                return cache.get('files', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"读取策略清单缓存失败，重新解析: {e}")
+        return {}
+
+    def _write_cache(self, files: Dict[str, Dict]):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'files': files}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"写入策略清单缓存失败: {e}")
+
+    def _file_entry(self, filename: str, cached: Optional[Dict]) -> Dict:
+        path = os.path.join(self.strategies_dir, filename)
+        stat = os.stat(path)
+        if cached and cached.get('mtime') == stat.st_mtime and cached.get('size') == stat.st_size:
+            self.stats['cached'] += 1
+            return cached
+        with open(path, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha1(source).hexdigest()
+        if cached and cached.get('sha1') == digest:
+            self.stats['hashed'] += 1
+            return {**cached, 'mtime': stat.st_mtime, 'size': stat.st_size}
+        self.stats['parsed'] += 1
+        try:
+            classes = parse_classes(source, path)
+        except SyntaxError as e:
+            # 语法错误的文件仍然交给导入步骤处理（导入时记录错误）
+            logger.error(f"解析策略文件 {filename} 失败: {e}")
+            classes = None
+        return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digest, 'classes': classes}
+
+    def load(self) -> Dict[str, Optional[List[str]]]:
+        """
+        获取策略清单
+
+        Returns:
+            Dict[str, Optional[List[str]]]: {模块名: [策略类名]}，只包含定义了策略类的模块；
+            无法解析的模块值为None（需要导入后检查）
+        """
+        cached_files = self._read_cache()
+        files = {}
+        for filename in sorted(os.listdir(self.strategies_dir)):
+            if not filename.endswith('.py') or filename in self.exclude_files:
+                continue
+            files[filename] = self._file_entry(filename, cached_files.get(filename))
+        if files != cached_files:
+            self._write_cache(files)
+
+        # 按基类名传递解析: 继承BaseStrategy的类，以及继承这些类的类（可以在其它文件中）
+        strategy_names = {self.base_class}
+        changed = True
+        while changed:
+            changed = False
+            for entry in files.values():
+                for name, bases in (entry['classes'] or {}).items():
+                    if name not in strategy_names and strategy_names.intersection(bases):
+                        strategy_names.add(name)
+                        changed = True
+
+        manifest = {}
+        for filename, entry in files.items():
+            module_name = filename[:-3]
+            if entry['classes'] is None:
+                manifest[module_name] = None
+                continue
+            names = [name for name in entry['classes'] if name in strategy_names and name != self.base_class]
+            if names:
+                manifest[module_name] = names
+        return manifest
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+多时间框架对齐模块
+一次性用 np.searchsorted 预计算 基准K线 → 各时间框架K线 的索引映射，
+回测主循环中按基准K线下标O(1)取得各时间框架的零拷贝数据窗口
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from lib.tool.candle_frame import CandleArray
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def to_int64_timestamps(values) -> np.ndarray:
+    """将datetime列/毫秒时间戳列统一转换为int64纳秒时间戳数组，用于二分查找"""
+    if isinstance(values, (pd.Series, pd.Index)) and pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]').astype('int64')
+    array = np.asarray(values)
+    if np.issubdtype(array.dtype, np.datetime64):
+        return array.astype('datetime64[ns]').astype('int64')
+    # 数值时间戳按毫秒处理
+    return array.astype('int64') * 1_000_000
+
+
+class TimeframeAligner:
+    """基准时间框架到其他时间框架的对齐索引"""
+
+    def __init__(self, base_times, frames: Dict[str, pd.DataFrame], window_sizes: Dict[str, int],
+                 time_column: str = 'datetime'):
+        """
+        预计算对齐索引
+
+        Args:
+            base_times: 基准时间框架每根K线的时间（datetime列或毫秒时间戳）
+            frames: {时间框架: DataFrame或CandleArray}，需按时间升序，DataFrame需包含time_column列
+            window_sizes: {时间框架: 窗口长度}
+            time_column: 时间列名
+        """
+        self.frames = frames
+        self.window_sizes = dict(window_sizes)
+        self.base_ts = to_int64_timestamps(base_times)
+        # end_index[tf][i] = 不晚于第i根基准K线时间的最新K线下标（-1表示不存在）
+        self.end_index: Dict[str, np.ndarray] = {}
+        for tf, df in frames.items():
+            tf_ts = to_int64_timestamps(df[time_column])
+            self.end_index[tf] = np.searchsorted(tf_ts, self.base_ts, side='right') - 1
+
+    def __len__(self) -> int:
+        return len(self.base_ts)
+
+    def index_at(self, tf: str, i: int) -> int:
+        """返回第i根基准K线对应的tf时间框架K线下标，不存在时返回-1"""
+        return int(self.end_index[tf][i])
+
+    def window(self, tf: str, i: int, window_size: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        返回第i根基准K线对应的tf时间框架数据窗口（iloc切片视图，不复制数据）
+
+        Args:
+            tf: 时间框架
+            i: 基准K线下标
+            window_size: 窗口长度，默认使用初始化时的配置
+
+        Returns:
+            DataFrame（或CandleArray）视图；没有对应K线时返回None
+        """
+        end = int(self.end_index[tf][i])
+        if end < 0:
+            return None
+        size = window_size if window_size is not None else self.window_sizes.get(tf, 168)
+        start = max(0, end - size + 1)
+        frame = self.frames[tf]
+        if isinstance(frame, CandleArray):
+            return frame[start:end + 1]
+        return frame.iloc[start:end + 1]
+
+    def windows(self, i: int, tf_names: Optional[Dict[str, str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        返回第i根基准K线对应的所有时间框架数据窗口
+
+        Args:
+            i: 基准K线下标
+            tf_names: 可选的 {数据时间框架: 返回时使用的键} 映射（例如 API时间框架 → 策略时间框架）
+
+        Returns:
+            {时间框架: DataFrame视图}，没有对应K线的时间框架不包含在结果中
+        """
+        result = {}
+        for tf in self.frames:
+            view = self.window(tf, i)
+            if view is None:
+                continue
+            key = tf_names.get(tf, tf) if tf_names else tf
+            result[key] = view
+        return result
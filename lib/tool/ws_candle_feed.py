@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+WebSocket K线行情模块
+在后台线程中运行asyncio事件循环，使用 python-okx 的 WsPublicAsync 订阅 candle15m/candle1H/candle4H 和 tickers 频道，
+在内存中维护每个(交易对, 周期)的滚动K线缓冲区，扫描器直接读取缓冲区，替代每轮对每个交易对、每个周期调用REST fetch_ohlcv
+
+说明:
+    WebSocket只推送最新K线，首次使用某个(交易对, 周期)或断线重连后，通过REST补齐历史K线后才从缓冲区读取；
+    断线后自动指数退避重连并重新订阅所有频道
+"""
+
+import os
+import sys
+import json
+import importlib.util
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lib.tool.ohlcv_cache import timeframe_to_ms
+# ccxt交易对转换为OKX instId（结果缓存），例如 BTC/USDT → BTC-USDT，BTC/USDT:USDT → BTC-USDT-SWAP
+from lib.tool.instrument_id import to_okx_inst_id as to_inst_id
+
+# python-okx 的WebSocket客户端依赖 websockets 和 certifi，未安装时WebSocket行情不可用
+# websockets 和 okx SDK 在 WsCandleFeed.start 中才导入，导入扫描器时不加载
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python-okx-master'))
+websockets = None
+WsPublicAsync = None
+
+
+def _import_ws_client():
+    """导入 websockets 和 python-okx 的 WsPublicAsync（只导入一次）"""
+    global websockets, WsPublicAsync
+    if WsPublicAsync is None:
+        import websockets as websockets_module
+        from okx.websocket.WsPublicAsync import WsPublicAsync as client_class
+        websockets, WsPublicAsync = websockets_module, client_class
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_WS_CANDLE_FEED_CONFIG = {
+    'ENABLED': True,                                         # 是否启用WebSocket行情
+    'CANDLE_URL': 'wss://ws.okx.com:8443/ws/v5/business',    # K线频道地址（OKX的K线频道在business端点）
+    'TICKER_URL': 'wss://ws.okx.com:8443/ws/v5/public',      # tickers频道地址
+    'MAX_BARS': 1000,                                        # 每个(交易对, 周期)最多保留的K线数量
+    'MAX_LAG_BARS': 1,                                       # 缓冲区最后一根K线最多落后当前K线的根数，超过时通过REST补齐
+    'SUBSCRIBE_BATCH': 100,                                  # 单条订阅消息包含的频道数量
+    'PING_INTERVAL': 25,                                     # 发送ping的间隔（秒），OKX 30秒无消息会断开连接
+    'RECONNECT_MAX_DELAY': 30,                               # 重连的最长等待时间（秒）
+    'RECORD_PATH': None,                                     # 录制收到的原始消息的JSONL文件路径（用于回放测试）
+}
+
+
+def to_candle_channel(timeframe: str) -> str:
+    """ccxt时间框架转换为OKX K线频道名，例如 15m → candle15m，1h → candle1H"""
+    unit = timeframe[-1]
+    return f"candle{timeframe[:-1]}{unit if unit == 'm' else unit.upper()}"
+
+
+class CandleBuffer:
+    """单个(交易对, 周期)的滚动K线缓冲区，按时间升序保存 [时间戳, 开, 高, 低, 收, 量]"""
+
+    def __init__(self, max_bars: int):
+        self.bars = deque(maxlen=max_bars)
+        # REST返回的K线少于请求数量时说明交易所没有更早的数据，缓冲区已是完整历史
+        self.full_history = False
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return self.bars[-1][0] if self.bars else None
+
+    def upsert(self, bar: List[float]):
+        """写入一根K线：新K线追加，同一时间戳（未收盘K线的更新）覆盖"""
+        ts = bar[0]
+        if not self.bars or ts > self.bars[-1][0]:
+            self.bars.append(bar)
+        elif ts == self.bars[-1][0]:
+            self.bars[-1] = bar
+        else:
+            self.merge([bar])
+
+    def merge(self, bars: Iterable[List[float]]):
+        """合并一批K线（REST补齐），时间戳相同时以新数据为准（断线期间可能漏掉了K线收盘时的推送）"""
+        combined = {bar[0]: bar for bar in self.bars}
+        combined.update({bar[0]: bar for bar in bars})
+        self.bars.clear()
+        self.bars.extend(combined[ts] for ts in sorted(combined)[-self.bars.maxlen:])
+
+    def window(self, limit: int) -> List[List[float]]:
+        """返回最近limit根K线的副本"""
+        if limit >= len(self.bars):
+            return [list(bar) for bar in self.bars]
+        return [list(bar) for bar in list(self.bars)[-limit:]]
+
+
+class WsCandleFeed:
+    """基于WebSocket推送的K线/行情数据源"""
+
+    def __init__(self, config: Dict[str, Any] = None, logger_param: logging.Logger = None):
+        """
+        初始化行情数据源（调用start后才会建立连接）
+
+        Args:
+            config: 配置，未提供的键使用DEFAULT_WS_CANDLE_FEED_CONFIG中的默认值
+            logger_param: 可选的日志记录器
+        """
+        self.config = {**DEFAULT_WS_CANDLE_FEED_CONFIG, **(config or {})}
+        self.logger = logger_param or logger
+        self._buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+        # 已通过REST补齐且之后一直保持连接的(instId, 周期)，只有这些才从缓冲区读取
+        self._synced = set()
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # 每个连接订阅的频道参数: {连接名: {(channel, instId), ...}}（调用方线程写入、事件循环线程读取，通过_lock保护）
+        self._subscriptions: Dict[str, set] = {'candle': set(), 'ticker': set()}
+        self._channel_timeframes: Dict[str, str] = {}
+        self._clients: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._record_file = None
+        # 统计信息
+        self.stats = {'messages': 0, 'connects': 0, 'disconnects': 0, 'buffer_hits': 0, 'rest_seeds': 0}
+
+    @staticmethod
+    def available() -> bool:
+        """WebSocket依赖是否已安装（只检查是否可以导入，不实际导入）"""
+        if WsPublicAsync is not None:
+            return True
+        return all(importlib.util.find_spec(name) is not None for name in ('websockets', 'certifi', 'okx'))
+
+    @property
+    def connected(self) -> bool:
+        return 'candle' in self._clients
+
+    def start(self):
+        """在后台线程中启动事件循环并建立连接"""
+        if self._running:
+            return
+        try:
+            _import_ws_client()
+        except ImportError as e:
+            raise RuntimeError(f"未安装websockets/certifi，无法启用WebSocket行情: {e}")
+        if self.config.get('RECORD_PATH'):
+            self._record_file = open(self.config['RECORD_PATH'], 'a', encoding='utf-8')
+        self._running = True
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(started,), name='ws-candle-feed', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        """关闭连接并停止后台线程"""
+        if not self._running:
+            return
+        self._running = False
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_clients(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+
+    def _run_loop(self, started: threading.Event):
+        # WsPublicAsync在构造时调用asyncio.get_event_loop()，需要先为本线程设置事件循环
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._run_connection('candle', self.config['CANDLE_URL']))
+        self._loop.create_task(self._run_connection('ticker', self.config['TICKER_URL']))
+        started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _close_clients(self):
+        for client in list(self._clients.values()):
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+
+    async def _connect(self, url: str):
+        client = WsPublicAsync(url)
+        if url.startswith('ws://'):
+            # 本地回放服务器不使用TLS，WebSocketFactory固定传入ssl参数，这里直接建立连接
+            client.websocket = await websockets.connect(url)
+        else:
+            await client.connect()
+        if client.websocket is None:
+            raise ConnectionError(f"无法连接 {url}")
+        return client
+
+    async def _run_connection(self, name: str, url: str):
+        """维持单个连接：断线后指数退避重连，并重新订阅该连接上的所有频道"""
+        delay = 1.0
+        while self._running:
+            ping_task = None
+            try:
+                client = await self._connect(url)
+                client.callback = lambda message: self._on_message(name, message)
+                self._clients[name] = client
+                self.stats['connects'] += 1
+                delay = 1.0
+                with self._lock:
+                    subscriptions = [{'channel': channel, 'instId': inst_id} for channel, inst_id in self._subscriptions[name]]
+                if subscriptions:
+                    self.logger.info(f"WebSocket({name}) 已连接，重新订阅 {len(subscriptions)} 个频道")
+                    await self._send_subscribe(client, subscriptions)
+                ping_task = asyncio.ensure_future(self._keepalive(client))
+                await client.consume()
+            except Exception as e:
+                if self._running:
+                    self.logger.warning(f"WebSocket({name}) 连接异常: {e}")
+            finally:
+                if ping_task is not None:
+                    ping_task.cancel()
+                if self._clients.pop(name, None) is not None:
+                    self.stats['disconnects'] += 1
+                if name == 'candle':
+                    # 断线期间可能漏掉K线，之后需要重新通过REST补齐
+                    with self._lock:
+                        self._synced.clear()
+            if self._running:
+                self.logger.info(f"WebSocket({name}) 连接断开，{delay:.0f}秒后重连")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, float(self.config['RECONNECT_MAX_DELAY']))
+
+    async def _keepalive(self, client):
+        while True:
+            await asyncio.sleep(self.config['PING_INTERVAL'])
+            await client.websocket.send('ping')
+
+    async def _send_subscribe(self, client, subscriptions: List[Dict[str, str]]):
+        batch = max(1, int(self.config['SUBSCRIBE_BATCH']))
+        for i in range(0, len(subscriptions), batch):
+            await client.subscribe(subscriptions[i:i + batch], client.callback)
+
+    def _subscribe(self, name: str, subscriptions: List[Tuple[str, str]]):
+        """记录订阅并在已连接时立即发送（未连接时在连接建立后统一发送）"""
+        with self._lock:
+            new = [item for item in subscriptions if item not in self._subscriptions[name]]
+            if not new:
+                return
+            self._subscriptions[name].update(new)
+        client = self._clients.get(name)
+        if client is not None and self._loop is not None:
+            args = [{'channel': channel, 'instId': inst_id} for channel, inst_id in new]
+            future = asyncio.run_coroutine_threadsafe(self._send_subscribe(client, args), self._loop)
+            try:
+                future.result(timeout=10)
+            except Exception as e:
+                self.logger.warning(f"WebSocket({name}) 订阅失败，将在重连后重试: {e}")
+
+    def track(self, symbols: Iterable[str], timeframes: Iterable[str]):
+        """订阅交易对的K线频道"""
+        subscriptions = []
+        for tf in timeframes:
+            channel = to_candle_channel(tf)
+            with self._lock:
+                self._channel_timeframes[channel] = tf
+            subscriptions.extend((channel, to_inst_id(symbol)) for symbol in symbols)
+        self._subscribe('candle', subscriptions)
+
+    def track_tickers(self, symbols: Iterable[str]):
+        """订阅交易对的tickers频道"""
+        self._subscribe('ticker', [('tickers', to_inst_id(symbol)) for symbol in symbols])
+
+    def _on_message(self, name: str, message: str):
+        """处理推送消息（在事件循环线程中调用）"""
+        if message == 'pong':
+            return
+        self.stats['messages'] += 1
+        if self._record_file is not None:
+            self._record_file.write(json.dumps({'conn': name, 'recv_ts': int(time.time() * 1000), 'msg': message}) + '\n')
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get('event') == 'error':
+            self.logger.error(f"WebSocket({name}) 返回错误: {payload.get('code')} {payload.get('msg')}")
+            return
+        arg, data = payload.get('arg') or {}, payload.get('data')
+        if not data:
+            return
+        channel, inst_id = arg.get('channel', ''), arg.get('instId')
+        if channel == 'tickers':
+            with self._lock:
+                for ticker in data:
+                    self._tickers[ticker.get('instId', inst_id)] = ticker
+        else:
+            with self._lock:
+                timeframe = self._channel_timeframes.get(channel)
+                if timeframe is None:
+                    return
+                key = (inst_id, timeframe)
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = CandleBuffer(int(self.config['MAX_BARS']))
+                for row in data:
+                    buffer.upsert([int(row[0])] + [float(value) for value in row[1:6]])
+
+    def get_window(self, symbol: str, timeframe: str, limit: int) -> Optional[List[List[float]]]:
+        """
+        从缓冲区读取最近limit根K线
+
+        Returns:
+            K线列表；缓冲区未补齐、数据不足或落后太多时返回None（调用方需通过REST获取后调用seed）
+        """
+        key = (to_inst_id(symbol), timeframe)
+        tf_ms = timeframe_to_ms(timeframe)
+        current_open = int(time.time() * 1000) // tf_ms * tf_ms
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if key not in self._synced or buffer is None:
+                return None
+            if len(buffer.bars) < limit and not buffer.full_history:
+                return None
+            if buffer.last_ts < current_open - int(self.config['MAX_LAG_BARS']) * tf_ms:
+                return None
+            self.stats['buffer_hits'] += 1
+            return buffer.window(limit)
+
+    def seed(self, symbol: str, timeframe: str, ohlcv: List[List[float]], limit: int):
+        """用REST获取的K线补齐缓冲区，连接正常时之后即可从缓冲区读取"""
+        key = (to_inst_id(symbol), timeframe)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = CandleBuffer(max(int(self.config['MAX_BARS']), limit))
+            buffer.merge([[int(bar[0])] + [float(value) for value in bar[1:6]] for bar in ohlcv])
+            buffer.full_history = len(ohlcv) < limit
+            self.stats['rest_seeds'] += 1
+            if self.connected and (to_candle_channel(timeframe), key[0]) in self._subscriptions['candle']:
+                self._synced.add(key)
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None, limit: Optional[int] = None,
+                    fallback=None) -> List[List[float]]:
+        """
+        与ccxt fetch_ohlcv兼容的接口：缓冲区可用时直接返回，否则通过fallback（实现了fetch_ohlcv的对象）获取并补齐
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间框架
+            since: 起始时间戳（毫秒）
+            limit: K线数量
+            fallback: REST数据源（例如ccxt交易所实例）
+        """
+        limit = limit or 100
+        self.track([symbol], [timeframe])
+        bars = self.get_window(symbol, timeframe, limit)
+        if bars is None:
+            if fallback is None:
+                return []
+            bars = fallback.fetch_ohlcv(symbol, timeframe, limit=limit)
+            self.seed(symbol, timeframe, bars, limit)
+        if since is not None:
+            bars = [bar for bar in bars if bar[0] >= since]
+        return bars
+
+    def fetch_all(self, symbols: List[str], limits: Dict[str, int], fetcher, cache=None) -> Dict[str, Dict[str, List[List[float]]]]:
+        """
+        获取所有交易对、所有周期的K线：缓冲区可用的直接返回，其余通过KlineFetcher并发REST获取并补齐缓冲区
+
+        Args:
+            symbols: 交易对列表
+            limits: 时间框架到获取数量的映射
+            fetcher: KlineFetcher实例
+            cache: 可选的OHLCVCache实例，提供时REST补齐只获取缓存之后的增量K线
+
+        Returns:
+            {symbol: {timeframe: ohlcv列表}}
+        """
+        self.track(symbols, limits.keys())
+        results: Dict[str, Dict[str, List[List[float]]]] = {symbol: {} for symbol in symbols}
+        missing = []
+        for symbol in symbols:
+            for tf, limit in limits.items():
+                bars = self.get_window(symbol, tf, limit)
+                if bars is None:
+                    missing.append((symbol, tf, limit))
+                else:
+                    results[symbol][tf] = bars
+        if missing:
+            fetched = fetcher.fetch_tasks(missing, cache)
+            for symbol, tf, limit in missing:
+                bars = fetched.get(symbol, {}).get(tf) or []
+                if bars:
+                    self.seed(symbol, tf, bars, limit)
+                results[symbol][tf] = bars
+        self.logger.info(f"WebSocket行情: 缓冲区命中 {len(symbols) * len(limits) - len(missing)} 个, REST补齐 {len(missing)} 个, 统计: {self.stats}")
+        return results
+
+    def get_tickers(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        返回已推送的ticker（格式与ccxt fetch_tickers的常用字段一致），没有推送数据的交易对不包含在结果中
+        """
+        result = {}
+        with self._lock:
+            for symbol in symbols:
+                ticker = self._tickers.get(to_inst_id(symbol))
+                if not ticker:
+                    continue
+                is_spot = ':' not in symbol
+                result[symbol] = {
+                    'symbol': symbol,
+                    'timestamp': int(ticker.get('ts') or 0),
+                    'last': float(ticker.get('last') or 0),
+                    'baseVolume': float(ticker.get('vol24h') or 0),
+                    # 现货的volCcy24h是计价币成交量；合约的volCcy24h是币数量，按最新价换算为计价币成交量
+                    'quoteVolume': float(ticker.get('volCcy24h') or 0) * (1 if is_spot else float(ticker.get('last') or 0)),
+                }
+        return result
@@ -6,7 +6,7 @@
 import os
 import sys
 import logging
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Iterable, Sequence, Iterator
 
 # 添加当前目录到Python路径以便直接运行脚本
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,8 +15,10 @@ sys.path.append(current_dir)
 # 尝试相对导入，如果失败则使用绝对导入
 try:
     from .db_connection import db, DatabaseConnection
+    from .schema_registry import get_schema_registry
 except ImportError:
     from db_connection import db, DatabaseConnection
+    from schema_registry import get_schema_registry
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
@@ -36,6 +38,9 @@ class BaseModel:
         'not', 'exists', 'is', 'null', 'true', 'false', 'default', 'auto_increment'
     }
     
+    # 编译好的SQL模板，进程内所有模型共享: {(表名, 操作, 字段元组, 投影, 分页方式): SQL}
+    _query_templates: Dict[Tuple, str] = {}
+    
     # 子类必须定义以下属性
     table_name: str = ""  # 表名
     primary_key: str = "id"  # 主键字段名
@@ -50,8 +55,8 @@ class BaseModel:
         if not self.db:
             raise ValueError("数据库连接未初始化")
         
-        # 缓存表结构
-        self._table_columns = None
+        # 表结构由进程内共享的SchemaRegistry缓存，同一连接的所有模型实例只加载一次
+        self.schema = get_schema_registry(self.db)
     
     @property
     def table_columns(self) -> List[str]:
@@ -60,9 +65,7 @@ class BaseModel:
         Returns:
             List[str]: 字段名列表
         """
-        if self._table_columns is None:
-            self._table_columns = self.db.get_table_columns(self.table_name)
-        return self._table_columns
+        return list(self.schema.columns(self.table_name))
     
     def validate_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """验证数据是否符合表结构
@@ -76,17 +79,79 @@ class BaseModel:
         Raises:
             ValueError: 数据不符合表结构时抛出
         """
-        valid_data = {}
-        columns = self.table_columns
-        
-        for key, value in data.items():
-            if key in columns:
-                valid_data[key] = value
-            else:
-                logger.warning(f"字段 '{key}' 不在表 '{self.table_name}' 中，已忽略")
+        columns = self.schema.column_set(self.table_name)
+        valid_data = {key: value for key, value in data.items() if key in columns}
+        if len(valid_data) != len(data):
+            unknown = self.schema.unknown_columns(self.table_name, [key for key in data if key not in columns])
+            if len(unknown) != len(data) - len(valid_data):
+                # 快照过期，按重新加载的表结构重新筛选
+                columns = self.schema.column_set(self.table_name)
+                valid_data = {key: value for key, value in data.items() if key in columns}
+            self.schema.warn_unknown(self.table_name, unknown)
         
         return valid_data
     
+    def _check_columns(self, keys: Iterable[str]):
+        """查询条件和投影中的字段必须存在于表中（字段名会直接拼入SQL）
+        
+        Raises:
+            ValueError: 存在未知字段时抛出
+        """
+        unknown = self.schema.unknown_columns(self.table_name, keys)
+        if unknown:
+            raise ValueError(f"字段 {unknown} 不在表 '{self.table_name}' 中")
+    
+    def _template(self, operation: str, keys: Tuple[str, ...] = (), columns: Optional[Tuple[str, ...]] = None,
+                  keyset: bool = False, limit: bool = False) -> str:
+        """获取（或编译并缓存）SQL模板
+        
+        Args:
+            operation: get / get_all / count / insert / update / delete
+            keys: WHERE条件字段（insert/update为写入字段）
+            columns: 查询返回的字段，None表示所有字段
+            keyset: 是否追加 主键 > %s 条件并按主键排序
+            limit: 是否追加 LIMIT %s
+            
+        Returns:
+            str: 参数化的SQL语句
+        """
+        cache_key = (self.table_name, operation, keys, columns, keyset, limit)
+        query = self._query_templates.get(cache_key)
+        if query is not None:
+            return query
+        
+        self._check_columns(set(keys) | set(columns or ()))
+        table = self._safe_table_name()
+        pk = self._quote_column(self.primary_key)
+        conditions = [f"{self._quote_column(key)} = %s" for key in keys]
+        
+        if operation == 'insert':
+            query = (f"INSERT INTO {table} ({', '.join(self._quote_column(key) for key in keys)}) "
+                     f"VALUES ({', '.join(['%s'] * len(keys))})")
+        elif operation == 'update':
+            query = f"UPDATE {table} SET {', '.join(conditions)} WHERE {pk} = %s"
+        elif operation == 'delete':
+            query = f"DELETE FROM {table} WHERE {pk} = %s"
+        else:
+            if operation == 'count':
+                query = f"SELECT COUNT(*) as count FROM {table}"
+            else:
+                projection = ", ".join(self._quote_column(column) for column in columns) if columns else "*"
+                query = f"SELECT {projection} FROM {table}"
+            if keyset:
+                conditions.append(f"{pk} > %s")
+            if conditions:
+                query += f" WHERE {' AND '.join(conditions)}"
+            if operation == 'get_all' and (keyset or limit):
+                query += f" ORDER BY {pk}"
+            if operation == 'get':
+                query += " LIMIT 1"
+            elif limit:
+                query += " LIMIT %s"
+        
+        self._query_templates[cache_key] = query
+        return query
+    
     def _safe_table_name(self) -> str:
         """获取安全的表名，避免与MySQL保留关键字冲突
         
@@ -109,42 +174,53 @@ class BaseModel:
         if not kwargs:
             return None
         
-        # 构建WHERE子句
-        where_clauses = []
-        params = []
-        for key, value in kwargs.items():
-            where_clauses.append(f"{key} = %s")
-            params.append(value)
-        
-        where_str = " AND ".join(where_clauses)
-        query = f"SELECT * FROM {self._safe_table_name()} WHERE {where_str} LIMIT 1"
-        
-        result = self.db.execute_query(query, tuple(params))
+        query = self._template('get', tuple(kwargs))
+        result = self.db.execute_query(query, tuple(kwargs.values()))
         return result[0] if result else None
     
-    def get_all(self, **kwargs) -> List[Dict[str, Any]]:
+    def get_all(self, columns: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                after: Any = None, **kwargs) -> List[Dict[str, Any]]:
         """根据条件查询多条记录
         
         Args:
+            columns: 只返回这些字段，None表示所有字段
+            limit: 最多返回的记录数（指定后按主键升序返回）
+            after: 键集分页游标，只返回主键大于该值的记录（按主键升序），传入上一页最后一条记录的主键
             **kwargs: 查询条件
             
         Returns:
             List[Dict[str, Any]]: 查询结果列表
         """
-        query = f"SELECT * FROM {self._safe_table_name()}"
-        params = []
+        keyset = after is not None
+        query = self._template('get_all', tuple(kwargs), tuple(columns) if columns else None,
+                               keyset=keyset, limit=limit is not None)
+        params = list(kwargs.values())
+        if keyset:
+            params.append(after)
+        if limit is not None:
+            params.append(int(limit))
+        return self.db.execute_query(query, tuple(params))
+    
+    def iter_all(self, columns: Optional[Sequence[str]] = None, batch_size: int = 1000, **kwargs) -> Iterator[Dict[str, Any]]:
+        """按主键分批遍历符合条件的记录（键集分页，内存中只保留一批）
         
-        if kwargs:
-            # 构建WHERE子句
-            where_clauses = []
-            for key, value in kwargs.items():
-                where_clauses.append(f"{key} = %s")
-                params.append(value)
+        Args:
+            columns: 只返回这些字段（会自动加上主键），None表示所有字段
+            batch_size: 每批查询的记录数
+            **kwargs: 查询条件
             
-            where_str = " AND ".join(where_clauses)
-            query += f" WHERE {where_str}"
-        
-        return self.db.execute_query(query, tuple(params))
+        Yields:
+            Dict[str, Any]: 记录
+        """
+        if columns and self.primary_key not in columns:
+            columns = [self.primary_key, *columns]
+        after = None
+        while True:
+            rows = self.get_all(columns=columns, limit=batch_size, after=after, **kwargs)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][self.primary_key]
     
     def create(self, data: Dict[str, Any]) -> Optional[int]:
         """创建新记录
@@ -161,22 +237,103 @@ class BaseModel:
             logger.warning("没有有效的数据可插入")
             return None
         
-        # 构建INSERT语句
-        columns = ", ".join(valid_data.keys())
-        placeholders = ", ".join(["%s"] * len(valid_data))
-        params = list(valid_data.values())
-        
-        query = f"INSERT INTO {self._safe_table_name()} ({columns}) VALUES ({placeholders})"
+        query = self._template('insert', tuple(valid_data))
         
         try:
             with self.db.get_cursor() as cursor:
-                cursor.execute(query, tuple(params))
+                cursor.execute(query, tuple(valid_data.values()))
                 # 获取插入的ID
                 return cursor.lastrowid
         except Exception as e:
             logger.error(f"创建记录失败: {e}")
             return None
     
+    def _group_rows(self, rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Tuple]]:
+        """按有效字段组合对多行数据分组（字段组合相同的行可以用同一条SQL批量写入）
+        
+        Args:
+            rows: 数据字典列表
+            
+        Returns:
+            Dict[Tuple[str, ...], List[Tuple]]: {字段元组: [参数元组, ...]}
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        columns = self.schema.column_set(self.table_name)
+        ignored = set()
+        groups: Dict[Tuple[str, ...], List[Tuple]] = {}
+        for row in rows:
+            keys = tuple(key for key in row if key in columns)
+            ignored.update(key for key in row if key not in columns)
+            if keys:
+                groups.setdefault(keys, []).append(tuple(row[key] for key in keys))
+        if ignored:
+            unknown = self.schema.unknown_columns(self.table_name, sorted(ignored))
+            if len(unknown) != len(ignored):
+                # 快照过期，按重新加载的表结构重新分组
+                return self._group_rows(rows)
+            self.schema.warn_unknown(self.table_name, unknown)
+        return groups
+    
+    def _quote_column(self, column: str) -> str:
+        """字段名是保留关键字时用反引号包裹"""
+        return f"`{column}`" if column.lower() in self.MYSQL_RESERVED_WORDS else column
+    
+    def bulk_create(self, rows: List[Dict[str, Any]], batch_size: int = 500) -> int:
+        """批量创建记录（executemany，pymysql会合并为多行INSERT）
+        
+        Args:
+            rows: 要插入的数据字典列表
+            batch_size: 每批写入的行数
+            
+        Returns:
+            int: 插入的行数，操作失败时返回0
+        """
+        total = 0
+        try:
+            # 所有批次在同一个连接的同一个事务中执行，失败时整体回滚
+            with self.db.transaction():
+                for keys, params_list in self._group_rows(rows).items():
+                    query = self._template('insert', keys)
+                    for i in range(0, len(params_list), batch_size):
+                        total += self.db.execute_many(query, params_list[i:i + batch_size])
+            return total
+        except Exception as e:
+            logger.error(f"批量创建记录失败: {e}")
+            return 0
+    
+    def bulk_upsert(self, rows: List[Dict[str, Any]], update_columns: Optional[List[str]] = None, batch_size: int = 500) -> int:
+        """批量插入或更新记录（多行 INSERT ... ON DUPLICATE KEY UPDATE）
+        
+        Args:
+            rows: 数据字典列表，主键或唯一键冲突时更新已有记录
+            update_columns: 冲突时更新的字段，默认为除主键外的所有写入字段
+            batch_size: 每条SQL包含的行数
+            
+        Returns:
+            int: MySQL返回的受影响行数（插入计1，更新计2），操作失败时返回0
+        """
+        total = 0
+        try:
+            with self.db.transaction():
+                for keys, params_list in self._group_rows(rows).items():
+                    updates = [key for key in (update_columns or keys) if key in keys and key != self.primary_key]
+                    columns = ", ".join(self._quote_column(key) for key in keys)
+                    row_placeholder = "(" + ", ".join(["%s"] * len(keys)) + ")"
+                    if updates:
+                        update_str = ", ".join(f"{self._quote_column(key)} = VALUES({self._quote_column(key)})" for key in updates)
+                    else:
+                        # 没有可更新的字段时保持原记录不变
+                        update_str = f"{self._quote_column(self.primary_key)} = {self._quote_column(self.primary_key)}"
+                    for i in range(0, len(params_list), batch_size):
+                        batch = params_list[i:i + batch_size]
+                        query = (f"INSERT INTO {self._safe_table_name()} ({columns}) VALUES "
+                                 f"{', '.join([row_placeholder] * len(batch))} ON DUPLICATE KEY UPDATE {update_str}")
+                        total += self.db.execute_update(query, tuple(value for row in batch for value in row))
+            return total
+        except Exception as e:
+            logger.error(f"批量插入或更新记录失败: {e}")
+            return 0
+    
     def update(self, pk_value: Any, data: Dict[str, Any]) -> bool:
         """根据主键更新记录
         
@@ -197,21 +354,12 @@ class BaseModel:
             logger.warning("没有有效的数据可更新")
             return False
         
-        # 构建UPDATE语句
-        set_clauses = []
-        params = []
-        for key, value in valid_data.items():
-            set_clauses.append(f"{key} = %s")
-            params.append(value)
-        
-        # 添加主键到参数列表末尾
-        params.append(pk_value)
-        
-        set_str = ", ".join(set_clauses)
-        query = f"UPDATE {self._safe_table_name()} SET {set_str} WHERE {self.primary_key} = %s"
+        # 主键放在参数列表末尾
+        query = self._template('update', tuple(valid_data))
+        params = (*valid_data.values(), pk_value)
         
         try:
-            affected_rows = self.db.execute_update(query, tuple(params))
+            affected_rows = self.db.execute_update(query, params)
             return affected_rows > 0
         except Exception as e:
             logger.error(f"更新记录失败: {e}")
@@ -226,7 +374,7 @@ class BaseModel:
         Returns:
             bool: 删除是否成功
         """
-        query = f"DELETE FROM {self._safe_table_name()} WHERE {self.primary_key} = %s"
+        query = self._template('delete')
         
         try:
             affected_rows = self.db.execute_update(query, (pk_value,))
@@ -244,20 +392,8 @@ class BaseModel:
         Returns:
             int: 记录数量
         """
-        query = f"SELECT COUNT(*) as count FROM {self._safe_table_name()}"
-        params = []
-        
-        if kwargs:
-            # 构建WHERE子句
-            where_clauses = []
-            for key, value in kwargs.items():
-                where_clauses.append(f"{key} = %s")
-                params.append(value)
-            
-            where_str = " AND ".join(where_clauses)
-            query += f" WHERE {where_str}"
-        
-        result = self.db.execute_query(query, tuple(params))
+        query = self._template('count', tuple(kwargs))
+        result = self.db.execute_query(query, tuple(kwargs.values()))
         return result[0]['count'] if result else 0
     
     def execute_query(self, query: str, params: Tuple = None) -> List[Dict[str, Any]]:
@@ -3,29 +3,188 @@
 """
 数据库连接模块
 """
+import time
+import queue
+import threading
 import pymysql
 import logging
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Callable, Sequence
 from contextlib import contextmanager
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 连接池默认配置（可在DATABASE_CONFIG中覆盖）
+DEFAULT_POOL_CONFIG = {
+    'POOL_SIZE': 5,          # 常驻连接数量
+    'MAX_OVERFLOW': 10,      # 繁忙时允许额外创建的连接数量（归还时关闭）
+    'POOL_TIMEOUT': 30,      # 连接全部被占用时等待的最长时间（秒）
+    'POOL_RECYCLE': 3600,    # 连接最长使用时间（秒），超过后重新建立，避免被MySQL wait_timeout断开
+    'POOL_PRE_PING': 30,     # 连接空闲超过该秒数后，取出时先ping检查是否可用（0表示不检查）
+}
+
+
+class PoolTimeoutError(Exception):
+    """连接池在等待时间内没有可用连接"""
+    pass
+
+
+class _PooledConnection:
+    """连接池中的连接及其创建/最后使用时间"""
+
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池"""
+
+    def __init__(self, connect_fn: Callable[[], Any], pool_size: int = 5, max_overflow: int = 10,
+                 timeout: float = 30, recycle: float = 3600, pre_ping: float = 30):
+        """初始化连接池（连接在首次使用时创建）
+
+        Args:
+            connect_fn: 创建新连接的函数
+            pool_size: 常驻连接数量
+            max_overflow: 允许额外创建的连接数量
+            timeout: 等待可用连接的最长时间（秒）
+            recycle: 连接最长使用时间（秒），0表示不限制
+            pre_ping: 空闲超过该秒数的连接取出前先ping，0表示不检查
+        """
+        self.connect_fn = connect_fn
+        self.pool_size = max(1, int(pool_size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        # 后进先出，优先复用最近使用过的连接
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size + self.max_overflow)
+        self._lock = threading.Lock()
+        self._total = 0
+        # 统计信息
+        self.stats = {'created': 0, 'recycled': 0, 'ping_failures': 0, 'checkouts': 0, 'waits': 0}
+
+    def _close_raw(self, conn: _PooledConnection):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._total -= 1
+
+    def _create(self) -> _PooledConnection:
+        with self._lock:
+            self._total += 1
+        try:
+            conn = _PooledConnection(self.connect_fn())
+        except Exception:
+            with self._lock:
+                self._total -= 1
+            raise
+        self.stats['created'] += 1
+        return conn
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if self.recycle and now - conn.created_at > self.recycle:
+            self.stats['recycled'] += 1
+            return False
+        if self.pre_ping and now - conn.last_used > self.pre_ping:
+            try:
+                conn.raw.ping(reconnect=False)
+            except Exception:
+                self.stats['ping_failures'] += 1
+                return False
+        return True
+
+    def checkout(self) -> _PooledConnection:
+        """取出一个可用连接，没有空闲连接时新建，超过上限时等待
+
+        Raises:
+            PoolTimeoutError: 等待超时
+        """
+        if not self._slots.acquire(blocking=False):
+            self.stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                raise PoolTimeoutError(f"等待数据库连接超时（{self.timeout}秒），连接数上限 {self.pool_size + self.max_overflow}")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._create()
+                    break
+                if self._is_usable(conn):
+                    break
+                self._close_raw(conn)
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats['checkouts'] += 1
+        return conn
+
+    def checkin(self, conn: _PooledConnection, broken: bool = False):
+        """归还连接；连接已损坏或空闲连接已达到常驻数量时关闭"""
+        try:
+            if broken or getattr(conn.raw, '_closed', False) or self._idle.qsize() >= self.pool_size:
+                self._close_raw(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def dispose(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_raw(conn)
+
+    def status(self) -> Dict[str, int]:
+        """连接池状态"""
+        with self._lock:
+            return {**self.stats, 'total': self._total, 'idle': self._idle.qsize()}
+
+
 class DatabaseConnection:
-    """数据库连接类，负责与MySQL数据库的连接和基本操作"""
+    """数据库连接类，负责与MySQL数据库的连接和基本操作
+
+    内部使用连接池，每个线程在操作期间独占一个连接；同一线程内嵌套的get_cursor/transaction复用同一个连接，
+    由最外层负责提交或回滚
+    """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], connect_fn: Optional[Callable[[], Any]] = None):
         """初始化数据库连接配置
         
         Args:
-            config: 数据库配置字典，包含HOST, PORT, USER, PASSWORD, DB, CHARSET等
+            config: 数据库配置字典，包含HOST, PORT, USER, PASSWORD, DB, CHARSET等，
+                    以及可选的连接池配置 POOL_SIZE, MAX_OVERFLOW, POOL_TIMEOUT, POOL_RECYCLE, POOL_PRE_PING
+            connect_fn: 可选的连接创建函数（默认使用pymysql按配置连接）
         """
         self.config = config
-        self.connection = None
+        pool_config = {**DEFAULT_POOL_CONFIG, **{k: v for k, v in config.items() if k in DEFAULT_POOL_CONFIG}}
+        self.pool = ConnectionPool(
+            connect_fn or self.connect,
+            pool_size=pool_config['POOL_SIZE'],
+            max_overflow=pool_config['MAX_OVERFLOW'],
+            timeout=pool_config['POOL_TIMEOUT'],
+            recycle=pool_config['POOL_RECYCLE'],
+            pre_ping=pool_config['POOL_PRE_PING'],
+        )
+        # 每个线程当前持有的连接和嵌套深度
+        self._local = threading.local()
     
     def connect(self):
-        """建立数据库连接
+        """建立一个新的数据库连接
         
         Returns:
             pymysql.connections.Connection: 数据库连接对象
@@ -34,7 +193,7 @@ class DatabaseConnection:
             pymysql.MySQLError: 数据库连接失败时抛出
         """
         try:
-            self.connection = pymysql.connect(
+            connection = pymysql.connect(
                 host=self.config.get('HOST'),
                 port=self.config.get('PORT'),
                 user=self.config.get('USER'),
@@ -44,35 +203,63 @@ class DatabaseConnection:
                 cursorclass=pymysql.cursors.DictCursor  # 使用字典光标，结果以字典形式返回
             )
             logger.info(f"成功连接到数据库: {self.config.get('DB')}")
-            return self.connection
+            return connection
         except pymysql.MySQLError as e:
             logger.error(f"数据库连接失败: {e}")
             raise
     
     def close(self):
-        """关闭数据库连接"""
-        if self.connection and not self.connection._closed:
-            self.connection.close()
-            logger.info("数据库连接已关闭")
+        """关闭连接池中的所有空闲连接"""
+        self.pool.dispose()
+        logger.info("数据库连接已关闭")
     
     @contextmanager
-    def get_cursor(self):
-        """获取数据库游标，使用上下文管理器自动处理游标和连接
+    def transaction(self):
+        """在当前线程持有的连接上执行事务，最外层退出时提交，发生异常时回滚
         
         Yields:
-            pymysql.cursors.DictCursor: 数据库游标对象
+            数据库连接对象
         """
-        if not self.connection or self.connection._closed:
-            self.connect()
+        local = self._local
+        if getattr(local, 'depth', 0) > 0:
+            # 嵌套调用：复用当前线程的连接，由最外层提交
+            local.depth += 1
+            try:
+                yield local.conn.raw
+            finally:
+                local.depth -= 1
+            return
         
+        conn = self.pool.checkout()
+        local.conn, local.depth = conn, 1
+        broken = False
         try:
-            with self.connection.cursor() as cursor:
-                yield cursor
-                self.connection.commit()
+            yield conn.raw
+            conn.raw.commit()
         except Exception as e:
-            self.connection.rollback()
+            try:
+                conn.raw.rollback()
+            except Exception:
+                # 回滚失败说明连接已不可用，归还时关闭
+                broken = True
+            if isinstance(e, pymysql.err.OperationalError):
+                broken = True
             logger.error(f"数据库操作失败: {e}")
             raise
+        finally:
+            local.conn, local.depth = None, 0
+            self.pool.checkin(conn, broken=broken)
+    
+    @contextmanager
+    def get_cursor(self):
+        """获取数据库游标，使用上下文管理器自动处理游标、提交和连接归还
+        
+        Yields:
+            pymysql.cursors.DictCursor: 数据库游标对象
+        """
+        with self.transaction() as connection:
+            with connection.cursor() as cursor:
+                yield cursor
     
     def execute_query(self, query: str, params: Tuple = None) -> List[Dict[str, Any]]:
         """执行SQL查询并返回结果
@@ -107,7 +294,25 @@ class DatabaseConnection:
                 affected_rows = cursor.execute(query, params)
                 return affected_rows
         except Exception as e:
-            logger.error(f"更新操作失败: {query}, 错误: {e}")
+            # 多行批量语句很长，日志中只保留开头部分
+            logger.error(f"更新操作失败: {query[:500]}, 错误: {e}")
+            raise
+    
+    def execute_many(self, query: str, params_list: Sequence[Tuple]) -> int:
+        """使用executemany批量执行同一条SQL（pymysql会把INSERT ... VALUES合并为多行插入）
+        
+        Args:
+            query: SQL语句
+            params_list: 每一行的参数
+            
+        Returns:
+            int: 受影响的行数
+        """
+        try:
+            with self.get_cursor() as cursor:
+                return cursor.executemany(query, params_list) or 0
+        except Exception as e:
+            logger.error(f"批量操作失败: {query}, 错误: {e}")
             raise
     
     def get_all_tables(self) -> List[str]:
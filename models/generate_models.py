@@ -7,6 +7,7 @@ import os
 import logging
 from typing import Dict, List
 from db_connection import DatabaseConnection, db
+from schema_registry import SchemaRegistry, DEFAULT_SNAPSHOT_PATH
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
@@ -23,6 +24,8 @@ class ModelGenerator:
         """
         self.db = db_conn
         self.output_dir = os.path.dirname(os.path.abspath(__file__))
+        # 生成过程中读取到的表字段，最后写入表结构快照
+        self.table_columns: Dict[str, List[str]] = {}
     
     def generate_model_class(self, table_name: str) -> str:
         """为指定表生成模型类代码
@@ -38,6 +41,7 @@ class ModelGenerator:
         if not table_structure:
             logger.warning(f"无法获取表 '{table_name}' 的结构")
             return ""
+        self.table_columns[table_name] = [field['Field'] for field in table_structure]
         
         # 查找主键
         primary_key = "id"
@@ -178,6 +182,11 @@ class {class_name}(BaseModel):
         # 生成__init__.py文件
         self.generate_init_file(generated_files)
         
+        # 写入表结构快照（配置DATABASE_CONFIG['SCHEMA_SNAPSHOT']后，运行时直接读取，不再查询表结构）
+        snapshot_path = self.db.config.get('SCHEMA_SNAPSHOT') or DEFAULT_SNAPSHOT_PATH
+        SchemaRegistry(self.db).save_snapshot(snapshot_path, self.table_columns)
+        logger.info(f"已生成表结构快照: {snapshot_path}")
+        
         return generated_files
     
     def generate_init_file(self, model_files: List[str]):
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+表结构元数据缓存
+进程内每个数据库连接对应一个 SchemaRegistry：第一次使用时用一条 information_schema 查询加载所有表的字段
+（失败时退回逐表DESCRIBE），之后所有模型实例共享同一份字段元组/集合，不再每个实例各自DESCRIBE
+
+可选地把表结构快照保存到磁盘（DATABASE_CONFIG['SCHEMA_SNAPSHOT']，generate_models.py 生成模型时也会写入同一格式的快照），
+启动时优先读取快照；快照中缺少某个字段时按表重新从数据库加载一次，避免快照过期导致字段被误判为不存在
+"""
+import os
+import json
+import time
+import logging
+import threading
+import weakref
+from typing import Dict, List, Tuple, Optional, FrozenSet, Iterable
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+logger = logging.getLogger(__name__)
+
+# generate_models.py 默认写入的快照文件
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_snapshot.json')
+
+
+class SchemaRegistry:
+    """一个数据库连接的表结构缓存（线程安全）"""
+
+    def __init__(self, db_conn, snapshot_path: Optional[str] = None):
+        """
+        Args:
+            db_conn: DatabaseConnection 对象
+            snapshot_path: 可选的快照文件路径，存在时启动优先读取，不存在时从数据库加载后写入
+        """
+        self.db = db_conn
+        self.snapshot_path = snapshot_path
+        self._columns: Dict[str, Tuple[str, ...]] = {}
+        self._column_sets: Dict[str, FrozenSet[str]] = {}
+        self._loaded = False
+        self._from_snapshot = set()      # 来自快照、尚未与数据库核对的表
+        self._warned = set()             # 已经警告过的 (表名, 字段名)
+        self._lock = threading.RLock()
+
+    # ---------------- 加载 ----------------
+
+    def _set_table(self, table: str, columns: Iterable[str]):
+        columns = tuple(columns)
+        self._columns[table] = columns
+        self._column_sets[table] = frozenset(columns)
+
+    def _load_all(self):
+        """加载所有表的字段：优先快照，其次 information_schema，失败时留给逐表DESCRIBE"""
+        if self.snapshot_path and self.load_snapshot(self.snapshot_path):
+            return
+        try:
+            rows = self.db.execute_query(
+                "SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION"
+            )
+            tables: Dict[str, List[str]] = {}
+            for row in rows:
+                tables.setdefault(row['table_name'], []).append(row['column_name'])
+            for table, columns in tables.items():
+                self._set_table(table, columns)
+            logger.info(f"已加载 {len(tables)} 个表的结构")
+            if self.snapshot_path and tables:
+                self.save_snapshot(self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"从information_schema加载表结构失败，改为按表DESCRIBE: {e}")
+
+    def _load_table(self, table: str):
+        self._set_table(table, self.db.get_table_columns(table))
+        self._from_snapshot.discard(table)
+
+    def load_snapshot(self, path: str) -> bool:
+        """
+        读取表结构快照
+
+        Returns:
+            bool: 是否读取成功
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            with self._lock:
+                for table, columns in snapshot.get('tables', {}).items():
+                    self._set_table(table, columns)
+                    self._from_snapshot.add(table)
+            logger.info(f"已从快照 {path} 读取 {len(snapshot.get('tables', {}))} 个表的结构")
+            return True
+        except Exception as e:
+            logger.warning(f"读取表结构快照失败 {path}: {e}")
+            return False
+
+    def save_snapshot(self, path: str, tables: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        保存表结构快照
+
+        Args:
+            path: 快照文件路径
+            tables: 要保存的 {表名: 字段列表}，默认为当前缓存的所有表
+        """
+        with self._lock:
+            data = {table: list(columns) for table, columns in (tables or self._columns).items()}
+        snapshot = {'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'tables': data}
+        try:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"保存表结构快照失败 {path}: {e}")
+
+    def refresh(self, table: Optional[str] = None):
+        """重新从数据库加载某个表（或全部表）的结构"""
+        with self._lock:
+            if table:
+                self._load_table(table)
+            else:
+                self._columns.clear()
+                self._column_sets.clear()
+                self._from_snapshot.clear()
+                self._loaded = False
+
+    # ---------------- 查询 ----------------
+
+    def columns(self, table: str) -> Tuple[str, ...]:
+        """表的字段元组（按表中的顺序）"""
+        columns = self._columns.get(table)
+        if columns is not None:
+            return columns
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._load_all()
+            if table not in self._columns:
+                self._load_table(table)
+            return self._columns[table]
+
+    def column_set(self, table: str) -> FrozenSet[str]:
+        """表的字段集合"""
+        if table not in self._column_sets:
+            self.columns(table)
+        return self._column_sets[table]
+
+    def unknown_columns(self, table: str, keys: Iterable[str]) -> List[str]:
+        """
+        返回不在表中的字段；表结构来自快照时先按表重新加载一次再判断
+
+        Args:
+            table: 表名
+            keys: 待检查的字段名
+        """
+        column_set = self.column_set(table)
+        unknown = [key for key in keys if key not in column_set]
+        if unknown and table in self._from_snapshot:
+            with self._lock:
+                if table in self._from_snapshot:
+                    self._load_table(table)
+            column_set = self._column_sets[table]
+            unknown = [key for key in unknown if key not in column_set]
+        return unknown
+
+    def warn_unknown(self, table: str, keys: Iterable[str]):
+        """同一个表的同一个未知字段只警告一次"""
+        new = [key for key in keys if (table, key) not in self._warned]
+        if new:
+            self._warned.update((table, key) for key in new)
+            logger.warning(f"字段 {new} 不在表 '{table}' 中，已忽略（同一字段不再重复提示）")
+
+
+_registries: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+def get_schema_registry(db_conn) -> SchemaRegistry:
+    """获取数据库连接对应的进程内共享 SchemaRegistry"""
+    registry = _registries.get(db_conn)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(db_conn)
+            if registry is None:
+                config = getattr(db_conn, 'config', None) or {}
+                registry = SchemaRegistry(db_conn, config.get('SCHEMA_SNAPSHOT') or None)
+                _registries[db_conn] = registry
+    return registry
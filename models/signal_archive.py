@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+交易信号归档模块
+每轮扫描的分析结果追加写入SQLite数据库（默认 reports/signal_archive.db），按 (策略, 交易对, 时间) 建立索引，
+用于查询历史信号，例如"最近30天SOL的所有买入信号"、"每天4小时周期出现多少次强烈买入"
+
+说明:
+    - 只追加，不修改已写入的记录；同一 (策略, 交易对, 时间, 操作) 只保存一次，重复导入同一文件不会产生重复记录
+    - 交易对统一保存为 BASE/QUOTE 形式（见lib.tool.instrument_id.pair_key），查询时可以使用任意写法或只写币种（如 SOL）
+    - 时间保存为秒级时间戳（本地时间），按天统计时使用本地日期
+    - 使用WAL模式，扫描器写入时报告查看器可以同时读取
+    - ingest_txt / ingest_directory 导入已有的 trade_signals_*.txt 文件
+"""
+import os
+import re
+import sys
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# 添加项目根目录到Python路径以便直接运行脚本
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from lib.tool.instrument_id import pair_key
+
+# 配置日志
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# 默认配置
+DEFAULT_SIGNAL_ARCHIVE_CONFIG = {
+    'ENABLED': True,                          # 扫描器是否归档每轮的分析结果
+    'PATH': 'reports/signal_archive.db',      # 数据库文件（相对路径基于项目根目录）
+    'INCLUDE_NEUTRAL': True,                  # 是否归档综合操作为观望的分析结果
+    'BATCH_SIZE': 1000,                       # 每次executemany写入的行数
+}
+
+try:
+    from config import SIGNAL_ARCHIVE_CONFIG
+except ImportError:
+    SIGNAL_ARCHIVE_CONFIG = {}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    confidence TEXT NOT NULL DEFAULT '',
+    total_score REAL NOT NULL DEFAULT 0,
+    entry_price REAL NOT NULL DEFAULT 0,
+    target_short REAL NOT NULL DEFAULT 0,
+    stop_loss REAL NOT NULL DEFAULT 0,
+    traded INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT 'scan',
+    timeframe_signals TEXT NOT NULL DEFAULT '{}',
+    reasoning TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_strategy_symbol_ts ON signals (strategy, symbol, ts, action);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals (ts);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+COLUMNS = ('strategy', 'symbol', 'ts', 'action', 'confidence', 'total_score', 'entry_price', 'target_short',
+           'stop_loss', 'traded', 'source', 'timeframe_signals', 'reasoning')
+INSERT_SQL = f"INSERT OR IGNORE INTO signals ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# trade_signals_*.txt 中每个信号块的字段
+_BLOCK_RE = re.compile(r'【信号 \d+】\s*(\S+)\n(.*?)(?=\n【信号 \d+】|\Z)', re.DOTALL)
+_FIELD_RES = {
+    'action': re.compile(r'操作[:：]\s*(\S+)'),
+    'total_score': re.compile(r'评分[:：]\s*([-\d.]+)'),
+    'entry_price': re.compile(r'当前价格[:：]\s*([-\d.]+)'),
+    'target_short': re.compile(r'短期目标[^:：]*[:：]\s*([-\d.]+)'),
+    'stop_loss': re.compile(r'止损价格[^:：]*[:：]\s*([-\d.]+)'),
+    'timestamp': re.compile(r'时间戳[:：]\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'),
+    'reasoning': re.compile(r'分析依据[:：][ \t]*([^\n]*)'),
+}
+_HEADER_TIME_RE = re.compile(r'记录时间[:：]\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+_HEADER_STRATEGY_RE = re.compile(r'策略名称[:：]\s*(\S+)')
+
+
+def _to_ts(value: Any) -> int:
+    """datetime / 'YYYY-mm-dd HH:MM:SS' / 时间戳 转换为秒级时间戳"""
+    if value is None:
+        return int(datetime.now().timestamp())
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        return int(datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp())
+    return int(value)
+
+
+def _symbol_range(symbol: str):
+    """
+    交易对查询条件: 完整交易对精确匹配；只有币种时（如 SOL）匹配该币种的所有交易对
+
+    Returns:
+        (SQL条件, 参数列表)
+    """
+    key = pair_key(symbol)
+    if '/' in key:
+        return "symbol = ?", [key]
+    # '/'的下一个字符是'0'，范围查询可以使用索引
+    return "symbol >= ? AND symbol < ?", [f"{key}/", f"{key}0"]
+
+
+class SignalArchive:
+    """基于SQLite的只追加信号归档"""
+
+    def __init__(self, path: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: 数据库文件路径，None时使用配置中的PATH；':memory:' 为内存数据库
+            config: 配置，未提供的键使用DEFAULT_SIGNAL_ARCHIVE_CONFIG和SIGNAL_ARCHIVE_CONFIG中的值
+        """
+        self.config = {**DEFAULT_SIGNAL_ARCHIVE_CONFIG, **SIGNAL_ARCHIVE_CONFIG, **(config or {})}
+        path = path or self.config['PATH']
+        if path != ':memory:' and not os.path.isabs(path):
+            path = os.path.join(PROJECT_ROOT, path)
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 扫描器的发送线程和查看器的请求线程共用一个连接，由锁串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        self.stats = {'appended': 0, 'ignored': 0, 'ingested_files': 0}
+
+    # ---------------- 写入 ----------------
+
+    @staticmethod
+    def signal_row(strategy: str, signal: Any, traded: bool = False, source: str = 'scan') -> tuple:
+        """把MultiTimeframeSignal等信号对象转换为一行数据"""
+        reasoning = getattr(signal, 'reasoning', [])
+        timeframe_signals = getattr(signal, 'timeframe_signals', None) or {
+            tf: value for tf, value in (('4h', getattr(signal, 'h4_signal', None)), ('1h', getattr(signal, 'h1_signal', None)),
+                                        ('15m', getattr(signal, 'm15_signal', None))) if value}
+        return (
+            strategy, pair_key(getattr(signal, 'symbol', '')), _to_ts(getattr(signal, 'timestamp', None)),
+            getattr(signal, 'overall_action', ''), getattr(signal, 'confidence_level', '') or '',
+            float(getattr(signal, 'total_score', 0) or 0), float(getattr(signal, 'entry_price', 0) or 0),
+            float(getattr(signal, 'target_short', 0) or 0), float(getattr(signal, 'stop_loss', 0) or 0),
+            int(bool(traded)), source, json.dumps(timeframe_signals, ensure_ascii=False),
+            '; '.join(reasoning) if isinstance(reasoning, list) else str(reasoning or ''),
+        )
+
+    def append_rows(self, rows: Iterable[tuple]) -> int:
+        """
+        批量写入（同一事务，每BATCH_SIZE行一次executemany）
+
+        Returns:
+            新写入的行数（已存在的记录被忽略）
+        """
+        batch_size = max(1, int(self.config['BATCH_SIZE']))
+        rows = list(rows)
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                for i in range(0, len(rows), batch_size):
+                    self._conn.executemany(INSERT_SQL, rows[i:i + batch_size])
+            inserted = self._conn.total_changes - before
+        self.stats['appended'] += inserted
+        self.stats['ignored'] += len(rows) - inserted
+        return inserted
+
+    def append(self, strategy: str, signals: Iterable[Any], traded: Iterable[Any] = (), source: str = 'scan') -> int:
+        """
+        归档一轮扫描的分析结果
+
+        Args:
+            strategy: 策略名称
+            signals: 信号对象列表
+            traded: 其中通过过滤并发送下单的信号对象（按对象判断）
+            source: 来源标记，扫描器为'scan'，导入的文件为'txt'
+
+        Returns:
+            新写入的行数
+        """
+        traded_ids = {id(signal) for signal in traded}
+        include_neutral = self.config['INCLUDE_NEUTRAL']
+        rows = [self.signal_row(strategy, signal, id(signal) in traded_ids, source) for signal in signals
+                if include_neutral or getattr(signal, 'overall_action', '') != '观望']
+        return self.append_rows(rows)
+
+    def ingest_txt(self, path: str, strategy: Optional[str] = None) -> int:
+        """
+        导入 trade_signals_*.txt 文件（文件中的信号都已发送下单，traded=1）；已导入且未修改的文件跳过
+
+        Args:
+            path: 文件路径
+            strategy: 策略名称，None时使用文件头部的策略名称
+
+        Returns:
+            新写入的行数
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute("SELECT mtime_ns, size FROM ingested_files WHERE path = ?", (key,)).fetchone()
+        if row is not None and (row['mtime_ns'], row['size']) == (stat.st_mtime_ns, stat.st_size):
+            return 0
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        header_time = _HEADER_TIME_RE.search(content)
+        header_strategy = _HEADER_STRATEGY_RE.search(content)
+        strategy = strategy or (header_strategy.group(1) if header_strategy else 'unknown')
+        rows = []
+        for symbol, block in _BLOCK_RE.findall(content):
+            fields = {name: regex.search(block) for name, regex in _FIELD_RES.items()}
+            if fields['action'] is None:
+                continue
+            reasoning = fields['reasoning'].group(1).strip() if fields['reasoning'] else ''
+            # 分析依据中列出了买入/卖出的周期，其余周期为观望
+            timeframe_signals = dict(item.split(':', 1) for item in reasoning.split('; ') if ':' in item)
+            timestamp = fields['timestamp'] or header_time
+            rows.append((
+                strategy, pair_key(symbol), _to_ts(timestamp.group(1) if timestamp else datetime.fromtimestamp(stat.st_mtime)),
+                fields['action'].group(1), '',
+                *(float(fields[name].group(1)) if fields[name] else 0.0
+                  for name in ('total_score', 'entry_price', 'target_short', 'stop_loss')),
+                1, 'txt', json.dumps(timeframe_signals, ensure_ascii=False), reasoning,
+            ))
+        inserted = self.append_rows(rows)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO ingested_files (path, mtime_ns, size, rows) VALUES (?, ?, ?, ?)",
+                               (key, stat.st_mtime_ns, stat.st_size, len(rows)))
+        self.stats['ingested_files'] += 1
+        return inserted
+
+    def ingest_directory(self, directory: str, pattern: str = r'trade_signals_\d{8}_\d{6}\.txt$') -> Dict[str, int]:
+        """
+        导入目录下所有匹配的txt文件
+
+        Returns:
+            {'files': 文件数, 'rows': 新写入的行数}
+        """
+        regex = re.compile(pattern)
+        files = rows = 0
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if regex.search(name):
+                try:
+                    rows += self.ingest_txt(os.path.join(directory, name))
+                    files += 1
+                except Exception as e:
+                    logger.warning(f"导入信号文件失败 {name}: {e}")
+        return {'files': files, 'rows': rows}
+
+    # ---------------- 查询 ----------------
+
+    def _where(self, strategy=None, symbol=None, action=None, start=None, end=None, timeframe=None,
+               timeframe_signal=None, traded=None):
+        conditions, params = [], []
+        if strategy:
+            conditions.append("strategy = ?")
+            params.append(strategy)
+        if symbol:
+            condition, values = _symbol_range(symbol)
+            conditions.append(condition)
+            params.extend(values)
+        if action:
+            # 买入/卖出同时匹配强烈买入/强烈卖出
+            conditions.append("action LIKE ?")
+            params.append(f"%{action}%")
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(_to_ts(start))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(_to_ts(end))
+        if timeframe and timeframe_signal:
+            conditions.append("json_extract(timeframe_signals, ?) = ?")
+            params.extend([f'$."{timeframe}"', timeframe_signal])
+        if traded is not None:
+            conditions.append("traded = ?")
+            params.append(int(bool(traded)))
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def query(self, strategy: Optional[str] = None, symbol: Optional[str] = None, action: Optional[str] = None,
+              start: Any = None, end: Any = None, timeframe: Optional[str] = None, timeframe_signal: Optional[str] = None,
+              traded: Optional[bool] = None, limit: int = 200, before: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """
+        按时间倒序查询信号
+
+        Args:
+            strategy: 策略名称
+            symbol: 交易对（任意写法）或币种
+            action: 综合操作（买入/卖出/观望，包含匹配）
+            start/end: 时间范围 [start, end)，datetime、'YYYY-mm-dd HH:MM:SS' 或时间戳
+            timeframe/timeframe_signal: 指定周期的信号，例如 ('4h', '强烈买入')
+            traded: 只查询发送了下单（True）或未发送（False）的信号
+            limit: 最多返回的行数
+            before: 上一页最后一行的 (ts, id)，用于翻页
+
+        Returns:
+            信号字典列表，timeframe_signals 已解析为字典
+        """
+        where, params = self._where(strategy, symbol, action, start, end, timeframe, timeframe_signal, traded)
+        if before is not None:
+            where += (" AND " if where else " WHERE ") + "(ts < ? OR (ts = ? AND id < ?))"
+            params.extend([int(before[0]), int(before[0]), int(before[1])])
+        sql = f"SELECT * FROM signals{where} ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(max(1, int(limit)))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            item['timeframe_signals'] = json.loads(item['timeframe_signals'] or '{}')
+            item['time'] = datetime.fromtimestamp(item['ts']).strftime('%Y-%m-%d %H:%M:%S')
+            result.append(item)
+        return result
+
+    def daily_counts(self, strategy: Optional[str] = None, symbol: Optional[str] = None, action: Optional[str] = None,
+                     start: Any = None, end: Any = None, timeframe: Optional[str] = None,
+                     timeframe_signal: Optional[str] = None, traded: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        按天（本地日期）统计信号数量，参数同query
+
+        Returns:
+            [{'day': 'YYYY-mm-dd', 'count': 数量}]，按日期升序
+        """
+        where, params = self._where(strategy, symbol, action, start, end, timeframe, timeframe_signal, traded)
+        sql = f"SELECT date(ts, 'unixepoch', 'localtime') AS day, COUNT(*) AS count FROM signals{where} GROUP BY day ORDER BY day"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def strategies(self) -> List[str]:
+        """归档中出现过的策略名称"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT strategy FROM signals ORDER BY strategy")]
+
+    def summary(self) -> Dict[str, Any]:
+        """归档概况：记录数、时间范围、策略列表"""
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) AS total, MIN(ts) AS first, MAX(ts) AS last FROM signals").fetchone()
+        fmt = lambda ts: datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S') if ts else ''
+        return {'total': row['total'], 'first': fmt(row['first']), 'last': fmt(row['last']),
+                'strategies': self.strategies(), 'path': self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_archive: Optional[SignalArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_signal_archive() -> SignalArchive:
+    """
+    获取进程内共享的信号归档（扫描器和报告查看器各自使用一个连接）
+
+    Returns:
+        SignalArchive: 使用SIGNAL_ARCHIVE_CONFIG配置的实例
+    """
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = SignalArchive()
+    return _archive
+
+
+if __name__ == "__main__":
+    # 导入已有的交易信号文件: python models/signal_archive.py [目录...]
+    archive = get_signal_archive()
+    directories = sys.argv[1:] or [os.path.join(PROJECT_ROOT, 'reports', 'trade_signals'), os.path.join(PROJECT_ROOT, 'trade_signals')]
+    for directory in directories:
+        result = archive.ingest_directory(directory)
+        print(f"{directory}: 导入 {result['files']} 个文件, 新增 {result['rows']} 条信号")
+    print(archive.summary())
@@ -1,38 +1,64 @@
+import os
+import sys
 import time
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# --profile-startup: 在导入其它模块之前开始统计各模块的导入耗时
+from lib.tool.startup_profiler import startup_profiler
+if '--profile-startup' in sys.argv:
+    startup_profiler.start()
 import json
-import os
+import signal
 import logging
-import redis
+import argparse
+import threading
+import importlib
+import inspect
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
-import ccxt
-import pandas as pd
-import numpy as np
-import talib as ta
-from lib2 import send_trading_signal_to_api
+# lib2只通过正常的import导入一次（与策略模块共用同一个模块对象）；ccxt在连接交易所时才导入
+from lib2 import send_position_info_to_api
 from strategies.base_strategy import BaseStrategy
-from strategies.multi_timeframe_strategy import MultiTimeframeStrategy, MultiTimeframeSignal
-import sys
-import os
-import importlib
-import inspect
-# 添加项目根目录到Python路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-# 导入lib.py文件作为一个模块
-import importlib.util
-# 动态导入lib.py文件
-spec = importlib.util.spec_from_file_location("lib_module", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib2.py"))
-lib_module = importlib.util.module_from_spec(spec)
-sys.modules["lib_module"] = lib_module
-spec.loader.exec_module(lib_module)
-# 从导入的模块中获取函数
-calculate_atr = lib_module.calculate_atr
-send_position_info_to_api = lib_module.send_position_info_to_api
-send_trading_signal_to_api = lib_module.send_trading_signal_to_api
-get_okx_positions = lib_module.get_okx_positions
+from lib.tool.strategy_manifest import StrategyManifest
 # 只导入必要的配置，不再导入TRADING_CONFIG
 from config import REDIS_CONFIG, API_KEY, SECRET_KEY, PASSPHRASE, OKX_CONFIG
+# K线并发获取配置，config.py中未配置时使用默认值
+try:
+    from config import KLINE_FETCH_CONFIG
+except ImportError:
+    KLINE_FETCH_CONFIG = {}
+# 增量K线缓存配置，config.py中未配置时使用默认值
+try:
+    from config import OHLCV_CACHE_CONFIG
+except ImportError:
+    OHLCV_CACHE_CONFIG = {}
+# WebSocket K线行情配置，config.py中未配置时使用默认值
+try:
+    from config import WS_CANDLE_FEED_CONFIG
+except ImportError:
+    WS_CANDLE_FEED_CONFIG = {}
+# 策略执行器配置，config.py中未配置时使用默认值
+try:
+    from config import STRATEGY_EXECUTOR_CONFIG
+except ImportError:
+    STRATEGY_EXECUTOR_CONFIG = {}
+# 常驻模式配置，config.py中未配置时使用默认值
+try:
+    from config import SCANNER_DAEMON_CONFIG
+except ImportError:
+    SCANNER_DAEMON_CONFIG = {}
+from lib.tool.kline_fetcher import KlineFetcher
+from lib.tool.ws_candle_feed import WsCandleFeed, DEFAULT_WS_CANDLE_FEED_CONFIG
+from lib.tool.strategy_executor import StrategyExecutor
+from lib.tool.candle_frame import CandleArray
+from lib.tool.ohlcv_cache import OHLCVCache, DEFAULT_OHLCV_CACHE_CONFIG
+from lib.tool.position_service import get_position_service
+from lib.tool.signal_dispatcher import get_signal_dispatcher, LatencyHistogram
+from lib.tool.bar_scheduler import BarCloseScheduler, RefreshTimer, due_strategies, DEFAULT_SCANNER_DAEMON_CONFIG
+from lib.tool.market_universe import get_market_universe
+from lib.tool.instrument_id import SymbolSet, pair_key
+from strategies.indicator_cache import indicator_cache
+from lib.tool.incremental_indicators import incremental_engine
 
 # 配置日志
 handler = logging.StreamHandler()
@@ -49,22 +75,44 @@ class MultiTimeframeProfessionalSystem:
         """初始化系统"""
         self.exchange = None
         self.strategies = {}
+        # 策略名到 (模块路径, 类名) 的映射，进程执行模式下用于在工作进程中实例化策略
+        self.strategy_specs = {}
+        self.strategy_executor = None
         self.output_dir = "reports"
         self.logger = logging.getLogger(__name__)  # 使用与全局相同的logger名称
         os.makedirs(self.output_dir, exist_ok=True)
+        # 增量K线缓存（首次获取K线时按所需长度创建）
+        self.ohlcv_cache_config = {**DEFAULT_OHLCV_CACHE_CONFIG, **OHLCV_CACHE_CONFIG}
+        self.ohlcv_cache = None
+        # WebSocket K线行情（首次获取K线时启动，之后的扫描直接读取推送的K线缓冲区）
+        self.ws_feed_config = {**DEFAULT_WS_CANDLE_FEED_CONFIG, **WS_CANDLE_FEED_CONFIG}
+        self.candle_feed = None
+        self.daemon_config = {**DEFAULT_SCANNER_DAEMON_CONFIG, **SCANNER_DAEMON_CONFIG}
+        # 交易对列表和成交量按 MARKET_UNIVERSE_CONFIG 的有效期缓存（_init_exchange 中创建，快照保存在磁盘上）
+        self.market_universe = None
+        # K线收盘到信号发送完成的延迟分布
+        self.cycle_latency = LatencyHistogram()
+        self.stop_event = threading.Event()
         
         # 初始化交易所连接
-        self._init_exchange()
+        with startup_profiler.phase('连接交易所'):
+            self._init_exchange()
         
         # 策略启用配置
         self.ENABLED_STRATEGIES = ["test3"]  # 空列表表示启用所有加载的策略
         
         # 动态加载策略
-        self._load_strategies()
+        with startup_profiler.phase('加载策略'):
+            self._load_strategies()
+        
+        # 重新发送上次进程退出前留在磁盘队列中的信号（不等到本次扫描第一次发送信号时才恢复）
+        with startup_profiler.phase('恢复信号发送队列'):
+            get_signal_dispatcher().start()
     
     def _init_exchange(self):
         """初始化交易所连接"""
         try:
+            import ccxt
             # 配置OKX交易所连接
             # 不设置defaultType，先获取现货交易对数据
             # 如果需要合约交易，可以在获取具体数据时指定类型
@@ -76,6 +124,7 @@ class MultiTimeframeProfessionalSystem:
             # 测试连接是否成功
             self.exchange.fetch_balance()
             self.logger.info("✅ 交易所连接成功!")
+            self.market_universe = get_market_universe(self.exchange)
         except Exception as e:
             self.logger.error(f"❌ 交易所连接失败: {e}")
             raise
@@ -108,6 +157,7 @@ class MultiTimeframeProfessionalSystem:
                     # 优先尝试无参数构造
                     strategy_instance = strategy_class()
                     self.register_strategy(strategy_name, strategy_instance)
+                    self.strategy_specs[strategy_name] = (f'strategies.{module_name}', strategy_name)
                 except Exception as e:
                     self.logger.error(f"❌ 初始化策略 '{strategy_name}' 失败: {str(e)}")
         except Exception as e:
@@ -126,7 +176,7 @@ class MultiTimeframeProfessionalSystem:
         # 需要排除的文件
         exclude_files = ['base_strategy.py', '__init__.py']
         # 需要排除的工具类文件
-        tool_files = ['condition_analyzer.py']
+        tool_files = ['condition_analyzer.py', 'indicator_cache.py', 'cross_sectional.py']
         
         try:
             self.logger.info(f"开始扫描策略目录: {strategies_dir}")
@@ -138,33 +188,45 @@ class MultiTimeframeProfessionalSystem:
                 self.logger.error(f"策略目录不存在: {strategies_dir}")
                 return strategy_class_to_filename
             
-            # 遍历strategies目录下的所有.py文件
-            for filename in os.listdir(strategies_dir):
-                if filename.endswith('.py') and filename not in exclude_files + tool_files:
-                    module_name = filename[:-3]  # 去掉.py后缀
+            # 从策略清单（按文件修改时间/哈希缓存的AST解析结果）获取各模块定义的策略类，只导入启用的策略所在的模块
+            try:
+                manifest = StrategyManifest(strategies_dir, exclude_files + tool_files)
+                candidates = manifest.load()
+                self.logger.info(f"策略清单: {candidates}（缓存 {manifest.stats['cached']}, 哈希校验 {manifest.stats['hashed']}, 重新解析 {manifest.stats['parsed']}）")
+            except Exception as e:
+                self.logger.error(f"读取策略清单失败，导入所有模块查找策略类: {e}")
+                candidates = {filename[:-3]: None for filename in os.listdir(strategies_dir)
+                              if filename.endswith('.py') and filename not in exclude_files + tool_files}
+            
+            for module_name, class_names in candidates.items():
+                if (self.ENABLED_STRATEGIES and class_names is not None and module_name not in self.ENABLED_STRATEGIES
+                        and not set(class_names) & set(self.ENABLED_STRATEGIES)):
+                    self.logger.info(f"⏩ 跳过模块 {module_name}（策略 {class_names} 未在启用列表中）")
+                    continue
+                try:
+                    # 动态导入模块
+                    module_path = f'strategies.{module_name}'
+                    self.logger.info(f"尝试导入模块: {module_path}")
+                    module = importlib.import_module(module_path)
                     
-                    try:
-                        # 动态导入模块
-                        module_path = f'strategies.{module_name}'
-                        self.logger.info(f"尝试导入模块: {module_path}")
-                        module = importlib.import_module(module_path)
-                        
-                        # 遍历模块中的所有属性
-                        for name, obj in inspect.getmembers(module):
-                            # 检查是否是类
-                            if inspect.isclass(obj):
-                                # 检查是否继承自BaseStrategy但不是BaseStrategy本身
-                                try:
-                                    is_strategy_class = issubclass(obj, BaseStrategy) and obj is not BaseStrategy
-                                except TypeError:
-                                    # 处理非类对象的情况
-                                    is_strategy_class = False
-                                    
-                                if is_strategy_class:
-                                    self.logger.info(f"找到策略类: {obj.__name__} (来自模块: {module_name})")
-                                    strategy_class_to_filename[obj] = module_name
-                    except Exception as e:
-                        self.logger.error(f"导入模块 {module_name} 时出错: {str(e)}")
+                    # 清单中的策略类；无法解析的模块遍历模块中的所有属性
+                    if class_names is not None:
+                        members = [(name, getattr(module, name, None)) for name in class_names]
+                    else:
+                        members = inspect.getmembers(module, inspect.isclass)
+                    for name, obj in members:
+                        # 检查是否继承自BaseStrategy但不是BaseStrategy本身
+                        try:
+                            is_strategy_class = issubclass(obj, BaseStrategy) and obj is not BaseStrategy
+                        except TypeError:
+                            # 处理非类对象的情况
+                            is_strategy_class = False
+                            
+                        if is_strategy_class:
+                            self.logger.info(f"找到策略类: {obj.__name__} (来自模块: {module_name})")
+                            strategy_class_to_filename[obj] = module_name
+                except Exception as e:
+                    self.logger.error(f"导入模块 {module_name} 时出错: {str(e)}")
             
             self.logger.info(f"成功加载 {len(strategy_class_to_filename)} 个策略类")
         except Exception as e:
@@ -172,19 +234,36 @@ class MultiTimeframeProfessionalSystem:
         
         return strategy_class_to_filename
     
-    def run_analysis(self):
-        """运行多时间框架分析"""
+    def run_analysis(self, due_timeframes: Optional[List[str]] = None, bar_close: Optional[float] = None):
+        """运行多时间框架分析
+        
+        Args:
+            due_timeframes: 本次收盘的时间框架（常驻模式），只分析使用这些时间框架的策略；None表示分析所有策略
+            bar_close: 触发本次扫描的K线收盘时刻（秒级时间戳），用于统计收盘到信号发送的延迟
+        """
         try:
             # 记录各步骤开始时间
             step_times = {}
+            cycle_marks = {}
             
-            # 步骤1: 获取活跃交易对
+            # 本次需要评估的策略
+            if due_timeframes is None:
+                strategy_names = list(self.strategies)
+            else:
+                strategy_names = due_strategies({name: self._strategy_timeframes(strategy) for name, strategy in self.strategies.items()}, due_timeframes)
+                self.logger.info(f"🕒 {'/'.join(due_timeframes)} K线收盘，评估策略: {strategy_names}")
+                if not strategy_names:
+                    return {}
+            if bar_close is not None:
+                cycle_marks['唤醒'] = time.time() - bar_close
+            
+            # 步骤1: 获取活跃交易对（交易对池快照有效期内不请求交易所）
             step_start = time.time()
             symbols = self._get_active_symbols()
             step_times['获取活跃交易对'] = time.time() - step_start
             self.logger.info(f"🎯 已获取 {len(symbols)} 个活跃交易对")
             
-            # 步骤2: 筛选高流动性交易对
+            # 步骤2: 筛选高流动性交易对（ticker有效期内直接使用预先排序的交易对列表）
             step_start = time.time()
             filtered_symbols = self._filter_high_liquidity_symbols(symbols)
             step_times['筛选高流动性交易对'] = time.time() - step_start
@@ -198,7 +277,7 @@ class MultiTimeframeProfessionalSystem:
             
             # 步骤3: 收集时间框架信息
             step_start = time.time()
-            timeframes_info = self._collect_timeframes_info()
+            timeframes_info = self._collect_timeframes_info(strategy_names)
             step_times['收集时间框架信息'] = time.time() - step_start
             self.logger.info(f"⏱️  收集了 {len(timeframes_info)} 个策略的时间框架信息")
             
@@ -206,12 +285,20 @@ class MultiTimeframeProfessionalSystem:
             step_start = time.time()
             all_data = self._fetch_klines_data(filtered_symbols, timeframes_info)
             step_times['获取K线数据'] = time.time() - step_start
+            if bar_close is not None:
+                cycle_marks['K线就绪'] = time.time() - bar_close
             self.logger.info(f"📈 成功获取 {len(all_data)} 个交易对的K线数据")
             
             # 步骤5: 策略分析
             step_start = time.time()
-            all_opportunities = self._analyze_with_strategies(all_data)
+            indicator_cache.reset_stats()
+            incremental_engine.reset_stats()
+            all_opportunities = self._analyze_with_strategies(all_data, strategy_names)
             step_times['策略分析'] = time.time() - step_start
+            if bar_close is not None:
+                cycle_marks['分析完成'] = time.time() - bar_close
+            cache_stats = indicator_cache.stats()
+            incremental_stats = incremental_engine.get_stats()
             self.logger.info(f"🔍 分析完成，找到 {sum(len(ops) for ops in all_opportunities.values())} 个交易机会")
 
              # 步骤6: 生成报告和保存信号
@@ -247,6 +334,14 @@ class MultiTimeframeProfessionalSystem:
                 strategy_instance.save_trade_signals(opportunities)
             step_times['保存交易信号'] = time.time() - step_start
             self.logger.info("📝 所有策略的交易信号已保存完成")
+            if bar_close is not None:
+                cycle_marks['信号发送'] = time.time() - bar_close
+                self.cycle_latency.observe(cycle_marks['信号发送'])
+
+            # 归档本轮分析结果（在信号发送之后，不影响下单延迟）
+            step_start = time.time()
+            self._archive_signals(all_opportunities, filtered_opportunities)
+            step_times['信号归档'] = time.time() - step_start
 
             # # 步骤7: 持仓分析
             step_start = time.time()
@@ -256,30 +351,28 @@ class MultiTimeframeProfessionalSystem:
             self.logger.info("\n=== 各步骤用时分析 ===")
             for step, duration in step_times.items():
                 self.logger.info(f"{step}: {duration:.2f}秒")
+                if step == '策略分析':
+                    self.logger.info(f"  指标缓存: 命中 {cache_stats['hits']}, 未命中 {cache_stats['misses']}, 命中率 {cache_stats['hit_rate']:.1%}, 淘汰 {cache_stats['evictions']}, 当前条目 {cache_stats['size']}")
+                    self.logger.info(f"  增量指标: 增量更新 {incremental_stats['updates']} 根K线, 重建 {incremental_stats['rebuilds']} 次, 未收盘K线预估 {incremental_stats['peeks']} 次, 状态数量 {incremental_stats['streams']}")
+                if step == '保存交易信号':
+                    dispatch_stats = get_signal_dispatcher().summary()
+                    request_latency = dispatch_stats['latency']['request']
+                    self.logger.info(f"  信号发送: 入队 {dispatch_stats['submitted']}, 成功 {dispatch_stats['sent']}, 重试 {dispatch_stats['retries']}, 失败 {dispatch_stats['failed']}, 待发送 {dispatch_stats['queued']}, 请求延迟 p50 {request_latency['p50_ms']:.0f}ms / p95 {request_latency['p95_ms']:.0f}ms")
             total_time = sum(step_times.values())
             self.logger.info(f"总用时: {total_time:.2f}秒")
+            if bar_close is not None:
+                latency = self.cycle_latency.snapshot()
+                marks = ', '.join(f"{name} {seconds:.2f}秒" for name, seconds in cycle_marks.items())
+                self.logger.info(f"⏱️  K线收盘 {datetime.fromtimestamp(bar_close).strftime('%H:%M')} 之后: {marks}（收盘到信号发送 p50 {latency['p50_ms'] / 1000:.1f}秒 / p95 {latency['p95_ms'] / 1000:.1f}秒, 共 {latency['count']} 轮）")
             return all_opportunities
         except Exception as e:
             self.logger.error(f"❌ 分析过程中发生错误: {e}")
             raise
     
     def _get_active_symbols(self) -> List[str]:
-        """获取活跃交易对"""
+        """获取活跃交易对（可交易的USDT现货交易对，来自交易对池缓存）"""
         try:
-            # 获取交易所所有交易对
-            markets = self.exchange.fetch_markets()
-            # 筛选活跃的现货交易对
-            # 1. 只保留USDT交易对
-            # 2. 只保留可交易的交易对
-            # 3. 移除不活跃的交易对
-            symbols = [
-                market['symbol']
-                for market in markets
-                if market['active'] and 
-                   market['quote'] == 'USDT' and 
-                   market['type'] == 'spot'
-            ]
-            return symbols
+            return list(self.market_universe.active_symbols())
         except Exception as e:
             self.logger.error(f"获取活跃交易对失败: {e}")
             return []
@@ -293,21 +386,15 @@ class MultiTimeframeProfessionalSystem:
             if self.strategies and hasattr(self.strategies.get("MultiTimeframeStrategy"), 'config'):
                 volume_threshold = self.strategies["MultiTimeframeStrategy"].config.get('VOLUME_THRESHOLD', 100000)
             
-            # 获取最新24小时成交量数据
-            tickers = self.exchange.fetch_tickers(symbols)
-            
-            # 筛选符合交易量阈值的交易对
-            high_liquidity_symbols = []
-            for symbol, ticker in tickers.items():
-                if isinstance(ticker, dict):
-                    # 获取交易量（以USDT为单位）
-                    volume = ticker.get('quoteVolume', 0)
-                    if volume >= volume_threshold:
-                        high_liquidity_symbols.append(symbol)
+            # ticker过期时获取最新24小时成交量（WebSocket已推送所有交易对的ticker时不再请求REST）
+            feed = self._get_candle_feed()
+            def feed_tickers(universe_symbols):
+                feed.track_tickers(universe_symbols)
+                return feed.get_tickers(universe_symbols)
+            source = feed_tickers if feed is not None else None
             
-            # 按照成交量降序排序
-            high_liquidity_symbols.sort(key=lambda s: tickers[s].get('quoteVolume', 0), reverse=True)
-            return high_liquidity_symbols
+            # 按成交量降序排列的交易对列表在刷新ticker时已计算好，这里只按阈值截取
+            return self.market_universe.liquid_symbols(volume_threshold, symbols, source=source)
         except Exception as e:
             self.logger.error(f"筛选高流动性交易对失败: {e}")
             return symbols  # 出错时返回所有交易对
@@ -317,64 +404,45 @@ class MultiTimeframeProfessionalSystem:
         if not self.strategies:
             return symbols
         
-        # 收集所有策略中配置的DISABLED_SYMBOLS
-        all_disabled_symbols = set()
+        # 收集所有策略中配置的DISABLED_SYMBOLS（按标的键建立集合，BTC/USDT、btc-usdt、BTC-USDT-SWAP 等写法等价）
+        configured = []
         for strategy_name, strategy in self.strategies.items():
             if hasattr(strategy, 'config') and 'DISABLED_SYMBOLS' in strategy.config:
                 disabled_symbols = strategy.config['DISABLED_SYMBOLS']
                 if disabled_symbols:
-                    for symbol in disabled_symbols:
-                        # 添加多种格式的交易对表示，确保能匹配交易所返回的不同格式
-                        # 原始格式
-                        all_disabled_symbols.add(symbol)
-                        # 斜杠转破折号格式
-                        all_disabled_symbols.add(symbol.replace('/', '-'))
-                        # 大写格式
-                        all_disabled_symbols.add(symbol.replace('/', '-').upper())
-                        # 小写格式
-                        all_disabled_symbols.add(symbol.replace('/', '-').lower())
+                    configured.extend(disabled_symbols)
                     self.logger.info(f"策略 '{strategy_name}' 的禁用交易对: {disabled_symbols}")
+        all_disabled_symbols = SymbolSet(configured)
         
         if all_disabled_symbols:
-            # 打印所有交易对，用于调试
-            self.logger.info(f"当前交易对列表（前10个）: {symbols[:10]}")
-            
-            # 过滤掉禁用的交易对
+            # 过滤掉禁用的交易对（每个交易对O(1)查找）
             filtered_symbols = []
             for symbol in symbols:
-                # 检查symbol是否与任何禁用的交易对匹配（忽略格式差异）
-                is_disabled = False
-                # 转换symbol为统一格式进行比较
-                symbol_normalized = symbol.upper().replace('/', '-')
-                for disabled in all_disabled_symbols:
-                    disabled_normalized = disabled.upper().replace('/', '-')
-                    if symbol_normalized == disabled_normalized:
-                        is_disabled = True
-                        self.logger.info(f"过滤掉禁用交易对: {symbol} (匹配: {disabled})")
-                        break
-                
-                if not is_disabled:
+                if symbol in all_disabled_symbols:
+                    self.logger.info(f"过滤掉禁用交易对: {symbol}")
+                else:
                     filtered_symbols.append(symbol)
             
             self.logger.info(f"应用禁用交易对过滤: 移除 {len(symbols) - len(filtered_symbols)} 个交易对")
-            self.logger.info(f"禁用的交易对格式列表: {list(all_disabled_symbols)}")
             return filtered_symbols
         
         return symbols
     
-    def _collect_timeframes_info(self) -> Dict[str, Dict[str, int]]:
-        """收集所有策略需要的时间框架信息"""
+    def _collect_timeframes_info(self, strategy_names: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """收集策略需要的时间框架信息（strategy_names为None时收集所有策略）"""
         timeframes_info = {}
         
         for name, strategy in self.strategies.items():
+            if strategy_names is not None and name not in strategy_names:
+                continue
             if hasattr(strategy, 'get_required_timeframes'):
                 timeframes = strategy.get_required_timeframes()
                 timeframes_info[name] = timeframes
                 self.logger.info(f"策略 '{name}' 需要的时间框架: {timeframes}")
         return timeframes_info
     
-    def _fetch_klines_data(self, symbols: List[str], timeframes_info: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, pd.DataFrame]]:
-        """获取K线数据"""
+    def _fetch_klines_data(self, symbols: List[str], timeframes_info: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, CandleArray]]:
+        """获取K线数据（每个时间框架保存为CandleArray，策略需要时再转换为DataFrame）"""
         all_data = {}
         
         # 合并所有策略需要的时间框架
@@ -389,30 +457,33 @@ class MultiTimeframeProfessionalSystem:
                 if tf not in min_lengths or length > min_lengths[tf]:
                     min_lengths[tf] = length
         
-        # 为每个交易对获取所有需要的K线数据
+        # 每个时间框架多获取10根K线作为缓冲
+        limits = {tf: min_lengths[tf] + 10 for tf in all_timeframes}
+        
+        # 并发获取所有交易对、所有时间框架的K线数据（启用缓存时只获取上次扫描之后的新K线）
+        fetcher = KlineFetcher(self.exchange, KLINE_FETCH_CONFIG, self.logger)
+        cache = self._get_ohlcv_cache(max(limits.values()) if limits else 0)
+        feed = self._get_candle_feed()
+        if feed is not None:
+            # WebSocket缓冲区可用的直接读取，其余通过REST（经过K线缓存）补齐
+            raw_data = feed.fetch_all(symbols, limits, fetcher, cache=cache)
+        else:
+            raw_data = fetcher.fetch_all(symbols, limits, cache=cache)
+        if cache is not None:
+            self.logger.info(f"K线缓存统计: {cache.stats}")
+        
+        # 转换为DataFrame并检查数据是否足够
         for symbol in symbols:
             symbol_data = {}
             try:
-                # self.logger.info(f"正在获取 {symbol} 的K线数据...")
                 for tf in all_timeframes:
-                    try:
-                        # 获取足够的历史数据
-                        limit = min_lengths[tf] + 10  # 多获取10根K线作为缓冲
-                        ohlcv = self.exchange.fetch_ohlcv(symbol, tf, limit=limit)
-                        if ohlcv:
-                            # 转换为DataFrame
-                            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                            df.set_index('timestamp', inplace=True)
-                            # 确保数据类型正确
-                            df = df.astype({'open': 'float64','high': 'float64','low': 'float64','close': 'float64','volume': 'float64'})
-                            symbol_data[tf] = df
-                        else:
-                            self.logger.warning(f"未获取到 {symbol} 的 {tf} 数据")
-                            symbol_data[tf] = pd.DataFrame()
-                    except Exception as e:
-                        self.logger.error(f"获取 {symbol} 的 {tf} 数据失败: {e}")
-                        symbol_data[tf] = pd.DataFrame()
+                    ohlcv = raw_data.get(symbol, {}).get(tf)
+                    if ohlcv:
+                        # 供增量指标引擎按 (交易对, 时间框架) 保存状态，最后一根K线尚未收盘
+                        symbol_data[tf] = CandleArray.from_ohlcv(ohlcv, {'symbol': symbol, 'timeframe': tf, 'live': True})
+                    else:
+                        self.logger.warning(f"未获取到 {symbol} 的 {tf} 数据")
+                        symbol_data[tf] = CandleArray.create_empty()
                 # 检查是否有足够的数据
                 valid_timeframes = [tf for tf, df in symbol_data.items() if not df.empty and len(df) >= min_lengths[tf]]
                 # 如果至少有一半时间框架的数据，则保留
@@ -422,43 +493,98 @@ class MultiTimeframeProfessionalSystem:
                 self.logger.error(f"处理 {symbol} 的数据时发生错误: {e}")
         return all_data
     
-    def _analyze_with_strategies(self, all_data: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, List[Any]]:
-        """使用所有注册的策略进行分析"""
-        all_opportunities = {name: [] for name in self.strategies}
-        # 创建线程池，用于并行分析
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # 提交所有分析任务
-            futures = {}
-            for symbol, data in all_data.items():
-                for strategy_name, strategy in self.strategies.items():
-                    # 检查策略是否有analyze方法
-                    if hasattr(strategy, 'analyze'):
-                        # 检查该策略需要的时间框架数据是否可用
-                        required_timeframes = strategy.get_required_timeframes() if hasattr(strategy, 'get_required_timeframes') else {}
-                        # 检查是否所有必需的时间框架都有数据
-                        has_required_data = True
-                        missing_timeframes = []
-                        for tf in required_timeframes:
-                            if tf not in data or data[tf].empty or len(data[tf]) < required_timeframes[tf]:
-                                has_required_data = False
-                                missing_timeframes.append(tf)
-                        # 如果没有足够的时间框架数据，跳过该策略的分析
-                        if not has_required_data:
-                            self.logger.info(f"跳过 {symbol} 的 {strategy_name} 分析：缺少必需的时间框架数据 - 缺少的周期: {missing_timeframes}")
-                            continue
-                        # 提交分析任务
-                        future_key = (symbol, strategy_name)
-                        futures[future_key] = executor.submit(strategy.analyze, symbol, data)
-            # 收集分析结果
-            for (symbol, strategy_name), future in futures.items():
-                try:
-                    result = future.result()
-                    if result is not None:
-                        all_opportunities[strategy_name].append(result)
-                except Exception as e:
-                    self.logger.error(f"{strategy_name} 分析 {symbol} 时发生错误: {e}")
+    def _get_ohlcv_cache(self, min_bars: int) -> Optional[OHLCVCache]:
+        """获取增量K线缓存实例，未启用时返回None"""
+        if not self.ohlcv_cache_config.get('ENABLED', True):
+            return None
+        # 保留的K线数量不能少于策略所需的窗口长度
+        max_bars = max(int(self.ohlcv_cache_config.get('MAX_BARS') or 0), min_bars)
+        if self.ohlcv_cache is None or self.ohlcv_cache.max_bars < max_bars:
+            self.ohlcv_cache = OHLCVCache(self.ohlcv_cache_config['CACHE_DIR'], max_bars=max_bars)
+        return self.ohlcv_cache
+    
+    def _get_candle_feed(self) -> Optional[WsCandleFeed]:
+        """获取WebSocket行情实例，未启用或依赖未安装时返回None（使用REST获取）"""
+        if not self.ws_feed_config.get('ENABLED', True):
+            return None
+        if self.candle_feed is None:
+            if not WsCandleFeed.available():
+                self.logger.warning("未安装websockets/certifi，WebSocket行情不可用，使用REST获取K线")
+                self.ws_feed_config['ENABLED'] = False
+                return None
+            try:
+                self.candle_feed = WsCandleFeed(self.ws_feed_config, self.logger)
+                self.candle_feed.start()
+            except Exception as e:
+                self.logger.error(f"启动WebSocket行情失败: {e}，使用REST获取K线")
+                self.ws_feed_config['ENABLED'] = False
+                self.candle_feed = None
+        return self.candle_feed
+    
+    def _analyze_with_strategies(self, all_data: Dict[str, Dict[str, CandleArray]], strategy_names: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+        """使用注册的策略进行分析（strategy_names为None时使用所有策略）"""
+        strategy_names = list(self.strategies) if strategy_names is None else strategy_names
+        all_opportunities = {name: [] for name in strategy_names}
+        # 收集所有分析任务
+        tasks = []
+        for symbol, data in all_data.items():
+            for strategy_name in strategy_names:
+                strategy = self.strategies[strategy_name]
+                # 检查策略是否有analyze方法
+                if hasattr(strategy, 'analyze'):
+                    # 检查该策略需要的时间框架数据是否可用
+                    required_timeframes = strategy.get_required_timeframes() if hasattr(strategy, 'get_required_timeframes') else {}
+                    # 检查是否所有必需的时间框架都有数据
+                    has_required_data = True
+                    missing_timeframes = []
+                    for tf in required_timeframes:
+                        if tf not in data or data[tf].empty or len(data[tf]) < required_timeframes[tf]:
+                            has_required_data = False
+                            missing_timeframes.append(tf)
+                    # 如果没有足够的时间框架数据，跳过该策略的分析
+                    if not has_required_data:
+                        self.logger.info(f"跳过 {symbol} 的 {strategy_name} 分析：缺少必需的时间框架数据 - 缺少的周期: {missing_timeframes}")
+                        continue
+                    tasks.append((symbol, strategy_name))
+        # 通过策略执行器（inline/thread/process）执行并收集分析结果
+        results = self._get_strategy_executor().run(tasks, all_data)
+        for symbol, strategy_name in tasks:
+            result, error = results.get((symbol, strategy_name), (None, None))
+            if error is not None:
+                self.logger.error(f"{strategy_name} 分析 {symbol} 时发生错误: {error}")
+            elif result is not None:
+                all_opportunities[strategy_name].append(result)
         return all_opportunities
     
+    def _get_strategy_executor(self) -> StrategyExecutor:
+        """获取策略执行器（在多轮扫描之间复用，进程模式下工作进程只初始化一次策略）"""
+        if self.strategy_executor is None:
+            self.strategy_executor = StrategyExecutor(self.strategies, self.strategy_specs, STRATEGY_EXECUTOR_CONFIG, self.logger)
+        return self.strategy_executor
+    
+    def _archive_signals(self, all_opportunities: Dict[str, List[Any]], filtered_opportunities: Dict[str, List[Any]]):
+        """
+        把本轮所有分析结果追加写入信号归档（models/signal_archive.py），通过过滤并发送下单的信号标记为traded
+
+        Args:
+            all_opportunities: 策略名称 -> 本轮分析结果
+            filtered_opportunities: 策略名称 -> 过滤后发送下单的信号
+        """
+        try:
+            from models.signal_archive import get_signal_archive
+            archive = get_signal_archive()
+            if not archive.config['ENABLED']:
+                return
+            inserted = 0
+            for strategy_name, opportunities in all_opportunities.items():
+                strategy_instance = self.strategies[strategy_name]
+                name = strategy_instance.get_name() if hasattr(strategy_instance, 'get_name') else strategy_name
+                inserted += archive.append(name, opportunities, traded=filtered_opportunities.get(strategy_name, []))
+            self.logger.info(f"🗄️ 信号归档完成，新增 {inserted} 条记录")
+        except Exception as e:
+            # 归档失败不影响扫描
+            self.logger.error(f"信号归档失败: {e}")
+
     def _generate_reports(self, all_opportunities: Dict[str, List[Any]]):
         """生成分析报告"""
         for strategy_name, opportunities in all_opportunities.items():
@@ -491,8 +617,8 @@ class MultiTimeframeProfessionalSystem:
     def _analyze_and_report_positions(self, all_opportunities):
         """分析当前持仓并报告需要关注的持仓"""
         try:
-            # 获取当前持仓
-            current_positions = get_okx_positions(self.exchange)
+            # 获取当前持仓（与各策略的仓位过滤共用同一个仓位快照）
+            current_positions = get_position_service(self.exchange).positions()
             if not current_positions:
                 self.logger.info("📋 当前没有持仓")
                 return
@@ -521,7 +647,7 @@ class MultiTimeframeProfessionalSystem:
                             for pos in positions_needing_attention:
                                 try:
                                     # 格式化symbol，将AAVE/USDT:USDT转换为AAVE-USDT格式
-                                    symbol_formatted = pos['symbol'].split(':')[0].replace('/', '-')
+                                    symbol_formatted = pair_key(pos['symbol']).replace('/', '-')
                                     send_position_info_to_api(pos, symbol_formatted, self.logger)
                                 except Exception as e:
                                     self.logger.error(f"发送持仓信息到API时发生错误: {e}")
@@ -530,17 +656,132 @@ class MultiTimeframeProfessionalSystem:
         except Exception as e:
             self.logger.error(f"获取或分析持仓时发生错误: {e}")
 
+    @staticmethod
+    def _strategy_timeframes(strategy) -> List[str]:
+        """策略使用的时间框架"""
+        return list(strategy.get_required_timeframes()) if hasattr(strategy, 'get_required_timeframes') else []
+    
+    def _all_timeframes(self) -> List[str]:
+        """所有已注册策略使用的时间框架"""
+        timeframes = set()
+        for strategy in self.strategies.values():
+            timeframes.update(self._strategy_timeframes(strategy))
+        return sorted(timeframes)
+    
+    def _strategy_files_signature(self) -> Tuple[Tuple[str, float], ...]:
+        """strategies目录下所有.py文件的修改时间，用于判断策略是否需要重新加载"""
+        strategies_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategies')
+        try:
+            return tuple(sorted(
+                (filename, os.path.getmtime(os.path.join(strategies_dir, filename)))
+                for filename in os.listdir(strategies_dir) if filename.endswith('.py')
+            ))
+        except OSError as e:
+            self.logger.error(f"读取策略目录失败: {e}")
+            return ()
+    
+    def _reload_strategies(self):
+        """策略文件修改后重新导入策略模块并重新注册策略（base_strategy.py和indicator_cache.py的修改需要重启进程）"""
+        self.logger.info("♻️  检测到策略文件修改，重新加载策略")
+        # 先重新导入工具模块，再重新导入策略模块，策略模块重新导入时引用工具模块中的新对象
+        module_names = [name for name in sys.modules if name.startswith('strategies.')
+                        and name not in ('strategies.base_strategy', 'strategies.indicator_cache')]
+        module_names.sort(key=lambda name: (name != 'strategies.condition_analyzer', name))
+        for module_name in module_names:
+            try:
+                importlib.reload(sys.modules[module_name])
+            except Exception as e:
+                self.logger.error(f"重新导入模块 {module_name} 失败: {e}")
+        previous = self.strategies
+        self.strategies = {}
+        self.strategy_specs = {}
+        self._load_strategies()
+        if not self.strategies:
+            self.logger.error("重新加载后没有可用的策略，继续使用原有策略")
+            self.strategies = previous
+            return
+        # 执行器持有旧的策略实例（进程模式下工作进程已初始化旧策略），重新创建
+        if self.strategy_executor is not None:
+            self.strategy_executor.shutdown()
+            self.strategy_executor = None
+    
+    def run_daemon(self, max_cycles: Optional[int] = None):
+        """
+        常驻模式: 保持交易所连接、K线缓冲区和策略实例，在策略所需时间框架的K线收盘时刻扫描，
+        只重新评估使用刚收盘时间框架的策略；交易对列表、成交量筛选和策略文件按SCANNER_DAEMON_CONFIG中的周期刷新
+        
+        Args:
+            max_cycles: 最多运行的扫描轮数，None表示一直运行到stop_event被设置（SIGTERM/SIGINT）
+        """
+        scheduler = BarCloseScheduler(self._all_timeframes(), self.daemon_config['CLOSE_DELAY'])
+        strategy_timer = RefreshTimer(self.daemon_config['STRATEGY_REFRESH'])
+        strategy_timer.mark()
+        signature = self._strategy_files_signature()
+        cycles = 0
+        self.logger.info(f"🚀 常驻模式启动，调度的时间框架: {sorted(scheduler.periods, key=scheduler.periods.get)}")
+        try:
+            while not self.stop_event.is_set():
+                # 策略注册表按自己的周期刷新
+                if strategy_timer.due():
+                    strategy_timer.mark()
+                    new_signature = self._strategy_files_signature()
+                    if new_signature != signature:
+                        signature = new_signature
+                        self._reload_strategies()
+                        scheduler.set_timeframes(self._all_timeframes())
+                
+                close_ts, due = scheduler.next_close()
+                self.logger.info(f"💤 下一次收盘: {datetime.fromtimestamp(close_ts).strftime('%Y-%m-%d %H:%M')} ({'/'.join(due)})")
+                woke = scheduler.wait_next(self.stop_event)
+                if woke is None:
+                    break
+                close_ts, due = woke
+                try:
+                    self.run_analysis(due_timeframes=due, bar_close=close_ts)
+                except Exception as e:
+                    # 单轮失败不退出常驻进程，等待下一次收盘
+                    self.logger.error(f"❌ {'/'.join(due)} 收盘扫描失败: {e}")
+                cycles += 1
+                if max_cycles and cycles >= max_cycles:
+                    break
+        finally:
+            self.logger.info(f"常驻模式退出，共完成 {cycles} 轮扫描")
+            if self.strategy_executor is not None:
+                self.strategy_executor.shutdown()
+            if self.candle_feed is not None:
+                self.candle_feed.stop()
+    
+    def stop(self):
+        """停止常驻模式（当前扫描完成后退出）"""
+        self.stop_event.set()
+
 # 主函数入口
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多时间框架分析系统')
+    parser.add_argument('--daemon', action='store_true', help='常驻模式: 在K线收盘时刻扫描，不再每次由supervisor重启')
+    parser.add_argument('--max-cycles', type=int, default=None, help='常驻模式下最多运行的扫描轮数')
+    parser.add_argument('--profile-startup', action='store_true', help='输出启动阶段和各模块的导入耗时后退出，不运行扫描')
+    args = parser.parse_args()
     try:
         # 初始化系统
         system = MultiTimeframeProfessionalSystem()
-        # 运行分析
-        system.logger.info("🚀 开始多时间框架分析...")
-        all_opportunities = system.run_analysis()
-        system.logger.info("✅ 多时间框架分析完成!")
+        if args.profile_startup:
+            startup_profiler.stop()
+            startup_profiler.report()
+        elif args.daemon:
+            # supervisor停止进程时，完成当前扫描后退出
+            signal.signal(signal.SIGTERM, lambda signum, frame: system.stop())
+            signal.signal(signal.SIGINT, lambda signum, frame: system.stop())
+            system.run_daemon(args.max_cycles)
+        else:
+            # 运行分析
+            system.logger.info("🚀 开始多时间框架分析...")
+            all_opportunities = system.run_analysis()
+            system.logger.info("✅ 多时间框架分析完成!")
     except Exception as e:
         # 使用全局logger记录错误
         logger.error(f"❌ 系统运行失败: {e}")
+        if args.daemon:
+            sys.exit(1)
         # 保留命令行，方便查看错误信息
         input("按Enter键退出...")
\ No newline at end of file
@@ -4,7 +4,11 @@ import os
 import sys
 import json
 import time
+import gzip
+import hashlib
+import threading
 import ccxt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 
@@ -290,40 +294,117 @@ def index():
     """主页面路由 - 多时间框架分析报告"""
     # 从URL参数获取报告文件路径
     report_path = request.args.get('file', DEFAULT_REPORT_PATH)
-    # 解析报告数据
+    # 解析报告数据（按文件版本缓存）
     report_data = global_report_control.parse_report_content(report_path)
     
-    # 统计各类机会数量
-    buy_count = len([op for op in report_data['opportunities'] if '买入' in op['action']])
-    sell_count = len([op for op in report_data['opportunities'] if '卖出' in op['action']])
-    watch_count = len([op for op in report_data['opportunities'] if '观望' in op['action']])
+    # 统计各类机会数量（使用报告索引中按操作类型分组的结果）
+    index = global_report_control.get_report_index(report_path)
+    buy_count = index.count('买入') if index else 0
+    sell_count = index.count('卖出') if index else 0
+    watch_count = index.count('观望') if index else 0
     # 渲染模板并传递数据
     return render_template('index.html', report_data=report_data,buy_count=buy_count,sell_count=sell_count,watch_count=watch_count,now=datetime.now())
 
 
+# 响应体缓存: (ETag, 客户端是否接受gzip) -> (响应体, 是否已压缩)，同一报告版本的相同请求不再重复序列化和压缩
+_json_body_cache = OrderedDict()
+_json_body_cache_lock = threading.Lock()
+JSON_BODY_CACHE_SIZE = 64
+GZIP_MIN_SIZE = 1024
+
+
+def report_etag(version, path, args):
+    """报告版本、接口路径和查询参数决定的ETag（不同接口对同一报告返回的内容不同）"""
+    query = '&'.join(f"{key}={value}" for key, value in sorted(args.items(multi=True)))
+    return hashlib.md5(f"{version}:{path}?{query}".encode('utf-8')).hexdigest()
+
+
+def conditional_json(build_payload, etag):
+    """
+    返回带ETag的JSON响应：客户端的If-None-Match匹配时返回304，不构造响应体；
+    客户端接受gzip且响应体较大时压缩
+
+    Args:
+        build_payload: 构造响应数据的函数
+        etag: 响应的ETag（弱校验，gzip与未压缩的响应内容等价）
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+        cache_key = (etag, accepts_gzip)
+        with _json_body_cache_lock:
+            cached = _json_body_cache.get(cache_key)
+        if cached is None:
+            body = json.dumps(build_payload(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            # 响应体较小时即使客户端接受gzip也不压缩，按客户端是否接受gzip缓存，同时记录实际是否压缩
+            use_gzip = accepts_gzip and len(body) >= GZIP_MIN_SIZE
+            if use_gzip:
+                body = gzip.compress(body, compresslevel=5)
+            cached = (body, use_gzip)
+            with _json_body_cache_lock:
+                _json_body_cache[cache_key] = cached
+                while len(_json_body_cache) > JSON_BODY_CACHE_SIZE:
+                    _json_body_cache.popitem(last=False)
+        body, use_gzip = cached
+        response = app.response_class(body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
 @app.route('/api/data')
 @login_required
 def api_data():
-    """API接口，返回JSON格式的报告数据"""
+    """API接口，返回JSON格式的报告数据（报告未变化时返回304）"""
     report_path = request.args.get('file', DEFAULT_REPORT_PATH)
-    report_data = global_report_control.parse_report_content(report_path)
-    return jsonify(report_data)
+    index = global_report_control.get_report_index(report_path)
+    if index is None:
+        return jsonify(global_report_control.parse_report_content(report_path))
+    return conditional_json(lambda: index.report_data, report_etag(index.version, request.path, request.args))
 
 
 @app.route('/api/filter')
 @login_required
 def filter_data():
-    """API接口，根据筛选条件返回过滤后的数据"""
-    # 获取筛选参数
-    filter_type = request.args.get('type', 'all')
-    search_term = request.args.get('search', '')
-    report_path = request.args.get('file', DEFAULT_REPORT_PATH)
-    
-    # 使用report_control中的筛选方法
-    filtered_data = global_report_control.filter_opportunities(file_path=report_path, filter_type=filter_type,search_term=search_term)
+    """
+    API接口，根据筛选条件返回过滤后的数据
     
-    # 返回过滤后的数据
-    return jsonify(filtered_data)
+    参数:
+        type: all/买入/卖出/观望; search: 交易对搜索词; match: contains(包含)/prefix(前缀)
+        sort: 逗号分隔的排序字段，前缀-表示降序，例如 -absScore,symbol（可选 score/absScore/shortPct/stopPct/price/symbol/action）
+        fields: 逗号分隔的返回字段，例如 symbol,action,totalScore
+        page/size: 页码（从1开始）和每页数量（size为0或不提供时返回全部）
+        cursor: 上一页返回的nextCursor（报告更新后失效，返回400）
+    返回:
+        {'opportunities', 'total', 'page', 'size', 'nextCursor', 'facets', 'version'}
+    """
+    report_path = request.args.get('file', DEFAULT_REPORT_PATH)
+    params = {
+        'filter_type': request.args.get('type', 'all'),
+        'search_term': request.args.get('search', ''),
+        'match': request.args.get('match', 'contains'),
+        'sort': request.args.get('sort', ''),
+        'fields': [field for field in request.args.get('fields', '').split(',') if field],
+        'page': request.args.get('page', 1, type=int),
+        'size': request.args.get('size', 0, type=int),
+        'cursor': request.args.get('cursor') or None,
+    }
+    index = global_report_control.get_report_index(report_path)
+    if index is None:
+        return jsonify(global_report_control.query_opportunities(report_path, **params))
+    try:
+        # 先校验参数（排序字段、游标），304和出错时都不需要构造响应体
+        if params['sort']:
+            index.sorted_positions(params['sort'])
+        if params['cursor']:
+            index.decode_cursor(params['cursor'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return conditional_json(lambda: index.query(**params), report_etag(index.version, request.path, request.args))
 
 
 @app.route('/balance')
@@ -875,6 +956,96 @@ def api_history_positions():
         })
 
 
+def signal_archive_params():
+    """历史信号查询参数（/api/signal_archive 和 /api/signal_archive/daily 共用）"""
+    days = request.args.get('days', 0, type=int)
+    start = request.args.get('start') or None
+    if days > 0 and start is None:
+        start = datetime.now() - timedelta(days=days)
+    return {
+        'strategy': request.args.get('strategy') or None,
+        'symbol': request.args.get('symbol') or None,
+        'action': request.args.get('action') or None,
+        'start': start,
+        'end': request.args.get('end') or None,
+        'timeframe': request.args.get('timeframe') or None,
+        'timeframe_signal': request.args.get('timeframe_signal') or None,
+        'traded': {'1': True, '0': False}.get(request.args.get('traded', '')),
+    }
+
+
+@app.route('/signal_archive')
+@login_required
+def signal_archive():
+    """历史信号页面路由"""
+    return render_template('signal_archive.html', now=datetime.now())
+
+
+@app.route('/api/signal_archive')
+@login_required
+def api_signal_archive():
+    """
+    API接口，查询历史信号（按时间倒序）
+
+    参数:
+        strategy/symbol/action: 策略名称、交易对或币种（如 SOL）、综合操作
+        days 或 start/end: 最近N天，或时间范围（YYYY-mm-dd HH:MM:SS）
+        timeframe/timeframe_signal: 指定周期的信号，例如 4h + 强烈买入
+        traded: 1 只看发送下单的信号，0 只看未发送的
+        limit: 每页数量（最多1000）; before: 上一页返回的nextBefore
+    返回:
+        {'success', 'data', 'nextBefore', 'summary'}
+    """
+    try:
+        from models.signal_archive import get_signal_archive
+        archive = get_signal_archive()
+        limit = min(max(request.args.get('limit', 200, type=int), 1), 1000)
+        before = request.args.get('before') or None
+        if before:
+            before = tuple(int(part) for part in before.split(':', 1))
+        rows = archive.query(**signal_archive_params(), limit=limit, before=before)
+        next_before = f"{rows[-1]['ts']}:{rows[-1]['id']}" if len(rows) == limit else None
+        return jsonify({'success': True, 'data': rows, 'nextBefore': next_before, 'summary': archive.summary()})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f"参数错误: {e}"}), 400
+    except Exception as e:
+        print(f"查询历史信号时发生错误: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/api/signal_archive/daily')
+@login_required
+def api_signal_archive_daily():
+    """API接口，按天统计历史信号数量（参数同 /api/signal_archive）"""
+    try:
+        from models.signal_archive import get_signal_archive
+        return jsonify({'success': True, 'data': get_signal_archive().daily_counts(**signal_archive_params())})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f"参数错误: {e}"}), 400
+    except Exception as e:
+        print(f"统计历史信号时发生错误: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@app.route('/api/signal_archive/ingest', methods=['POST'])
+@login_required
+def api_signal_archive_ingest():
+    """API接口，导入 reports/trade_signals 和 trade_signals 目录下已有的交易信号txt文件（已导入的文件跳过）"""
+    try:
+        from models.signal_archive import get_signal_archive
+        archive = get_signal_archive()
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = {'files': 0, 'rows': 0}
+        for directory in (os.path.join(project_root, 'reports', 'trade_signals'), os.path.join(project_root, 'trade_signals')):
+            counts = archive.ingest_directory(directory)
+            result['files'] += counts['files']
+            result['rows'] += counts['rows']
+        return jsonify({'success': True, 'data': result})
+    except Exception as e:
+        print(f"导入历史信号时发生错误: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+
 def convert_closed_orders_to_trades(closed_orders):
     """将ccxt的fetchClosedOrders返回的已关闭订单转换为标准交易记录格式
     
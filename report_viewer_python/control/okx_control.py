@@ -1,6 +1,10 @@
 from datetime import datetime
 import time
 
+# 项目根目录已由app.py加入Python路径
+from lib.tool.position_service import PositionService, POSITION_SERVICE_CONFIG
+from lib.tool.market_universe import get_market_universe
+
 class OKXControl:
     def __init__(self):
         # 初始化API客户端
@@ -8,6 +12,8 @@ class OKXControl:
         self.okx_official_api = None  # OKX官方包API客户端
         self.okx_account_api = None  # 账户相关API
         self.okx_public_api = None  # 公共API
+        # 仓位快照服务：多个页面/接口同时请求仓位时合并为一次交易所调用，时效内直接返回快照
+        self.position_service = PositionService(self._fetch_okx_positions, POSITION_SERVICE_CONFIG)
     
     def set_api_clients(self, okx_public_api=None, okx_account_api=None, okx_official_api=None, okx_exchange=None):
         """设置OKX API客户端实例"""
@@ -807,8 +813,34 @@ class OKXControl:
         print(f"=== 批量设置杠杆完成 - 成功: {success_count}, 失败: {fail_count} ===")
         return final_result
     
-    def get_okx_positions(self):
-        """获取OKX交易所的当前仓位数据"""
+    def get_market_universe_summary(self, top=20):
+        """获取交易对池概况（与扫描器共用同一个快照文件，快照过期时才请求交易所）
+        
+        Args:
+            top: 返回成交量最大的前几个交易对
+        """
+        try:
+            universe = get_market_universe(self.okx_exchange)
+            universe.liquid_symbols()
+            return universe.summary(top)
+        except Exception as e:
+            print(f"=== 获取交易对池失败: {e} ===")
+            return {'error': str(e)}
+    
+    def get_okx_positions(self, max_age=None):
+        """获取OKX交易所的当前仓位数据
+        
+        Args:
+            max_age: 可接受的仓位快照最大年龄（秒），None使用配置，0表示强制从交易所获取
+        """
+        try:
+            return self.position_service.positions(max_age)
+        except Exception as e:
+            print(f"=== 获取OKX仓位数据失败: {e} ===")
+            return []
+    
+    def _fetch_okx_positions(self):
+        """从交易所获取当前仓位数据（失败时抛出异常，由仓位快照服务处理）"""
         try:
             print("=== 开始获取OKX仓位数据 ===")
             print(f"API客户端状态 - AccountAPI: {bool(self.okx_account_api)}, Exchange: {bool(self.okx_exchange)}")
@@ -933,7 +965,7 @@ class OKXControl:
             print(f"错误类型: {type(e).__name__}")
             import traceback
             print(f"错误堆栈:\n{traceback.format_exc()}")
-            return []
+            raise
     
     def handle_modify_stop_order_request(self, request_data):
         """处理修改止盈止损订单的请求"""
@@ -1,8 +1,216 @@
 import os
 import re
+import base64
+import bisect
+import hashlib
+import threading
+from collections import Counter, OrderedDict
 from datetime import datetime
 
+from lib.tool.report_artifact import artifact_path, read_report_artifact
+
+# 查询接口的排序字段: 请求中的名称 -> 取值函数
+SORT_FIELDS = {
+    'score': lambda opp: opp.get('totalScore', 0),
+    'absScore': lambda opp: abs(opp.get('totalScore', 0)),
+    'shortPct': lambda opp: opp.get('shortPct', 0),
+    'stopPct': lambda opp: opp.get('stopPct', 0),
+    'price': lambda opp: opp.get('currentPrice', 0),
+    'symbol': lambda opp: opp.get('symbol', ''),
+    'action': lambda opp: opp.get('action', ''),
+}
+# facets统计的操作类型
+FACET_ACTIONS = ('买入', '卖出', '观望')
+# 每页最大数量
+MAX_PAGE_SIZE = 500
+# 每份报告缓存的排序结果数量（排序条件来自请求参数）
+MAX_CACHED_ORDERS = 32
+
+
+class ReportIndex:
+    """一份报告解析后的内存索引：按操作类型、交易对前缀、评分组织交易机会的位置"""
+
+    def __init__(self, report_data, source):
+        """
+        Args:
+            report_data: parse_report_content格式的报告数据
+            source: 数据来源（'jsonl' 或 'txt'）
+        """
+        self.report_data = report_data
+        self.source = source
+        opportunities = report_data['opportunities']
+        # 操作类型 -> 位置列表（保持报告中的顺序）
+        self.by_action = {}
+        for i, opportunity in enumerate(opportunities):
+            self.by_action.setdefault(opportunity.get('action', ''), []).append(i)
+        # 小写交易对，用于搜索
+        self.symbol_keys = [opportunity.get('symbol', '').lower() for opportunity in opportunities]
+        # 按交易对排序的 (小写交易对, 位置)，前缀查找使用二分
+        self.by_symbol = sorted((key, i) for i, key in enumerate(self.symbol_keys))
+        # 按评分从高到低排序的位置
+        self.by_score = sorted(range(len(opportunities)), key=lambda i: opportunities[i].get('totalScore', 0), reverse=True)
+        # 各操作类型的数量（页面统计和查询接口的facets）
+        self.facets = self._facets(range(len(opportunities)))
+        # 报告版本（由ReportControl按文件标识设置），用于ETag和分页游标
+        self.version = ''
+        # 排序条件 -> 全部交易机会的排序结果
+        self._orders = {}
+
+    def _facets(self, positions):
+        actions = Counter(self.report_data['opportunities'][i].get('action', '') for i in positions)
+        facets = {action: sum(n for name, n in actions.items() if action in name) for action in FACET_ACTIONS}
+        facets['all'] = sum(actions.values())
+        return facets
+
+    def count(self, action):
+        """操作类型包含action的交易机会数量"""
+        if action in self.facets:
+            return self.facets[action]
+        return sum(len(positions) for name, positions in self.by_action.items() if action in name)
+
+    def action_positions(self, filter_type='all'):
+        """操作类型筛选后的位置（报告顺序）"""
+        if filter_type == 'all':
+            return range(len(self.symbol_keys))
+        matched = [positions for name, positions in self.by_action.items() if filter_type in name]
+        if len(matched) == 1:
+            return matched[0]
+        return sorted(i for positions in matched for i in positions)
+
+    def prefix_positions(self, prefix):
+        """交易对以prefix开头（不区分大小写）的位置（报告顺序）"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.by_symbol, (prefix,))
+        positions = []
+        for key, i in self.by_symbol[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.append(i)
+        return sorted(positions)
+
+    def filter(self, filter_type='all', search_term='', match='contains'):
+        """
+        按操作类型和交易对筛选
+
+        Args:
+            filter_type: 'all' 或操作类型（买入/卖出/观望），包含匹配
+            search_term: 交易对搜索词，不区分大小写
+            match: 'contains' 交易对包含搜索词（原有行为），'prefix' 交易对以搜索词开头
+
+        Returns:
+            交易机会列表（报告顺序）
+        """
+        opportunities = self.report_data['opportunities']
+        return [opportunities[i] for i in self._search(self.action_positions(filter_type), search_term, match)]
+
+    def _search(self, positions, search_term, match):
+        """在positions中按交易对搜索词筛选"""
+        search_term = search_term.lower().strip()
+        if search_term and match == 'prefix':
+            allowed = set(self.prefix_positions(search_term))
+            return [i for i in positions if i in allowed]
+        if search_term:
+            keys = self.symbol_keys
+            return [i for i in positions if search_term in keys[i]]
+        return positions
+
+    def sorted_positions(self, sort):
+        """
+        按多个字段排序后的全部位置（结果按排序条件缓存）
+
+        Args:
+            sort: 逗号分隔的字段，前缀 - 表示降序，例如 '-absScore,symbol'；字段见SORT_FIELDS
+        """
+        order = self._orders.get(sort)
+        if order is None:
+            keys = [key.strip() for key in sort.split(',') if key.strip()]
+            opportunities = self.report_data['opportunities']
+            order = list(range(len(opportunities)))
+            # 从最后一个字段开始做稳定排序，得到多字段排序的结果
+            for key in reversed(keys):
+                field = key.lstrip('+-')
+                if field not in SORT_FIELDS:
+                    raise ValueError(f"不支持的排序字段: {field}")
+                value_of = SORT_FIELDS[field]
+                order.sort(key=lambda i: value_of(opportunities[i]), reverse=key.startswith('-'))
+            if len(self._orders) < MAX_CACHED_ORDERS:
+                self._orders[sort] = order
+        return order
+
+    def query(self, filter_type='all', search_term='', match='contains', sort='', fields=None,
+              page=1, size=0, cursor=None):
+        """
+        查询交易机会：筛选、多字段排序、分页和字段投影
+
+        Args:
+            filter_type: 'all' 或操作类型
+            search_term: 交易对搜索词
+            match: 'contains' 或 'prefix'
+            sort: 排序条件（见sorted_positions），为空时保持报告顺序
+            fields: 返回的字段列表，为空时返回全部字段
+            page: 页码（从1开始），提供cursor时忽略
+            size: 每页数量，0表示不分页
+            cursor: 上一页返回的nextCursor
+
+        Returns:
+            {'opportunities', 'total', 'page', 'size', 'nextCursor', 'facets', 'version'}
+
+        Raises:
+            ValueError: 参数不正确或游标已失效（报告已更新）
+        """
+        searched = self._search(range(len(self.symbol_keys)), search_term, match)
+        # facets统计搜索后的各操作类型数量（不受操作类型筛选影响，便于页面显示各标签页的数量）
+        facets = self._facets(searched) if search_term.strip() else self.facets
+        allowed = set(self.action_positions(filter_type))
+        positions = [i for i in searched if i in allowed]
+        if sort:
+            selected = set(positions)
+            positions = [i for i in self.sorted_positions(sort) if i in selected]
+        
+        size = max(0, min(int(size or 0), MAX_PAGE_SIZE))
+        if cursor:
+            offset = self.decode_cursor(cursor)
+        else:
+            page = max(1, int(page or 1))
+            offset = (page - 1) * size
+        end = offset + size if size else len(positions)
+        page_positions = positions[offset:end]
+        
+        opportunities = self.report_data['opportunities']
+        if fields:
+            items = [{field: opportunities[i].get(field) for field in fields} for i in page_positions]
+        else:
+            items = [opportunities[i] for i in page_positions]
+        return {
+            'opportunities': items,
+            'total': len(positions),
+            'page': offset // size + 1 if size else 1,
+            'size': size,
+            'nextCursor': self.encode_cursor(end) if size and end < len(positions) else None,
+            'facets': facets,
+            'version': self.version,
+        }
+
+    def encode_cursor(self, offset):
+        """分页游标: 报告版本和偏移量（报告更新后旧游标失效）"""
+        return base64.urlsafe_b64encode(f"{self.version}:{offset}".encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            version, offset = text.rsplit(':', 1)
+            offset = int(offset)
+        except Exception:
+            raise ValueError("无效的分页游标")
+        if version != self.version:
+            raise ValueError("报告已更新，分页游标已失效")
+        return max(0, offset)
+
+
 class ReportControl:
+    # 缓存的报告数量（查看器可以通过file参数查看其它报告）
+    MAX_CACHED_REPORTS = 8
+
     def __init__(self, default_report_path=None):
         # 如果没有提供默认路径，使用标准路径
         if default_report_path is None:
@@ -13,27 +221,89 @@ class ReportControl:
             )
         else:
             self.default_report_path = default_report_path
+        # 报告路径 -> (文件标识, ReportIndex)，文件修改时间或大小变化时重新解析
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'jsonl': 0, 'txt': 0}
     
     def parse_report_content(self, file_path=None):
-        """解析报告文件内容并返回结构化数据"""
-        # 使用指定路径或默认路径
+        """解析报告文件内容并返回结构化数据（同一文件版本只解析一次）"""
+        index = self.get_report_index(file_path)
+        if index is None:
+            report_path = file_path or self.default_report_path
+            print(f"警告: 报告文件不存在 - {report_path}")
+            # 返回包含错误信息的数据结构，不使用模拟数据
+            error_data = {
+                'analysisTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),  # 添加generated_at字段
+                'timeframeDimensions': '周线→日线→4小时→1小时→15分钟',
+                'totalOpportunities': 0,
+                'error': f"报告文件不存在: {report_path}",
+                'opportunities': []
+            }
+            return error_data
+        # 返回浅拷贝，调用方修改列表不影响缓存
+        report_data = dict(index.report_data)
+        report_data['opportunities'] = list(report_data['opportunities'])
+        return report_data
+    
+    def get_report_index(self, file_path=None):
+        """
+        获取报告的内存索引：优先加载同名的 .jsonl 结构化报告（比txt新时），否则解析txt；
+        按文件的修改时间和大小缓存
+
+        Returns:
+            ReportIndex，报告文件不存在时返回None
+        """
         report_path = file_path or self.default_report_path
+        txt_key = self._file_key(report_path)
+        if txt_key is None:
+            return None
+        jsonl_path = artifact_path(report_path)
+        jsonl_key = self._file_key(jsonl_path) if jsonl_path != report_path else None
+        # txt比.jsonl新时（例如旧版本策略只写了txt），.jsonl已过期
+        if jsonl_key is not None and jsonl_key[0] < txt_key[0]:
+            jsonl_key = None
+        key = (txt_key, jsonl_key)
+        
+        with self._lock:
+            cached = self._cache.get(report_path)
+            if cached is not None and cached[0] == key:
+                self._cache.move_to_end(report_path)
+                self.stats['hits'] += 1
+                return cached[1]
         
+        index = None
+        if jsonl_key is not None:
+            try:
+                index = ReportIndex(read_report_artifact(jsonl_path), 'jsonl')
+                self.stats['jsonl'] += 1
+            except Exception as e:
+                print(f"读取结构化报告失败，解析txt报告: {e}")
+        if index is None:
+            index = ReportIndex(self._parse_text_report(report_path), 'txt')
+            self.stats['txt'] += 1
+        index.version = hashlib.md5(repr((report_path, key)).encode()).hexdigest()[:16]
+        
+        with self._lock:
+            self._cache[report_path] = (key, index)
+            self._cache.move_to_end(report_path)
+            while len(self._cache) > self.MAX_CACHED_REPORTS:
+                self._cache.popitem(last=False)
+        return index
+    
+    @staticmethod
+    def _file_key(path):
+        """文件标识 (修改时间ns, 大小)，文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _parse_text_report(self, report_path):
+        """用正则解析txt报告（没有结构化报告时的后备方式）"""
         try:
-            # 检查文件是否存在
-            if not os.path.exists(report_path):
-                print(f"警告: 报告文件不存在 - {report_path}")
-                # 返回包含错误信息的数据结构，不使用模拟数据
-                error_data = {
-                    'analysisTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),  # 添加generated_at字段
-                    'timeframeDimensions': '周线→日线→4小时→1小时→15分钟',
-                    'totalOpportunities': 0,
-                    'error': f"报告文件不存在: {report_path}",
-                    'opportunities': []
-                }
-                return error_data
-            
             # 记录文件修改时间，用于调试
             file_mtime = os.path.getmtime(report_path)
             print(f"读取文件: {report_path}, 最后修改时间: {datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S')}")
@@ -195,29 +465,29 @@ class ReportControl:
             }
             return error_data
     
-    def filter_opportunities(self, file_path=None, filter_type='all', search_term=''):
-        """根据筛选条件过滤交易机会数据"""
-        # 解析报告数据
-        report_data = self.parse_report_content(file_path)
-        
-        # 应用筛选条件
-        filtered_opportunities = []
-        search_term = search_term.lower().strip()
-        
-        for opportunity in report_data['opportunities']:
-            # 应用操作类型筛选
-            action_match = (filter_type == 'all' or filter_type in opportunity.get('action', ''))
-            # 应用搜索筛选
-            search_match = (search_term == '' or search_term in opportunity.get('symbol', '').lower())
-            
-            if action_match and search_match:
-                filtered_opportunities.append(opportunity)
+    def filter_opportunities(self, file_path=None, filter_type='all', search_term='', match='contains'):
+        """根据筛选条件过滤交易机会数据（使用缓存的报告索引）"""
+        index = self.get_report_index(file_path)
+        filtered_opportunities = index.filter(filter_type, search_term, match) if index is not None else []
         
         return {
             'opportunities': filtered_opportunities,
             'total': len(filtered_opportunities)
         }
     
+    def query_opportunities(self, file_path=None, **params):
+        """
+        分页查询交易机会（参数见ReportIndex.query），报告不存在时返回空结果
+
+        Raises:
+            ValueError: 参数不正确或游标已失效
+        """
+        index = self.get_report_index(file_path)
+        if index is None:
+            return {'opportunities': [], 'total': 0, 'page': 1, 'size': 0, 'nextCursor': None,
+                    'facets': {action: 0 for action in FACET_ACTIONS + ('all',)}, 'version': ''}
+        return index.query(**params)
+    
     def _read_file_with_encoding(self, file_path):
         """尝试使用不同的编码读取文件"""
         encodings = ['utf-8', 'gbk', 'latin-1']
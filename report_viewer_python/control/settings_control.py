@@ -1,4 +1,3 @@
-import redis
 import json
 import os
 import sys
@@ -17,51 +16,21 @@ except ImportError:
         'PASSWORD': ''
     }
 
+# 项目根目录已由app.py加入Python路径
+from lib.tool.redis_pool import get_redis_pool
+
 class SettingsControl:
     """系统设置控制器"""
     
     def __init__(self):
         """初始化设置控制器"""
-        self.redis_client = self._get_redis_client()
-    
-    def _get_redis_client(self):
-        """获取Redis客户端连接"""
-        try:
-            # 解析Redis地址
-            addr = REDIS_CONFIG.get('ADDR', 'localhost:6379')
-            password = REDIS_CONFIG.get('PASSWORD', '')
-            
-            if ':' in addr:
-                host, port = addr.split(':')
-                port = int(port)
-            else:
-                host = addr
-                port = 6379
-            
-            # 创建Redis连接
-            if password:
-                redis_client = redis.Redis(host=host, port=port, password=password, decode_responses=True)
-            else:
-                redis_client = redis.Redis(host=host, port=port, decode_responses=True)
-            
-            # 测试连接
-            redis_client.ping()
-            return redis_client
-        
-        except Exception as e:
-            print(f"连接Redis失败: {e}")
-            return None
+        # 与扫描器、策略共用同一个Redis连接池模块（按需连接，Redis不可用时自动降级）
+        self.redis_pool = get_redis_pool(REDIS_CONFIG)
     
     def get_trade_mul(self):
         """从Redis获取交易倍率，如果不存在则返回默认值1.0"""
         try:
-            if self.redis_client:
-                trade_mul = self.redis_client.get('trade_mul')
-                if trade_mul:
-                    return float(trade_mul)
-            
-            # 如果Redis中没有值或连接失败，返回默认值
-            return 1.0
+            return self.redis_pool.get_float('trade_mul', 1.0)
         
         except Exception as e:
             print(f"获取交易倍率失败: {e}")
@@ -101,18 +70,13 @@ class SettingsControl:
                     'message': '交易倍率必须在0.1到10之间'
                 }
             
-            if not self.redis_client:
+            # 更新trade_mul值（同时刷新本进程的本地缓存）
+            if not self.redis_pool.set('trade_mul', str(trade_mul)):
                 return {
                     'success': False,
                     'message': '无法连接到Redis服务器'
                 }
             
-            # 获取当前值
-            current_value = self.get_trade_mul()
-            
-            # 更新trade_mul值
-            self.redis_client.set('trade_mul', str(trade_mul))
-            
             return {
                 'success': True,
                 'message': '设置已保存',
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, jsonify, session
+from flask import Blueprint, render_template, jsonify, session, request
 from datetime import datetime
 import json
 from control.okx_control import OKXControl
@@ -53,6 +53,19 @@ def api_get_balance():
 
 
 
+@okx_bp.route('/api/market_universe')
+def api_market_universe():
+    # 检查用户是否已登录
+    if 'username' not in session:
+        return jsonify({'status': 'error', 'message': '请先登录'}), 401
+    
+    # 交易对池概况：交易对数量、快照年龄、成交量最大的交易对
+    top = request.args.get('top', 20, type=int)
+    result = okx_control.get_market_universe_summary(top)
+    if 'error' in result:
+        return jsonify({'status': 'error', 'message': result['error']})
+    return jsonify({'status': 'success', 'data': result})
+
 @okx_bp.route('/orders')
 def orders():
     # 检查用户是否已登录
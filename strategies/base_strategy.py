@@ -7,12 +7,13 @@
 import abc
 import json
 import os
-import redis
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
-from lib2 import get_okx_positions, send_trading_signal_to_api
+from lib2 import send_trading_signal_to_api
+from lib.tool.position_service import get_position_service, normalize_symbol
+from lib.tool.report_artifact import write_report_artifact
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -60,6 +61,31 @@ class BaseStrategy(abc.ABC):
         """
         pass
 
+    def analyze_series(self, symbol: str, data: Dict[str, pd.DataFrame], base_times: pd.Series) -> Optional[Dict[str, Any]]:
+        """
+        批量分析模式：在完整历史数据上一次性计算所有指标，返回每根基准K线的评分和操作
+        回测引擎在策略实现了该方法时使用它，代替逐根K线调用analyze
+        Args:
+            symbol: 交易对符号
+            data: 完整历史的多时间框架数据，格式为 {timeframe: dataframe}，dataframe需包含datetime列
+            base_times: 基准时间框架每根K线的时间
+        Returns:
+            {字段名: 与base_times等长的数组}，默认返回None表示策略不支持批量分析
+        """
+        return None
+
+    def build_signal_from_series(self, symbol: str, series: Dict[str, Any], i: int) -> Any:
+        """
+        根据analyze_series的结果构造第i根基准K线的信号对象
+        Args:
+            symbol: 交易对符号
+            series: analyze_series的返回值
+            i: 基准K线下标
+        Returns:
+            与analyze返回值类型相同的信号对象，没有交易信号或策略未实现时返回None
+        """
+        return None
+
     def get_name(self) -> str:
         """获取策略名称"""
         return self.strategy_name
@@ -290,27 +316,20 @@ class BaseStrategy(abc.ABC):
                 max_positions = self.config.get('MAX_POSITIONS', 10)
                 self.logger.info(f"当前配置: MAX_POSITIONS={max_positions}")
                 
-                # 调用lib中的函数获取仓位数据
-                self.logger.info(f"调用get_okx_positions，传入的exchange对象: {type(self.exchange).__name__}")
-                formatted_positions = get_okx_positions(self.exchange)
-                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)}")
+                # 调用仓位快照服务获取仓位数据（同一账户的多处调用合并为一次交易所请求）
+                self.logger.info(f"获取仓位快照，传入的exchange对象: {type(self.exchange).__name__}")
+                snapshot = get_position_service(self.exchange).get(self.config.get('POSITION_MAX_AGE'))
+                formatted_positions = snapshot.positions
+                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)} (快照版本 {snapshot.version}, {snapshot.age:.1f}秒前)")
                 if formatted_positions:
                     self.logger.info(f"当前持仓数据示例: {formatted_positions[:2]}")  # 只显示前2个持仓，避免日志过长
                 
-                # 提取已持有的标的并标准化格式
-                held_symbols_converted = []
-                for position in formatted_positions:
-                    symbol = position.get('symbol', '')
-                    if symbol:
-                        # 标准化持仓标的格式
-                        # 1. 移除永续合约后缀（如'-SWAP'）
-                        # 2. 统一转换为大写
-                        standard_symbol = symbol.replace('-SWAP', '').upper()
-                        held_symbols_converted.append(standard_symbol)
+                # 已持有的标的（快照中按标准化交易对建立的集合）
+                held_symbols_converted = sorted(snapshot.held)
                 
                 # 检查持仓数量是否超过最大限制
                 max_positions = self.config.get('MAX_POSITIONS', 10)
-                current_position_count = len(held_symbols_converted)
+                current_position_count = snapshot.count
                 
                 # 记录持仓信息
                 self.logger.info(f"当前持仓数量: {current_position_count}, 持仓标的: {held_symbols_converted}")
@@ -332,14 +351,11 @@ class BaseStrategy(abc.ABC):
                             if not signal_symbol:
                                 continue
                                 
-                            # 标准化交易信号中的标的格式
-                            standard_signal_symbol = signal_symbol.replace('-SWAP', '').upper()
-                            
-                            # 检查是否匹配已持仓
-                            if standard_signal_symbol not in held_symbols_converted:
+                            # 检查是否匹配已持仓（标准化后O(1)判断）
+                            if not snapshot.is_held(signal_symbol):
                                 filtered_signals.append(signal)
                             else:
-                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {standard_signal_symbol})")
+                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {normalize_symbol(signal_symbol)})")
                         except Exception as e:
                             self.logger.error(f"处理交易信号时出错: {e}")
                             # 出错时保留该信号，避免误过滤
@@ -499,9 +515,10 @@ class BaseStrategy(abc.ABC):
         # 文件名固定为multi_timeframe_analysis_new.txt
         filename = os.path.join(report_dir, "multi_timeframe_analysis_new.txt")
         
+        analysis_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(filename, 'w', encoding='utf-8') as f:
             # 写入报告头部
-            f.write("=" * 80 + "\n📊 多时间框架专业分析报告\n" + "=" * 80 + f"\n分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n时间框架维度: 周线→日线→4小时→1小时→15分钟\n发现机会: {len(all_opportunities)}\n策略名称: {self.get_name()}\n" + "=" * 80 + "\n\n")
+            f.write("=" * 80 + "\n📊 多时间框架专业分析报告\n" + "=" * 80 + f"\n分析时间: {analysis_time}\n时间框架维度: 周线→日线→4小时→1小时→15分钟\n发现机会: {len(all_opportunities)}\n策略名称: {self.get_name()}\n" + "=" * 80 + "\n\n")
             
             # 写入每个交易机会
             for i, opportunity in enumerate(all_opportunities, 1):
@@ -533,5 +550,8 @@ class BaseStrategy(abc.ABC):
                 
                 f.write(f"【机会 {i}】\n" + "-" * 60 + "\n" + f"交易对: {symbol}\n" + f"综合建议: {overall_action}\n" + f"信心等级: {confidence_level}\n" + f"总评分: {total_score:.3f}\n" + f"当前价格: {entry_price:.6f}\n" + f"周线趋势: {weekly_trend}\n" + f"日线趋势: {daily_trend}\n" + f"4小时信号: {h4_signal}\n" + f"1小时信号: {h1_signal}\n" + f"15分钟信号: {m15_signal}\n" + f"短期目标: {target_short:.6f}\n" + f"止损价格: {stop_loss:.6f}\n" + f"分析依据: {reasoning_text}\n" + "\n" + "=" * 80 + "\n\n")
         
+        # 同时写入结构化报告，报告查看器直接加载，不再正则解析txt
+        write_report_artifact(filename, all_opportunities, analysis_time, self.get_name())
+
         self.logger.info(f"✅ 多时间框架分析报告已保存至: {filename}")
         return filename
\ No newline at end of file
@@ -1,4 +1,7 @@
 import pandas as pd
+from strategies.indicator_cache import sma, ema, rsi, rolling_std, rolling_min, rolling_max
+# 评分函数同时接受DataFrame和CandleArray（CandleArray在此转换为DataFrame，转换结果缓存在CandleArray上）
+from lib.tool.candle_frame import as_frame
 
 def calculate_trend_indicators_and_score(df: pd.DataFrame, current_price, timeframe):
     """计算技术指标并计算趋势评分（SMA版本）
@@ -11,9 +14,10 @@ def calculate_trend_indicators_and_score(df: pd.DataFrame, current_price, timefr
     Returns:
         int: 趋势评分
     """
+    df = as_frame(df)
     # 计算技术指标
-    sma_20 = df['close'].rolling(20).mean().iloc[-1]
-    sma_50 = df['close'].rolling(50).mean() if len(df) >= 50 else pd.Series([current_price])
+    sma_20 = sma(df, 'close', 20).iloc[-1]
+    sma_50 = sma(df, 'close', 50) if len(df) >= 50 else pd.Series([current_price])
     sma_50 = sma_50.iloc[-1] if not sma_50.empty else current_price
     
     # 计算趋势评分
@@ -41,9 +45,10 @@ def calculate_ema_trend_indicators_and_score(df: pd.DataFrame, current_price, ti
     Returns:
         int: 趋势评分
     """
+    df = as_frame(df)
     # 计算技术指标 - 使用EMA代替SMA
-    ema_20 = df['close'].ewm(span=20, adjust=False).mean().iloc[-1]
-    ema_50 = df['close'].ewm(span=50, adjust=False).mean() if len(df) >= 50 else pd.Series([current_price])
+    ema_20 = ema(df, 'close', 20).iloc[-1]
+    ema_50 = ema(df, 'close', 50) if len(df) >= 50 else pd.Series([current_price])
     ema_50 = ema_50.iloc[-1] if not ema_50.empty else current_price
     
     # 计算趋势评分
@@ -72,12 +77,9 @@ def calculate_rsi_score(df: pd.DataFrame, timeframe):
     Returns:
         int: RSI评分
     """
+    df = as_frame(df)
     # 计算RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    rsi_series = 100 - (100 / (1 + rs))
+    rsi_series = rsi(df, 14)
     rsi_value = rsi_series.iloc[-1]
     
     # 计算RSI评分
@@ -100,12 +102,9 @@ def calculate_rsi_crossover_score(df: pd.DataFrame, window=7):
     Returns:
         int: RSI交叉评分
     """
+    df = as_frame(df)
     # 计算RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi_series = 100 - (100 / (1 + rs))
+    rsi_series = rsi(df, window)
     
     # 15分钟时间框架特殊处理 - 交叉分析
     score = 0
@@ -128,7 +127,8 @@ def calculate_volume_score(df: pd.DataFrame):
     Returns:
         int: 成交量评分
     """
-    volume_avg = df['volume'].rolling(20).mean().iloc[-1]
+    df = as_frame(df)
+    volume_avg = sma(df, 'volume', 20).iloc[-1]
     volume_current = df['volume'].iloc[-1]
     volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
     
@@ -153,23 +153,24 @@ def calculate_bollinger_band_signal_score(df: pd.DataFrame):
     Returns:
         int: 布林带信号评分，正值表示看涨，负值表示看跌
     """
+    df = as_frame(df)
     # 确保数据足够
     if len(df) < 50:
         return 0
     
     # 计算布林带（使用20日移动平均和2倍标准差）
     window = 20
-    df['sma'] = df['close'].rolling(window=window).mean()
-    df['std'] = df['close'].rolling(window=window).std()
-    df['upper_band'] = df['sma'] + 2 * df['std']
-    df['lower_band'] = df['sma'] - 2 * df['std']
-    df['band_width'] = df['upper_band'] - df['lower_band']
-    df['band_width_pct'] = df['band_width'] / df['sma'] * 100
+    sma_series = sma(df, 'close', window)
+    std_series = rolling_std(df, 'close', window)
+    upper_band_series = sma_series + 2 * std_series
+    lower_band_series = sma_series - 2 * std_series
+    band_width = upper_band_series - lower_band_series
+    band_width_pct = band_width / sma_series * 100
     
     # 判断布林带宽度是否走平或缩窄
     # 计算带宽变化趋势（最近10天的带宽均值与前10天的带宽均值比较）
-    recent_band_width_avg = df['band_width_pct'].iloc[-10:].mean()
-    previous_band_width_avg = df['band_width_pct'].iloc[-20:-10].mean()
+    recent_band_width_avg = band_width_pct.iloc[-10:].mean()
+    previous_band_width_avg = band_width_pct.iloc[-20:-10].mean()
     
     # 带宽走平或缩窄的条件
     is_band_width_flat_or_narrowing = recent_band_width_avg <= previous_band_width_avg * 1.05
@@ -179,35 +180,31 @@ def calculate_bollinger_band_signal_score(df: pd.DataFrame):
     
     # 获取最新价格和布林带值
     current_price = df['close'].iloc[-1]
-    upper_band = df['upper_band'].iloc[-1]
-    lower_band = df['lower_band'].iloc[-1]
-    sma = df['sma'].iloc[-1]
+    upper_band = upper_band_series.iloc[-1]
+    lower_band = lower_band_series.iloc[-1]
+    sma_value = sma_series.iloc[-1]
     
     # 计算价格与布林带的距离百分比
-    distance_to_upper = (current_price - upper_band) / sma * 100
-    distance_to_lower = (lower_band - current_price) / sma * 100
+    distance_to_upper = (current_price - upper_band) / sma_value * 100
+    distance_to_lower = (lower_band - current_price) / sma_value * 100
     
     # 计算RSI用于指标配合判断
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    rsi_series = 100 - (100 / (1 + rs))
+    rsi_series = rsi(df, 14)
     current_rsi = rsi_series.iloc[-1]
     prev_rsi = rsi_series.iloc[-2] if len(rsi_series) >= 2 else current_rsi
     
     # 计算KDJ指标（简化版，使用RSV和随机指标）
     n = 9
-    df['low_n'] = df['low'].rolling(window=n).min()
-    df['high_n'] = df['high'].rolling(window=n).max()
-    df['rsv'] = (df['close'] - df['low_n']) / (df['high_n'] - df['low_n']) * 100
-    df['k'] = df['rsv'].ewm(com=2, adjust=False).mean()
-    df['d'] = df['k'].ewm(com=2, adjust=False).mean()
+    low_n = rolling_min(df, 'low', n)
+    high_n = rolling_max(df, 'high', n)
+    rsv = (df['close'] - low_n) / (high_n - low_n) * 100
+    k_series = rsv.ewm(com=2, adjust=False).mean()
+    d_series = k_series.ewm(com=2, adjust=False).mean()
     
-    current_k = df['k'].iloc[-1]
-    current_d = df['d'].iloc[-1]
-    prev_k = df['k'].iloc[-2] if len(df) >= 2 else current_k
-    prev_d = df['d'].iloc[-2] if len(df) >= 2 else current_d
+    current_k = k_series.iloc[-1]
+    current_d = d_series.iloc[-1]
+    prev_k = k_series.iloc[-2] if len(df) >= 2 else current_k
+    prev_d = d_series.iloc[-2] if len(df) >= 2 else current_d
     
     # 判断KDJ金叉（K线上穿D线）和死叉（K线下穿D线）
     is_kdj_gold_cross = prev_k < prev_d and current_k > current_d
@@ -265,9 +262,9 @@ def calculate_bollinger_band_signal_score(df: pd.DataFrame):
         # 检查最近3根K线
         for i in range(1, min(4, len(df))):
             idx = -i
-            if df['close'].iloc[idx] < df['lower_band'].iloc[idx]:
+            if df['close'].iloc[idx] < lower_band_series.iloc[idx]:
                 # 如果有K线收盘价跌破下轨，检查之后是否快速收回
-                if i > 1 and df['close'].iloc[idx+1] > df['lower_band'].iloc[idx+1]:
+                if i > 1 and df['close'].iloc[idx+1] > lower_band_series.iloc[idx+1]:
                     break_and_recover = True
                 else:
                     valid_below_lower = False
@@ -309,9 +306,9 @@ def calculate_bollinger_band_signal_score(df: pd.DataFrame):
         # 检查最近3根K线
         for i in range(1, min(4, len(df))):
             idx = -i
-            if df['close'].iloc[idx] > df['upper_band'].iloc[idx]:
+            if df['close'].iloc[idx] > upper_band_series.iloc[idx]:
                 # 如果有K线收盘价突破上轨，检查之后是否快速回落
-                if i > 1 and df['close'].iloc[idx+1] < df['upper_band'].iloc[idx+1]:
+                if i > 1 and df['close'].iloc[idx+1] < upper_band_series.iloc[idx+1]:
                     break_and_reverse = True
                 else:
                     valid_above_upper = False
@@ -358,16 +355,13 @@ def calculate_rsi_divergence_score(df: pd.DataFrame):
     Returns:
         int: 背离信号评分，正值表示看涨，负值表示看跌
     """
+    df = as_frame(df)
     # 确保数据足够
     if len(df) < 50:
         return 0
     
     # 计算RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    rsi_series = 100 - (100 / (1 + rs))
+    rsi_series = rsi(df, 14)
     
     # 获取最新价格和RSI
     current_price = df['close'].iloc[-1]
@@ -415,11 +409,11 @@ def calculate_rsi_divergence_score(df: pd.DataFrame):
         recent_rsi_high = None
         prev_rsi_high = None
         
-        for idx, rsi in rsi_highs:
+        for idx, rsi_value in rsi_highs:
             if not recent_rsi_high and idx <= recent_price_high_idx + 2 and idx >= recent_price_high_idx - 2:
-                recent_rsi_high = rsi
+                recent_rsi_high = rsi_value
             elif not prev_rsi_high and idx <= prev_price_high_idx + 2 and idx >= prev_price_high_idx - 2:
-                prev_rsi_high = rsi
+                prev_rsi_high = rsi_value
             if recent_rsi_high and prev_rsi_high:
                 break
         
@@ -433,7 +427,7 @@ def calculate_rsi_divergence_score(df: pd.DataFrame):
             
             # 辅助条件：成交量萎缩
             recent_volume = df['volume'].iloc[recent_price_high_idx]
-            volume_avg = df['volume'].rolling(20).mean().iloc[recent_price_high_idx]
+            volume_avg = sma(df, 'volume', 20).iloc[recent_price_high_idx]
             if volume_avg > 0 and recent_volume / volume_avg < 0.8:
                 score += 1
             
@@ -467,11 +461,11 @@ def calculate_rsi_divergence_score(df: pd.DataFrame):
         recent_rsi_low = None
         prev_rsi_low = None
         
-        for idx, rsi in rsi_lows:
+        for idx, rsi_value in rsi_lows:
             if not recent_rsi_low and idx <= recent_price_low_idx + 2 and idx >= recent_price_low_idx - 2:
-                recent_rsi_low = rsi
+                recent_rsi_low = rsi_value
             elif not prev_rsi_low and idx <= prev_price_low_idx + 2 and idx >= prev_price_low_idx - 2:
-                prev_rsi_low = rsi
+                prev_rsi_low = rsi_value
             if recent_rsi_low and prev_rsi_low:
                 break
         
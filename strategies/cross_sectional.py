@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+横截面评分模块
+把同一时间框架下所有交易对的K线堆叠为二维数组（交易对 × K线），一次计算整个交易对池的最新指标值和评分，
+代替逐个交易对调用 condition_analyzer 的评分函数。评分规则与 condition_analyzer 中的同名函数一致:
+    - ema_trend_scores       ↔ calculate_ema_trend_indicators_and_score
+    - volume_scores          ↔ calculate_volume_score
+    - rsi_crossover_scores   ↔ calculate_rsi_crossover_score
+
+只计算每个交易对最后一根K线（及前一根）的指标值；EMA按pandas ewm(adjust=False)的递推公式在交易对维度上向量化，
+K线数量不同的交易对分组堆叠，结果按传入的交易对顺序返回
+"""
+
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _column(data: Any, column: str) -> np.ndarray:
+    """CandleArray直接返回数组视图，DataFrame转换为float64数组"""
+    if isinstance(data, pd.DataFrame):
+        return data[column].to_numpy(dtype='float64')
+    return np.asarray(data[column], dtype='float64')
+
+
+class UniverseMatrix:
+    """一个时间框架上所有交易对的K线矩阵（按K线数量分组，每组形状为 交易对数 × K线数）"""
+
+    def __init__(self, frames: Dict[str, Any]):
+        """
+        Args:
+            frames: {交易对: CandleArray或DataFrame}，同一时间框架
+        """
+        self.symbols: List[str] = list(frames)
+        self.lengths = np.array([len(frames[symbol]) for symbol in self.symbols], dtype='int64')
+        self.groups = []   # [(在symbols中的位置, K线数, {列名: 二维数组})]
+        for length in np.unique(self.lengths):
+            positions = np.flatnonzero(self.lengths == length)
+            columns = {}
+            for column in COLUMNS:
+                if length:
+                    columns[column] = np.vstack([_column(frames[self.symbols[i]], column) for i in positions])
+                else:
+                    columns[column] = np.empty((len(positions), 0))
+            self.groups.append((positions, int(length), columns))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _collect(self, compute: Callable[[int, Dict[str, np.ndarray]], np.ndarray]) -> np.ndarray:
+        """对每组调用compute(K线数, 列数组)，结果按交易对顺序合并"""
+        result = np.full(len(self.symbols), np.nan)
+        for positions, length, columns in self.groups:
+            result[positions] = compute(length, columns)
+        return result
+
+    def last(self, column: str = 'close', offset: int = 0) -> np.ndarray:
+        """倒数第offset+1根K线的值，K线不足时为NaN"""
+        return self._collect(lambda n, c: c[column][:, n - 1 - offset] if n > offset else np.nan)
+
+    def ema_last(self, span: int, column: str = 'close') -> np.ndarray:
+        """最后一根K线的EMA（与 Series.ewm(span=span, adjust=False).mean() 的递推公式相同）"""
+        alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        old_wt_factor = 1.0 - alpha
+
+        def compute(n, c):
+            if n == 0:
+                return np.nan
+            values = c[column]
+            weighted = values[:, 0].copy()
+            for t in range(1, n):
+                weighted = (old_wt_factor * weighted + alpha * values[:, t]) / (old_wt_factor + alpha)
+            return weighted
+        return self._collect(compute)
+
+    def sma_last(self, column: str, window: int, offset: int = 0) -> np.ndarray:
+        """以倒数第offset+1根K线结尾的简单移动平均，K线不足时为NaN"""
+        return self._collect(lambda n, c: c[column][:, n - offset - window:n - offset].mean(axis=1)
+                             if n - offset >= window else np.nan)
+
+    def rsi_last(self, window: int = 14, offset: int = 0) -> np.ndarray:
+        """以倒数第offset+1根K线结尾的RSI（涨跌幅使用简单移动平均，与indicator_cache.rsi相同）"""
+        def compute(n, c):
+            end = n - offset
+            if end < window + 1:
+                return np.nan
+            delta = np.diff(c['close'][:, end - window - 1:end], axis=1)
+            gain = np.where(delta > 0, delta, 0.0).mean(axis=1)
+            loss = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 100 - (100 / (1 + gain / loss))
+        return self._collect(compute)
+
+    def atr_last(self, period: int) -> np.ndarray:
+        """最后一根K线的ATR（与lib2.calculate_atr相同: K线少于period根时为0）"""
+        def compute(n, c):
+            if n < period:
+                return 0.0
+            if n == period:
+                # 第一根K线没有前收盘价，真实波动幅度为NaN
+                return np.nan
+            high, low = c['high'][:, n - period:], c['low'][:, n - period:]
+            prev_close = c['close'][:, n - period - 1:n - 1]
+            tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+            return tr.mean(axis=1)
+        return self._collect(compute)
+
+
+def ema_trend_scores(matrix: UniverseMatrix, timeframe: str) -> np.ndarray:
+    """EMA趋势评分（calculate_ema_trend_indicators_and_score的横截面版本）"""
+    if timeframe == "15m":
+        return np.zeros(len(matrix))
+    price = matrix.last('close')
+    ema_20 = matrix.ema_last(20)
+    ema_50 = np.where(matrix.lengths >= 50, matrix.ema_last(50), price)
+    return np.select(
+        [(price > ema_20) & (ema_20 > ema_50), price > ema_20, (price < ema_20) & (ema_20 < ema_50), price < ema_20],
+        [2, 1, -2, -1], default=0
+    ).astype('float64')
+
+
+def volume_scores(matrix: UniverseMatrix) -> np.ndarray:
+    """成交量评分（calculate_volume_score的横截面版本）"""
+    volume_avg = matrix.sma_last('volume', 20)
+    volume_current = matrix.last('volume')
+    with np.errstate(invalid='ignore'):
+        positive = volume_avg > 0
+    volume_ratio = np.where(positive, volume_current / np.where(positive, volume_avg, 1.0), 1.0)
+    return np.where(volume_ratio > 1.5, 1.0, np.where(volume_ratio < 0.5, -1.0, 0.0))
+
+
+def rsi_crossover_scores(matrix: UniverseMatrix, window: int = 7) -> np.ndarray:
+    """RSI交叉评分（calculate_rsi_crossover_score的横截面版本）"""
+    rsi_value = matrix.rsi_last(window)
+    prev_rsi = matrix.rsi_last(window, offset=1)
+    with np.errstate(invalid='ignore'):
+        return np.where((prev_rsi < 30) & (rsi_value > 30), 2.0,
+                        np.where((prev_rsi > 70) & (rsi_value < 70), -2.0, 0.0))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+指标缓存模块
+为 condition_analyzer 中的评分函数提供共享的指标计算结果缓存，
+同一个DataFrame被多个策略/评分函数使用时，EMA、RSI、滚动均值等指标只计算一次
+
+缓存键: (指标名, 参数, 数据长度, 首尾索引, 最后时间戳, 价格指纹)，使用LRU淘汰控制内存
+缓存未命中时，带有 attrs['symbol'] / attrs['timeframe'] 的DataFrame交给增量指标引擎计算（只处理新收盘的K线）
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+import pandas as pd
+
+from lib.tool.incremental_indicators import incremental_engine
+
+# 尝试导入配置文件，如果不存在则使用默认值
+try:
+    from config import INDICATOR_CACHE_CONFIG
+except ImportError:
+    INDICATOR_CACHE_CONFIG = {}
+
+# 配置日志
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+# 默认最多缓存的指标序列数量（每个序列约300个float，4096条约10MB）
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class IndicatorCache:
+    """线程安全的LRU指标缓存"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的指标序列数量
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[Tuple, pd.Series]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def frame_key(df: pd.DataFrame) -> Tuple:
+        """生成DataFrame的标识：长度、首尾索引、最后时间戳和几个价格点的指纹"""
+        n = len(df)
+        if n == 0:
+            return (0,)
+        last_ts = None
+        for col in ('timestamp', 'datetime'):
+            if col in df.columns:
+                last_ts = df[col].iat[-1]
+                break
+        close = df['close'] if 'close' in df.columns else df.iloc[:, 0]
+        fingerprint = (close.iat[0], close.iat[n // 2], close.iat[-1])
+        if 'volume' in df.columns:
+            fingerprint += (df['volume'].iat[-1],)
+        return (df.attrs.get('symbol'), df.attrs.get('timeframe'), n, df.index[0], df.index[-1], last_ts) + fingerprint
+
+    def get_or_compute(self, df: pd.DataFrame, name: str, params: Tuple, compute_fn: Callable[[], pd.Series]) -> pd.Series:
+        """
+        获取指标序列，缓存未命中时调用compute_fn计算并写入缓存
+
+        Args:
+            df: 指标所基于的DataFrame
+            name: 指标名称
+            params: 指标参数
+            compute_fn: 无参计算函数
+
+        Returns:
+            指标序列（调用方不应修改）
+        """
+        key = (name, params) + self.frame_key(df)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute_fn()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def reset_stats(self):
+        """重置统计（每轮扫描开始时调用）"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局指标缓存实例
+indicator_cache = IndicatorCache(INDICATOR_CACHE_CONFIG.get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+
+def _get(df: pd.DataFrame, name: str, params: Tuple, batch_fn: Callable[[], pd.Series]) -> pd.Series:
+    """先查缓存，未命中时通过增量指标引擎计算（不支持增量时退化为批量计算）"""
+    return indicator_cache.get_or_compute(df, name, params, lambda: incremental_engine.series(df, name, params, batch_fn))
+
+
+def sma(df: pd.DataFrame, column: str, window: int) -> pd.Series:
+    """简单移动平均"""
+    return _get(df, 'sma', (column, window), lambda: df[column].rolling(window).mean())
+
+
+def rolling_std(df: pd.DataFrame, column: str, window: int) -> pd.Series:
+    """滚动标准差"""
+    return _get(df, 'std', (column, window), lambda: df[column].rolling(window).std())
+
+
+def rolling_min(df: pd.DataFrame, column: str, window: int) -> pd.Series:
+    """滚动最小值"""
+    return _get(df, 'min', (column, window), lambda: df[column].rolling(window).min())
+
+
+def rolling_max(df: pd.DataFrame, column: str, window: int) -> pd.Series:
+    """滚动最大值"""
+    return _get(df, 'max', (column, window), lambda: df[column].rolling(window).max())
+
+
+def ema(df: pd.DataFrame, column: str, span: int) -> pd.Series:
+    """指数移动平均（adjust=False）"""
+    return _get(df, 'ema', (column, span), lambda: df[column].ewm(span=span, adjust=False).mean())
+
+
+def rsi(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    """RSI（涨跌幅使用简单移动平均）"""
+    def compute():
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+    return _get(df, 'rsi', (window,), compute)
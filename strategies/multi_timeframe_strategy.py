@@ -8,14 +8,14 @@ import pandas as pd
 import numpy as np
 import json
 import os
-import redis
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from lib2 import get_okx_positions  # 导入获取OKX仓位数据的函数
+from lib.tool.position_service import get_position_service, normalize_symbol
+from lib.tool.instrument_id import SymbolIndex
+from lib.tool.report_artifact import write_report_artifact
 from dataclasses import dataclass, field, make_dataclass
 import logging
 import sys
-import ccxt
 from strategies.condition_analyzer import calculate_trend_indicators_and_score, calculate_rsi_score, calculate_volume_score, calculate_rsi_crossover_score
 
 # 添加项目根目录到路径
@@ -68,22 +68,13 @@ if not logger.handlers:
 
 # 导入项目模块
 from strategies.base_strategy import BaseStrategy
+from lib.tool.candle_frame import as_frame
 import sys
 import os
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# 导入lib.py文件作为一个模块
-import importlib.util
-# 动态导入lib.py文件
-spec = importlib.util.spec_from_file_location("lib_module", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib2.py"))
-lib_module = importlib.util.module_from_spec(spec)
-sys.modules["lib_module"] = lib_module
-spec.loader.exec_module(lib_module)
-# 从导入的模块中获取函数
-calculate_atr = lib_module.calculate_atr
-send_trading_signal_to_api = lib_module.send_trading_signal_to_api
-get_okx_positions = lib_module.get_okx_positions
-from okx.Account import AccountAPI
+# 从lib2导入函数（与其它模块共用同一个lib2模块，不再重复执行lib2.py）
+from lib2 import calculate_atr, send_trading_signal_to_api
 from config import REDIS_CONFIG
 
 # 动态创建MultiTimeframeSignal类
@@ -113,8 +104,10 @@ def create_multi_timeframe_signal_class():
     # 组合所有字段，确保非默认参数在前，默认参数在后
     fields = non_default_fields + default_fields
     
-    # 创建数据类
-    return make_dataclass('MultiTimeframeSignal', fields)
+    # 创建数据类（__module__默认为types，需要指向本模块，进程池才能pickle分析结果；make_dataclass的module参数需要Python 3.12+）
+    signal_class = make_dataclass('MultiTimeframeSignal', fields)
+    signal_class.__module__ = __name__
+    return signal_class
 
 # 创建MultiTimeframeSignal类
 MultiTimeframeSignal = create_multi_timeframe_signal_class()
@@ -152,6 +145,8 @@ class MultiTimeframeStrategy(BaseStrategy):
             MultiTimeframeSignal对象或None
         """
         try:
+            # 扫描器传入的可能是CandleArray，统一转换为DataFrame
+            data = {tf: as_frame(df) for tf, df in data.items()}
             signals = {} 
             strengths = {} 
             
@@ -371,27 +366,20 @@ class MultiTimeframeStrategy(BaseStrategy):
                 max_positions = self.config.get('MAX_POSITIONS', 30)  # 使用策略中的默认值
                 self.logger.info(f"当前配置: MAX_POSITIONS={max_positions}")
                 
-                # 调用lib中的函数获取仓位数据
-                self.logger.info(f"调用get_okx_positions，传入的exchange对象: {type(self.exchange).__name__}")
-                formatted_positions = get_okx_positions(self.exchange)
-                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)}")
+                # 调用仓位快照服务获取仓位数据（同一账户的多处调用合并为一次交易所请求）
+                self.logger.info(f"获取仓位快照，传入的exchange对象: {type(self.exchange).__name__}")
+                snapshot = get_position_service(self.exchange).get(self.config.get('POSITION_MAX_AGE'))
+                formatted_positions = snapshot.positions
+                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)} (快照版本 {snapshot.version}, {snapshot.age:.1f}秒前)")
                 if formatted_positions:
                     self.logger.info(f"当前持仓数据示例: {formatted_positions[:2]}")  # 只显示前2个持仓，避免日志过长
                 
-                # 提取已持有的标的并标准化格式
-                held_symbols_converted = []
-                for position in formatted_positions:
-                    symbol = position.get('symbol', '')
-                    if symbol:
-                        # 标准化持仓标的格式
-                        # 1. 移除永续合约后缀（如'-SWAP'）
-                        # 2. 统一转换为大写
-                        standard_symbol = symbol.replace(':USDT', '').upper()
-                        held_symbols_converted.append(standard_symbol)
+                # 已持有的标的（快照中按标准化交易对建立的集合）
+                held_symbols_converted = sorted(snapshot.held)
                 
                 # 检查持仓数量是否超过最大限制
                 max_positions = self.config.get('MAX_POSITIONS', 30)  # 使用策略中的默认值
-                current_position_count = len(held_symbols_converted)
+                current_position_count = snapshot.count
                 
                 # 记录持仓信息
                 self.logger.info(f"当前持仓数量: {current_position_count}, 持仓标的: {held_symbols_converted}")
@@ -413,14 +401,11 @@ class MultiTimeframeStrategy(BaseStrategy):
                             if not signal_symbol:
                                 continue
                                 
-                            # 标准化交易信号中的标的格式
-                            standard_signal_symbol = signal_symbol.replace(':USDT', '').upper()
-                            
-                            # 检查是否匹配已持仓
-                            if standard_signal_symbol not in held_symbols_converted:
+                            # 检查是否匹配已持仓（标准化后O(1)判断）
+                            if not snapshot.is_held(signal_symbol):
                                 filtered_signals.append(signal)
                             else:
-                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {standard_signal_symbol})")
+                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {normalize_symbol(signal_symbol)})")
                         except Exception as e:
                             self.logger.error(f"处理交易信号时出错: {e}")
                             # 出错时保留该信号，避免误过滤
@@ -447,51 +432,26 @@ class MultiTimeframeStrategy(BaseStrategy):
         # 修复括号不匹配问题，移除了多余的右括号
         positions_needing_attention = []
         
+        # 按标的键建立交易机会索引（同一标的取第一个机会），每个持仓O(1)查找，
+        # BTC/USDT:USDT、BTC-USDT-SWAP 等写法的持仓都能匹配到 BTC/USDT 的交易机会
+        opportunity_index = SymbolIndex(opportunities, symbol_of=lambda opp: getattr(opp, 'symbol', ''))
+        
         for position in current_positions:
             # 获取持仓的交易对
             pos_symbol = position.get('symbol', '')
             if not pos_symbol:
                 continue
             
-            # 提取标的名称（去掉合约后缀）
-            if ':' in pos_symbol:
-                base_symbol = pos_symbol.split(':')[0]  # 例如 BTC/USDT:USDT -> BTC/USDT
-            else:
-                base_symbol = pos_symbol
-            
-            # 标准化标的名称以提高匹配成功率
-            # 转换为大写并去除可能的空格
-            normalized_symbol = base_symbol.strip().upper()
+            related_opportunity = opportunity_index.first(pos_symbol)
+            related_action = getattr(related_opportunity, 'overall_action', None)
             
-            # 检查多头仓位
+            # 检查多头仓位：策略建议卖出
             if position.get('posSide') == 'long':
-                # 查找是否有策略建议卖出 - 使用更健壮的匹配方式
-                related_opportunity = None
-                for opp in opportunities:
-                    if hasattr(opp, 'symbol'):
-                        # 对机会中的标的也进行标准化处理
-                        opp_symbol = getattr(opp, 'symbol', '').strip().upper()
-                        # 尝试完全匹配或部分匹配
-                        if normalized_symbol == opp_symbol or normalized_symbol.replace('/', '') == opp_symbol.replace('/', ''):
-                            related_opportunity = opp
-                            break
-                            
-                if related_opportunity and hasattr(related_opportunity, 'overall_action') and related_opportunity.overall_action == "卖出":
+                if related_action == "卖出":
                     positions_needing_attention.append({**position, 'reason': f'{self.get_name()}策略建议平仓'})
-            # 检查空头仓位
+            # 检查空头仓位：策略建议买入
             elif position.get('posSide') == 'short':
-                # 查找是否有策略建议买入 - 使用更健壮的匹配方式
-                related_opportunity = None
-                for opp in opportunities:
-                    if hasattr(opp, 'symbol'):
-                        # 对机会中的标的也进行标准化处理
-                        opp_symbol = getattr(opp, 'symbol', '').strip().upper()
-                        # 尝试完全匹配或部分匹配（去除斜杠等特殊字符后）
-                        if normalized_symbol == opp_symbol or normalized_symbol.replace('/', '') == opp_symbol.replace('/', ''):
-                            related_opportunity = opp
-                            break
-                            
-                if related_opportunity and hasattr(related_opportunity, 'overall_action') and related_opportunity.overall_action == "买入":
+                if related_action == "买入":
                     positions_needing_attention.append({**position, 'reason': f'{self.get_name()}策略建议平仓'})
             
             # 检查持仓时间超过5小时的标的
@@ -533,9 +493,10 @@ class MultiTimeframeStrategy(BaseStrategy):
         # 文件名固定为multi_timeframe_analysis_new.txt
         filename = os.path.join(report_dir, "multi_timeframe_analysis_new.txt")
         
+        analysis_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(filename, 'w', encoding='utf-8') as f:
             # 写入报告头部
-            f.write("=" * 80 + "\n" + "📊 多时间框架专业分析报告\n" + "=" * 80 + "\n" + f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n" + f"时间框架维度: 周线→日线→4小时→1小时→15分钟\n" + f"发现机会: {len(all_opportunities)}\n" + f"策略名称: {self.get_name()}\n" + "=" * 80 + "\n\n")
+            f.write("=" * 80 + "\n" + "📊 多时间框架专业分析报告\n" + "=" * 80 + "\n" + f"分析时间: {analysis_time}\n" + f"时间框架维度: 周线→日线→4小时→1小时→15分钟\n" + f"发现机会: {len(all_opportunities)}\n" + f"策略名称: {self.get_name()}\n" + "=" * 80 + "\n\n")
             
             # 写入每个交易机会
             for i, opportunity in enumerate(all_opportunities, 1):
@@ -568,6 +529,9 @@ class MultiTimeframeStrategy(BaseStrategy):
                 # 写入交易机会信息
                 f.write(f"【机会 {i}】\n" + "-" * 60 + "\n" + f"交易对: {symbol}\n" + f"综合建议: {overall_action}\n" + f"信心等级: {confidence_level}\n" + f"总评分: {total_score:.3f}\n" + f"当前价格: {entry_price:.6f}\n" + f"周线趋势: {weekly_trend}\n" + f"日线趋势: {daily_trend}\n" + f"4小时信号: {h4_signal}\n" + f"1小时信号: {h1_signal}\n" + f"15分钟信号: {m15_signal}\n" + f"短期目标: {target_short:.6f}\n" + f"止损价格: {stop_loss:.6f}\n" + f"分析依据: {reasoning_text}\n" + "\n" + "=" * 80 + "\n\n")
         
+        # 同时写入结构化报告，报告查看器直接加载，不再正则解析txt
+        write_report_artifact(filename, all_opportunities, analysis_time, self.get_name())
+
         logger.info(f"✅ 多时间框架分析报告已保存至: {filename}")
         return filename
         
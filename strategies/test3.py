@@ -8,15 +8,17 @@ import pandas as pd
 import numpy as np
 import json
 import os
-import redis
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from lib2 import get_okx_positions  # 导入获取OKX仓位数据的函数
+from lib.tool.position_service import get_position_service, normalize_symbol
+from lib.tool.instrument_id import SymbolIndex
+from lib.tool.report_artifact import write_report_artifact
+from lib.tool.redis_pool import get_redis_pool
 from dataclasses import dataclass, field, make_dataclass
 import logging
 import sys
-import ccxt
 from strategies.condition_analyzer import calculate_ema_trend_indicators_and_score, calculate_rsi_score, calculate_volume_score, calculate_rsi_crossover_score
+from strategies.cross_sectional import UniverseMatrix, ema_trend_scores, volume_scores, rsi_crossover_scores
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -75,19 +77,12 @@ import sys
 import os
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# 导入lib.py文件作为一个模块
-import importlib.util
-# 动态导入lib.py文件
-spec = importlib.util.spec_from_file_location("lib_module", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib2.py"))
-lib_module = importlib.util.module_from_spec(spec)
-sys.modules["lib_module"] = lib_module
-spec.loader.exec_module(lib_module)
-# 从导入的模块中获取函数
-calculate_atr = lib_module.calculate_atr
-send_trading_signal_to_api = lib_module.send_trading_signal_to_api
-get_okx_positions = lib_module.get_okx_positions
-from okx.Account import AccountAPI
+# 从lib2导入函数（与其它模块共用同一个lib2模块，不再重复执行lib2.py）
+import lib2
+from lib2 import calculate_atr, send_trading_signal_to_api
 from config import REDIS_CONFIG
+from lib.tool.timeframe_alignment import TimeframeAligner
+from lib.tool.candle_frame import as_frame
 
 # 动态创建MultiTimeframeSignal类
 def create_multi_timeframe_signal_class():
@@ -131,8 +126,10 @@ def create_multi_timeframe_signal_class():
     # 组合所有字段，确保非默认参数在前，默认参数在后
     fields = non_default_fields + default_fields
     
-    # 创建数据类
-    return make_dataclass('MultiTimeframeSignal', fields)
+    # 创建数据类（__module__默认为types，需要指向本模块，进程池才能pickle分析结果；make_dataclass的module参数需要Python 3.12+）
+    signal_class = make_dataclass('MultiTimeframeSignal', fields)
+    signal_class.__module__ = __name__
+    return signal_class
 
 # 创建MultiTimeframeSignal类
 MultiTimeframeSignal = create_multi_timeframe_signal_class()
@@ -172,6 +169,8 @@ class MultiTimeframeStrategy(BaseStrategy):
             MultiTimeframeSignal对象或None
         """
         try:
+            # 扫描器传入的可能是CandleArray，统一转换为DataFrame
+            data = {tf: as_frame(df) for tf, df in data.items()}
             signals = {} 
             strengths = {} 
             
@@ -203,20 +202,6 @@ class MultiTimeframeStrategy(BaseStrategy):
                     total_score -= strength * weight
                     reasoning.append(f"{tf}:{signal}")
             
-            # 确定综合操作：根据配置的阈值判断买入、卖出或观望
-            if total_score >= self.config['BUY_THRESHOLD']:
-                overall_action = "买入"
-                confidence = "高"
-            elif total_score <= self.config['SELL_THRESHOLD']:
-                overall_action = "卖出"
-                confidence = "高"
-            else:
-                overall_action = "观望"
-                confidence = "低"
-            
-            # 添加详细日志，记录每个交易对的分析结果
-            # logger.info(f"{symbol} 分析结果 - 总分: {total_score:.3f}, 操作: {overall_action}, 信号: {signals}")
-            
             # 获取15分钟时间框架的数据来计算ATR
             df_15m = data.get('15m')
             if df_15m is None or df_15m.empty:
@@ -226,77 +211,96 @@ class MultiTimeframeStrategy(BaseStrategy):
             # 计算ATR值
             atr_value = calculate_atr(df_15m)
             
-            # 检查是否存在观望信号
-            has_neutral = any("观望" in signal for signal in signals.values())
-            
-            # 过滤掉"观望"信号
-            valid_signals = [signal for signal in signals.values() if "观望" not in signal]
-            
-            # 只有当没有观望信号且所有有效信号方向一致时，才算一致
-            all_agreed = False
-            if not has_neutral and valid_signals:
-                # 检查所有有效信号是否方向一致
-                first_direction = "买入" if "买入" in valid_signals[0] else "卖出"
-                all_agreed = all(first_direction in signal for signal in valid_signals)
-            
-            # 根据是否所有时间框架一致决定使用的TARGET_MULTIPLIER
-            target_multiplier = self.config['TARGET_MULTIPLIER']
-            if all_agreed:
-                target_multiplier *= 3  # 所有时间框架一致时，使用3倍的TARGET_MULTIPLIER
-            
-            # 根据交易方向计算ATR相关价格（做多/做空）
-            if overall_action == "买入":
-                # 买入方向：
-                # - target_multiplier倍ATR作为短期目标（当前价格 + target_multiplier*ATR）
-                # - STOP_LOSS_MULTIPLIER倍ATR作为止损价格（当前价格 - STOP_LOSS_MULTIPLIER*ATR）
-                atr_one = current_price + atr_value
-                target_short = current_price + target_multiplier * atr_value
-                stop_loss = current_price - self.config['STOP_LOSS_MULTIPLIER'] * atr_value
-            else:
-                # 卖出方向：
-                # - target_multiplier倍ATR作为短期目标（当前价格 - target_multiplier*ATR）
-                # - STOP_LOSS_MULTIPLIER倍ATR作为止损价格（当前价格 + STOP_LOSS_MULTIPLIER*ATR）
-                atr_one = current_price - atr_value
-                target_short = current_price - target_multiplier * atr_value
-                stop_loss = current_price + self.config['STOP_LOSS_MULTIPLIER'] * atr_value
-            
-            # 移除中期和长期目标
-            target_medium = 0.0
-            target_long = 0.0
-            
-            # 创建动态时间框架信号字典，基于TIMEFRAME_DATA_LENGTHS配置
-            timeframe_signals = {}
-            for timeframe in TRADING_CONFIG.get('TIMEFRAME_DATA_LENGTHS', {}).keys():
-                timeframe_signals[timeframe] = signals.get(timeframe, '观望')
-            
-            # 过滤信号应该移动到这里
-
-            return MultiTimeframeSignal(
-                symbol=symbol,
-                weekly_trend="观望",  # 默认值，不再使用
-                daily_trend="观望",   # 默认值，不再使用
-                h4_signal=signals.get('4h', '观望'),
-                h1_signal=signals.get('1h', '观望'),
-                m15_signal=signals.get('15m', '观望'),
-                timeframe_signals=timeframe_signals,
-                overall_action=overall_action,
-                confidence_level=confidence,
-                total_score=total_score,
-                entry_price=current_price,
-                target_short=target_short,
-                target_medium=target_medium,
-                target_long=target_long,
-                stop_loss=stop_loss,
-                atr_one=atr_one,
-                reasoning=reasoning,
-                timestamp=datetime.now()
-            )
+            return self._build_signal(symbol, signals, total_score, reasoning, current_price, atr_value)
         
         except Exception as e:
             # 实际使用时应该记录日志
             print(f"多时间框架分析{symbol}失败: {e}")
             return None
             
+    def _build_signal(self, symbol: str, signals: Dict[str, str], total_score: float, reasoning: List[str],
+                      current_price: float, atr_value: float) -> MultiTimeframeSignal:
+        """根据各时间框架的信号和综合评分构造MultiTimeframeSignal（analyze和analyze_universe共用）"""
+        # 确定综合操作：根据配置的阈值判断买入、卖出或观望
+        if total_score >= self.config['BUY_THRESHOLD']:
+            overall_action = "买入"
+            confidence = "高"
+        elif total_score <= self.config['SELL_THRESHOLD']:
+            overall_action = "卖出"
+            confidence = "高"
+        else:
+            overall_action = "观望"
+            confidence = "低"
+        
+        # 添加详细日志，记录每个交易对的分析结果
+        # logger.info(f"{symbol} 分析结果 - 总分: {total_score:.3f}, 操作: {overall_action}, 信号: {signals}")
+        
+        # 检查是否存在观望信号
+        has_neutral = any("观望" in signal for signal in signals.values())
+        
+        # 过滤掉"观望"信号
+        valid_signals = [signal for signal in signals.values() if "观望" not in signal]
+        
+        # 只有当没有观望信号且所有有效信号方向一致时，才算一致
+        all_agreed = False
+        if not has_neutral and valid_signals:
+            # 检查所有有效信号是否方向一致
+            first_direction = "买入" if "买入" in valid_signals[0] else "卖出"
+            all_agreed = all(first_direction in signal for signal in valid_signals)
+        
+        # 根据是否所有时间框架一致决定使用的TARGET_MULTIPLIER
+        target_multiplier = self.config['TARGET_MULTIPLIER']
+        if all_agreed:
+            target_multiplier *= 3  # 所有时间框架一致时，使用3倍的TARGET_MULTIPLIER
+        
+        # 根据交易方向计算ATR相关价格（做多/做空）
+        if overall_action == "买入":
+            # 买入方向：
+            # - target_multiplier倍ATR作为短期目标（当前价格 + target_multiplier*ATR）
+            # - STOP_LOSS_MULTIPLIER倍ATR作为止损价格（当前价格 - STOP_LOSS_MULTIPLIER*ATR）
+            atr_one = current_price + atr_value
+            target_short = current_price + target_multiplier * atr_value
+            stop_loss = current_price - self.config['STOP_LOSS_MULTIPLIER'] * atr_value
+        else:
+            # 卖出方向：
+            # - target_multiplier倍ATR作为短期目标（当前价格 - target_multiplier*ATR）
+            # - STOP_LOSS_MULTIPLIER倍ATR作为止损价格（当前价格 + STOP_LOSS_MULTIPLIER*ATR）
+            atr_one = current_price - atr_value
+            target_short = current_price - target_multiplier * atr_value
+            stop_loss = current_price + self.config['STOP_LOSS_MULTIPLIER'] * atr_value
+        
+        # 移除中期和长期目标
+        target_medium = 0.0
+        target_long = 0.0
+        
+        # 创建动态时间框架信号字典，基于TIMEFRAME_DATA_LENGTHS配置
+        timeframe_signals = {}
+        for timeframe in TRADING_CONFIG.get('TIMEFRAME_DATA_LENGTHS', {}).keys():
+            timeframe_signals[timeframe] = signals.get(timeframe, '观望')
+        
+        # 过滤信号应该移动到这里
+
+        return MultiTimeframeSignal(
+            symbol=symbol,
+            weekly_trend="观望",  # 默认值，不再使用
+            daily_trend="观望",   # 默认值，不再使用
+            h4_signal=signals.get('4h', '观望'),
+            h1_signal=signals.get('1h', '观望'),
+            m15_signal=signals.get('15m', '观望'),
+            timeframe_signals=timeframe_signals,
+            overall_action=overall_action,
+            confidence_level=confidence,
+            total_score=total_score,
+            entry_price=current_price,
+            target_short=target_short,
+            target_medium=target_medium,
+            target_long=target_long,
+            stop_loss=stop_loss,
+            atr_one=atr_one,
+            reasoning=reasoning,
+            timestamp=datetime.now()
+        )
+    
     def _analyze_timeframe(self, df: pd.DataFrame, timeframe: str) -> tuple:
         """分析单个时间框架"""
         if df.empty or len(df) < 20:
@@ -336,6 +340,241 @@ class MultiTimeframeStrategy(BaseStrategy):
         strength = min(abs(score) / 4.0, 1.0)
         return action, strength
     
+    def analyze_universe(self, universe: Dict[str, Dict[str, Any]]) -> Dict[str, MultiTimeframeSignal]:
+        """
+        横截面分析模式：把所有交易对同一时间框架的K线堆叠为矩阵，一次计算整个交易对池的评分，
+        只为综合评分达到BUY_THRESHOLD/SELL_THRESHOLD的交易对构造信号，结果与逐个调用analyze一致
+        
+        Args:
+            universe: {交易对: {timeframe: CandleArray或DataFrame}}
+        
+        Returns:
+            {交易对: MultiTimeframeSignal}，只包含综合操作为买入/卖出的交易对
+        """
+        # 时间框架集合（及顺序）相同的交易对一起计算，保证与analyze相同的累加顺序
+        groups: Dict[tuple, List[str]] = {}
+        for symbol, data in universe.items():
+            groups.setdefault(tuple(data), []).append(symbol)
+        
+        weights = {'4h': 0.4, '1h': 0.4, '15m': 0.2}
+        period = lib2.TRADING_CONFIG.get('ATR_PERIOD', 14)
+        results = {}
+        for timeframes, symbols in groups.items():
+            if len(timeframes) < 3:  # 至少需要3个时间框架
+                continue
+            total_score = np.zeros(len(symbols))
+            actions = {}
+            matrices = {}
+            for tf in timeframes:
+                matrices[tf] = UniverseMatrix({symbol: universe[symbol][tf] for symbol in symbols})
+                tf_actions, strengths = self._analyze_timeframe_universe(matrices[tf], tf)
+                sign = np.where(np.char.find(tf_actions.astype(str), "买入") >= 0, 1.0,
+                                np.where(np.char.find(tf_actions.astype(str), "卖出") >= 0, -1.0, 0.0))
+                total_score = total_score + sign * strengths * weights.get(tf, 0.1)
+                actions[tf] = tf_actions
+            
+            crossing = np.flatnonzero((total_score >= self.config['BUY_THRESHOLD']) |
+                                      (total_score <= self.config['SELL_THRESHOLD']))
+            if not len(crossing):
+                continue
+            
+            # 当前价格与ATR使用15分钟时间框架（没有或为空时使用第一个时间框架），每个时间框架只计算一次
+            prices = {}
+            for i in crossing:
+                symbol = symbols[i]
+                price_tf = '15m' if '15m' in timeframes and len(universe[symbol]['15m']) else timeframes[0]
+                if price_tf not in prices:
+                    prices[price_tf] = (matrices[price_tf].last('close'), matrices[price_tf].atr_last(period))
+                current_price, atr_value = prices[price_tf][0][i], prices[price_tf][1][i]
+                signals = {tf: str(actions[tf][i]) for tf in timeframes}
+                reasoning = [f"{tf}:{signal}" for tf, signal in signals.items() if "买入" in signal or "卖出" in signal]
+                results[symbol] = self._build_signal(symbol, signals, float(total_score[i]), reasoning,
+                                                     float(current_price), float(atr_value))
+        return results
+    
+    def _analyze_timeframe_universe(self, matrix: UniverseMatrix, timeframe: str) -> tuple:
+        """_analyze_timeframe的横截面版本，返回 (操作数组, 强度数组)"""
+        if timeframe == self.config["SIGNAL_TRIGGER_TIMEFRAME"]:
+            score = rsi_crossover_scores(matrix, window=7)
+        else:
+            score = ema_trend_scores(matrix, timeframe) + volume_scores(matrix)
+        
+        if timeframe in ['5m', '15m']:
+            score = score * 0.8
+        
+        # K线不足20根时观望
+        score = np.where(matrix.lengths < 20, 0.0, score)
+        action = np.select([score >= 2, score >= 1, score <= -2, score <= -1],
+                           ["强烈买入", "买入", "强烈卖出", "卖出"], default="观望").astype(object)
+        strength = np.minimum(np.abs(score) / 4.0, 1.0)
+        return action, strength
+    
+    def analyze_series(self, symbol: str, data: Dict[str, pd.DataFrame], base_times: pd.Series) -> Optional[Dict[str, Any]]:
+        """
+        批量分析模式：在完整历史数据上一次性计算指标，结果与逐根K线调用analyze一致
+        
+        Args:
+            symbol: 交易对符号
+            data: 完整历史的多时间框架数据，格式为 {timeframe: dataframe}
+            base_times: 基准时间框架每根K线的时间
+        
+        Returns:
+            与base_times等长的数组字典，包含valid/total_score/overall_action/entry_price/stop_loss/target_short/atr_one/timeframe_signals
+        """
+        try:
+            window_sizes = self.get_required_timeframes()
+            aligner = TimeframeAligner(base_times, data, window_sizes)
+            n = len(aligner)
+            
+            # 至少需要3个时间框架，且每个时间框架都要有对应的K线
+            valid = np.full(n, len(data) >= 3)
+            total_score = np.zeros(n)
+            signs = {}
+            timeframe_signals = {}
+            weights = {'4h': 0.4, '1h': 0.4, '15m': 0.2}
+            for tf, df in data.items():
+                actions, strengths = self._analyze_timeframe_series(df, tf, window_sizes.get(tf, 168))
+                end_index = aligner.end_index[tf]
+                valid &= end_index >= 0
+                safe_index = np.maximum(end_index, 0)
+                tf_actions = actions[safe_index]
+                tf_sign = np.where(np.char.find(tf_actions.astype(str), "买入") >= 0, 1.0,
+                                   np.where(np.char.find(tf_actions.astype(str), "卖出") >= 0, -1.0, 0.0))
+                # 与analyze中相同的累加顺序，保证浮点结果一致
+                total_score = total_score + tf_sign * strengths[safe_index] * weights.get(tf, 0.1)
+                signs[tf] = tf_sign
+                timeframe_signals[tf] = tf_actions
+            
+            overall_action = np.where(total_score >= self.config['BUY_THRESHOLD'], "买入",
+                                      np.where(total_score <= self.config['SELL_THRESHOLD'], "卖出", "观望")).astype(object)
+            
+            # 当前价格与ATR使用15分钟时间框架（没有时使用第一个时间框架）
+            price_tf = '15m' if '15m' in data else list(data.keys())[0]
+            price_df = data[price_tf]
+            price_index = np.maximum(aligner.end_index[price_tf], 0)
+            close = price_df['close'].to_numpy(dtype='float64')
+            entry_price = close[price_index]
+            atr_value = self._atr_series(price_df, window_sizes.get(price_tf, 168))[price_index]
+            
+            # 所有时间框架都没有观望信号且方向一致时，使用3倍TARGET_MULTIPLIER
+            sign_matrix = np.vstack([signs[tf] for tf in data])
+            all_agreed = np.all(sign_matrix != 0, axis=0) & (np.all(sign_matrix > 0, axis=0) | np.all(sign_matrix < 0, axis=0))
+            target_multiplier = np.where(all_agreed, self.config['TARGET_MULTIPLIER'] * 3, self.config['TARGET_MULTIPLIER'])
+            
+            direction = np.where(overall_action == "买入", 1.0, -1.0)
+            return {
+                'valid': valid,
+                'total_score': total_score,
+                'overall_action': overall_action,
+                'entry_price': entry_price,
+                'atr_one': entry_price + direction * atr_value,
+                'target_short': entry_price + direction * target_multiplier * atr_value,
+                'stop_loss': entry_price - direction * self.config['STOP_LOSS_MULTIPLIER'] * atr_value,
+                'timeframe_signals': timeframe_signals,
+            }
+        except Exception as e:
+            self.logger.error(f"批量分析{symbol}失败，回退到逐根K线分析: {e}")
+            return None
+    
+    def build_signal_from_series(self, symbol: str, series: Dict[str, Any], i: int) -> Optional[MultiTimeframeSignal]:
+        """根据analyze_series的结果构造第i根基准K线的MultiTimeframeSignal，观望或数据不足时返回None"""
+        if not series['valid'][i] or series['overall_action'][i] == "观望":
+            return None
+        signals = {tf: str(actions[i]) for tf, actions in series['timeframe_signals'].items()}
+        reasoning = [f"{tf}:{signal}" for tf, signal in signals.items() if "买入" in signal or "卖出" in signal]
+        timeframe_signals = {timeframe: signals.get(timeframe, '观望') for timeframe in TRADING_CONFIG.get('TIMEFRAME_DATA_LENGTHS', {}).keys()}
+        return MultiTimeframeSignal(
+            symbol=symbol,
+            weekly_trend="观望",
+            daily_trend="观望",
+            h4_signal=signals.get('4h', '观望'),
+            h1_signal=signals.get('1h', '观望'),
+            m15_signal=signals.get('15m', '观望'),
+            timeframe_signals=timeframe_signals,
+            overall_action=series['overall_action'][i],
+            confidence_level="高",
+            total_score=float(series['total_score'][i]),
+            entry_price=float(series['entry_price'][i]),
+            target_short=float(series['target_short'][i]),
+            target_medium=0.0,
+            target_long=0.0,
+            stop_loss=float(series['stop_loss'][i]),
+            atr_one=float(series['atr_one'][i]),
+            reasoning=reasoning,
+            timestamp=datetime.now()
+        )
+    
+    def _analyze_timeframe_series(self, df: pd.DataFrame, timeframe: str, window_size: int) -> tuple:
+        """
+        _analyze_timeframe的批量版本：对该时间框架的每根K线，计算以它结尾、长度为window_size的窗口上的信号
+        
+        Returns:
+            (actions数组, strengths数组)，长度与df相同
+        """
+        close = df['close'].astype('float64')
+        n = len(close)
+        index = np.arange(n)
+        length = np.minimum(index + 1, window_size)
+        score = np.zeros(n)
+        
+        if timeframe == self.config["SIGNAL_TRIGGER_TIMEFRAME"]:
+            # RSI交叉评分（只依赖最近几根K线，与窗口起点无关）
+            window = 7
+            delta = close.diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+            rsi = (100 - (100 / (1 + gain / loss))).to_numpy()
+            prev_rsi = np.concatenate([[np.nan], rsi[:-1]])
+            score += np.where((prev_rsi < 30) & (rsi > 30), 2, np.where((prev_rsi > 70) & (rsi < 70), -2, 0))
+        else:
+            price = close.to_numpy()
+            # EMA从窗口起点开始初始化，使用全历史EMA换算出窗口内EMA
+            start = index - length + 1
+            ema_20 = self._windowed_ema(close, 20, start)
+            ema_50 = np.where(length >= 50, self._windowed_ema(close, 50, start), price)
+            trend = np.select(
+                [(price > ema_20) & (ema_20 > ema_50), price > ema_20, (price < ema_20) & (ema_20 < ema_50), price < ema_20],
+                [2, 1, -2, -1], default=0
+            ) if timeframe != "15m" else np.zeros(n)
+            volume = df['volume'].astype('float64')
+            volume_avg = volume.rolling(20).mean().to_numpy()
+            volume_ratio = np.where(volume_avg > 0, volume.to_numpy() / np.where(volume_avg > 0, volume_avg, 1), 1)
+            score += trend + np.where(volume_ratio > 1.5, 1, np.where(volume_ratio < 0.5, -1, 0))
+        
+        if timeframe in ['5m', '15m']:
+            score *= 0.8
+        
+        actions = np.select([score >= 2, score >= 1, score <= -2, score <= -1],
+                            ["强烈买入", "买入", "强烈卖出", "卖出"], default="观望").astype(object)
+        strengths = np.minimum(np.abs(score) / 4.0, 1.0)
+        # 窗口不足20根K线时与_analyze_timeframe一样返回观望
+        short = length < 20
+        actions[short] = "观望"
+        strengths[short] = 0.0
+        return actions, strengths
+    
+    @staticmethod
+    def _windowed_ema(close: pd.Series, span: int, start: np.ndarray) -> np.ndarray:
+        """
+        计算每根K线在 [start, 当前] 窗口上从头初始化的EMA（adjust=False）
+        利用全历史EMA: 窗口EMA_e = EMA_e - (1-a)^(e-s) * (EMA_s - close_s)
+        """
+        alpha = 2.0 / (span + 1)
+        full = close.ewm(span=span, adjust=False).mean().to_numpy()
+        price = close.to_numpy()
+        decay = (1 - alpha) ** (np.arange(len(price)) - start)
+        return full - decay * (full[start] - price[start])
+    
+    @staticmethod
+    def _atr_series(df: pd.DataFrame, window_size: int) -> np.ndarray:
+        """calculate_atr的批量版本，窗口不足ATR周期时为0"""
+        period = lib2.TRADING_CONFIG.get('ATR_PERIOD', 14)
+        prev_close = df['close'].shift(1)
+        tr = np.maximum(df['high'] - df['low'], np.maximum(abs(df['high'] - prev_close), abs(df['low'] - prev_close)))
+        atr = tr.rolling(window=period).mean().to_numpy()
+        length = np.minimum(np.arange(len(df)) + 1, window_size)
+        return np.where(length >= period, atr, 0.0)
+    
     def get_required_timeframes(self) -> Dict[str, int]:
         """
         获取策略所需的时间框架和数据长度
@@ -343,7 +582,8 @@ class MultiTimeframeStrategy(BaseStrategy):
         Returns:
             字典，键为时间框架名称，值为所需数据长度
         """
-        return TRADING_CONFIG.get('TIMEFRAME_DATA_LENGTHS', {
+        # 使用实例配置（参数扫描可以替换各时间框架的数据长度），时间框架本身仍由TRADING_CONFIG决定
+        return self.config.get('TIMEFRAME_DATA_LENGTHS') or TRADING_CONFIG.get('TIMEFRAME_DATA_LENGTHS', {
             '4h': 168,   # 4小时
             '1h': 168,   # 1小时
             '15m': 168   # 15分钟
@@ -414,17 +654,9 @@ class MultiTimeframeStrategy(BaseStrategy):
                     elif 'LOSS' in self.config:
                         loss_value = self.config['LOSS']
                     
-                    # 从Redis中获取交易倍率trade_mul，默认为1
+                    # 从Redis中获取交易倍率trade_mul，默认为1（共享连接池，本地缓存几秒，同一轮的多个信号只读一次）
                     try:
-                        # 创建Redis连接
-                        r = redis.Redis(
-                            host=REDIS_CONFIG['ADDR'].split(':')[0],
-                            port=int(REDIS_CONFIG['ADDR'].split(':')[1]),
-                            password=REDIS_CONFIG['PASSWORD'],
-                            decode_responses=True
-                        )
-                        # 获取trade_mul值，如果不存在则使用默认值1
-                        trade_mul = float(r.get('trade_mul') or 1)
+                        trade_mul = get_redis_pool(REDIS_CONFIG).get_float('trade_mul', 1.0)
                         # 应用交易倍率
                         loss_value = loss_value * trade_mul
                         logger.info(f"应用交易倍率: {trade_mul}, 原始loss: {loss_value/trade_mul}, 调整后loss: {loss_value}")
@@ -468,27 +700,20 @@ class MultiTimeframeStrategy(BaseStrategy):
                 max_positions = self.config.get('MAX_POSITIONS', 30)  # 使用策略中的默认值
                 self.logger.info(f"当前配置: MAX_POSITIONS={max_positions}")
                 
-                # 调用lib中的函数获取仓位数据
-                self.logger.info(f"调用get_okx_positions，传入的exchange对象: {type(self.exchange).__name__}")
-                formatted_positions = get_okx_positions(self.exchange)
-                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)}")
+                # 调用仓位快照服务获取仓位数据（同一账户的多处调用合并为一次交易所请求）
+                self.logger.info(f"获取仓位快照，传入的exchange对象: {type(self.exchange).__name__}")
+                snapshot = get_position_service(self.exchange).get(self.config.get('POSITION_MAX_AGE'))
+                formatted_positions = snapshot.positions
+                self.logger.info(f"获取到的持仓数据数量: {len(formatted_positions)} (快照版本 {snapshot.version}, {snapshot.age:.1f}秒前)")
                 if formatted_positions:
                     self.logger.info(f"当前持仓数据示例: {formatted_positions[:2]}")  # 只显示前2个持仓，避免日志过长
                 
-                # 提取已持有的标的并标准化格式
-                held_symbols_converted = []
-                for position in formatted_positions:
-                    symbol = position.get('symbol', '')
-                    if symbol:
-                        # 标准化持仓标的格式
-                        # 1. 移除永续合约后缀（如'-SWAP'）
-                        # 2. 统一转换为大写
-                        standard_symbol = symbol.replace(':USDT', '').upper()
-                        held_symbols_converted.append(standard_symbol)
+                # 已持有的标的（快照中按标准化交易对建立的集合）
+                held_symbols_converted = sorted(snapshot.held)
                 
                 # 检查持仓数量是否超过最大限制
                 max_positions = self.config.get('MAX_POSITIONS', 30)  # 使用策略中的默认值
-                current_position_count = len(held_symbols_converted)
+                current_position_count = snapshot.count
                 
                 # 记录持仓信息
                 self.logger.info(f"当前持仓数量: {current_position_count}, 持仓标的: {held_symbols_converted}")
@@ -510,14 +735,11 @@ class MultiTimeframeStrategy(BaseStrategy):
                             if not signal_symbol:
                                 continue
                                 
-                            # 标准化交易信号中的标的格式
-                            standard_signal_symbol = signal_symbol.replace(':USDT', '').upper()
-                            
-                            # 检查是否匹配已持仓
-                            if standard_signal_symbol not in held_symbols_converted:
+                            # 检查是否匹配已持仓（标准化后O(1)判断）
+                            if not snapshot.is_held(signal_symbol):
                                 filtered_signals.append(signal)
                             else:
-                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {standard_signal_symbol})")
+                                self.logger.info(f"过滤掉已持仓标的: {signal_symbol} (标准化: {normalize_symbol(signal_symbol)})")
                         except Exception as e:
                             self.logger.error(f"处理交易信号时出错: {e}")
                             # 出错时保留该信号，避免误过滤
@@ -544,51 +766,26 @@ class MultiTimeframeStrategy(BaseStrategy):
         # 修复括号不匹配问题，移除了多余的右括号
         positions_needing_attention = []
         
+        # 按标的键建立交易机会索引（同一标的取第一个机会），每个持仓O(1)查找，
+        # BTC/USDT:USDT、BTC-USDT-SWAP 等写法的持仓都能匹配到 BTC/USDT 的交易机会
+        opportunity_index = SymbolIndex(opportunities, symbol_of=lambda opp: getattr(opp, 'symbol', ''))
+        
         for position in current_positions:
             # 获取持仓的交易对
             pos_symbol = position.get('symbol', '')
             if not pos_symbol:
                 continue
             
-            # 提取标的名称（去掉合约后缀）
-            if ':' in pos_symbol:
-                base_symbol = pos_symbol.split(':')[0]  # 例如 BTC/USDT:USDT -> BTC/USDT
-            else:
-                base_symbol = pos_symbol
+            related_opportunity = opportunity_index.first(pos_symbol)
+            related_action = getattr(related_opportunity, 'overall_action', None)
             
-            # 标准化标的名称以提高匹配成功率
-            # 转换为大写并去除可能的空格
-            normalized_symbol = base_symbol.strip().upper()
-            
-            # 检查多头仓位
+            # 检查多头仓位：策略建议卖出
             if position.get('posSide') == 'long':
-                # 查找是否有策略建议卖出 - 使用更健壮的匹配方式
-                related_opportunity = None
-                for opp in opportunities:
-                    if hasattr(opp, 'symbol'):
-                        # 对机会中的标的也进行标准化处理
-                        opp_symbol = getattr(opp, 'symbol', '').strip().upper()
-                        # 尝试完全匹配或部分匹配
-                        if normalized_symbol == opp_symbol or normalized_symbol.replace('/', '') == opp_symbol.replace('/', ''):
-                            related_opportunity = opp
-                            break
-                            
-                if related_opportunity and hasattr(related_opportunity, 'overall_action') and related_opportunity.overall_action == "卖出":
+                if related_action == "卖出":
                     positions_needing_attention.append({**position, 'reason': f'{self.get_name()}策略建议平仓'})
-            # 检查空头仓位
+            # 检查空头仓位：策略建议买入
             elif position.get('posSide') == 'short':
-                # 查找是否有策略建议买入 - 使用更健壮的匹配方式
-                related_opportunity = None
-                for opp in opportunities:
-                    if hasattr(opp, 'symbol'):
-                        # 对机会中的标的也进行标准化处理
-                        opp_symbol = getattr(opp, 'symbol', '').strip().upper()
-                        # 尝试完全匹配或部分匹配（去除斜杠等特殊字符后）
-                        if normalized_symbol == opp_symbol or normalized_symbol.replace('/', '') == opp_symbol.replace('/', ''):
-                            related_opportunity = opp
-                            break
-                            
-                if related_opportunity and hasattr(related_opportunity, 'overall_action') and related_opportunity.overall_action == "买入":
+                if related_action == "买入":
                     positions_needing_attention.append({**position, 'reason': f'{self.get_name()}策略建议平仓'})
             
             # 检查持仓时间超过5小时的标的
@@ -630,12 +827,13 @@ class MultiTimeframeStrategy(BaseStrategy):
         # 文件名固定为multi_timeframe_analysis_new.txt
         filename = os.path.join(report_dir, "multi_timeframe_analysis_new.txt")
         
+        analysis_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(filename, 'w', encoding='utf-8') as f:
             # 写入报告头部
             f.write("=" * 80 + "\n")
             f.write("📊 多时间框架专业分析报告\n")
             f.write("=" * 80 + "\n")
-            f.write(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"分析时间: {analysis_time}\n")
             f.write(f"时间框架维度: 周线→日线→4小时→1小时→15分钟\n")
             f.write(f"发现机会: {len(all_opportunities)}\n")
             f.write(f"策略名称: {self.get_name()}\n")
@@ -693,6 +891,9 @@ class MultiTimeframeStrategy(BaseStrategy):
                 f.write(f"分析依据: {reasoning_text}\n")
                 f.write("\n" + "=" * 80 + "\n\n")
         
+        # 同时写入结构化报告，报告查看器直接加载，不再正则解析txt
+        write_report_artifact(filename, all_opportunities, analysis_time, self.get_name())
+
         logger.info(f"✅ 多时间框架分析报告已保存至: {filename}")
         return filename
         
@@ -15,12 +15,30 @@ INITIAL_CAPITAL = 10000.0
 # 交易对配置
 # SYMBOLS = ["BTC-USDT", "ETH-USDT"]  # 交易对列表
 SYMBOLS = ["BTC-USDT", "ETH-USDT", "SOL-USDT", "XRP-USDT", "ADA-USDT", "DOGE-USDT", "ARB-USDT", "LTC-USDT"]  # 交易对列表
+# 大于0时改为使用扫描器交易对池快照（reports/market_universe.json）中成交量最大的前N个交易对，没有快照时使用SYMBOLS
+UNIVERSE_TOP_N = 0
 
 # 可以填写策略文件名（不含.py后缀）或策略类名
 STRATEGIES_TO_TEST = ["test3"]
 # STRATEGIES_TO_TEST = ["multi_timeframe_strategy_ema", "multi_timeframe_strategy", "test3"]  # 测试所有策略
 
 
+# 参数扫描配置（strategies_test/param_sweep.py，命令行未指定 --grid/--space 时使用）
+# 键为策略TRADING_CONFIG中的参数名，值为候选值列表；TIMEFRAME_DATA_LENGTHS的候选值为 {时间框架: 数据长度} 字典
+PARAM_SWEEP_SPACE = {
+    "BUY_THRESHOLD": [0.2, 0.3, 0.4],
+    "TARGET_MULTIPLIER": [3, 4.5, 6],
+    "STOP_LOSS_MULTIPLIER": [2, 3],
+}
+PARAM_SWEEP_WORKERS = 0  # 工作进程数，0表示使用CPU核心数
+
+
+# 组合回测配置（strategies_test/portfolio_backtest.py，所有交易对共用INITIAL_CAPITAL）
+PORTFOLIO_MAX_POSITIONS = 0  # 最大同时持仓数，0表示使用策略配置的MAX_POSITIONS
+PORTFOLIO_POSITION_FRACTION = 0  # 每笔开仓占当前权益的比例，0表示 1/最大持仓数
+PORTFOLIO_CHUNK_BARS = 4096  # 事件循环中每个交易对每次从磁盘读取的K线数（内存占用约 交易对数 × 块大小 × 100字节）
+
+
 # 其他回测相关配置
 MAX_RETRY_COUNT = 3  # API请求最大重试次数
 REQUEST_TIMEOUT = 30  # API请求超时时间（秒）
@@ -20,6 +20,10 @@ import inspect
 # ===== 配置参数 =====
 # 导入回测配置
 from backtest_config import START_DATE, END_DATE, STRATEGIES_TO_TEST, SYMBOLS
+try:
+    from backtest_config import UNIVERSE_TOP_N
+except ImportError:
+    UNIVERSE_TOP_N = 0
 
 # 交易标的配置
 symbols = SYMBOLS  # 从配置文件导入交易对列表
@@ -40,6 +44,16 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__f
 from okx.MarketData import MarketAPI
 # 导入基础策略类
 from strategies.base_strategy import BaseStrategy
+# 策略清单（只导入要测试的策略所在的模块）
+from lib.tool.strategy_manifest import StrategyManifest
+# 导入列式K线存储
+from lib.tool.candle_store import CandleStore
+from lib.tool.ohlcv_cache import timeframe_to_ms
+# 导入多时间框架对齐引擎
+from lib.tool.timeframe_alignment import TimeframeAligner
+from lib.tool.candle_frame import CandleArray, as_frame
+# 交易对池快照（与扫描器共用）
+from lib.tool.market_universe import MarketUniverse
 
 # 配置日志 - 只输出到控制台，不创建日志文件
 logging.basicConfig(
@@ -50,6 +64,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def load_universe_symbols(top_n):
+    """
+    从扫描器的交易对池快照中取成交量最大的前N个交易对（只读取快照，不请求交易所）
+    
+    Args:
+        top_n: 交易对数量
+        
+    Returns:
+        list: OKX格式的交易对列表（如 BTC-USDT），没有快照时返回空列表
+    """
+    universe = MarketUniverse()
+    ranked = universe.liquid_symbols(limit=top_n)
+    if ranked:
+        logger.info(f"使用交易对池快照中成交量最大的{len(ranked)}个交易对（快照时间: {universe.age('tickers'):.0f}秒前）")
+    return [symbol.replace('/', '-') for symbol in ranked]
+
+
 def load_strategy_classes(strategies_to_test=None):
     """
     动态加载strategies文件夹中的策略类，只加载继承自BaseStrategy的类
@@ -70,7 +101,7 @@ def load_strategy_classes(strategies_to_test=None):
     # 需要排除的文件
     exclude_files = ['base_strategy.py', '__init__.py']
     # 需要排除的工具类文件
-    tool_files = ['condition_analyzer.py']
+    tool_files = ['condition_analyzer.py', 'indicator_cache.py', 'cross_sectional.py']
     
     try:
         logger.info(f"开始扫描策略目录: {strategies_dir}")
@@ -82,38 +113,46 @@ def load_strategy_classes(strategies_to_test=None):
             logger.error(f"策略目录不存在: {strategies_dir}")
             return strategy_class_to_filename
         
-        # 遍历strategies目录下的所有.py文件
-        for filename in os.listdir(strategies_dir):
-            if filename.endswith('.py') and filename not in exclude_files + tool_files:
-                module_name = filename[:-3]  # 去掉.py后缀
-                
-                # 检查是否需要跳过（根据文件名过滤）
-                skip_by_filename = strategies_to_test and module_name not in strategies_to_test
+        # 从策略清单获取各模块定义的策略类，只导入要测试的策略所在的模块
+        try:
+            candidates = StrategyManifest(strategies_dir, exclude_files + tool_files).load()
+        except Exception as e:
+            logger.error(f"读取策略清单失败，导入所有模块查找策略类: {e}")
+            candidates = {filename[:-3]: None for filename in os.listdir(strategies_dir)
+                          if filename.endswith('.py') and filename not in exclude_files + tool_files}
+        
+        for module_name, class_names in candidates.items():
+            # 检查是否需要跳过（根据文件名过滤）
+            skip_by_filename = strategies_to_test and module_name not in strategies_to_test
+            if skip_by_filename and class_names is not None and not set(class_names) & set(strategies_to_test):
+                continue
+            
+            try:
+                # 动态导入模块
+                module_path = f'strategies.{module_name}'
+                logger.info(f"尝试导入模块: {module_path}")
+                module = importlib.import_module(module_path)
                 
-                try:
-                    # 动态导入模块
-                    module_path = f'strategies.{module_name}'
-                    logger.info(f"尝试导入模块: {module_path}")
-                    module = importlib.import_module(module_path)
-                    
-                    # 遍历模块中的所有属性
-                    for name, obj in inspect.getmembers(module):
-                        # 检查是否是类
-                        if inspect.isclass(obj):
-                            # 检查是否继承自BaseStrategy但不是BaseStrategy本身
-                            try:
-                                is_strategy_class = issubclass(obj, BaseStrategy) and obj is not BaseStrategy
-                            except TypeError:
-                                # 处理非类对象的情况
-                                is_strategy_class = False
-                                
-                            if is_strategy_class:
-                                # 如果有指定策略列表，并且没有被文件名过滤掉，再检查类名
-                                if not strategies_to_test or obj.__name__ in strategies_to_test or not skip_by_filename:
-                                    logger.info(f"找到策略类: {obj.__name__} (来自模块: {module_name})")
-                                    strategy_class_to_filename[obj] = module_name
-                except Exception as e:
-                    logger.error(f"导入模块 {module_name} 时出错: {str(e)}")
+                # 清单中的策略类；无法解析的模块遍历模块中的所有属性
+                if class_names is not None:
+                    members = [(name, getattr(module, name, None)) for name in class_names]
+                else:
+                    members = inspect.getmembers(module, inspect.isclass)
+                for name, obj in members:
+                    # 检查是否继承自BaseStrategy但不是BaseStrategy本身
+                    try:
+                        is_strategy_class = issubclass(obj, BaseStrategy) and obj is not BaseStrategy
+                    except TypeError:
+                        # 处理非类对象的情况
+                        is_strategy_class = False
+                        
+                    if is_strategy_class:
+                        # 如果有指定策略列表，并且没有被文件名过滤掉，再检查类名
+                        if not strategies_to_test or obj.__name__ in strategies_to_test or not skip_by_filename:
+                            logger.info(f"找到策略类: {obj.__name__} (来自模块: {module_name})")
+                            strategy_class_to_filename[obj] = module_name
+            except Exception as e:
+                logger.error(f"导入模块 {module_name} 时出错: {str(e)}")
         
         logger.info(f"成功加载 {len(strategy_class_to_filename)} 个策略类")
     except Exception as e:
@@ -125,7 +164,8 @@ def load_strategy_classes(strategies_to_test=None):
 class BacktestEngine:
     """回测引擎"""
     
-    def __init__(self, strategy_class, initial_capital=10000.0, symbol=None):
+    def __init__(self, strategy_class, initial_capital=10000.0, symbol=None, strategy=None,
+                 market_api=None, candle_store=None, timeframe_data=None):
         """
         初始化回测引擎
         
@@ -133,20 +173,53 @@ class BacktestEngine:
             strategy_class: 策略类
             initial_capital: 初始资金
             symbol: 交易对
+            strategy: 已创建的策略实例（参数扫描时复用同一实例并替换config），为None时用strategy_class创建
+            market_api: 共用的OKX MarketAPI客户端，为None时在需要请求API时创建
+            candle_store: 共用的列式K线存储，为None时使用默认目录
+            timeframe_data: 预先加载的K线 {API时间框架: DataFrame或CandleArray}，已有的时间框架不再获取
         """
+        if strategy is not None:
+            self.strategy = strategy
+        else:
+            self.strategy = self._create_strategy(strategy_class, symbol)
+        self.initial_capital = initial_capital
+        self.capital = initial_capital
+        self.position = 0  # 持仓数量 (正数为多仓，负数为空仓)
+        self.entry_price = 0.0  # 入场价格
+        self.stop_loss = 0.0  # 仓位止损价格
+        self.take_profit = 0.0  # 仓位止盈价格
+        self.symbol = symbol  # 使用传入的交易对
+        self.trades = []  # 交易记录
+        self.timeframe_data = dict(timeframe_data or {})  # 多时间框架数据
+        self.api_timeframe_map = {}  # API时间框架映射
+        self._market_api = market_api
+        # 列式K线存储（按 交易对/时间框架/月份 分区），重复回测时只获取缺失的区间
+        self.candle_store = candle_store or CandleStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data', 'candle_store'))
+        logger.info(f"初始化回测引擎，策略需要的时间框架: {list(self.strategy.get_required_timeframes().keys())}")
+    
+    @property
+    def market_api(self):
+        """OKX MarketAPI客户端（只在需要请求API时创建）"""
+        if self._market_api is None:
+            self._market_api = MarketAPI()
+        return self._market_api
+    
+    @staticmethod
+    def _create_strategy(strategy_class, symbol=None):
+        """创建策略实例"""
         try:
             # 安全地初始化策略实例
             logger.info(f"初始化策略类: {strategy_class.__name__}")
             
             # 优先尝试无参数构造（更安全）
             try:
-                self.strategy = strategy_class()
+                strategy = strategy_class()
                 logger.info(f"成功使用无参数构造函数初始化策略: {strategy_class.__name__}")
             except Exception as e1:
                 # 如果无参数构造失败，尝试带symbol参数构造
                 logger.warning(f"使用无参数构造函数失败: {str(e1)}，尝试带symbol参数构造")
                 try:
-                    self.strategy = strategy_class(symbol=symbol)
+                    strategy = strategy_class(symbol=symbol)
                     logger.info(f"成功使用带symbol参数构造函数初始化策略: {strategy_class.__name__}")
                 except Exception as e2:
                     logger.error(f"两种初始化方式都失败，无法创建策略实例: {str(e2)}")
@@ -154,22 +227,11 @@ class BacktestEngine:
         except Exception as e:
             logger.error(f"初始化策略时发生错误: {str(e)}")
             raise
-        self.initial_capital = initial_capital
-        self.capital = initial_capital
-        self.position = 0  # 持仓数量 (正数为多仓，负数为空仓)
-        self.entry_price = 0.0  # 入场价格
-        self.stop_loss = 0.0  # 仓位止损价格
-        self.take_profit = 0.0  # 仓位止盈价格
-        self.symbol = symbol  # 使用传入的交易对
-        self.trades = []  # 交易记录
-        self.timeframe_data = {}  # 多时间框架数据
-        self.api_timeframe_map = {}  # API时间框架映射
-        self.market_api = MarketAPI()
-        logger.info(f"初始化回测引擎，策略需要的时间框架: {list(self.strategy.get_required_timeframes().keys())}")
+        return strategy
     
     def fetch_historical_data(self, timeframe, start_time, end_time):
         """
-        获取历史K线数据（优先从Excel读取，不存在则从OKX API获取并保存）
+        获取历史K线数据（优先从本地列式K线存储读取，只向OKX API请求缺失的区间）
         
         Args:
             timeframe: 时间框架
@@ -179,324 +241,120 @@ class BacktestEngine:
         Returns:
             pandas.DataFrame: K线数据
         """
-        # 创建数据目录
-        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # 生成Excel文件名
-        start_date = pd.to_datetime(start_time, unit='ms').strftime('%Y%m%d')
-        end_date = pd.to_datetime(end_time, unit='ms').strftime('%Y%m%d')
-        excel_file = os.path.join(data_dir, f'{self.symbol}_{timeframe}_{start_date}_{end_date}.xlsx')
-        
-        # 尝试从Excel读取数据
-        start_datetime = pd.to_datetime(start_time, unit='ms')
-        end_datetime = pd.to_datetime(end_time, unit='ms')
-        
         try:
-            if os.path.exists(excel_file):
-                logger.info(f"尝试从Excel文件读取{timeframe}数据: {excel_file}")
-                df = pd.read_excel(excel_file)
-                
-                # 检查数据时间范围是否覆盖需求
-                df_start = df['datetime'].min()
-                df_end = df['datetime'].max()
-                
-                if df_start <= start_datetime and df_end >= end_datetime:
-                    # 过滤出需要的时间范围
-                    df = df[(df['datetime'] >= start_datetime) & (df['datetime'] <= end_datetime)]
-                    logger.info(f"成功从Excel读取数据，共{len(df)}条，时间范围: {df['datetime'].min()} 至 {df['datetime'].max()}")
-                    return df
-                else:
-                    logger.info(f"Excel数据时间范围不完整，需要从API获取，当前Excel范围: {df_start} - {df_end}，需要范围: {start_datetime} - {end_datetime}")
-            else:
-                logger.info(f"Excel文件不存在，将从API获取数据: {excel_file}")
+            columns = self.candle_store.get_range(
+                self.symbol, timeframe, start_time, end_time,
+                lambda fetch_start, fetch_end: self._fetch_from_api(timeframe, fetch_start, fetch_end)
+            )
         except Exception as e:
-            logger.warning(f"读取Excel文件失败: {str(e)}，将从API获取数据")
+            logger.error(f"获取{timeframe}历史数据时出错: {str(e)}")
+            return pd.DataFrame()
+        
+        # 检查数据是否为空
+        if len(columns['timestamp']) == 0:
+            logger.warning(f"未获取到{timeframe}数据，返回空DataFrame")
+            return pd.DataFrame()
         
-        # 从API获取数据
+        # 转换为DataFrame（timestamp/OHLCV/datetime列）
+        df = CandleArray.from_columns(columns).to_frame(time_index=False)
+        logger.info(f"成功获取{timeframe}数据，共{len(df)}条，时间范围: {df['datetime'].min()} 至 {df['datetime'].max()}，存储统计: {self.candle_store.stats}")
+        return df
+    
+    def _fetch_from_api(self, timeframe, start_time, end_time):
+        """
+        从OKX历史K线接口分页获取指定时间范围的数据
+        
+        Args:
+            timeframe: 时间框架
+            start_time: 开始时间（毫秒时间戳）
+            end_time: 结束时间（毫秒时间戳）
+            
+        Returns:
+            list: [[ts, open, high, low, close, volume], ...]，只包含已收盘的K线；
+                  请求失败且没有获取到任何数据时返回None（区间不会被登记为已知缺口）
+        """
         all_data = []
-        limit = 300  # 恢复官方limit为300
+        limit = 300  # 官方limit为300
         request_count = 0  # 记录请求次数
+        failed = False  # 是否因请求异常或错误码中止
         
+        logger.info(f"开始从API获取{timeframe}数据，时间范围: {pd.to_datetime(start_time, unit='ms')} 至 {pd.to_datetime(end_time, unit='ms')}")
+        
+        # 解析时间框架，确定每个周期的毫秒数
         try:
-            logger.info(f"开始获取{timeframe}数据，时间范围: {pd.to_datetime(start_time, unit='ms')} 至 {pd.to_datetime(end_time, unit='ms')}")
-            
-            # 根据不同时间框架计算after值，确保第一条数据是20250101 00:00:00
-            # 解析时间框架，确定每个周期的毫秒数
-            period_ms = 0
-            
-            if timeframe.endswith('m'):
-                # 分钟级别
-                minutes = int(timeframe[:-1])
-                period_ms = minutes * 60 * 1000
-            elif timeframe.endswith('H'):
-                # 小时级别
-                hours = int(timeframe[:-1])
-                period_ms = hours * 60 * 60 * 1000
-            elif timeframe.endswith('D'):
-                # 日级别
-                days = int(timeframe[:-1])
-                period_ms = days * 24 * 60 * 60 * 1000
-            
-            # 初始化period_ms
+            period_ms = timeframe_to_ms(timeframe)
+        except ValueError:
             period_ms = 0
-            if timeframe.endswith('m'):
-                minutes = int(timeframe[:-1])
-                period_ms = minutes * 60 * 1000
-            elif timeframe.endswith('H'):
-                hours = int(timeframe[:-1])
-                period_ms = hours * 60 * 60 * 1000
-            elif timeframe.endswith('D'):
-                days = int(timeframe[:-1])
-                period_ms = days * 24 * 60 * 60 * 1000
-            
-            # 初始after值设为start_time加上适当数量的周期
-            cycles_to_add = 300
-            if period_ms > 0:
-                current_after = start_time + (cycles_to_add * period_ms)
-                logger.info(f"为{timeframe}时间框架设置初始after值: {current_after} ({pd.to_datetime(current_after, unit='ms')})，计算逻辑: {pd.to_datetime(start_time, unit='ms')} + ({cycles_to_add} * {period_ms/1000}秒)")
-            else:
-                current_after = start_time
-                logger.warning(f"无法解析时间框架{timeframe}，使用start_time作为after值")
-            
-            # 添加循环分页获取数据的逻辑
-            max_requests = 1000  # 限制最大请求次数，避免无限循环
-            while request_count < max_requests:
-                request_count += 1
-                logger.info(f"第{request_count}次请求{timeframe}数据，使用after={current_after}")
-                
-                try:
-                    response = self.market_api.get_history_candlesticks(
-                        instId=self.symbol,
-                        bar=timeframe,
-                        after=str(current_after),  # 使用当前after值
-                        limit=str(limit)
-                    )
-                    
-                    if response['code'] == '0':
-                        if response['data']:
-                            data = response['data']
-                            logger.info(f"第{request_count}次请求获取到{timeframe}数据: {len(data)}条，当前累计: {len(all_data) + len(data)}条")
-                            
-                            # 记录数据的时间范围
-                            try:
-                                # OKX API返回的字段顺序: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
-                                # data[0][0] = 最新数据的时间戳(ts)
-                                # data[-1][0] = 最早数据的时间戳(ts)
-                                first_timestamp = int(data[0][0])  # 第一个数据点的时间戳(最新)
-                                last_timestamp = int(data[-1][0])  # 最后一个数据点的时间戳(最早)
-                                # 安全地转换时间戳
-                                first_datetime = pd.to_datetime(first_timestamp, unit='ms', errors='coerce')
-                                last_datetime = pd.to_datetime(last_timestamp, unit='ms', errors='coerce')
-                                logger.info(f"本次获取数据时间范围: {first_datetime} 至 {last_datetime}")
-                            except Exception as e:
-                                logger.warning(f"解析时间戳时出错: {e}")
-                            
-                            all_data.extend(data)
-                            
-                            # 更新current_after为本次数据中最早的数据点时间戳，用于获取更旧的数据
-                            # 由于OKX API的after参数是获取此时间戳之后的数据，我们需要调整逻辑
-                            # 这里我们使用最新的数据点时间戳作为下一次请求的after值
-                            if data:
-                                # 获取本次数据中最新的数据点时间戳
-                                latest_timestamp = int(data[0][0])
-                                
-                                # 检查是否已经获取了足够的数据（达到结束时间或数据量上限）
-                                if latest_timestamp >= end_time:  # 设置一个合理的数据量上限
-                                    logger.info(f"已获取足够数据，达到结束时间或数据量上限")
-                                    break
-                                
-                                # 更新after值，确保获取更新的数据
-                                # 更新after值为本次数据中最晚时间加上适当数量的周期
-                                latest_timestamp = int(data[0][0])
-                                # 重新计算周期毫秒数
-                                period_ms = 0
-                                if timeframe.endswith('m'):
-                                    minutes = int(timeframe[:-1])
-                                    period_ms = minutes * 60 * 1000
-                                elif timeframe.endswith('H'):
-                                    hours = int(timeframe[:-1])
-                                    period_ms = hours * 60 * 60 * 1000
-                                elif timeframe.endswith('D'):
-                                    days = int(timeframe[:-1])
-                                    period_ms = days * 24 * 60 * 60 * 1000
-                                
-                                # 对于15m时间框架，增加每次跳跃的周期数，确保能获取到完整时间范围
-                                cycles_to_add = 300      
-                                if period_ms > 0:
-                                    current_after = latest_timestamp + (cycles_to_add * period_ms)
-                                    logger.info(f"更新after值为: {current_after} ({pd.to_datetime(current_after, unit='ms')})，计算逻辑: {pd.to_datetime(latest_timestamp, unit='ms')} + ({cycles_to_add} * {period_ms/1000}秒)")
-                                else:
-                                    current_after = latest_timestamp
-                                    logger.warning(f"无法解析时间框架{timeframe}，使用最新时间戳作为after值")
-                            
-                            # 如果本次返回的数据少于limit，说明可能已经获取了所有可用数据
-                            if len(data) < limit:
-                                logger.info(f"返回数据少于limit，可能已获取所有可用数据")
-                                break
-                            
-                            # 避免请求过快，添加短暂延迟
-                            time.sleep(0.1)
-                        else:
-                            logger.warning(f"第{request_count}次请求{timeframe}数据返回空结果")
-                            break
-                    else:
-                        logger.error(f"第{request_count}次请求{timeframe}数据失败: 错误码={response['code']}, 消息={response['msg']}")
-                        # 尝试减小limit再请求一次
-                        if limit > 50 and request_count == 1:  # 只在第一次请求失败时尝试减小limit
-                            limit = 50
-                            logger.info(f"减小limit至{limit}并重试")
-                            continue
-                        break
-                except Exception as api_error:
-                    logger.error(f"第{request_count}次API调用异常: {str(api_error)}")
-                    # 尝试减小limit再请求一次
-                    if limit > 50 and request_count == 1:  # 只在第一次请求异常时尝试减小limit
-                        limit = 50
-                        logger.info(f"减小limit至{limit}并重试")
-                        continue
-                    break
-        except Exception as e:
-            logger.error(f"获取数据过程中出现异常: {str(e)}")
-        
-        logger.info(f"数据获取完成，累计获取{len(all_data)}条原始数据，请求次数: {request_count}")
         
-        # 检查数据是否为空
-        if not all_data:
-            logger.warning(f"未获取到{timeframe}数据，返回空DataFrame")
-            return pd.DataFrame()
+        # OKX的after参数返回早于该时间戳的数据，初始after值设为start_time加上一页的周期数
+        cycles_to_add = 300
+        if period_ms > 0:
+            current_after = start_time + (cycles_to_add * period_ms)
+        else:
+            current_after = start_time
+            logger.warning(f"无法解析时间框架{timeframe}，使用start_time作为after值")
         
-        # 转换数据为DataFrame
-        try:
-            # 转换为DataFrame，使用OKX API返回的字段顺序
-            # ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm
-            df = pd.DataFrame(all_data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume', 
-                'volume_ccy', 'volume_ccy_quote', 'confirm'
-            ])
-            
-            # 转换时间戳为datetime类型
-            df['datetime'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
-            
-            # 转换数值列的数据类型
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume', 
-                              'volume_ccy', 'volume_ccy_quote']
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        max_requests = 1000  # 限制最大请求次数，避免无限循环
+        while request_count < max_requests:
+            request_count += 1
+            try:
+                response = self.market_api.get_history_candlesticks(
+                    instId=self.symbol,
+                    bar=timeframe,
+                    after=str(current_after),
+                    limit=str(limit)
+                )
+            except Exception as api_error:
+                logger.error(f"第{request_count}次API调用异常: {str(api_error)}")
+                # 尝试减小limit再请求一次
+                if limit > 50 and request_count == 1:  # 只在第一次请求异常时尝试减小limit
+                    limit = 50
+                    logger.info(f"减小limit至{limit}并重试")
+                    continue
+                failed = True
+                break
             
-            # 按时间排序（升序）
-            df = df.sort_values('datetime', ascending=True).reset_index(drop=True)
+            if response['code'] != '0':
+                logger.error(f"第{request_count}次请求{timeframe}数据失败: 错误码={response['code']}, 消息={response['msg']}")
+                # 尝试减小limit再请求一次
+                if limit > 50 and request_count == 1:  # 只在第一次请求失败时尝试减小limit
+                    limit = 50
+                    logger.info(f"减小limit至{limit}并重试")
+                    continue
+                failed = True
+                break
             
-            # 去重处理，避免分页拉取时出现重复数据
-            original_len = len(df)
-            df = df.drop_duplicates(subset=['timestamp'], keep='last')
-            duplicate_count = original_len - len(df)
-            if duplicate_count > 0:
-                logger.info(f"移除了{duplicate_count}条重复数据，剩余{len(df)}条数据")
+            data = response['data']
+            if not data:
+                logger.warning(f"第{request_count}次请求{timeframe}数据返回空结果")
+                break
             
-            # 过滤掉超出指定时间范围的数据
-            start_datetime = pd.to_datetime(start_time, unit='ms')
-            end_datetime = pd.to_datetime(end_time, unit='ms')
-            original_len = len(df)
-            df = df[(df['datetime'] >= start_datetime) & (df['datetime'] <= end_datetime)]
-            filtered_count = original_len - len(df)
-            if filtered_count > 0:
-                logger.info(f"过滤掉{filtered_count}条超出时间范围的数据，剩余{len(df)}条")
+            # OKX API返回的字段顺序: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]，按时间降序
+            # confirm为0表示K线未收盘，不写入缓存
+            for row in data:
+                if len(row) > 8 and row[8] == '0':
+                    continue
+                all_data.append([float(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])])
             
-            # 保存数据到Excel文件，方便下次读取
-            try:
-                # 确保excel_file变量在这个作用域内可见
-                if 'excel_file' in locals():
-                    df.to_excel(excel_file, index=False)
-                    logger.info(f"数据已保存到Excel文件: {excel_file}")
-            except Exception as e:
-                logger.warning(f"保存数据到Excel失败: {str(e)}")
+            # 检查是否已经获取到结束时间
+            latest_timestamp = int(data[0][0])
+            if latest_timestamp >= end_time:
+                break
             
-            return df
-        except Exception as e:
-            logger.error(f"处理{timeframe}数据时出错: {str(e)}")
-            return pd.DataFrame()
+            # 如果本次返回的数据少于limit，说明已经获取了所有可用数据
+            if len(data) < limit:
+                break
             
-            # 去重处理，避免重复数据
-            if all_data:
-                # 转换为DataFrame进行去重
-                temp_df = pd.DataFrame(all_data)
-                # 基于时间戳去重
-                temp_df = temp_df.drop_duplicates(subset=[0])
-                # 转回列表
-                all_data = temp_df.values.tolist()
-                logger.info(f"去重后剩余{len(all_data)}条数据")
+            # 更新after值为本次数据中最晚时间加上一页的周期数
+            current_after = latest_timestamp + (cycles_to_add * period_ms) if period_ms > 0 else latest_timestamp
             
-            # 将数据转换为DataFrame
-            if all_data:
-                # 反转数据，使其按时间升序排列
-                all_data.reverse()
-                
-                # OKX API返回的字段顺序: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
-                # ts = 时间戳(毫秒), o = 开盘价, h = 最高价, l = 最低价, c = 收盘价
-                # vol = 交易量(张), volCcy = 交易量(币), volCcyQuote = 交易量(计价币), confirm = K线状态
-                df = pd.DataFrame(all_data, columns=[
-                    'timestamp', 'open', 'high', 'low', 'close', 'volume', 
-                    'volume_ccy', 'volume_ccy_quote', 'confirm'
-                ])
-                
-                # 将数据信息写入日志文件
-                log_file_path = f"{timeframe}_data_analysis.txt"
-                with open(log_file_path, 'w', encoding='utf-8') as f:
-                    f.write(f"=== {timeframe} 时间框架数据统计 ===\n")
-                    f.write(f"总行数: {len(df)}\n")
-                    if not df.empty:
-                        f.write(f"时间范围: {df['timestamp'].iloc[0]} 至 {df['timestamp'].iloc[-1]}\n")
-                    f.write(f"请求次数: {request_count}\n")
-                    f.write(f"数据点分布:\n")
-                    # 写入前10行和后10行数据用于检查
-                    f.write("\n前10行数据:\n")
-                    f.write(df.head(10).to_string())
-                    f.write("\n\n后10行数据:\n")
-                    f.write(df.tail(10).to_string())
-                logger.info(f"数据分析信息已保存到 {log_file_path}")
-                
-                # 转换数据类型
-                # 安全地转换时间戳，避免无效值
-                df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms', errors='coerce')
-                # 过滤掉无效的时间戳
-                df = df.dropna(subset=['timestamp'])
-                df[['open', 'high', 'low', 'close']] = df[['open', 'high', 'low', 'close']].astype(float)
-                df['volume'] = df['volume'].astype(float)
-                
-                # 过滤掉超出指定时间范围的数据
-                start_datetime = pd.to_datetime(start_time, unit='ms')
-                end_datetime = pd.to_datetime(end_time, unit='ms')
-                original_len = len(df)
-                df = df[(df['timestamp'] >= start_datetime) & (df['timestamp'] <= end_datetime)]
-                filtered_count = original_len - len(df)
-                if filtered_count > 0:
-                    logger.info(f"过滤掉{filtered_count}条超出时间范围的数据，剩余{len(df)}条")
-                
-                # 重命名列以匹配策略期望的格式
-                df = df.rename(columns={
-                    'timestamp': 'datetime',
-                    'open': 'open',
-                    'high': 'high',
-                    'low': 'low',
-                    'close': 'close',
-                    'volume': 'volume'
-                })
-                
-                # 只保留需要的列
-                df = df[['datetime', 'open', 'high', 'low', 'close', 'volume']]
-                
-                logger.info(f"成功获取{timeframe}数据，共{len(df)}条")
-                return df
-            else:
-                logger.warning(f"未获取到{timeframe}数据")
-                return pd.DataFrame()
-                
-        except Exception as e:
-            logger.error(f"获取历史数据时出错: {str(e)}")
-            import traceback
-            logger.error(f"错误堆栈: {traceback.format_exc()}")
-            return pd.DataFrame()
+            # 避免请求过快，添加短暂延迟
+            time.sleep(0.1)
+        
+        logger.info(f"API获取完成，累计获取{len(all_data)}条{timeframe}数据，请求次数: {request_count}")
+        if failed and not all_data:
+            return None
+        return all_data
     
     def prepare_backtest_data(self):
         """准备回测数据，获取指定时间范围的多时间框架K线"""
@@ -533,6 +391,9 @@ class BacktestEngine:
         
         # 获取每个时间框架的数据
         for strategy_tf, api_tf in self.api_timeframe_map.items():
+            if api_tf in self.timeframe_data and not self.timeframe_data[api_tf].empty:
+                # 预先加载的数据（参数扫描时所有参数组合共用同一份K线）
+                continue
             logger.info(f"正在获取{strategy_tf} (API: {api_tf}) 时间框架的数据...")
             df = self.fetch_historical_data(api_tf, start_time_ms, end_time_ms)
             if not df.empty:
@@ -620,7 +481,7 @@ class BacktestEngine:
         return all_continuous
 
     def run_backtest(self):
-        """运行回测"""
+        """运行回测，返回generate_report的统计信息（数据不足无法回测时返回None）"""
         logger.info("开始回测...")
         
         # 准备回测数据
@@ -648,6 +509,8 @@ class BacktestEngine:
             base_tf = '15m'
             logger.warning("无法从策略获取时间框架信息，使用默认的15分钟时间框架")
         
+        # 预先提供的数据可能是CandleArray，统一转换为回测使用的DataFrame格式
+        self.timeframe_data = {tf: as_frame(df, time_index=False) for tf, df in self.timeframe_data.items()}
         base_df = self.timeframe_data.get(base_tf)
         
         if base_df is None or base_df.empty:
@@ -660,13 +523,29 @@ class BacktestEngine:
         # 回测主循环 - 在最小粒度时间框架上迭代
         logger.info(f"开始回测主循环，将处理从索引168到{len(base_df)-1}的{base_tf}数据点")
         
-        # 为每个时间框架建立时间戳到索引的映射，提高查找效率
-        tf_index_maps = {}
-        for api_tf, df in self.timeframe_data.items():
-            # 将时间戳转换为datetime对象并创建映射
-            tf_index_maps[api_tf] = {}
-            for idx, dt in enumerate(df['datetime']):
-                tf_index_maps[api_tf][dt] = idx
+        # API时间框架 -> 策略时间框架
+        strategy_tf_names = {atf: stf for stf, atf in self.api_timeframe_map.items()}
+        for api_tf in self.timeframe_data:
+            if api_tf not in strategy_tf_names:
+                logger.warning(f"无法找到{api_tf}对应的策略时间框架")
+        
+        # 一次性预计算基准K线到各时间框架K线的对齐索引（二分查找），主循环中按下标直接取零拷贝窗口
+        aligned_frames = {api_tf: df for api_tf, df in self.timeframe_data.items() if api_tf in strategy_tf_names}
+        window_sizes = {api_tf: required_timeframes.get(strategy_tf_names[api_tf], 168) for api_tf in aligned_frames}
+        aligner = TimeframeAligner(base_df['datetime'], aligned_frames, window_sizes)
+        required_tfs = set(required_timeframes.keys())
+        
+        # 策略支持批量分析时，一次性在完整历史上计算每根基准K线的信号，代替逐根调用analyze
+        series_start = time.time()
+        series = self.strategy.analyze_series(
+            self.symbol,
+            {strategy_tf_names[api_tf]: df for api_tf, df in aligned_frames.items()},
+            base_df['datetime']
+        )
+        if series is not None:
+            logger.info(f"使用批量分析模式生成信号，用时 {time.time() - series_start:.2f}秒")
+        else:
+            logger.info("策略未提供批量分析，使用逐根K线分析模式")
         
         # 校验所有时间框架数据是否连续
         # if not self.validate_timeframe_continuity():
@@ -677,59 +556,14 @@ class BacktestEngine:
         for i in range(168, len(base_df)):  # 跳过前168个数据点，确保有足够的历史数据计算指标
             logger.debug(f"迭代索引: {i}/{len(base_df)-1}")
             
-            # 获取当前基准时间框架K线的时间
-            current_time = base_df['datetime'].iloc[i]
-            
-            # 为每个时间框架提取当前时间点对应的数据窗口
-            current_data = {}
-            
-            for api_tf, df in self.timeframe_data.items():
-                # 将API时间框架转换回策略时间框架
-                strategy_tf = None
-                for stf, atf in self.api_timeframe_map.items():
-                    if atf == api_tf:
-                        strategy_tf = stf
-                        break
-                
-                if not strategy_tf:
-                    logger.warning(f"无法找到{api_tf}对应的策略时间框架")
-                    continue
-                
-                # 获取该时间框架需要的数据长度
-                window_size = self.strategy.get_required_timeframes().get(strategy_tf, 168)
-                
-                # 查找当前基准时间对应的该时间框架的索引
-                # 对于较大时间框架，我们需要找到不晚于当前基准时间的最新K线
-                closest_idx = None
-                
-                # 使用预构建的索引映射进行查找
-                if api_tf in tf_index_maps:
-                    # 查找不晚于current_time的最新时间戳
-                    valid_times = [dt for dt in tf_index_maps[api_tf].keys() if dt <= current_time]
-                    if valid_times:
-                        closest_time = max(valid_times)
-                        closest_idx = tf_index_maps[api_tf][closest_time]
-                
-                # 如果没有找到对应的索引，使用二分查找作为备选
-                if closest_idx is None:
-                    # 使用二分查找找到不大于current_time的最大索引
-                    closest_idx = df['datetime'].searchsorted(current_time, side='right') - 1
-                
-                # 确保索引有效
-                if closest_idx >= 0:
-                    # 计算起始索引
-                    start_idx = max(0, closest_idx - window_size + 1)
-                    current_data[strategy_tf] = df.iloc[start_idx:closest_idx+1].copy()
-                    
-                    # 验证数据窗口大小
-                    if len(current_data[strategy_tf]) < window_size:
-                        logger.warning(f"{strategy_tf}时间框架数据窗口不足，当前{len(current_data[strategy_tf])}条，需要{window_size}条")
-                else:
-                    logger.warning(f"无法找到{strategy_tf}时间框架中对应{current_time}的K线")
-                    continue
+            # 为每个时间框架取出当前时间点对应的数据窗口（不晚于当前基准时间的最新K线及其之前的数据）
+            current_data = aligner.windows(i, strategy_tf_names)
+            for strategy_tf, window_df in current_data.items():
+                window_size = required_timeframes.get(strategy_tf, 168)
+                if len(window_df) < window_size:
+                    logger.warning(f"{strategy_tf}时间框架数据窗口不足，当前{len(window_df)}条，需要{window_size}条")
             
             # 验证是否获取了所有需要的时间框架数据
-            required_tfs = set(self.strategy.get_required_timeframes().keys())
             current_tfs = set(current_data.keys())
             missing_tfs = required_tfs - current_tfs
             if missing_tfs:
@@ -814,7 +648,10 @@ class BacktestEngine:
             #反转current_data的下每个k线的顺序
             # current_data2 = {tf: df.sort_values('datetime', ascending=False).reset_index(drop=True) for tf, df in current_data.items()}
             # 使用策略生成信号
-            signal = self.strategy.analyze(self.symbol, current_data)
+            if series is not None:
+                signal = self.strategy.build_signal_from_series(self.symbol, series, i)
+            else:
+                signal = self.strategy.analyze(self.symbol, current_data)
 
             # filter_trade_signals 过滤交易信号
             signal = [signal]
@@ -1093,7 +930,7 @@ class BacktestEngine:
             logger.info(f"[{final_date}] 回测结束，平仓: {final_price:.2f}, 最终资金: {self.capital:.2f}, 总收益: {profit_rate:.2f}%")
         
         # 生成回测报告
-        self.generate_report()
+        return self.generate_report()
     
     def generate_report(self):
         """生成回测报告并返回统计信息"""
@@ -1282,6 +1119,9 @@ if __name__ == "__main__":
     logger.info("启动多交易对多策略回测系统")
     logger.info("注意: 本回测使用模拟记录方式，不会调用实际的OKX仓位API")
     
+    if UNIVERSE_TOP_N:
+        symbols = load_universe_symbols(UNIVERSE_TOP_N) or symbols
+    
     # 加载策略类及其文件名映射
     strategy_class_to_filename = load_strategy_classes(strategies_to_test)
     
@@ -1312,6 +1152,9 @@ if __name__ == "__main__":
         
         # 存储每个交易对的统计信息
         symbol_stats = {}
+        # 所有交易对共用一个API客户端和K线存储
+        market_api = MarketAPI()
+        candle_store = CandleStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data', 'candle_store'))
         
         # 遍历每个交易对执行回测
         for symbol in symbols:
@@ -1321,7 +1164,9 @@ if __name__ == "__main__":
             backtest = BacktestEngine(
                 strategy_class=strategy_class,
                 initial_capital=10000.0,
-                symbol=symbol
+                symbol=symbol,
+                market_api=market_api,
+                candle_store=candle_store
             )
             
             # 运行回测
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+历史数据导入工具
+将旧版回测生成的 historical_data/*.xlsx（文件名格式: {交易对}_{时间框架}_{开始日期}_{结束日期}.xlsx）
+导入到列式K线存储 historical_data/candle_store 中
+
+用法:
+    python strategies_test/import_historical_xlsx.py
+    python strategies_test/import_historical_xlsx.py --source path/to/xlsx_dir --delete
+"""
+
+import os
+import sys
+import glob
+import argparse
+import logging
+import pandas as pd
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.candle_store import CandleStore, CANDLE_COLUMNS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data')
+
+
+def parse_xlsx_name(path):
+    """从文件名解析 (交易对, 时间框架)，格式不符时返回None"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    parts = name.rsplit('_', 3)
+    if len(parts) != 4:
+        return None
+    symbol, timeframe, _, _ = parts
+    return symbol, timeframe
+
+
+def xlsx_to_bars(path):
+    """读取xlsx并转换为 [timestamp, open, high, low, close, volume] 数组"""
+    df = pd.read_excel(path)
+    if 'timestamp' in df.columns and pd.api.types.is_numeric_dtype(df['timestamp']):
+        ts = df['timestamp'].astype('int64')
+    else:
+        # 旧文件中只有datetime列，或timestamp列已被转换为时间类型
+        time_col = 'datetime' if 'datetime' in df.columns else 'timestamp'
+        ts = pd.to_datetime(df[time_col]).astype('datetime64[ms]').astype('int64')
+    bars = pd.DataFrame({'timestamp': ts})
+    for col in CANDLE_COLUMNS[1:]:
+        bars[col] = pd.to_numeric(df[col], errors='coerce')
+    return bars.dropna().to_numpy(dtype='float64')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='将历史xlsx数据导入列式K线存储')
+    parser.add_argument('--source', default=DATA_DIR, help='xlsx文件所在目录')
+    parser.add_argument('--store', default=os.path.join(DATA_DIR, 'candle_store'), help='K线存储根目录')
+    parser.add_argument('--delete', action='store_true', help='导入成功后删除xlsx文件')
+    args = parser.parse_args()
+
+    store = CandleStore(args.store)
+    files = sorted(glob.glob(os.path.join(args.source, '*.xlsx')))
+    if not files:
+        logger.info(f"目录中没有xlsx文件: {args.source}")
+        return
+
+    imported = 0
+    for path in files:
+        parsed = parse_xlsx_name(path)
+        if parsed is None:
+            logger.warning(f"无法解析文件名，跳过: {path}")
+            continue
+        symbol, timeframe = parsed
+        try:
+            bars = xlsx_to_bars(path)
+            count = store.write(symbol, timeframe, bars)
+            imported += 1
+            logger.info(f"已导入 {path}: {symbol} {timeframe} 共{count}条")
+            if args.delete:
+                os.remove(path)
+        except Exception as e:
+            logger.error(f"导入 {path} 失败: {e}")
+
+    logger.info(f"导入完成: {imported}/{len(files)} 个文件")
+
+
+if __name__ == '__main__':
+    main()
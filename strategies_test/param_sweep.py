@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+回测参数扫描工具
+对策略TRADING_CONFIG中的参数（BUY_THRESHOLD、TARGET_MULTIPLIER、STOP_LOSS_MULTIPLIER、TIMEFRAME_DATA_LENGTHS等）
+做网格搜索或随机搜索，不需要修改策略文件:
+    - 每个交易对的K线只加载一次（本地列式K线存储，缺失的区间才请求OKX），写入一块共享内存
+    - (交易对, 参数组合) 任务分发到进程池，每个工作进程只实例化一次策略，任务之间只替换策略的config
+    - 每完成一个任务就追加写入结果表（JSONL），中断后重新运行会跳过已完成的任务（出错的任务会重新执行）
+    - 全部完成后按参数组合汇总各交易对的收益，写入同名的 _summary.txt
+
+回测时间范围、交易对和初始资金与 btc_backtest.py 相同（backtest_config.py）
+
+用法:
+    python strategies_test/param_sweep.py
+    python strategies_test/param_sweep.py --grid BUY_THRESHOLD=0.2,0.3,0.4 --grid TARGET_MULTIPLIER=3,4.5,6
+    python strategies_test/param_sweep.py --grid 'TIMEFRAME_DATA_LENGTHS=[{"4h":200,"1h":200,"15m":200},{"4h":299,"1h":299,"15m":299}]'
+    python strategies_test/param_sweep.py --space sweep.json --random 40 --seed 7 --workers 8
+    python strategies_test/param_sweep.py --results strategies_test/reports/param_sweep/test3_sweep.jsonl   # 继续上次的扫描
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import importlib
+import itertools
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backtest_config import START_DATE, END_DATE, STRATEGIES_TO_TEST, SYMBOLS, INITIAL_CAPITAL
+try:
+    from backtest_config import PARAM_SWEEP_SPACE, PARAM_SWEEP_WORKERS
+except ImportError:
+    PARAM_SWEEP_SPACE, PARAM_SWEEP_WORKERS = {}, 0
+try:
+    from backtest_config import UNIVERSE_TOP_N
+except ImportError:
+    UNIVERSE_TOP_N = 0
+
+from btc_backtest import BacktestEngine, load_strategy_classes, load_universe_symbols
+from okx.MarketData import MarketAPI
+from lib.tool.candle_store import CandleStore
+from lib.tool.candle_frame import CandleArray
+from lib.tool.strategy_executor import SharedCandleData, shared_symbol_frames
+
+logger = logging.getLogger('param_sweep')
+
+CANDLE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data', 'candle_store')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports', 'param_sweep')
+# 写入结果表的统计字段（BacktestEngine.generate_report的返回值）
+STAT_FIELDS = ('final_capital', 'total_profit', 'total_profit_rate', 'buy_trades', 'sell_trades', 'stop_loss_trades',
+               'take_profit_trades', 'close_position_trades', 'win_rate', 'winning_trades', 'losing_trades', 'total_trade_profit')
+
+
+# ---------------- 参数空间 ----------------
+
+def parse_values(text):
+    """
+    解析命令行中的候选值: JSON数组（如 [{"4h":200},{"4h":299}]），或逗号分隔的值（数字按数字解析）
+
+    Returns:
+        list: 候选值列表
+    """
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        try:
+            values.append(json.loads(item))
+        except ValueError:
+            values.append(item)
+    return values
+
+
+def build_space(grid_args, space_file=None):
+    """
+    合并参数空间: --space 文件 < --grid 参数；都没有时使用backtest_config.PARAM_SWEEP_SPACE
+
+    Returns:
+        dict: {参数名: 候选值列表}，参数名按字母排序
+    """
+    space = {}
+    if space_file:
+        with open(space_file, 'r', encoding='utf-8') as f:
+            space.update(json.load(f))
+    for arg in grid_args or []:
+        if '=' not in arg:
+            raise ValueError(f"--grid 格式应为 参数名=值1,值2: {arg}")
+        key, values = arg.split('=', 1)
+        space[key.strip()] = parse_values(values)
+    if not space:
+        space = dict(PARAM_SWEEP_SPACE)
+    return {key: list(space[key]) for key in sorted(space)}
+
+
+def validate_space(space, base_config):
+    """
+    校验参数空间: 参数必须是策略配置中已有的参数；TIMEFRAME_DATA_LENGTHS只能修改数据长度，不能增减时间框架
+
+    Raises:
+        ValueError: 参数空间不合法
+    """
+    for key, values in space.items():
+        if key not in base_config:
+            raise ValueError(f"策略配置中没有参数 {key}（可选: {', '.join(sorted(base_config))}）")
+        if not values:
+            raise ValueError(f"参数 {key} 没有候选值")
+        if key == 'TIMEFRAME_DATA_LENGTHS':
+            timeframes = set(base_config[key])
+            for value in values:
+                if not isinstance(value, dict) or set(value) != timeframes:
+                    raise ValueError(f"TIMEFRAME_DATA_LENGTHS的候选值必须包含且只包含时间框架 {sorted(timeframes)}: {value}")
+
+
+def param_sets(space, random_count=0, seed=None):
+    """
+    生成参数组合
+
+    Args:
+        space: {参数名: 候选值列表}
+        random_count: 大于0时从网格中不重复地随机抽取这么多组合（按下标解码，不展开整个网格）
+        seed: 随机种子
+
+    Returns:
+        list: [{参数名: 值}]
+    """
+    keys = list(space)
+    if not random_count:
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    sizes = [len(space[key]) for key in keys]
+    total = 1
+    for size in sizes:
+        total *= size
+    picks = random.Random(seed).sample(range(total), min(random_count, total))
+    result = []
+    for pick in picks:
+        params = {}
+        for key, size in zip(reversed(keys), reversed(sizes)):
+            pick, index = divmod(pick, size)
+            params[key] = space[key][index]
+        result.append({key: params[key] for key in keys})
+    return result
+
+
+def params_key(params):
+    """参数组合的规范化JSON（用于汇总分组）"""
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def cell_key(strategy_name, symbol, params, base_config=None):
+    """
+    结果表中一个任务的唯一键: 策略、交易对、参数组合、合并后的完整策略配置和回测时间范围
+    （策略的基础配置变化后，之前的结果不再被当作已完成）
+    """
+    merged_config = {**(base_config or {}), **params}
+    raw = json.dumps([strategy_name, symbol, params, merged_config, START_DATE.isoformat(), END_DATE.isoformat(), INITIAL_CAPITAL],
+                     sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+# ---------------- 结果表 ----------------
+
+def load_results(path):
+    """
+    读取已有的结果表
+
+    Returns:
+        dict: {任务键: 结果记录}，出错的任务不计入（重新运行时会重新执行）
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 上次中断时写了一半的行
+                continue
+            if record.get('key') and not record.get('error'):
+                results[record['key']] = record
+    return results
+
+
+def summarize(records, path):
+    """
+    按参数组合汇总各交易对的结果，按平均收益率降序写入汇总文件
+
+    Returns:
+        list: 汇总行（字典）
+    """
+    groups = {}
+    for record in records:
+        group = groups.setdefault(params_key(record['params']), {
+            'params': record['params'], 'symbols': 0, 'profit_rates': [], 'final_capital': 0.0,
+            'winning_trades': 0, 'completed_trades': 0, 'buy_trades': 0})
+        group['symbols'] += 1
+        group['profit_rates'].append(record['total_profit_rate'])
+        group['final_capital'] += record['final_capital']
+        group['winning_trades'] += record['winning_trades']
+        group['completed_trades'] += record['winning_trades'] + record['losing_trades']
+        group['buy_trades'] += record['buy_trades']
+    rows = []
+    for group in groups.values():
+        rates = group.pop('profit_rates')
+        group['mean_profit_rate'] = sum(rates) / len(rates)
+        group['min_profit_rate'] = min(rates)
+        group['win_rate'] = group['winning_trades'] / group['completed_trades'] * 100 if group['completed_trades'] else 0.0
+        rows.append(group)
+    rows.sort(key=lambda row: row['mean_profit_rate'], reverse=True)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("===== 参数扫描汇总 =====\n\n")
+        f.write(f"回测时间段: {START_DATE} 至 {END_DATE}\n")
+        f.write(f"参数组合数: {len(rows)}，结果数: {len(records)}\n\n")
+        f.write(f"{'排名':<6}{'平均收益率%':<14}{'最差收益率%':<14}{'胜率%':<10}{'买入次数':<10}{'交易对数':<10}参数\n")
+        f.write("-" * 120 + "\n")
+        for rank, row in enumerate(rows, 1):
+            f.write(f"{rank:<6}{row['mean_profit_rate']:<14.2f}{row['min_profit_rate']:<14.2f}{row['win_rate']:<10.2f}"
+                    f"{row['buy_trades']:<10}{row['symbols']:<10}{params_key(row['params'])}\n")
+    return rows
+
+
+# ---------------- 回测任务 ----------------
+
+def run_job(strategy, symbol, params, candles, candle_store=None):
+    """
+    用指定参数回测一个交易对
+
+    Args:
+        strategy: 策略实例（复制后替换config，不修改原实例）
+        symbol: 交易对
+        params: 覆盖策略配置的参数
+        candles: {API时间框架: K线}
+        candle_store: 共用的K线存储（预先加载了数据，不会再读取）
+
+    Returns:
+        dict: 统计信息（STAT_FIELDS）
+    """
+    job_strategy = copy.copy(strategy)
+    job_strategy.config = {**strategy.config, **params}
+    engine = BacktestEngine(type(strategy), initial_capital=INITIAL_CAPITAL, symbol=symbol, strategy=job_strategy,
+                            candle_store=candle_store, timeframe_data=candles)
+    stats = engine.run_backtest()
+    if stats is None:
+        raise RuntimeError("K线数据不足，无法回测")
+    return {field: stats[field] for field in STAT_FIELDS}
+
+
+# 工作进程内的全局状态：策略实例、K线存储和从共享内存构造的K线
+_worker_strategy = None
+_worker_store = None
+_worker_candles = {}
+
+
+def _init_worker(module_name, class_name, base_config=None):
+    """工作进程初始化：只实例化一次策略（使用主进程策略实例的配置），关闭逐根K线的回测日志"""
+    global _worker_strategy, _worker_store
+    logging.disable(logging.WARNING)
+    module = importlib.import_module(f'strategies.{module_name}')
+    _worker_strategy = BacktestEngine._create_strategy(getattr(module, class_name))
+    if base_config is not None:
+        _worker_strategy.config = dict(base_config)
+    _worker_store = CandleStore(CANDLE_STORE_DIR)
+
+
+def _run_shared_job(shm_name, key, symbol, params):
+    """在工作进程中执行一个任务（K线取自共享内存）"""
+    start = time.time()
+    try:
+        candles = _worker_candles.get((shm_name, symbol))
+        if candles is None:
+            candles = {tf: CandleArray.from_frame(df) for tf, df in shared_symbol_frames(shm_name, symbol).items()}
+            _worker_candles.clear()
+            _worker_candles[(shm_name, symbol)] = candles
+        return key, run_job(_worker_strategy, symbol, params, candles, _worker_store), None, time.time() - start
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}", time.time() - start
+
+
+class ParamSweep:
+    """参数扫描: 加载K线、分发任务、写入结果表"""
+
+    def __init__(self, strategy_class, module_name, symbols, space, results_path, workers=0, random_count=0, seed=None):
+        """
+        Args:
+            strategy_class: 策略类
+            module_name: 策略所在的模块名（strategies目录下的文件名）
+            symbols: OKX格式的交易对列表
+            space: {参数名: 候选值列表}
+            results_path: 结果表路径（JSONL），已存在时跳过其中已完成的任务
+            workers: 工作进程数，0表示使用CPU核心数，负数表示在当前进程中执行（便于调试）
+            random_count: 大于0时随机搜索这么多参数组合
+            seed: 随机种子
+        """
+        self.strategy_class = strategy_class
+        self.module_name = module_name
+        self.strategy_name = f"{module_name}.{strategy_class.__name__}"
+        self.symbols = list(symbols)
+        self.space = space
+        self.results_path = results_path
+        self.workers = workers if workers < 0 else (workers or os.cpu_count() or 1)
+        self.random_count = random_count
+        self.seed = seed
+        self.stats = {'jobs': 0, 'skipped': 0, 'done': 0, 'failed': 0, 'load_time': 0.0, 'run_time': 0.0}
+
+    def jobs(self, base_config=None):
+        """所有 (任务键, 交易对, 参数) 任务，按参数组合排列，同一组合的交易对相邻；base_config为策略实例的配置"""
+        return [(cell_key(self.strategy_name, symbol, params, base_config), symbol, params)
+                for params in param_sets(self.space, self.random_count, self.seed) for symbol in self.symbols]
+
+    def load_data(self, strategy):
+        """
+        加载所有交易对的K线（所有交易对共用一个API客户端和K线存储）
+
+        Returns:
+            dict: {交易对: {API时间框架: DataFrame}}，没有数据的交易对不包含在内
+        """
+        market_api = MarketAPI()
+        candle_store = CandleStore(CANDLE_STORE_DIR)
+        all_data = {}
+        for symbol in self.symbols:
+            engine = BacktestEngine(self.strategy_class, initial_capital=INITIAL_CAPITAL, symbol=symbol, strategy=strategy,
+                                    market_api=market_api, candle_store=candle_store)
+            if engine.prepare_backtest_data():
+                all_data[symbol] = engine.timeframe_data
+            else:
+                logger.error(f"交易对 {symbol} 没有完整的K线数据，跳过")
+        return all_data
+
+    def run(self, strategy=None, all_data=None):
+        """
+        执行扫描
+
+        Args:
+            strategy: 已创建的策略实例（其config作为基础配置，工作进程使用同样的配置），为None时创建
+            all_data: 预先加载的K线 {交易对: {API时间框架: K线}}，为None时调用load_data
+
+        Returns:
+            list: 本次扫描所有任务的结果记录（包括之前已完成的）
+        """
+        if strategy is None:
+            strategy = BacktestEngine._create_strategy(self.strategy_class)
+        completed = load_results(self.results_path)
+        jobs = self.jobs(strategy.config)
+        pending = [job for job in jobs if job[0] not in completed]
+        self.stats.update(jobs=len(jobs), skipped=len(jobs) - len(pending))
+        logger.info(f"参数扫描 {self.strategy_name}: {len(jobs) // max(len(self.symbols), 1)} 个参数组合 × {len(self.symbols)} 个交易对，"
+                    f"已完成 {self.stats['skipped']} 个，待执行 {len(pending)} 个")
+        records = {job[0]: completed[job[0]] for job in jobs if job[0] in completed}
+        if pending:
+            load_start = time.time()
+            if all_data is None:
+                all_data = self.load_data(strategy)
+            self.stats['load_time'] = time.time() - load_start
+            pending = [job for job in pending if job[1] in all_data]
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.results_path)), exist_ok=True)
+            run_start = time.time()
+            # 上次中断时最后一行可能只写了一半，先换行，避免与本次的第一条结果连在一起
+            if os.path.exists(self.results_path) and os.path.getsize(self.results_path) > 0:
+                with open(self.results_path, 'rb+') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                for key, symbol, params, stats, error, elapsed in self._execute(pending, strategy, all_data):
+                    record = {'key': key, 'strategy': self.strategy_name, 'symbol': symbol, 'params': params,
+                              'start': START_DATE.strftime('%Y-%m-%d %H:%M:%S'), 'end': END_DATE.strftime('%Y-%m-%d %H:%M:%S'),
+                              'elapsed': round(elapsed, 3), 'error': error, **(stats or {})}
+                    # 每个结果写完立即刷新，中断后已完成的任务不会丢失
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    f.flush()
+                    if error:
+                        self.stats['failed'] += 1
+                        logger.error(f"{symbol} {params_key(params)} 回测失败: {error}")
+                    else:
+                        self.stats['done'] += 1
+                        records[key] = record
+                    finished = self.stats['done'] + self.stats['failed']
+                    if finished % 50 == 0 or finished == len(pending):
+                        logger.info(f"进度 {finished}/{len(pending)}，用时 {time.time() - run_start:.1f}秒")
+            self.stats['run_time'] = time.time() - run_start
+        return [records[job[0]] for job in jobs if job[0] in records]
+
+    def _execute(self, pending, strategy, all_data):
+        """执行任务，按完成顺序产出 (任务键, 交易对, 参数, 统计, 错误, 用时)"""
+        by_key = {key: (symbol, params) for key, symbol, params in pending}
+        if self.workers < 0:
+            # 当前进程执行时同样关闭逐根K线的回测日志
+            backtest_logger = logging.getLogger(BacktestEngine.__module__)
+            level = backtest_logger.level
+            backtest_logger.setLevel(logging.ERROR)
+            try:
+                for key, symbol, params in pending:
+                    start = time.time()
+                    try:
+                        stats = run_job(strategy, symbol, params, all_data[symbol])
+                        yield key, symbol, params, stats, None, time.time() - start
+                    except Exception as e:
+                        yield key, symbol, params, None, f"{type(e).__name__}: {e}", time.time() - start
+            finally:
+                backtest_logger.setLevel(level)
+            return
+        shared = SharedCandleData({symbol: all_data[symbol] for symbol in {job[1] for job in pending}})
+        try:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(self.module_name, self.strategy_class.__name__, dict(strategy.config))) as pool:
+                # 同一交易对的任务连续提交，工作进程可以复用构造好的K线
+                ordered = sorted(pending, key=lambda job: job[1])
+                futures = [pool.submit(_run_shared_job, shared.name, key, symbol, params) for key, symbol, params in ordered]
+                for future in as_completed(futures):
+                    try:
+                        key, stats, error, elapsed = future.result()
+                    except Exception as e:
+                        # 工作进程异常退出，剩余任务在下次运行时重新执行
+                        logger.error(f"工作进程执行失败: {e}")
+                        continue
+                    symbol, params = by_key[key]
+                    yield key, symbol, params, stats, error, elapsed
+        finally:
+            shared.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测参数扫描（网格/随机搜索）')
+    parser.add_argument('--strategy', default=None, help='策略文件名或类名，默认使用backtest_config.STRATEGIES_TO_TEST的第一个')
+    parser.add_argument('--symbols', default=None, help='逗号分隔的交易对（OKX格式，如 BTC-USDT），默认使用backtest_config')
+    parser.add_argument('--grid', action='append', default=[], help='参数候选值，如 BUY_THRESHOLD=0.2,0.3（可重复）')
+    parser.add_argument('--space', default=None, help='参数空间JSON文件 {参数名: [候选值]}')
+    parser.add_argument('--random', type=int, default=0, help='随机搜索的参数组合数，0表示完整网格')
+    parser.add_argument('--seed', type=int, default=None, help='随机搜索的种子（继续上次的随机搜索时需要相同）')
+    parser.add_argument('--workers', type=int, default=PARAM_SWEEP_WORKERS, help='工作进程数，0为CPU核心数，-1为当前进程执行')
+    parser.add_argument('--results', default=None, help='结果表路径（JSONL），已存在时跳过已完成的任务')
+    args = parser.parse_args()
+
+    strategies = load_strategy_classes([args.strategy] if args.strategy else STRATEGIES_TO_TEST)
+    if not strategies:
+        logger.error("未能加载策略类，参数扫描无法继续")
+        sys.exit(1)
+    strategy_class, module_name = next(iter(strategies.items()))
+    if len(strategies) > 1:
+        logger.warning(f"加载了 {len(strategies)} 个策略类，只扫描 {strategy_class.__name__}（用 --strategy 指定）")
+
+    if args.symbols:
+        symbols = [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]
+    else:
+        symbols = (load_universe_symbols(UNIVERSE_TOP_N) if UNIVERSE_TOP_N else []) or SYMBOLS
+
+    strategy = BacktestEngine._create_strategy(strategy_class)
+    space = build_space(args.grid, args.space)
+    try:
+        validate_space(space, strategy.config)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    results_path = args.results or os.path.join(
+        RESULTS_DIR, f"{module_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    sweep = ParamSweep(strategy_class, module_name, symbols, space, results_path, workers=args.workers,
+                       random_count=args.random, seed=args.seed)
+    records = sweep.run(strategy)
+    summary_path = os.path.splitext(results_path)[0] + '_summary.txt'
+    rows = summarize(records, summary_path)
+
+    logger.info(f"参数扫描完成: {sweep.stats}")
+    logger.info(f"结果表: {results_path}")
+    logger.info(f"汇总报告: {summary_path}")
+    for rank, row in enumerate(rows[:10], 1):
+        logger.info(f"  {rank}. 平均收益率 {row['mean_profit_rate']:.2f}% 胜率 {row['win_rate']:.2f}% 参数 {params_key(row['params'])}")
+
+
+if __name__ == "__main__":
+    main()
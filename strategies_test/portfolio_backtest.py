@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+组合回测工具（多交易对共用资金和持仓上限）
+btc_backtest.py 对每个交易对单独全仓回测再把结果相加，无法反映实盘中 MAX_POSITIONS、仓位过滤和共用资金之间的影响。
+本工具按实盘的方式在一个时间轴上回测所有交易对:
+    - 准备阶段: 逐个交易对加载K线（与btc_backtest相同的K线存储），用策略的analyze_series一次性算出每根基准K线的信号，
+      压缩为定长记录写入临时文件后释放K线，同一时刻内存中只有一个交易对的完整K线
+    - 事件循环: 每个交易对的记录文件按块读取（每块 PORTFOLIO_CHUNK_BARS 根），用 heapq.merge 按时间做k路归并，
+      同一时间的所有交易对K线作为一步；内存占用只与交易对数量和块大小有关，与回测时长无关
+    - 每一步与实盘相同: 构造信号 -> filter_trade_signals -> filter_by_positions（仓位取自模拟账户的PositionService）
+      -> 按评分从高到低开仓，直到持仓数达到 MAX_POSITIONS 或现金不足
+    - 卖出信号、止损止盈的判断和成交价格与 BacktestEngine 相同（按当前K线收盘价成交），每一步按最新收盘价计算组合权益
+
+用法:
+    python strategies_test/portfolio_backtest.py
+    python strategies_test/portfolio_backtest.py --symbols BTC-USDT,ETH-USDT,SOL-USDT --max-positions 2
+    python strategies_test/portfolio_backtest.py --top 200 --position-fraction 0.05
+"""
+
+import os
+import sys
+import csv
+import copy
+import time
+import heapq
+import shutil
+import logging
+import argparse
+import tempfile
+import itertools
+from datetime import datetime
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backtest_config import START_DATE, END_DATE, STRATEGIES_TO_TEST, SYMBOLS, INITIAL_CAPITAL
+try:
+    from backtest_config import UNIVERSE_TOP_N
+except ImportError:
+    UNIVERSE_TOP_N = 0
+try:
+    from backtest_config import PORTFOLIO_MAX_POSITIONS, PORTFOLIO_POSITION_FRACTION, PORTFOLIO_CHUNK_BARS
+except ImportError:
+    PORTFOLIO_MAX_POSITIONS, PORTFOLIO_POSITION_FRACTION, PORTFOLIO_CHUNK_BARS = 0, 0, 4096
+
+from btc_backtest import BacktestEngine, load_strategy_classes, load_universe_symbols
+from okx.MarketData import MarketAPI
+from lib.tool.candle_store import CandleStore
+from lib.tool.candle_frame import as_frame
+from lib.tool import position_service
+from lib.tool.position_service import PositionService, POSITION_SERVICE_CONFIG
+
+logger = logging.getLogger('portfolio_backtest')
+
+CANDLE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data', 'candle_store')
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports', 'portfolio')
+# 与BacktestEngine相同: 跳过前168根基准K线，确保有足够的历史数据计算指标
+WARMUP_BARS = 168
+# 与BacktestEngine相同的时间框架优先级，用于确定最小粒度的基准时间框架
+TIMEFRAME_PRIORITY = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d', '3d', '1w']
+# 开仓金额低于该值（USDT）时放弃
+MIN_ORDER_VALUE = 1.0
+TRADE_FIELDS = ('date', 'symbol', 'type', 'price', 'amount', 'value', 'trade_profit', 'signal_score', 'cash', 'positions')
+
+
+class SimulatedAccount:
+    """
+    组合回测的模拟账户: 现金和持仓
+    同时作为策略的exchange对象，filter_by_positions通过PositionService获取的是本账户的仓位（不会请求交易所）
+    """
+
+    def __init__(self, initial_capital):
+        # 不设置apiKey，不会为模拟账户订阅私有WebSocket
+        self.apiKey = ''
+        self.cash = initial_capital
+        self.positions = {}  # {交易对: {'amount', 'entry_price', 'stop_loss', 'take_profit', 'last_price', 'last_time', 'entry_time'}}
+        # 账户自己的仓位服务: get_position_service(self) 直接返回它，不登记到全局表中（回测结束后随账户释放）
+        self.position_service = PositionService(self.fetch_positions, POSITION_SERVICE_CONFIG)
+
+    def fetch_positions(self):
+        """与 lib2.format_okx_positions 相同格式的仓位列表"""
+        return [{'symbol': symbol, 'posSide': 'long', 'amount': p['amount'], 'entry_price': p['entry_price'],
+                 'current_price': p['last_price'], 'profit_percent': (p['last_price'] / p['entry_price'] - 1) * 100,
+                 'datetime': p['entry_time'].strftime('%Y-%m-%d %H:%M:%S')}
+                for symbol, p in self.positions.items()]
+
+    def market_value(self):
+        """持仓按最新收盘价计算的市值"""
+        return sum(p['amount'] * p['last_price'] for p in self.positions.values())
+
+    def equity(self):
+        return self.cash + self.market_value()
+
+    def open(self, symbol, price, value, stop_loss, take_profit, when):
+        self.cash -= value
+        self.positions[symbol] = {'amount': value / price, 'entry_price': price, 'stop_loss': stop_loss,
+                                  'take_profit': take_profit, 'last_price': price, 'last_time': when, 'entry_time': when}
+        # 仓位变化后使快照失效，下一次filter_by_positions重新获取
+        self.position_service.invalidate()
+        return self.positions[symbol]
+
+    def close(self, symbol, price):
+        position = self.positions.pop(symbol)
+        value = position['amount'] * price
+        self.cash += value
+        self.position_service.invalidate()
+        return position, value, value - position['amount'] * position['entry_price']
+
+
+class PortfolioBacktest:
+    """按统一时间轴回测多个交易对，共用资金和持仓上限"""
+
+    def __init__(self, strategy, initial_capital=INITIAL_CAPITAL, max_positions=PORTFOLIO_MAX_POSITIONS,
+                 position_fraction=PORTFOLIO_POSITION_FRACTION, chunk_bars=PORTFOLIO_CHUNK_BARS, report_dir=None):
+        """
+        Args:
+            strategy: 策略实例（复制后使用，不修改原实例的config和exchange）
+            initial_capital: 初始资金
+            max_positions: 最大同时持仓数，0表示使用策略配置的MAX_POSITIONS
+            position_fraction: 每笔开仓占当前权益的比例，0表示 1/最大持仓数
+            chunk_bars: 事件循环中每个交易对每次从记录文件读取的K线数
+            report_dir: 交易记录和权益曲线的输出目录，None时不输出
+        """
+        self.strategy = copy.copy(strategy)
+        self.strategy.config = dict(strategy.config)
+        if max_positions:
+            self.strategy.config['MAX_POSITIONS'] = max_positions
+        self.max_positions = self.strategy.config.get('MAX_POSITIONS', 30)
+        self.position_fraction = position_fraction or 1.0 / self.max_positions
+        self.initial_capital = initial_capital
+        self.chunk_bars = max(int(chunk_bars), 1)
+        self.report_dir = report_dir
+        self.account = SimulatedAccount(initial_capital)
+        self.strategy.exchange = self.account
+
+        timeframes = self.strategy.get_required_timeframes()
+        self.base_tf = next((tf for tf in TIMEFRAME_PRIORITY if tf in timeframes), None) or next(iter(timeframes), '15m')
+        self.timeframes = list(timeframes)
+        # 信号文字（观望/买入/强烈卖出等）编码为下标，0固定为观望
+        self.labels = ['观望']
+        self._label_index = {'观望': 0}
+        self.dtype = np.dtype([('ts', 'i8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'), ('action', 'i1'),
+                               ('total_score', 'f8'), ('entry_price', 'f8'), ('target_short', 'f8'),
+                               ('stop_loss', 'f8'), ('atr_one', 'f8')]
+                              + [(f'tf_{tf}', 'i1') for tf in self.timeframes])
+        self.symbols = []
+        self._workdir = None
+        self._files = []
+        self.stats = {'symbols': 0, 'skipped_symbols': 0, 'bars': 0, 'steps': 0, 'signals': 0, 'trade_signals': 0,
+                      'buy_trades': 0, 'sell_trades': 0, 'stop_loss_trades': 0, 'take_profit_trades': 0,
+                      'close_position_trades': 0, 'winning_trades': 0, 'losing_trades': 0, 'total_trade_profit': 0.0,
+                      'filtered_by_positions': 0, 'rejected_by_slots': 0, 'rejected_by_cash': 0, 'max_positions_held': 0,
+                      'min_cash': initial_capital, 'max_drawdown': 0.0, 'out_of_order': 0,
+                      'prepare_time': 0.0, 'run_time': 0.0}
+
+    # ---------------- 准备阶段 ----------------
+
+    def _encode(self, values):
+        """信号文字数组编码为下标数组"""
+        codes = np.zeros(len(values), dtype='i1')
+        for label in pd.unique(values):
+            index = self._label_index.get(label)
+            if index is None:
+                index = self._label_index[label] = len(self.labels)
+                self.labels.append(label)
+            codes[values == label] = index
+        return codes
+
+    def add_symbol(self, symbol, candles=None, market_api=None, candle_store=None):
+        """
+        加载一个交易对的K线，计算信号序列并写入记录文件（K线在函数返回后释放）
+
+        Args:
+            symbol: OKX格式的交易对
+            candles: 预先加载的K线 {API时间框架: K线}，缺少的时间框架从K线存储/OKX获取
+            market_api: 共用的OKX MarketAPI客户端
+            candle_store: 共用的K线存储
+
+        Returns:
+            int: 写入的K线记录数，数据不足或策略不支持批量分析时为0
+        """
+        start = time.time()
+        engine = BacktestEngine(type(self.strategy), initial_capital=self.initial_capital, symbol=symbol,
+                                strategy=self.strategy, market_api=market_api, candle_store=candle_store,
+                                timeframe_data=candles)
+        if not engine.prepare_backtest_data():
+            logger.error(f"交易对 {symbol} 没有完整的K线数据，跳过")
+            self.stats['skipped_symbols'] += 1
+            return 0
+        strategy_tf_names = {atf: stf for stf, atf in engine.api_timeframe_map.items()}
+        data = {strategy_tf_names[atf]: as_frame(df, time_index=False)
+                for atf, df in engine.timeframe_data.items() if atf in strategy_tf_names}
+        base_df = data.get(self.base_tf)
+        if base_df is None or len(base_df) <= WARMUP_BARS:
+            logger.error(f"交易对 {symbol} 的{self.base_tf}K线不足{WARMUP_BARS}根，跳过")
+            self.stats['skipped_symbols'] += 1
+            return 0
+        series = self.strategy.analyze_series(symbol, data, base_df['datetime'])
+        if series is None:
+            logger.error(f"策略不支持批量分析（analyze_series），无法组合回测交易对 {symbol}")
+            self.stats['skipped_symbols'] += 1
+            return 0
+
+        rows = slice(WARMUP_BARS, len(base_df))
+        records = np.zeros(len(base_df) - WARMUP_BARS, dtype=self.dtype)
+        records['ts'] = base_df['datetime'].to_numpy().astype('datetime64[ms]').astype('int64')[rows]
+        for field in ('high', 'low', 'close'):
+            records[field] = base_df[field].to_numpy(dtype='float64')[rows]
+        actions = np.asarray(series['overall_action'], dtype=object)
+        records['action'] = np.where(np.asarray(series['valid'])[rows], self._encode(actions[rows]), 0)
+        for field in ('total_score', 'entry_price', 'target_short', 'stop_loss', 'atr_one'):
+            records[field] = np.asarray(series[field], dtype='float64')[rows]
+        for tf in self.timeframes:
+            records[f'tf_{tf}'] = self._encode(np.asarray(series['timeframe_signals'][tf], dtype=object)[rows])
+
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix='portfolio_backtest_')
+        path = os.path.join(self._workdir, f"{len(self._files)}.bin")
+        records.tofile(path)
+        self.symbols.append(symbol)
+        self._files.append(path)
+        self.stats['symbols'] += 1
+        self.stats['bars'] += len(records)
+        self.stats['prepare_time'] += time.time() - start
+        return len(records)
+
+    # ---------------- 事件循环 ----------------
+
+    def _stream(self, index):
+        """按时间顺序产出一个交易对的 (时间戳, 交易对下标, 块, 块内下标)，每次只读取一块"""
+        labels = np.array(self.labels, dtype=object)
+        with open(self._files[index], 'rb') as f:
+            while True:
+                chunk = np.fromfile(f, dtype=self.dtype, count=self.chunk_bars)
+                if not len(chunk):
+                    return
+                # 与analyze_series返回值相同的结构，供策略的build_signal_from_series使用
+                view = {'valid': np.ones(len(chunk), dtype=bool), 'overall_action': labels[chunk['action']],
+                        'timeframe_signals': {tf: labels[chunk[f'tf_{tf}']] for tf in self.timeframes},
+                        'action': chunk['action'], 'high': chunk['high'], 'low': chunk['low'], 'close': chunk['close']}
+                for field in ('total_score', 'entry_price', 'target_short', 'stop_loss', 'atr_one'):
+                    view[field] = chunk[field]
+                for j, ts in enumerate(chunk['ts'].tolist()):
+                    yield ts, index, view, j
+
+    def events(self):
+        """所有交易对按时间k路归并后的事件流（同一时间按交易对下标排序）"""
+        return heapq.merge(*(self._stream(index) for index in range(len(self._files))))
+
+    def run(self):
+        """
+        执行组合回测（需要先调用add_symbol）
+
+        Returns:
+            dict: 统计信息
+        """
+        start = time.time()
+        # 逐步调用filter_by_positions会输出大量INFO日志，回测期间只保留警告
+        quiet = [self.strategy.logger, logging.getLogger(position_service.__name__), logging.getLogger(BacktestEngine.__module__)]
+        levels = [item.level for item in quiet]
+        for item in quiet:
+            item.setLevel(logging.WARNING)
+        self._trade_file = self._equity_file = None
+        if self.report_dir:
+            os.makedirs(self.report_dir, exist_ok=True)
+            self._trade_file = open(os.path.join(self.report_dir, 'trades.csv'), 'w', encoding='utf-8', newline='')
+            self._trade_writer = csv.DictWriter(self._trade_file, fieldnames=TRADE_FIELDS)
+            self._trade_writer.writeheader()
+            self._equity_file = open(os.path.join(self.report_dir, 'equity.csv'), 'w', encoding='utf-8', newline='')
+            self._equity_file.write('date,equity,cash,positions\n')
+        peak = self.initial_capital
+        last_ts = None
+        try:
+            for ts, group in itertools.groupby(self.events(), key=itemgetter(0)):
+                if last_ts is not None and ts <= last_ts:
+                    self.stats['out_of_order'] += 1
+                last_ts = ts
+                when = pd.Timestamp(ts, unit='ms').to_pydatetime()
+                self._step(when, list(group))
+                equity = self.account.equity()
+                peak = max(peak, equity)
+                self.stats['max_drawdown'] = max(self.stats['max_drawdown'], (peak - equity) / peak * 100)
+                self.stats['steps'] += 1
+                if self._equity_file:
+                    self._equity_file.write(f"{when:%Y-%m-%d %H:%M:%S},{equity:.6f},{self.account.cash:.6f},{len(self.account.positions)}\n")
+            # 回测结束，按最新收盘价平掉剩余持仓
+            for symbol in list(self.account.positions):
+                position = self.account.positions[symbol]
+                self._exit(symbol, position['last_price'], 'CLOSE_POSITION', position['last_time'])
+        finally:
+            for item, level in zip(quiet, levels):
+                item.setLevel(level)
+            for f in (self._trade_file, self._equity_file):
+                if f:
+                    f.close()
+        self.stats['run_time'] = time.time() - start
+        return self.report()
+
+    def _step(self, when, events):
+        """处理同一时间所有交易对的K线（顺序与BacktestEngine相同: 信号 -> 开平仓 -> 止损止盈）"""
+        account = self.account
+        signals = []
+        for _, index, view, j in events:
+            if view['action'][j]:
+                signal = self.strategy.build_signal_from_series(self.symbols[index], view, j)
+                if signal is not None:
+                    signal.timestamp = when
+                    signals.append(signal)
+        self.stats['signals'] += len(signals)
+        bars = {self.symbols[index]: (view['high'][j], view['low'][j], view['close'][j]) for _, index, view, j in events}
+
+        if signals:
+            trade_signals = self.strategy.filter_trade_signals(signals)
+            self.stats['trade_signals'] += len(trade_signals)
+            # 卖出信号与BacktestEngine相同，平掉已有的多仓
+            for signal in trade_signals:
+                if signal.overall_action == "卖出" and signal.symbol in account.positions:
+                    self._exit(signal.symbol, bars[signal.symbol][2], 'SELL', when, signal.total_score)
+            buys = [signal for signal in trade_signals if signal.overall_action == "买入"]
+            if buys:
+                candidates = self.strategy.filter_by_positions(buys)
+                self.stats['filtered_by_positions'] += len(buys) - len(candidates)
+                # 与扫描器相同，按评分从高到低处理
+                candidates.sort(key=lambda signal: signal.total_score, reverse=True)
+                for signal in candidates:
+                    if len(account.positions) >= self.max_positions:
+                        self.stats['rejected_by_slots'] += 1
+                        continue
+                    if signal.symbol in account.positions:
+                        # filter_by_positions应该已经过滤掉，这里防止同一交易对重复开仓
+                        continue
+                    value = min(account.equity() * self.position_fraction, account.cash)
+                    if value < MIN_ORDER_VALUE:
+                        self.stats['rejected_by_cash'] += 1
+                        continue
+                    price = bars[signal.symbol][2]
+                    account.open(signal.symbol, price, value, signal.stop_loss, signal.target_short, when)
+                    self.stats['buy_trades'] += 1
+                    self.stats['min_cash'] = min(self.stats['min_cash'], account.cash)
+                    self.stats['max_positions_held'] = max(self.stats['max_positions_held'], len(account.positions))
+                    self._record(when, signal.symbol, 'BUY', price, value / price, value, None, signal.total_score)
+
+        # 止损止盈（每根K线都检查，按收盘价成交）并更新最新价格
+        for symbol, (high, low, close) in bars.items():
+            position = account.positions.get(symbol)
+            if position is None:
+                continue
+            position['last_price'] = close
+            position['last_time'] = when
+            if low <= position['stop_loss']:
+                self._exit(symbol, close, 'STOP_LOSS', when)
+            elif high >= position['take_profit']:
+                self._exit(symbol, close, 'TAKE_PROFIT', when)
+
+    def _exit(self, symbol, price, trade_type, when, score=None):
+        position, value, trade_profit = self.account.close(symbol, price)
+        self.stats[f"{trade_type.lower()}_trades"] += 1
+        self.stats['total_trade_profit'] += trade_profit
+        self.stats['winning_trades' if trade_profit > 0 else 'losing_trades'] += 1
+        self._record(when, symbol, trade_type, price, position['amount'], value, trade_profit, score)
+
+    def _record(self, when, symbol, trade_type, price, amount, value, trade_profit, score):
+        if self._trade_file:
+            self._trade_writer.writerow({
+                'date': when.strftime('%Y-%m-%d %H:%M:%S'), 'symbol': symbol, 'type': trade_type, 'price': price,
+                'amount': amount, 'value': round(value, 6), 'trade_profit': '' if trade_profit is None else round(trade_profit, 6),
+                'signal_score': '' if score is None else round(score, 6), 'cash': round(self.account.cash, 6),
+                'positions': len(self.account.positions)})
+
+    def report(self):
+        """统计信息（字段与BacktestEngine.generate_report相同，另加组合相关的统计）"""
+        final_capital = self.account.equity()
+        completed = self.stats['winning_trades'] + self.stats['losing_trades']
+        return {
+            'initial_capital': self.initial_capital,
+            'final_capital': final_capital,
+            'total_profit': final_capital - self.initial_capital,
+            'total_profit_rate': (final_capital - self.initial_capital) / self.initial_capital * 100,
+            'win_rate': self.stats['winning_trades'] / completed * 100 if completed else 0,
+            'max_positions': self.max_positions,
+            'position_fraction': self.position_fraction,
+            **self.stats,
+        }
+
+    def close(self):
+        """删除临时记录文件"""
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+            self._files = []
+
+
+def write_summary(stats, strategy_name, symbols, path):
+    """写入组合回测汇总报告"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("===== 组合回测汇总报告 =====\n\n")
+        f.write(f"策略名称: {strategy_name}\n")
+        f.write(f"回测时间段: {START_DATE} 至 {END_DATE}\n")
+        f.write(f"交易对数量: {stats['symbols']}（跳过 {stats['skipped_symbols']} 个）\n")
+        f.write(f"最大持仓数: {stats['max_positions']}，每笔开仓占权益: {stats['position_fraction'] * 100:.2f}%\n\n")
+        f.write(f"初始资金: {stats['initial_capital']:.2f} USDT\n")
+        f.write(f"最终权益: {stats['final_capital']:.2f} USDT\n")
+        f.write(f"总收益率: {stats['total_profit_rate']:.2f}%\n")
+        f.write(f"最大回撤: {stats['max_drawdown']:.2f}%\n")
+        f.write(f"胜率: {stats['win_rate']:.2f}% ({stats['winning_trades']}/{stats['winning_trades'] + stats['losing_trades']})\n\n")
+        f.write(f"买入次数: {stats['buy_trades']}\n")
+        f.write(f"卖出信号平仓: {stats['sell_trades']}，止盈: {stats['take_profit_trades']}，止损: {stats['stop_loss_trades']}，"
+                f"回测结束平仓: {stats['close_position_trades']}\n")
+        f.write(f"最多同时持仓: {stats['max_positions_held']}\n")
+        f.write(f"仓位过滤掉的买入信号: {stats['filtered_by_positions']}，持仓已满放弃: {stats['rejected_by_slots']}，"
+                f"现金不足放弃: {stats['rejected_by_cash']}\n\n")
+        f.write(f"K线数: {stats['bars']}，时间步数: {stats['steps']}\n")
+        f.write(f"准备用时: {stats['prepare_time']:.1f}秒，事件循环用时: {stats['run_time']:.1f}秒\n")
+        f.write("\n交易对列表:\n")
+        for symbol in symbols:
+            f.write(f"  - {symbol}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='组合回测（多交易对共用资金和持仓上限）')
+    parser.add_argument('--strategy', default=None, help='策略文件名或类名，默认使用backtest_config.STRATEGIES_TO_TEST的第一个')
+    parser.add_argument('--symbols', default=None, help='逗号分隔的交易对（OKX格式，如 BTC-USDT），默认使用backtest_config')
+    parser.add_argument('--top', type=int, default=UNIVERSE_TOP_N, help='使用交易对池快照中成交量最大的前N个交易对')
+    parser.add_argument('--capital', type=float, default=INITIAL_CAPITAL, help='初始资金')
+    parser.add_argument('--max-positions', type=int, default=PORTFOLIO_MAX_POSITIONS, help='最大同时持仓数，0为策略配置的MAX_POSITIONS')
+    parser.add_argument('--position-fraction', type=float, default=PORTFOLIO_POSITION_FRACTION, help='每笔开仓占权益的比例，0为1/最大持仓数')
+    parser.add_argument('--chunk-bars', type=int, default=PORTFOLIO_CHUNK_BARS, help='事件循环中每个交易对每次读取的K线数')
+    args = parser.parse_args()
+
+    strategies = load_strategy_classes([args.strategy] if args.strategy else STRATEGIES_TO_TEST)
+    if not strategies:
+        logger.error("未能加载策略类，组合回测无法继续")
+        sys.exit(1)
+    strategy_class, module_name = next(iter(strategies.items()))
+    if len(strategies) > 1:
+        logger.warning(f"加载了 {len(strategies)} 个策略类，只回测 {strategy_class.__name__}（用 --strategy 指定）")
+
+    if args.symbols:
+        symbols = [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]
+    else:
+        symbols = (load_universe_symbols(args.top) if args.top else []) or SYMBOLS
+
+    report_dir = os.path.join(REPORTS_DIR, f"{module_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    backtest = PortfolioBacktest(BacktestEngine._create_strategy(strategy_class), initial_capital=args.capital,
+                                 max_positions=args.max_positions, position_fraction=args.position_fraction,
+                                 chunk_bars=args.chunk_bars, report_dir=report_dir)
+    market_api = MarketAPI()
+    candle_store = CandleStore(CANDLE_STORE_DIR)
+    try:
+        for n, symbol in enumerate(symbols, 1):
+            count = backtest.add_symbol(symbol, market_api=market_api, candle_store=candle_store)
+            logger.info(f"[{n}/{len(symbols)}] {symbol}: {count} 根K线")
+        stats = backtest.run()
+    finally:
+        backtest.close()
+
+    summary_path = os.path.join(report_dir, 'summary.txt')
+    write_summary(stats, f"{module_name}.py", backtest.symbols, summary_path)
+    logger.info(f"组合回测完成: 最终权益 {stats['final_capital']:.2f} USDT（{stats['total_profit_rate']:.2f}%），"
+                f"最大回撤 {stats['max_drawdown']:.2f}%，买入 {stats['buy_trades']} 次，最多同时持仓 {stats['max_positions_held']}")
+    logger.info(f"报告目录: {report_dir}")
+
+
+if __name__ == "__main__":
+    main()
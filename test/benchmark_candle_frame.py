@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+K线容器基准测试
+对比扫描器原来的 OHLCV列表 → DataFrame（to_datetime + set_index + astype）路径与 CandleArray 的构造耗时和内存占用，
+并测量读取收盘价尾部、惰性转换为DataFrame的耗时
+
+用法:
+    python test/benchmark_candle_frame.py --symbols 150 --bars 309
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.candle_frame import CandleArray
+
+TIMEFRAMES = ['4h', '1h', '15m']
+
+
+def legacy_dataframe(ohlcv):
+    """扫描器原来的转换方式"""
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    return df.astype({'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64', 'volume': 'float64'})
+
+
+def generate_ohlcv(count, bars, seed=9):
+    """生成交易所格式的OHLCV列表"""
+    rng = np.random.default_rng(seed)
+    now = int(time.time() * 1000) // 900000 * 900000
+    result = []
+    for _ in range(count):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, bars)))
+        result.append([[now - (bars - 1 - i) * 900000, float(close[i - 1] if i else close[0]), float(close[i] * 1.002),
+                        float(close[i] * 0.998), float(close[i]), float(rng.uniform(10, 1000))] for i in range(bars)])
+    return result
+
+
+def measure(build, payloads):
+    """返回 (耗时秒, 构造结果占用的峰值内存字节, 结果列表)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = [build(payload) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线容器基准测试')
+    parser.add_argument('--symbols', type=int, default=150, help='交易对数量（每个交易对3个时间框架）')
+    parser.add_argument('--bars', type=int, default=309, help='每个时间框架的K线数量')
+    args = parser.parse_args()
+
+    payloads = generate_ohlcv(args.symbols * len(TIMEFRAMES), args.bars)
+    print(f"K线序列数量: {len(payloads)}，每个 {args.bars} 根")
+
+    legacy_time, legacy_peak, frames = measure(legacy_dataframe, payloads)
+    array_time, array_peak, arrays = measure(CandleArray.from_ohlcv, payloads)
+    legacy_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+    array_bytes = sum(candles.nbytes for candles in arrays)
+    print(f"DataFrame:   构造 {legacy_time * 1000:8.1f}毫秒, 数据 {legacy_bytes / 1024:8.0f}KB, 构造峰值内存 {legacy_peak / 1024:8.0f}KB")
+    print(f"CandleArray: 构造 {array_time * 1000:8.1f}毫秒, 数据 {array_bytes / 1024:8.0f}KB, 构造峰值内存 {array_peak / 1024:8.0f}KB")
+    print(f"构造加速 {legacy_time / max(array_time, 1e-9):.1f}倍")
+
+    # 读取尾部收盘价（策略最常见的访问方式）
+    start = time.perf_counter()
+    for df in frames:
+        df['close'].iloc[-20:].mean()
+    legacy_tail = time.perf_counter() - start
+    start = time.perf_counter()
+    for candles in arrays:
+        candles['close'][-20:].mean()
+    array_tail = time.perf_counter() - start
+    print(f"读取最近20根收盘价均值: DataFrame {legacy_tail * 1000:.1f}毫秒, CandleArray {array_tail * 1000:.1f}毫秒")
+
+    # 惰性转换为DataFrame（需要pandas计算时），转换结果与原路径一致
+    start = time.perf_counter()
+    converted = [candles.to_frame() for candles in arrays]
+    convert_time = time.perf_counter() - start
+    print(f"CandleArray.to_frame(): {convert_time * 1000:.1f}毫秒（每个CandleArray只转换一次，结果缓存）")
+    for df, frame in zip(frames, converted):
+        # pandas 3 中 to_datetime(unit='ms') 返回datetime64[ms]，时间索引统一为纳秒后比较
+        expected = df.set_axis(df.index.astype('datetime64[ns]'))
+        pd.testing.assert_frame_equal(expected, frame, check_freq=False)
+    print("转换结果校验通过")
+
+    # 没有K线时（交易所返回空列表）构造空的CandleArray，扫描器按时间框架是否为空判断数据是否足够
+    attrs = {'symbol': 'EMPTY/USDT', 'timeframe': '15m'}
+    for candles in (CandleArray.from_ohlcv([], attrs), CandleArray.create_empty(attrs)):
+        assert candles.empty and len(candles) == 0 and candles.attrs == attrs
+        assert candles.to_frame().empty and list(candles.to_frame().columns) == list(frames[0].columns)
+    print("空K线校验通过")
+
+
+if __name__ == '__main__':
+    main()
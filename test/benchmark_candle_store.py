@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+历史K线加载基准测试
+生成合成的15m K线，对比 Excel 读取（旧回测缓存）与列式K线存储区间查询的加载耗时
+
+用法:
+    python test/benchmark_candle_store.py --days 180
+    python test/benchmark_candle_store.py --days 605 --skip-excel
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.candle_store import CandleStore, CANDLE_COLUMNS
+
+
+def generate_bars(days, tf_ms=15 * 60 * 1000, start_ms=1704067200000):
+    """生成合成K线数组 [timestamp, open, high, low, close, volume]"""
+    n = days * 24 * 60 * 60 * 1000 // tf_ms
+    rng = np.random.default_rng(42)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, n))
+    volume = rng.uniform(10, 1000, n)
+    ts = start_ms + np.arange(n, dtype='int64') * tf_ms
+    return np.column_stack([ts.astype('float64'), open_, high, low, close, volume])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史K线加载基准测试')
+    parser.add_argument('--days', type=int, default=180, help='数据天数（15m周期）')
+    parser.add_argument('--repeat', type=int, default=5, help='列式存储读取重复次数')
+    parser.add_argument('--skip-excel', action='store_true', help='跳过Excel基线（需要openpyxl）')
+    args = parser.parse_args()
+
+    bars = generate_bars(args.days)
+    start_ms, end_ms = int(bars[0, 0]), int(bars[-1, 0])
+    work_dir = tempfile.mkdtemp(prefix='candle_bench_')
+    print(f"K线数量: {len(bars)} (15m, {args.days}天)")
+
+    try:
+        if not args.skip_excel:
+            excel_file = os.path.join(work_dir, 'BTC-USDT_15m.xlsx')
+            df = pd.DataFrame(bars, columns=CANDLE_COLUMNS)
+            df['datetime'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+            start = time.time()
+            df.to_excel(excel_file, index=False)
+            print(f"Excel写入: {time.time() - start:.2f}秒")
+            start = time.time()
+            pd.read_excel(excel_file)
+            print(f"Excel读取: {time.time() - start:.2f}秒")
+
+        store = CandleStore(os.path.join(work_dir, 'candle_store'))
+        start = time.time()
+        store.write('BTC-USDT', '15m', bars)
+        print(f"列式存储写入: {time.time() - start:.3f}秒")
+
+        start = time.time()
+        for _ in range(args.repeat):
+            columns = store.read('BTC-USDT', '15m', start_ms, end_ms)
+        elapsed = (time.time() - start) / args.repeat
+        print(f"列式存储全区间读取: {elapsed * 1000:.1f}毫秒 ({len(columns['timestamp'])}条)")
+
+        start = time.time()
+        df = pd.DataFrame(store.read('BTC-USDT', '15m', start_ms, end_ms))
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+        print(f"列式存储读取并构建DataFrame: {(time.time() - start) * 1000:.1f}毫秒")
+
+        month_ms = 30 * 24 * 60 * 60 * 1000
+        start = time.time()
+        columns = store.read('BTC-USDT', '15m', end_ms - month_ms, end_ms)
+        print(f"列式存储最近30天区间查询: {(time.time() - start) * 1000:.1f}毫秒 ({len(columns['timestamp'])}条)")
+
+        # 追加最后一天的数据并检测缺口
+        tail = generate_bars(1, start_ms=end_ms + 15 * 60 * 1000)
+        start = time.time()
+        store.write('BTC-USDT', '15m', tail)
+        print(f"追加1天数据: {(time.time() - start) * 1000:.1f}毫秒")
+        start = time.time()
+        gaps = store.find_gaps('BTC-USDT', '15m', start_ms, int(tail[-1, 0]))
+        print(f"缺口检测: {(time.time() - start) * 1000:.1f}毫秒 (缺口 {len(gaps)} 个)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+冷启动耗时回归测试（每次测量都在新的Python进程中进行）
+    - import multi_timeframe_system 的耗时（中位数），超过 --budget 秒时返回非0退出码
+    - 启动时不应导入的模块（ccxt、talib、okx、redis、requests），lib2只执行一次
+    - 策略发现: 旧方式导入strategies目录下所有模块 vs 策略清单（无缓存 / 有缓存）只导入启用的策略模块
+    - --profile 输出导入耗时明细（与 multi_timeframe_system.py --profile-startup 相同的统计）
+
+需要能导入 config.py（与运行扫描器的环境相同）
+
+用法:
+    python test/benchmark_cold_start.py
+    python test/benchmark_cold_start.py --runs 7 --budget 3 --profile
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_MODULES = ['ccxt', 'talib', 'okx', 'redis', 'requests']
+
+IMPORT_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+import multi_timeframe_system
+elapsed = time.perf_counter() - start
+lib2_runs = sum(1 for m in list(sys.modules.values()) if (getattr(m, '__file__', None) or '').endswith('lib2.py'))
+print(json.dumps({'seconds': elapsed, 'eager': [m for m in %r if m in sys.modules], 'lib2_runs': lib2_runs}))
+''' % (EAGER_MODULES,)
+
+LEGACY_DISCOVERY_SCRIPT = '''
+import os, sys, time, json, inspect, importlib
+from strategies.base_strategy import BaseStrategy
+start = time.perf_counter()
+found = []
+for filename in sorted(os.listdir('strategies')):
+    if filename.endswith('.py') and filename not in %r:
+        module = importlib.import_module('strategies.' + filename[:-3])
+        for name, obj in inspect.getmembers(module):
+            if inspect.isclass(obj) and issubclass(obj, BaseStrategy) and obj is not BaseStrategy:
+                found.append((filename[:-3], name))
+print(json.dumps({'seconds': time.perf_counter() - start, 'found': found}))
+'''
+
+MANIFEST_DISCOVERY_SCRIPT = '''
+import os, sys, time, json, importlib
+from strategies.base_strategy import BaseStrategy
+from lib.tool.strategy_manifest import StrategyManifest
+start = time.perf_counter()
+manifest = StrategyManifest('strategies', %r, cache_path=%r)
+candidates = manifest.load()
+enabled = %r
+found = []
+for module_name, class_names in candidates.items():
+    if module_name in enabled or set(class_names or []) & set(enabled):
+        module = importlib.import_module('strategies.' + module_name)
+        found += [(module_name, name) for name in class_names if issubclass(getattr(module, name), BaseStrategy)]
+print(json.dumps({'seconds': time.perf_counter() - start, 'found': found, 'stats': manifest.stats}))
+'''
+
+PROFILE_SCRIPT = '''
+from lib.tool.startup_profiler import startup_profiler
+startup_profiler.start()
+import multi_timeframe_system
+startup_profiler.stop()
+startup_profiler.report(top=15)
+'''
+
+EXCLUDE_FILES = ['base_strategy.py', '__init__.py', 'condition_analyzer.py', 'indicator_cache.py', 'cross_sectional.py']
+
+
+def run_python(script):
+    env = dict(os.environ)
+    env['PYTHONDONTWRITEBYTECODE'] = '0'
+    result = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"退出码 {result.returncode}")
+    return result.stdout
+
+
+def last_json(output):
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='冷启动耗时回归测试')
+    parser.add_argument('--runs', type=int, default=5, help='每项测量的进程数（取中位数）')
+    parser.add_argument('--budget', type=float, default=5.0, help='import multi_timeframe_system 的耗时预算（秒）')
+    parser.add_argument('--enabled', nargs='*', default=['test3'], help='启用的策略（模块名或类名）')
+    parser.add_argument('--profile', action='store_true', help='输出导入耗时明细')
+    args = parser.parse_args()
+
+    # 预热一次，生成 .pyc（与部署后的状态一致），不计入结果
+    run_python(IMPORT_SCRIPT)
+
+    imports = [last_json(run_python(IMPORT_SCRIPT)) for _ in range(args.runs)]
+    import_time = statistics.median(r['seconds'] for r in imports)
+    print(f"import multi_timeframe_system: 中位数 {import_time:.3f}秒（{args.runs}个进程，预算 {args.budget}秒）")
+
+    legacy = [last_json(run_python(LEGACY_DISCOVERY_SCRIPT % (EXCLUDE_FILES,))) for _ in range(args.runs)]
+    cache_path = os.path.join(tempfile.mkdtemp(prefix='strategy_manifest_'), 'manifest.json')
+    cold = last_json(run_python(MANIFEST_DISCOVERY_SCRIPT % (EXCLUDE_FILES, cache_path, args.enabled)))
+    warm = [last_json(run_python(MANIFEST_DISCOVERY_SCRIPT % (EXCLUDE_FILES, cache_path, args.enabled))) for _ in range(args.runs)]
+    legacy_time = statistics.median(r['seconds'] for r in legacy)
+    warm_time = statistics.median(r['seconds'] for r in warm)
+    print(f"策略发现: 导入所有策略模块 {legacy_time * 1000:.0f}毫秒, 策略清单无缓存 {cold['seconds'] * 1000:.0f}毫秒, "
+          f"有缓存 {warm_time * 1000:.0f}毫秒（启用 {args.enabled}）")
+
+    ok = True
+    print("功能校验:")
+    ok &= check(f"启动时不导入 {EAGER_MODULES}", all(not r['eager'] for r in imports))
+    ok &= check("lib2只执行一次", all(r['lib2_runs'] == 1 for r in imports))
+    expected = sorted(tuple(item) for item in legacy[0]['found']
+                      if item[0] in args.enabled or item[1] in args.enabled)
+    ok &= check("策略清单找到的启用策略与导入所有模块相同", sorted(tuple(item) for item in warm[0]['found']) == expected)
+    ok &= check("有缓存时不重新解析策略文件", warm[0]['stats']['parsed'] == 0 and cold['stats']['parsed'] > 0)
+    ok &= check(f"导入耗时在预算内（{import_time:.3f}秒 <= {args.budget}秒）", import_time <= args.budget)
+
+    if args.profile:
+        print(run_python(PROFILE_SCRIPT))
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
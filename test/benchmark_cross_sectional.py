@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+横截面评分基准测试（合成K线，不需要网络）
+    - 对比策略执行器逐个交易对调用 analyze 与 CROSS_SECTIONAL 模式一次调用 analyze_universe 的耗时
+    - 校验横截面模式只返回综合评分达到买入/卖出阈值的交易对，且信号（操作、评分、价格、止损、目标、各周期信号）
+      与逐个分析完全一致
+    - 校验K线数量不同、K线不足20根、缺少时间框架的交易对，以及analyze_universe失败时回退到逐个分析
+
+用法:
+    python test/benchmark_cross_sectional.py
+    python test/benchmark_cross_sectional.py --symbols 800 --bars 309 --repeat 3
+"""
+
+import gc
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.candle_frame import CandleArray
+from lib.tool.strategy_executor import StrategyExecutor
+from strategies.test3 import MultiTimeframeStrategy
+
+TIMEFRAME_MINUTES = {'4h': 240, '1h': 60, '15m': 15}
+
+
+def generate_data(symbol_count, bars, seed=5):
+    """生成合成K线（CandleArray，与WebSocket行情/K线存储提供的格式一致），部分交易对K线数量不同"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp('2026-01-01').value // 10 ** 6
+    all_data = {}
+    for i in range(symbol_count):
+        symbol = f"SYN{i:04d}/USDT"
+        all_data[symbol] = {}
+        for tf, minutes in TIMEFRAME_MINUTES.items():
+            # 少量新上线的交易对K线较少（包括不足20根的）
+            n = bars if i % 25 else int(rng.integers(5, bars))
+            # 分段漂移让一部分交易对的RSI发生交叉、趋势一致
+            drift = rng.normal(0, 0.004)
+            close = 100 * np.exp(np.cumsum(rng.normal(drift, 0.01, n)))
+            timestamp = end - np.arange(n)[::-1] * minutes * 60000
+            values = np.vstack([np.roll(close, 1), close * 1.004, close * 0.996, close, rng.lognormal(3, 1, n)])
+            all_data[symbol][tf] = CandleArray(timestamp.astype('int64'), np.ascontiguousarray(values))
+    return all_data
+
+
+def summarize(signal):
+    if signal is None:
+        return None
+    return (signal.overall_action, round(signal.total_score, 10), round(signal.entry_price, 8),
+            round(signal.stop_loss, 8), round(signal.target_short, 8), round(signal.atr_one, 8),
+            tuple(sorted(signal.timeframe_signals.items())), tuple(signal.reasoning))
+
+
+def timed(func, repeat):
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='横截面评分基准测试')
+    parser.add_argument('--symbols', type=int, default=600, help='合成交易对数量')
+    parser.add_argument('--bars', type=int, default=309, help='每个时间框架的K线数量')
+    parser.add_argument('--repeat', type=int, default=1, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    strategy = MultiTimeframeStrategy()
+    strategies = {'MultiTimeframeStrategy': strategy}
+    all_data = generate_data(args.symbols, args.bars)
+    tasks = [(symbol, 'MultiTimeframeStrategy') for symbol in all_data]
+
+    per_symbol = StrategyExecutor(strategies, config={'MODE': 'inline'})
+    cross_sectional = StrategyExecutor(strategies, config={'MODE': 'inline', 'CROSS_SECTIONAL': True})
+    legacy, legacy_time = timed(lambda: per_symbol.run(tasks, all_data), args.repeat)
+    results, cross_time = timed(lambda: cross_sectional.run(tasks, all_data), args.repeat)
+
+    expected = {task: summarize(result) for task, (result, _) in legacy.items()
+                if result is not None and result.overall_action != "观望"}
+    actual = {task: summarize(result) for task, (result, _) in results.items() if result is not None}
+    print(f"{args.symbols}个交易对 × {len(TIMEFRAME_MINUTES)}个时间框架 × {args.bars}根K线: "
+          f"逐个analyze {legacy_time * 1000:.0f}毫秒, 横截面 {cross_time * 1000:.0f}毫秒 "
+          f"（{legacy_time / max(cross_time, 1e-9):.1f}倍），触发信号 {len(actual)} 个")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("每个任务都有结果且没有错误", set(results) == set(tasks) and all(e is None for _, e in results.values()))
+    ok &= check("买入和卖出信号都存在", {v[0] for v in expected.values()} == {"买入", "卖出"})
+    ok &= check("只返回达到阈值的交易对", set(actual) == set(expected))
+    mismatched = [task for task in expected if actual.get(task) != expected[task]]
+    ok &= check("信号与逐个分析一致", not mismatched)
+    if mismatched:
+        print(f"    例如 {mismatched[0]}: {expected[mismatched[0]]} vs {actual.get(mismatched[0])}")
+
+    # 缺少时间框架的交易对与逐个分析一样不产生信号
+    partial = {symbol: dict(list(data.items())[:2]) for symbol, data in list(all_data.items())[:20]}
+    ok &= check("少于3个时间框架时不产生信号", strategy.analyze_universe(partial) == {})
+
+    # DataFrame输入与CandleArray输入结果相同
+    frames = {symbol: {tf: candles.to_frame() for tf, candles in data.items()}
+              for symbol, data in list(all_data.items())[:100]}
+    subset = {symbol: all_data[symbol] for symbol in frames}
+    ok &= check("DataFrame输入结果一致", {s: summarize(v) for s, v in strategy.analyze_universe(frames).items()}
+                == {s: summarize(v) for s, v in strategy.analyze_universe(subset).items()})
+
+    # analyze_universe失败时回退到逐个分析
+    class Broken(MultiTimeframeStrategy):
+        def analyze_universe(self, universe):
+            raise RuntimeError('模拟横截面分析失败')
+    fallback = StrategyExecutor({'MultiTimeframeStrategy': Broken()}, config={'MODE': 'inline', 'CROSS_SECTIONAL': True})
+    fallback_results = fallback.run(tasks[:50], all_data)
+    ok &= check("横截面分析失败时回退到逐个分析",
+                {t: summarize(r) for t, (r, _) in fallback_results.items()} == {t: summarize(legacy[t][0]) for t in tasks[:50]})
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+数据库批量写入基准测试
+对比 BaseModel.create 逐行插入与 bulk_create / bulk_upsert 批量写入 order、his_order 表的速度（行/秒），
+并用多线程并发写入验证连接池（每个线程独占连接，不再共用一个socket）
+
+默认使用SQLite兼容层（把MySQL语法转换为SQLite语法）作为本地替身；
+指定 --mysql 时使用config.py中的DATABASE_CONFIG，在 bench_order / bench_his_order 表上测试（按order表结构创建，测试后删除）
+
+用法:
+    python test/benchmark_db_bulk_write.py --rows 5000
+    python test/benchmark_db_bulk_write.py --rows 20000 --mysql
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+# 与models中的脚本一样，把models目录加入路径后直接导入（不触发models/__init__.py中的全局模型实例化）
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+sys.path.append(os.path.dirname(MODELS_DIR))
+sys.path.append(MODELS_DIR)
+
+from db_connection import DatabaseConnection
+from base_model import BaseModel
+
+ORDER_COLUMNS_DDL = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    variety_id INTEGER NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0,
+    cost_open REAL NOT NULL,
+    cost_close REAL NOT NULL DEFAULT 0,
+    max_price REAL NOT NULL,
+    min_price REAL NOT NULL,
+    volume REAL NOT NULL,
+    open_order TEXT NOT NULL DEFAULT '',
+    colse_order TEXT NOT NULL DEFAULT '',
+    order_no TEXT NOT NULL,
+    stop_win_price REAL NOT NULL DEFAULT 0,
+    stop_loss_price REAL NOT NULL DEFAULT 0,
+    direction TEXT NOT NULL,
+    factor_name TEXT NOT NULL DEFAULT '',
+    creat_time TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    update_time TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    stopArr TEXT NOT NULL DEFAULT ''
+"""
+
+
+class SQLiteCursor:
+    """模拟pymysql DictCursor：%s占位符、DESCRIBE、ON DUPLICATE KEY UPDATE 转换为SQLite语法"""
+
+    UPSERT_PATTERN = re.compile(r"ON DUPLICATE KEY UPDATE (.*)$", re.S)
+    VALUES_PATTERN = re.compile(r"VALUES\((`?\w+`?)\)")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cursor.close()
+
+    def _translate(self, query):
+        describe = re.match(r"DESCRIBE `?(\w+)`?", query)
+        if describe:
+            return f"SELECT name AS Field FROM pragma_table_info('{describe.group(1)}')"
+        query = query.replace('%s', '?')
+        upsert = self.UPSERT_PATTERN.search(query)
+        if upsert:
+            updates = self.VALUES_PATTERN.sub(lambda m: f"excluded.{m.group(1)}", upsert.group(1))
+            query = query[:upsert.start()] + f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        return query
+
+    def execute(self, query, params=None):
+        self.cursor.execute(self._translate(query), params or ())
+        self.lastrowid = self.cursor.lastrowid
+        return self.cursor.rowcount
+
+    def executemany(self, query, params_list):
+        self.cursor.executemany(self._translate(query), params_list)
+        return self.cursor.rowcount
+
+    def fetchall(self):
+        names = [d[0] for d in self.cursor.description or []]
+        return [dict(zip(names, row)) for row in self.cursor.fetchall()]
+
+
+class SQLiteConnection:
+    """模拟pymysql连接接口的SQLite连接"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._closed = False
+
+    def cursor(self):
+        return SQLiteCursor(self.conn)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def ping(self, reconnect=False):
+        self.conn.execute("SELECT 1")
+
+    def close(self):
+        self.conn.close()
+        self._closed = True
+
+
+def make_model(table, db_conn):
+    """创建指定表名的模型"""
+    model_class = type(f"Bench_{table}", (BaseModel,), {'table_name': table, 'primary_key': 'id'})
+    return model_class(db_conn)
+
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rows = []
+    for i in range(count):
+        price = rng.uniform(0.1, 50000)
+        rows.append({
+            'variety_id': rng.randint(1, 500), 'status': rng.randint(0, 2), 'cost_open': price, 'cost_close': 0,
+            'max_price': price * 1.05, 'min_price': price * 0.95, 'volume': rng.uniform(1, 100),
+            'open_order': f"open-{seed}-{i}", 'colse_order': '', 'order_no': f"no-{seed}-{i}",
+            'stop_win_price': price * 1.1, 'stop_loss_price': price * 0.9,
+            'direction': rng.choice(['long', 'short']), 'factor_name': 'bench', 'creat_time': now,
+            'update_time': now, 'stopArr': '[]',
+        })
+    return rows
+
+
+def timed(label, rows_count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:32s} {rows_count:7d} 行, {elapsed:7.2f}秒, {rows_count / max(elapsed, 1e-9):10.0f} 行/秒")
+    return result
+
+
+def run_table(db_conn, table, rows_count, threads):
+    model = make_model(table, db_conn)
+    print(f"表 {table}:")
+    single_rows = make_rows(min(rows_count, 2000), seed=1)
+    timed("create 逐行插入", len(single_rows), lambda: [model.create(row) for row in single_rows])
+
+    bulk_rows = make_rows(rows_count, seed=2)
+    created = timed("bulk_create", len(bulk_rows), lambda: model.bulk_create(bulk_rows))
+
+    # 按主键更新刚插入的记录（插入部分需要完整的行，否则NOT NULL列会在冲突判断前报错）
+    existing = model.execute_query(f"SELECT id FROM {model._safe_table_name()} ORDER BY id DESC LIMIT %s", (rows_count,))
+    upsert_rows = [{**row, 'id': record['id'], 'status': 1, 'cost_close': 123.0}
+                   for record, row in zip(existing, make_rows(len(existing), seed=3))]
+    upserted = timed("bulk_upsert 更新已有记录", len(upsert_rows),
+                     lambda: model.bulk_upsert(upsert_rows, update_columns=['status', 'cost_close', 'update_time']))
+
+    # 多线程并发写入（连接池中每个线程独占连接）
+    per_thread = max(1, rows_count // threads // 5)
+    thread_rows = [make_rows(per_thread, seed=100 + t) for t in range(threads)]
+
+    def worker(rows):
+        for row in rows:
+            model.create(row)
+
+    def run_threads():
+        workers = [threading.Thread(target=worker, args=(rows,)) for rows in thread_rows]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+    timed(f"{threads}线程并发 create", per_thread * threads, run_threads)
+    expected = len(single_rows) + len(bulk_rows) + per_thread * threads
+    actual = model.count(factor_name='bench')
+    updated = model.count(status=1, cost_close=123.0)
+    print(f"  写入校验: 期望 {expected} 行, 实际 {actual} 行; bulk_upsert 更新 {updated} 行; 连接池状态: {db_conn.pool.status()}")
+    return expected == actual and created == len(bulk_rows) and upserted > 0 and updated == len(upsert_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库批量写入基准测试')
+    parser.add_argument('--rows', type=int, default=5000, help='批量写入的行数')
+    parser.add_argument('--threads', type=int, default=8, help='并发写入的线程数')
+    parser.add_argument('--mysql', action='store_true', help='使用config.py中的MySQL配置')
+    args = parser.parse_args()
+
+    if args.mysql:
+        from config import DATABASE_CONFIG
+        db_conn = DatabaseConnection(DATABASE_CONFIG)
+        tables = {'bench_order': 'order', 'bench_his_order': 'his_order'}
+        for bench_table, source in tables.items():
+            db_conn.execute_update(f"DROP TABLE IF EXISTS `{bench_table}`")
+            db_conn.execute_update(f"CREATE TABLE `{bench_table}` LIKE `{source}`")
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        db_conn = DatabaseConnection({'POOL_SIZE': args.threads, 'MAX_OVERFLOW': 0}, connect_fn=lambda: SQLiteConnection(path))
+        tables = {'order': None, 'his_order': None}
+        for table in tables:
+            db_conn.execute_update(f'CREATE TABLE "{table}" ({ORDER_COLUMNS_DDL})')
+        print(f"使用SQLite替身: {path}")
+
+    ok = True
+    try:
+        for table in tables:
+            ok = run_table(db_conn, table, args.rows, args.threads) and ok
+    finally:
+        if args.mysql:
+            for bench_table in tables:
+                db_conn.execute_update(f"DROP TABLE IF EXISTS `{bench_table}`")
+        db_conn.close()
+    if not ok:
+        print("写入校验失败")
+        sys.exit(1)
+    print("写入校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+交易对标识索引性能测试（不需要网络）
+    - 禁用交易对过滤: 原来每个交易对与每个禁用写法逐个 upper()/replace() 比较 vs SymbolSet
+    - 持仓匹配交易机会（analyze_positions）: 原来每个持仓线性扫描所有交易机会 vs SymbolIndex
+    - 已持仓过滤: 原来逐个比较持仓列表 vs SymbolSet
+    - 校验两种方式的结果一致，以及各种写法的解析/转换
+
+用法:
+    python test/benchmark_instrument_id.py
+    python test/benchmark_instrument_id.py --symbols 1000 --positions 200 --repeat 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.instrument_id import (SymbolIndex, SymbolSet, pair_key, parse_instrument,
+                                    to_ccxt_symbol, to_okx_inst_id)
+
+
+def legacy_filter_disabled(symbols, disabled_symbols):
+    """原 _filter_disabled_symbols 的比较方式"""
+    all_disabled = set()
+    for symbol in disabled_symbols:
+        all_disabled.add(symbol)
+        all_disabled.add(symbol.replace('/', '-'))
+        all_disabled.add(symbol.replace('/', '-').upper())
+        all_disabled.add(symbol.replace('/', '-').lower())
+    filtered = []
+    for symbol in symbols:
+        symbol_normalized = symbol.upper().replace('/', '-')
+        if not any(symbol_normalized == disabled.upper().replace('/', '-') for disabled in all_disabled):
+            filtered.append(symbol)
+    return filtered
+
+
+def legacy_related_opportunities(positions, opportunities):
+    """原 analyze_positions 的匹配方式: 每个持仓线性扫描交易机会"""
+    related = []
+    for position in positions:
+        normalized_symbol = position['symbol'].split(':')[0].strip().upper()
+        found = None
+        for opp in opportunities:
+            opp_symbol = opp.symbol.strip().upper()
+            if normalized_symbol == opp_symbol or normalized_symbol.replace('/', '') == opp_symbol.replace('/', ''):
+                found = opp
+                break
+        related.append(found)
+    return related
+
+
+def legacy_filter_held(signals, positions):
+    """逐个比较持仓列表的已持仓过滤"""
+    held = [p['symbol'].split(':')[0].upper().replace('-', '/') for p in positions]
+    return [s for s in signals if s.symbol.upper().replace('-', '/') not in held]
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易对标识索引性能测试')
+    parser.add_argument('--symbols', type=int, default=1000, help='交易对数量')
+    parser.add_argument('--positions', type=int, default=200, help='持仓数量')
+    parser.add_argument('--disabled', type=int, default=200, help='禁用交易对数量')
+    parser.add_argument('--repeat', type=int, default=10, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    symbols = [f"C{i:04d}/USDT" for i in range(args.symbols)]
+    # 配置中的禁用交易对使用各种写法
+    styles = [lambda s: s, lambda s: s.replace('/', '-'), lambda s: s.replace('/', '-').lower()]
+    disabled = [rng.choice(styles)(s) for s in rng.sample(symbols, args.disabled)]
+    opportunities = [SimpleNamespace(symbol=s, overall_action=rng.choice(['买入', '卖出', '观望'])) for s in symbols]
+    positions = [{'symbol': f"{s}:USDT", 'posSide': rng.choice(['long', 'short'])}
+                 for s in rng.sample(symbols, args.positions)]
+
+    print(f"{args.symbols}个交易对 × {args.positions}个持仓，{args.disabled}个禁用交易对（每项{args.repeat}次取平均）:")
+    legacy_disabled, legacy_disabled_t = timed(lambda: legacy_filter_disabled(symbols, disabled), max(1, args.repeat // 10))
+
+    def indexed_filter_disabled():
+        disabled_set = SymbolSet(disabled)
+        return [s for s in symbols if s not in disabled_set]
+    indexed_disabled, indexed_disabled_t = timed(indexed_filter_disabled, args.repeat)
+    print(f"  禁用交易对过滤: 嵌套循环 {legacy_disabled_t * 1000:.1f}毫秒, SymbolSet {indexed_disabled_t * 1000:.2f}毫秒")
+
+    legacy_related, legacy_related_t = timed(lambda: legacy_related_opportunities(positions, opportunities), args.repeat)
+
+    def indexed_related():
+        index = SymbolIndex(opportunities)
+        return [index.first(p['symbol']) for p in positions]
+    related, related_t = timed(indexed_related, args.repeat)
+    print(f"  持仓匹配交易机会: 线性扫描 {legacy_related_t * 1000:.1f}毫秒, SymbolIndex {related_t * 1000:.2f}毫秒")
+
+    legacy_held, legacy_held_t = timed(lambda: legacy_filter_held(opportunities, positions), args.repeat)
+
+    def indexed_held():
+        held = SymbolSet(p['symbol'] for p in positions)
+        return [s for s in opportunities if s.symbol not in held]
+    held, held_t = timed(indexed_held, args.repeat)
+    print(f"  已持仓过滤: 列表比较 {legacy_held_t * 1000:.1f}毫秒, SymbolSet {held_t * 1000:.2f}毫秒")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("禁用交易对过滤结果一致", indexed_disabled == legacy_disabled)
+    ok &= check("持仓匹配的交易机会一致", all(a is b for a, b in zip(related, legacy_related)))
+    ok &= check("已持仓过滤结果一致", held == legacy_held)
+    ok &= check("标的键", pair_key('BTC/USDT') == pair_key('BTC/USDT:USDT') == pair_key('BTC-USDT-SWAP')
+                == pair_key('btc-usdt') == pair_key('BTCUSDT') == 'BTC/USDT')
+    ok &= check("标的键为驻留字符串", pair_key('eth-usdt') is pair_key('ETH/USDT:USDT'))
+    ok &= check("OKX instId", to_okx_inst_id('BTC/USDT') == 'BTC-USDT' and to_okx_inst_id('BTC/USDT:USDT') == 'BTC-USDT-SWAP')
+    ok &= check("ccxt格式", to_ccxt_symbol('BTC-USDT-SWAP') == 'BTC/USDT:USDT' and to_ccxt_symbol('btc-usdt') == 'BTC/USDT')
+    ok &= check("交割合约", parse_instrument('BTC-USD-240628').kind == 'future'
+                and to_ccxt_symbol('BTC-USD-240628') == 'BTC/USD:USD-240628'
+                and to_okx_inst_id('BTC/USD:USD-240628') == 'BTC-USD-240628')
+    ok &= check("SymbolIndex.first返回同一标的的第一个对象",
+                SymbolIndex([{'symbol': 'A/USDT', 'n': 1}, {'symbol': 'A-USDT', 'n': 2}]).first('A/USDT:USDT')['n'] == 1)
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
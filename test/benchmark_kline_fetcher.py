@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+K线并发获取基准测试
+通过本地桩交易所回放录制的OHLCV响应（模拟网络延迟），对比串行获取与KlineFetcher并发获取的耗时
+
+用法:
+    python test/benchmark_kline_fetcher.py                          # 使用合成数据
+    python test/benchmark_kline_fetcher.py --record ohlcv.json      # 从OKX录制真实响应
+    python test/benchmark_kline_fetcher.py --replay ohlcv.json      # 回放录制的响应
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.kline_fetcher import KlineFetcher
+
+TIMEFRAME_MS = {'15m': 15 * 60 * 1000, '1h': 60 * 60 * 1000, '4h': 4 * 60 * 60 * 1000}
+
+
+class StubExchange:
+    """本地桩交易所，回放录制的OHLCV响应并模拟请求延迟与偶发失败"""
+
+    def __init__(self, responses, latency=0.15, jitter=0.05, failure_rate=0.0):
+        self.responses = responses
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.failure_rate:
+            raise ConnectionError("stub exchange: simulated network error")
+        ohlcv = self.responses.get(symbol, {}).get(timeframe, [])
+        if since is not None:
+            ohlcv = [bar for bar in ohlcv if bar[0] >= since]
+        return ohlcv[-limit:] if limit else ohlcv
+
+
+def generate_responses(symbol_count, timeframes, length):
+    """生成合成的OHLCV响应"""
+    now = int(time.time() * 1000)
+    responses = {}
+    for i in range(symbol_count):
+        symbol = f"SYM{i}/USDT"
+        responses[symbol] = {}
+        for tf in timeframes:
+            step = TIMEFRAME_MS.get(tf, 60 * 1000)
+            price = 100.0
+            bars = []
+            for j in range(length):
+                price *= 1 + random.uniform(-0.01, 0.01)
+                bars.append([now - (length - j) * step, price, price * 1.01, price * 0.99, price, random.uniform(100, 1000)])
+            responses[symbol][tf] = bars
+    return responses
+
+
+def record_responses(path, symbol_count, timeframes, length):
+    """从OKX公共接口录制OHLCV响应"""
+    import ccxt
+    exchange = ccxt.okx({'enableRateLimit': True})
+    tickers = exchange.fetch_tickers()
+    symbols = sorted((s for s in tickers if s.endswith('/USDT')), key=lambda s: tickers[s].get('quoteVolume') or 0, reverse=True)[:symbol_count]
+    responses = {symbol: {tf: exchange.fetch_ohlcv(symbol, tf, limit=length) for tf in timeframes} for symbol in symbols}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(responses, f)
+    print(f"已录制 {len(symbols)} 个交易对的响应到 {path}")
+    return responses
+
+
+def run_serial(exchange, symbols, limits):
+    result = {}
+    for symbol in symbols:
+        result[symbol] = {}
+        for tf, limit in limits.items():
+            result[symbol][tf] = exchange.fetch_ohlcv(symbol, tf, limit=limit)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线并发获取基准测试')
+    parser.add_argument('--replay', help='回放的录制文件路径')
+    parser.add_argument('--record', help='录制真实响应并保存到该路径')
+    parser.add_argument('--symbols', type=int, default=150, help='交易对数量')
+    parser.add_argument('--length', type=int, default=309, help='每个周期的K线数量')
+    parser.add_argument('--latency', type=float, default=0.15, help='模拟的单次请求延迟（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.01, help='模拟的请求失败率')
+    parser.add_argument('--in-flight', type=int, default=8, help='并发获取的最大在途请求数')
+    parser.add_argument('--skip-serial', action='store_true', help='跳过串行基线')
+    args = parser.parse_args()
+
+    timeframes = ['4h', '1h', '15m']
+    if args.record:
+        responses = record_responses(args.record, args.symbols, timeframes, args.length)
+    elif args.replay:
+        with open(args.replay, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+    else:
+        responses = generate_responses(args.symbols, timeframes, args.length)
+
+    symbols = list(responses.keys())
+    limits = {tf: args.length for tf in timeframes}
+    print(f"交易对: {len(symbols)}, 周期: {timeframes}, 请求数: {len(symbols) * len(timeframes)}, 模拟延迟: {args.latency}s")
+
+    if not args.skip_serial:
+        exchange = StubExchange(responses, latency=args.latency, failure_rate=0.0)
+        start = time.time()
+        run_serial(exchange, symbols, limits)
+        print(f"串行获取: {time.time() - start:.2f}秒 ({exchange.calls} 次请求)")
+
+    exchange = StubExchange(responses, latency=args.latency, failure_rate=args.failure_rate)
+    fetcher = KlineFetcher(exchange, {'MAX_IN_FLIGHT': args.in_flight, 'RATE_PER_SECOND': 1000, 'BURST': 1000, 'BACKOFF_BASE': 0.05})
+    start = time.time()
+    result = fetcher.fetch_all(symbols, limits)
+    missing = sum(1 for symbol in result for tf in timeframes if not result[symbol].get(tf))
+    print(f"并发获取(in_flight={args.in_flight}): {time.time() - start:.2f}秒 ({exchange.calls} 次请求, 缺失 {missing} 个, 统计 {fetcher.stats})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+交易对池缓存测试（模拟交易所，不需要网络）
+    - 对比每轮扫描都 fetch_markets + fetch_tickers 与使用 MarketUniverse 的交易所请求次数和耗时
+    - 校验流动性筛选结果与原来的逐个比较+排序一致
+    - 校验ticker过期只刷新ticker、重启后从磁盘快照恢复、只读实例（回测/报告查看器）读取其它进程更新的快照、
+      交易所请求失败时使用过期快照、WebSocket推送了全部ticker时不请求REST
+
+用法:
+    python test/benchmark_market_universe.py
+    python test/benchmark_market_universe.py --markets 3000 --cycles 96 --latency 0.3
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.market_universe import MarketUniverse
+
+
+class FakeClock:
+    """模拟时钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeExchange:
+    """模拟ccxt交易所: 记录请求次数，每次请求耗时latency秒"""
+
+    def __init__(self, market_count, latency, seed=1):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.calls = {'fetch_markets': 0, 'fetch_tickers': 0}
+        self.fail = False
+        self.raw_markets = []
+        for i in range(market_count):
+            base = f"C{i:04d}"
+            market_type = 'spot' if i % 3 else 'swap'
+            quote = 'USDT' if i % 5 else 'USDC'
+            symbol = f"{base}/{quote}" if market_type == 'spot' else f"{base}/{quote}:{quote}"
+            self.raw_markets.append({'symbol': symbol, 'id': symbol.replace('/', '-'), 'base': base, 'quote': quote,
+                                     'type': market_type, 'active': i % 17 != 0, 'info': {'raw': 'x' * 200}})
+        self.volumes = {m['symbol']: rng.lognormvariate(12, 2.5) for m in self.raw_markets}
+
+    def fetch_markets(self):
+        self.calls['fetch_markets'] += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError('模拟网络错误')
+        return self.raw_markets
+
+    def fetch_tickers(self, symbols=None):
+        self.calls['fetch_tickers'] += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError('模拟网络错误')
+        return {symbol: {'symbol': symbol, 'last': 1.0, 'bid': 0.999, 'ask': 1.001, 'quoteVolume': self.volumes[symbol],
+                         'baseVolume': self.volumes[symbol], 'percentage': 0.0, 'timestamp': 0, 'info': {}}
+                for symbol in (symbols or self.volumes)}
+
+
+def legacy_liquid_symbols(exchange, volume_threshold):
+    """原来的实现: 每轮都获取交易对列表和ticker"""
+    symbols = [m['symbol'] for m in exchange.fetch_markets()
+               if m['active'] and m['quote'] == 'USDT' and m['type'] == 'spot']
+    tickers = exchange.fetch_tickers(symbols)
+    result = [s for s, t in tickers.items() if t.get('quoteVolume', 0) >= volume_threshold]
+    result.sort(key=lambda s: tickers[s].get('quoteVolume', 0), reverse=True)
+    return result
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易对池缓存测试')
+    parser.add_argument('--markets', type=int, default=1500, help='模拟的交易对数量')
+    parser.add_argument('--cycles', type=int, default=16, help='模拟的扫描轮数（每轮间隔15分钟）')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟每次交易所请求的耗时（秒）')
+    parser.add_argument('--threshold', type=float, default=100000, help='成交量阈值')
+    args = parser.parse_args()
+
+    snapshot = os.path.join(tempfile.mkdtemp(prefix='market_universe_'), 'market_universe.json')
+    config = {'SNAPSHOT_PATH': snapshot, 'MARKETS_TTL': 6 * 3600, 'TICKERS_TTL': 60}
+
+    # 原来的方式: 每轮都请求
+    legacy_exchange = FakeExchange(args.markets, args.latency)
+    start = time.perf_counter()
+    for _ in range(args.cycles):
+        expected = legacy_liquid_symbols(legacy_exchange, args.threshold)
+    legacy_time = time.perf_counter() - start
+
+    # MarketUniverse: 每轮间隔15分钟，ticker每轮过期，交易对元数据6小时过期
+    exchange = FakeExchange(args.markets, args.latency)
+    clock = FakeClock(1700000000)
+    universe = MarketUniverse(exchange, config, clock=clock)
+    start = time.perf_counter()
+    for _ in range(args.cycles):
+        symbols = universe.active_symbols()
+        liquid = universe.liquid_symbols(args.threshold, symbols)
+        clock.now += 900
+    universe_time = time.perf_counter() - start
+    expected_markets_calls = (args.cycles * 900 - 1) // (6 * 3600) + 1
+
+    print(f"{args.cycles}轮扫描: 原方式 请求 {sum(legacy_exchange.calls.values())} 次 {legacy_time:.2f}秒, "
+          f"交易对池 请求 {exchange.calls} {universe_time:.2f}秒")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("流动性筛选结果与原实现一致（成交量降序）", liquid == expected)
+    ok &= check(f"交易对元数据按有效期刷新（{expected_markets_calls}次）", exchange.calls['fetch_markets'] == expected_markets_calls)
+    ok &= check("ticker每轮过期后刷新", exchange.calls['fetch_tickers'] == args.cycles)
+
+    # 有效期内重复查询不请求交易所，阈值筛选只做二分查找
+    universe.liquid_symbols(args.threshold)
+    calls = dict(exchange.calls)
+    start = time.perf_counter()
+    for _ in range(1000):
+        universe.liquid_symbols(args.threshold)
+    lookup_ms = (time.perf_counter() - start) * 1000
+    ok &= check(f"有效期内不请求交易所（1000次筛选 {lookup_ms:.0f}毫秒）", exchange.calls == calls)
+    ok &= check("阈值筛选", universe.liquid_symbols(args.threshold * 10) == [s for s in expected
+                                                                          if exchange.volumes[s] >= args.threshold * 10])
+    ok &= check("limit参数", universe.liquid_symbols(limit=5) == universe.liquid_symbols()[:5])
+
+    # 重启: 新实例从磁盘快照恢复，有效期内不请求交易所
+    restarted_exchange = FakeExchange(args.markets, args.latency)
+    restarted = MarketUniverse(restarted_exchange, config, clock=clock)
+    clock.now += 1
+    restarted_liquid = restarted.liquid_symbols(args.threshold)
+    ok &= check("重启后从快照恢复，不请求交易所",
+                restarted_liquid == liquid and not any(restarted_exchange.calls.values()))
+    ok &= check("快照中不保存ccxt原始info字段", 'info' not in restarted.markets()[0])
+
+    # 只读实例（回测、报告查看器）: 读取扫描器进程更新后的快照
+    reader = MarketUniverse(None, config, clock=clock)
+    before = reader.stats['snapshot_loaded']
+    clock.now += 120
+    exchange.volumes = {s: v * random.Random(2).uniform(0.5, 1.5) for s, v in exchange.volumes.items()}
+    universe.liquid_symbols(args.threshold)
+    ok &= check("只读实例读取其它实例更新的快照",
+                reader.liquid_symbols(args.threshold) == universe.liquid_symbols(args.threshold)
+                and reader.stats['snapshot_loaded'] > before)
+
+    # 交易所请求失败时使用过期快照
+    clock.now += 120
+    exchange.fail = True
+    stale = universe.liquid_symbols(args.threshold)
+    exchange.fail = False
+    ok &= check("请求失败时使用过期快照", stale == reader.liquid_symbols(args.threshold) and universe.stats['stale_served'] > 0)
+
+    # WebSocket推送了全部ticker时不请求REST
+    clock.now += 120
+    calls = exchange.calls['fetch_tickers']
+    pushed = {s: {'last': 1.0, 'bid': 0.999, 'ask': 1.001, 'quoteVolume': v} for s, v in exchange.volumes.items()}
+    universe.liquid_symbols(args.threshold, source=lambda symbols: {s: pushed[s] for s in symbols})
+    ok &= check("WebSocket推送了全部ticker时不请求REST",
+                exchange.calls['fetch_tickers'] == calls and universe.stats['tickers_pushed'] == 1)
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
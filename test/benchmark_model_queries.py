@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+模型查询基准测试
+在SQLite替身（见 benchmark_db_bulk_write.py）上对比:
+    - 每次新建模型实例时的表结构加载（共享SchemaRegistry后只加载一次）
+    - get/count 重复调用的耗时（SQL模板按 (表, 操作, 字段) 缓存）
+    - his_order 全量读取: get_all() 一次 SELECT * 与 iter_all(columns=..., batch_size=...) 键集分页的峰值内存
+并校验键集分页读取的记录与一次性读取一致、表结构快照可以写入和读回
+
+用法:
+    python test/benchmark_model_queries.py --rows 50000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_db_bulk_write import SQLiteConnection, ORDER_COLUMNS_DDL, make_model, make_rows
+from db_connection import DatabaseConnection
+from schema_registry import SchemaRegistry
+
+
+def peak_memory(func):
+    """返回 (结果, 耗时秒, 峰值内存字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型查询基准测试')
+    parser.add_argument('--rows', type=int, default=50000, help='his_order 表的记录数')
+    parser.add_argument('--batch-size', type=int, default=1000, help='键集分页每批的记录数')
+    parser.add_argument('--calls', type=int, default=1000, help='get/count 重复调用次数')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    db_conn = DatabaseConnection({'POOL_SIZE': 2, 'MAX_OVERFLOW': 0}, connect_fn=lambda: SQLiteConnection(path))
+    db_conn.execute_update(f'CREATE TABLE "his_order" ({ORDER_COLUMNS_DDL})')
+
+    model = make_model('his_order', db_conn)
+    model.bulk_create(make_rows(args.rows, seed=7), batch_size=2000)
+    print(f"his_order 记录数: {model.count()}")
+
+    # 表结构: 新建模型实例不再重复DESCRIBE
+    start = time.perf_counter()
+    for _ in range(200):
+        make_model('his_order', db_conn).validate_data({'status': 1, 'unknown_field': 1})
+    print(f"新建200个模型实例并校验数据: {(time.perf_counter() - start) * 1000:.1f}毫秒（表结构只加载一次，未知字段只警告一次）")
+
+    # 重复查询使用缓存的SQL模板
+    start = time.perf_counter()
+    for i in range(args.calls):
+        model.get(id=i + 1)
+        model.count(status=i % 3)
+    elapsed = time.perf_counter() - start
+    print(f"get + count 各 {args.calls} 次: {elapsed:.2f}秒, SQL模板缓存数量 {len(model._query_templates)}")
+
+    # 全量读取 vs 键集分页 + 投影
+    columns = ['id', 'variety_id', 'status', 'cost_open', 'cost_close', 'volume']
+    all_rows, full_time, full_peak = peak_memory(lambda: model.get_all())
+    count, iter_time, iter_peak = peak_memory(lambda: sum(1 for _ in model.iter_all(columns=columns, batch_size=args.batch_size)))
+    print(f"get_all() SELECT *:           {len(all_rows):7d} 条, {full_time:6.2f}秒, 峰值内存 {full_peak / 1024 / 1024:7.1f}MB")
+    print(f"iter_all(投影{len(columns)}列, 每批{args.batch_size}): {count:7d} 条, {iter_time:6.2f}秒, 峰值内存 {iter_peak / 1024 / 1024:7.1f}MB")
+
+    ok = count == len(all_rows)
+    paged_ids = [row['id'] for row in model.iter_all(columns=['status'], batch_size=args.batch_size, status=1)]
+    expected_ids = sorted(row['id'] for row in all_rows if row['status'] == 1)
+    ok = ok and paged_ids == expected_ids
+    print(f"按条件键集分页校验: {'通过' if paged_ids == expected_ids else '失败'}（{len(paged_ids)} 条）")
+
+    # 表结构快照写入与读回
+    snapshot_path = os.path.join(workdir, 'schema_snapshot.json')
+    model.schema.save_snapshot(snapshot_path)
+    restored = SchemaRegistry(db_conn, snapshot_path)
+    ok = ok and restored.columns('his_order') == model.schema.columns('his_order')
+    print(f"表结构快照校验: {'通过' if restored.columns('his_order') == model.schema.columns('his_order') else '失败'}")
+
+    db_conn.close()
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
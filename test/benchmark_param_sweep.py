@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+回测参数扫描基准测试（合成K线，不需要网络）
+    - 对比当前进程串行执行与进程池执行同一批 (交易对, 参数组合) 回测任务的耗时
+    - 校验两种方式结果相同、替换config与用同样参数新建策略实例的回测结果相同、
+      中断后（结果表最后一行写了一半）重新运行只执行未完成的任务、全部完成后重新运行不执行任何任务、
+      TIMEFRAME_DATA_LENGTHS可以扫描、随机搜索不重复、不存在的参数报错
+
+用法:
+    python test/benchmark_param_sweep.py
+    python test/benchmark_param_sweep.py --symbols 4 --days 30 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import tempfile
+
+# 添加项目根目录和strategies_test到Python路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'strategies_test'))
+
+from param_sweep import ParamSweep, BacktestEngine, run_job, param_sets, validate_space, load_results, summarize, cell_key
+from parity_analyze_series import generate_data
+from strategies.test3 import MultiTimeframeStrategy, TRADING_CONFIG
+
+API_TIMEFRAMES = {'4h': '4H', '1h': '1H', '15m': '15m'}
+
+
+def synthetic_universe(symbol_count, days):
+    """每个交易对一份不同随机种子的合成K线 {交易对: {API时间框架: DataFrame}}"""
+    return {f"SYN{i}-USDT": {API_TIMEFRAMES[tf]: df for tf, df in generate_data(days, seed=100 + i).items()}
+            for i in range(symbol_count)}
+
+
+def comparable(records):
+    return sorted((r['symbol'], r['key'], round(r['total_profit_rate'], 9), r['buy_trades'], r['win_rate']) for r in records)
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测参数扫描基准测试')
+    parser.add_argument('--symbols', type=int, default=3, help='合成交易对数量')
+    parser.add_argument('--days', type=int, default=60, help='合成K线天数')
+    parser.add_argument('--workers', type=int, default=4, help='进程池工作进程数')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='param_sweep_')
+    all_data = synthetic_universe(args.symbols, args.days)
+    symbols = list(all_data)
+    space = {'BUY_THRESHOLD': [0.2, 0.3], 'TARGET_MULTIPLIER': [3, 4.5]}
+    strategy = MultiTimeframeStrategy()
+    logging.getLogger(BacktestEngine.__module__).setLevel(logging.ERROR)
+
+    serial = ParamSweep(MultiTimeframeStrategy, 'test3', symbols, space, os.path.join(workdir, 'serial.jsonl'), workers=-1)
+    start = time.perf_counter()
+    serial_records = serial.run(strategy, all_data)
+    serial_time = time.perf_counter() - start
+    pooled = ParamSweep(MultiTimeframeStrategy, 'test3', symbols, space, os.path.join(workdir, 'pool.jsonl'), workers=args.workers)
+    start = time.perf_counter()
+    pooled_records = pooled.run(strategy, all_data)
+    pool_time = time.perf_counter() - start
+    jobs = len(symbols) * len(param_sets(space))
+    print(f"{len(param_sets(space))}个参数组合 × {len(symbols)}个交易对（{args.days}天15分钟K线）: "
+          f"串行 {serial_time:.1f}秒, 进程池({args.workers}) {pool_time:.1f}秒（{serial_time / max(pool_time, 1e-9):.1f}倍）")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("所有任务完成且没有错误", len(serial_records) == jobs == len(pooled_records)
+                and serial.stats['failed'] == 0 and pooled.stats['failed'] == 0)
+    ok &= check("进程池与串行结果相同", comparable(serial_records) == comparable(pooled_records))
+    ok &= check("不同参数得到不同结果", len({(r['buy_trades'], round(r['total_profit_rate'], 6)) for r in serial_records}) > len(symbols))
+
+    # 替换config与新建策略实例的结果相同
+    record = serial_records[-1]
+    fresh = MultiTimeframeStrategy(config={**TRADING_CONFIG, **record['params']})
+    engine = BacktestEngine(MultiTimeframeStrategy, symbol=record['symbol'], strategy=fresh,
+                            timeframe_data=all_data[record['symbol']])
+    stats = engine.run_backtest()
+    ok &= check("替换config与新建策略实例结果相同", abs(stats['total_profit_rate'] - record['total_profit_rate']) < 1e-9
+                and stats['buy_trades'] == record['buy_trades'] and strategy.config is TRADING_CONFIG)
+
+    # 中断后继续: 保留前一半结果，最后一行只写了一半
+    path = os.path.join(workdir, 'resume.jsonl')
+    with open(os.path.join(workdir, 'serial.jsonl'), 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:jobs // 2])
+        f.write(lines[jobs // 2][:40])
+    resumed = ParamSweep(MultiTimeframeStrategy, 'test3', symbols, space, path, workers=-1)
+    resumed_records = resumed.run(strategy, all_data)
+    ok &= check("中断后只执行未完成的任务", resumed.stats['skipped'] == jobs // 2 and resumed.stats['done'] == jobs - jobs // 2
+                and comparable(resumed_records) == comparable(serial_records))
+    again = ParamSweep(MultiTimeframeStrategy, 'test3', symbols, space, path, workers=-1)
+    ok &= check("全部完成后重新运行不执行任务", len(again.run(strategy, all_data)) == jobs and again.stats['done'] == 0
+                and len(load_results(path)) == jobs)
+    # 扫描参数相同但策略基础配置不同时，任务键不同（不会复用旧结果）
+    params = param_sets(space)[0]
+    changed = {**strategy.config, 'STOP_LOSS_MULTIPLIER': strategy.config['STOP_LOSS_MULTIPLIER'] + 1}
+    ok &= check("基础配置变化后任务键变化", cell_key('test3', symbols[0], params, strategy.config)
+                != cell_key('test3', symbols[0], params, changed))
+
+    # TIMEFRAME_DATA_LENGTHS扫描（窗口超过约60根后EMA已收敛，结果不再变化，所以用小于EMA50周期的窗口对比）
+    lengths = [{'4h': 30, '1h': 30, '15m': 30}, {'4h': 299, '1h': 299, '15m': 299}]
+    tf_space = {'TIMEFRAME_DATA_LENGTHS': lengths}
+    validate_space(tf_space, strategy.config)
+    tf_results = [run_job(strategy, symbols[0], params, all_data[symbols[0]]) for params in param_sets(tf_space)]
+    ok &= check("TIMEFRAME_DATA_LENGTHS可以扫描", tf_results[0] != tf_results[1]
+                and strategy.get_required_timeframes() == TRADING_CONFIG['TIMEFRAME_DATA_LENGTHS'])
+
+    # 随机搜索和参数校验
+    big_space = {'BUY_THRESHOLD': [0.1, 0.2, 0.3, 0.4], 'TARGET_MULTIPLIER': [2, 3, 4.5], 'STOP_LOSS_MULTIPLIER': [1, 2, 3]}
+    picks = param_sets(big_space, random_count=10, seed=3)
+    grid = param_sets(big_space)
+    ok &= check("随机搜索不重复且属于网格", len(picks) == 10 and all(p in grid for p in picks)
+                and len({str(p) for p in picks}) == 10 and picks == param_sets(big_space, random_count=10, seed=3))
+    try:
+        validate_space({'BUY_THRESHOLDX': [0.1]}, strategy.config)
+        rejected = False
+    except ValueError:
+        rejected = True
+    ok &= check("不存在的参数报错", rejected)
+    rows = summarize(serial_records, os.path.join(workdir, 'summary.txt'))
+    ok &= check("汇总每个参数组合一行，按平均收益率降序", len(rows) == len(param_sets(space))
+                and [r['mean_profit_rate'] for r in rows] == sorted((r['mean_profit_rate'] for r in rows), reverse=True))
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
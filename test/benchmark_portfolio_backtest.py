@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+组合回测基准测试（合成K线，不需要网络）
+    - 统计准备阶段（逐个交易对计算信号并写入记录文件）和事件循环（k路归并）的耗时，以及事件循环期间的内存增长
+    - 校验只有一个交易对、全仓、最多1个持仓时与BacktestEngine结果相同、
+      事件按时间顺序且每个时间点只处理一次（交易对起始时间不同）、持仓数不超过上限且上限确实生效（5个交易对最多2个持仓）、
+      同一交易对不会重复开仓、现金不为负、最终权益等于初始资金加各笔交易盈亏、
+      不同的读取块大小结果相同、原策略实例的config和exchange没有被修改、模拟账户的仓位服务不登记到全局表中
+
+用法:
+    python test/benchmark_portfolio_backtest.py
+    python test/benchmark_portfolio_backtest.py --symbols 200 --days 365 --max-positions 50
+"""
+
+import os
+import sys
+import csv
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+# 添加项目根目录和strategies_test到Python路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'strategies_test'))
+
+from portfolio_backtest import PortfolioBacktest, BacktestEngine
+from parity_analyze_series import generate_data
+from strategies.test3 import MultiTimeframeStrategy
+from lib.tool import position_service
+
+API_TIMEFRAMES = {'4h': '4H', '1h': '1H', '15m': '15m'}
+
+
+def synthetic_candles(index, days):
+    """第index个合成交易对的K线 {API时间框架: DataFrame}，起始时间按下标错开0~2天"""
+    data = generate_data(days, seed=200 + index, start=f"2024-01-0{1 + index % 3}")
+    return {API_TIMEFRAMES[tf]: df for tf, df in data.items()}
+
+
+def current_rss_mb():
+    """当前进程的常驻内存（MB，读取/proc，不支持时返回0）"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class RssSampler(threading.Thread):
+    """后台线程定期采样常驻内存，记录峰值"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def read_trades(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='组合回测基准测试')
+    parser.add_argument('--symbols', type=int, default=40, help='合成交易对数量')
+    parser.add_argument('--days', type=int, default=90, help='合成K线天数')
+    parser.add_argument('--max-positions', type=int, default=5, help='最大同时持仓数')
+    parser.add_argument('--chunk-bars', type=int, default=1024, help='事件循环中每个交易对每次读取的K线数')
+    parser.add_argument('--max-loop-mb', type=float, default=256, help='事件循环期间允许的内存增长（MB）')
+    args = parser.parse_args()
+
+    logging.getLogger(BacktestEngine.__module__).setLevel(logging.ERROR)
+    logging.getLogger('strategies.test3').setLevel(logging.WARNING)
+    strategy = MultiTimeframeStrategy()
+    original_exchange, original_config = strategy.exchange, strategy.config
+    original_max_positions = strategy.config['MAX_POSITIONS']
+    workdir = tempfile.mkdtemp(prefix='portfolio_backtest_')
+    registered_services = len(position_service._services)
+    ok = True
+
+    # 整个交易对池
+    backtest = PortfolioBacktest(strategy, initial_capital=10000.0, max_positions=args.max_positions,
+                                 chunk_bars=args.chunk_bars, report_dir=os.path.join(workdir, 'universe'))
+    all_ts = set()
+    start = time.perf_counter()
+    for index in range(args.symbols):
+        candles = synthetic_candles(index, args.days)
+        all_ts.update(candles['15m']['datetime'].iloc[168:].tolist())
+        backtest.add_symbol(f"SYN{index}-USDT", candles=candles)
+        del candles
+    prepare_time = time.perf_counter() - start
+    rss_before = current_rss_mb()
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        stats = backtest.run()
+    finally:
+        loop_peak = sampler.stop()
+        backtest.close()
+    loop_time = time.perf_counter() - start
+    loop_growth = loop_peak - rss_before
+    print(f"{args.symbols}个交易对 × {args.days}天15分钟K线（{stats['bars']}根，{stats['steps']}个时间步）: "
+          f"准备 {prepare_time:.1f}秒, 事件循环 {loop_time:.1f}秒（{stats['bars'] / max(loop_time, 1e-9):.0f}根/秒）")
+    print(f"事件循环期间内存: 开始 {rss_before:.0f}MB, 峰值 {loop_peak:.0f}MB（增长 {loop_growth:.0f}MB）")
+    print(f"最终权益 {stats['final_capital']:.2f}（{stats['total_profit_rate']:.2f}%），最大回撤 {stats['max_drawdown']:.2f}%，"
+          f"买入 {stats['buy_trades']} 次，仓位过滤 {stats['filtered_by_positions']}，持仓已满放弃 {stats['rejected_by_slots']}")
+
+    print("功能校验:")
+    ok &= check("每个时间点只处理一次且按时间顺序", stats['steps'] == len(all_ts) and stats['out_of_order'] == 0
+                and stats['skipped_symbols'] == 0)
+    ok &= check("持仓数不超过上限", stats['max_positions_held'] <= args.max_positions)
+    trades = read_trades(os.path.join(workdir, 'universe', 'trades.csv'))
+    open_symbols, duplicated = set(), 0
+    for trade in trades:
+        if trade['type'] == 'BUY':
+            duplicated += trade['symbol'] in open_symbols
+            open_symbols.add(trade['symbol'])
+        else:
+            open_symbols.discard(trade['symbol'])
+    ok &= check("同一交易对不重复开仓，结束时全部平仓", duplicated == 0 and not open_symbols
+                and len(trades) == 2 * stats['buy_trades'])
+    ok &= check("现金不为负", stats['min_cash'] >= -1e-6)
+    ok &= check("最终权益 = 初始资金 + 各笔交易盈亏", abs(stats['final_capital'] - 10000.0 - stats['total_trade_profit']) < 1e-6)
+    ok &= check(f"事件循环期间内存增长不超过{args.max_loop_mb:.0f}MB", loop_growth <= args.max_loop_mb)
+    ok &= check("原策略实例没有被修改", strategy.exchange is original_exchange and strategy.config is original_config
+                and strategy.config['MAX_POSITIONS'] == original_max_positions)
+
+    # 单个交易对、全仓、最多1个持仓时与BacktestEngine相同
+    candles = synthetic_candles(0, args.days)
+    engine = BacktestEngine(MultiTimeframeStrategy, initial_capital=10000.0, symbol='SYN0-USDT', strategy=strategy,
+                            timeframe_data=dict(candles))
+    expected = engine.run_backtest()
+    single = PortfolioBacktest(strategy, initial_capital=10000.0, max_positions=1, position_fraction=1.0)
+    single.add_symbol('SYN0-USDT', candles=dict(candles))
+    try:
+        result = single.run()
+    finally:
+        single.close()
+    fields = ('buy_trades', 'sell_trades', 'stop_loss_trades', 'take_profit_trades', 'close_position_trades')
+    ok &= check("单个交易对全仓时与BacktestEngine结果相同",
+                abs(result['final_capital'] - expected['final_capital']) < 1e-6 * expected['final_capital']
+                and all(result[field] == expected[field] for field in fields))
+
+    # 不同的读取块大小结果相同
+    results = []
+    for chunk_bars in (97, 4096):
+        small = PortfolioBacktest(strategy, initial_capital=10000.0, max_positions=2, chunk_bars=chunk_bars)
+        for index in range(min(args.symbols, 5)):
+            small.add_symbol(f"SYN{index}-USDT", candles=synthetic_candles(index, min(args.days, 30)))
+        try:
+            results.append(small.run())
+        finally:
+            small.close()
+    ok &= check("不同的读取块大小结果相同", results[0]['final_capital'] == results[1]['final_capital']
+                and all(results[0][field] == results[1][field] for field in fields + ('steps', 'filtered_by_positions')))
+    # 持仓已满时filter_by_positions放弃所有买入信号（计入仓位过滤），同一步的候选超过空余仓位时计入持仓已满放弃
+    ok &= check("持仓上限生效", results[0]['max_positions_held'] == 2 and results[0]['filtered_by_positions'] > 0)
+    ok &= check("模拟账户的仓位服务不登记到全局表中", len(position_service._services) == registered_services)
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+仓位快照服务测试
+    - 多个线程同时过滤信号时，对比各自调用 fetch_positions 的旧方式与单飞合并后的交易所请求次数和耗时
+    - 校验时效预算（max_age）、invalidate 后重新获取、获取失败时返回旧快照
+    - 校验 positions 频道推送（完整快照 + 增量更新，pos为0时删除）
+    - 校验 BTC/USDT:USDT、BTC-USDT-SWAP、btc-usdt 等格式的持仓判断
+
+用法:
+    python test/benchmark_position_service.py
+    python test/benchmark_position_service.py --callers 20 --latency 0.3
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.position_service import PositionService, normalize_symbol
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def make_positions(count):
+    return [{'symbol': f"COIN{i}/USDT:USDT", 'posSide': 'long', 'amount': 1.0, 'entry_price': 1.0,
+             'current_price': 0, 'profit_percent': 0, 'datetime': ''} for i in range(count)]
+
+
+class FakeExchange:
+    """模拟较慢的仓位接口，记录调用次数"""
+
+    def __init__(self, latency, positions):
+        self.latency = latency
+        self.positions = positions
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("模拟交易所超时")
+        return list(self.positions)
+
+
+def run_callers(callers, target):
+    threads = [threading.Thread(target=target) for _ in range(callers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='仓位快照服务测试')
+    parser.add_argument('--callers', type=int, default=10, help='同时请求仓位的线程数（模拟并发执行的策略）')
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟交易所接口的延迟（秒）')
+    parser.add_argument('--positions', type=int, default=30, help='模拟的持仓数量')
+    args = parser.parse_args()
+
+    # 旧方式: 每个策略各自请求交易所
+    legacy_exchange = FakeExchange(args.latency, make_positions(args.positions))
+    legacy = run_callers(args.callers, legacy_exchange.fetch)
+
+    exchange = FakeExchange(args.latency, make_positions(args.positions))
+    service = PositionService(exchange.fetch, {'MAX_AGE': 5, 'FETCH_TIMEOUT': 5})
+    versions = []
+    coalesced = run_callers(args.callers, lambda: versions.append(service.get().version))
+    print(f"{args.callers}个线程同时获取仓位: 各自请求 {legacy_exchange.calls}次/{legacy * 1000:.0f}毫秒, "
+          f"单飞合并 {exchange.calls}次/{coalesced * 1000:.0f}毫秒, 统计 {service.stats}")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("并发请求只访问一次交易所", exchange.calls == 1 and len(set(versions)) == 1)
+
+    calls = exchange.calls
+    service.get()
+    ok &= check("时效内直接返回快照", exchange.calls == calls)
+    time.sleep(0.05)
+    ok &= check("调用方可指定更严格的时效", service.get(max_age=0.01).version == 2 and exchange.calls == calls + 1)
+    ok &= check("max_age=0 强制重新获取", service.get(max_age=0).version == 3)
+    service.invalidate()
+    ok &= check("invalidate 后重新获取", service.get().version == 4 and exchange.calls == calls + 3)
+
+    exchange.fail = True
+    ok &= check("获取失败时返回旧快照", service.get(max_age=0).version == 4 and service.stats['errors'] == 1)
+    failing = PositionService(exchange.fetch)
+    try:
+        failing.get()
+        ok &= check("没有旧快照时抛出异常", False)
+    except ConnectionError:
+        ok &= check("没有旧快照时抛出异常", True)
+    exchange.fail = False
+
+    snapshot = service.get()
+    ok &= check("持仓判断兼容各种交易对格式",
+                snapshot.is_held('COIN1/USDT:USDT') and snapshot.is_held('COIN1-USDT-SWAP')
+                and snapshot.is_held('coin1-usdt') and not snapshot.is_held('BTC/USDT:USDT'))
+    ok &= check("normalize_symbol", normalize_symbol('BTC-USDT-SWAP') == normalize_symbol('BTC/USDT:USDT') == 'BTC/USDT')
+
+    # 推送更新: 首次推送为完整快照，之后为增量
+    push = PositionService(exchange.fetch, {'MAX_AGE': 0.01})
+    calls = exchange.calls
+    push.apply_push([
+        {'instId': 'BTC-USDT-SWAP', 'posSide': 'long', 'pos': '2', 'avgPx': '60000', 'uTime': '1700000000000'},
+        {'instId': 'ETH-USDT-SWAP', 'posSide': 'short', 'pos': '-3', 'avgPx': '3000', 'uTime': '1700000000000'},
+    ], full=True)
+    push.set_push_live(True)
+    time.sleep(0.02)
+    snapshot = push.get()
+    ok &= check("推送在线时不受时效限制、不访问交易所",
+                exchange.calls == calls and snapshot.source == 'ws' and snapshot.count == 2)
+    btc = [p for p in snapshot.positions if p['symbol'] == 'BTC/USDT:USDT']
+    ok &= check("推送仓位转换为lib2格式", btc and btc[0]['amount'] == 2.0 and btc[0]['entry_price'] == 60000.0)
+    push.apply_push([{'instId': 'ETH-USDT-SWAP', 'posSide': 'short', 'pos': '0'},
+                     {'instId': 'SOL-USDT-SWAP', 'posSide': 'long', 'pos': '10', 'avgPx': '150'}])
+    snapshot = push.get()
+    ok &= check("增量推送: 平仓删除、新仓位加入",
+                snapshot.is_held('SOL-USDT-SWAP') and not snapshot.is_held('ETH/USDT:USDT') and snapshot.count == 2)
+    push.set_push_live(False)
+    time.sleep(0.02)
+    ok &= check("推送断开后按时效重新获取", push.get().source == 'rest' and exchange.calls == calls + 1)
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
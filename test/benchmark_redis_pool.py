@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+共享Redis连接池测试
+    - 对比每次读取 trade_mul 都新建 redis.Redis 的旧方式与共享 RedisPool（连接池 + 本地TTL缓存）的耗时
+    - 校验 mget 的pipeline读取、set 后本地缓存刷新、TTL过期后重新读取
+    - 校验降级模式: Redis不可用时读取返回默认值/本地旧值，写入返回False，RETRY_INTERVAL内不再尝试连接
+
+默认使用fakeredis（pip install fakeredis）；指定 --addr 时使用本地 redis-server
+
+用法:
+    python test/benchmark_redis_pool.py
+    python test/benchmark_redis_pool.py --addr localhost:6379 --reads 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.redis_pool import RedisPool, parse_addr
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共享Redis连接池测试')
+    parser.add_argument('--addr', default='', help='本地redis-server地址（host:port），为空时使用fakeredis')
+    parser.add_argument('--reads', type=int, default=2000, help='读取trade_mul的次数')
+    args = parser.parse_args()
+
+    import redis
+    if args.addr:
+        host, port = parse_addr(args.addr)
+        config = {'ADDR': args.addr, 'PASSWORD': '', 'RETRY_INTERVAL': 1, 'LOCAL_TTL': {'trade_mul': 0.2}}
+        pool = RedisPool(config)
+        new_client = lambda: redis.Redis(host=host, port=port, decode_responses=True)
+        print(f"使用redis-server: {args.addr}")
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        config = {'ADDR': 'fake:6379', 'PASSWORD': '', 'RETRY_INTERVAL': 1, 'LOCAL_TTL': {'trade_mul': 0.2}}
+        pool = RedisPool(config, client=fakeredis.FakeRedis(server=server, decode_responses=True))
+        new_client = lambda: fakeredis.FakeRedis(server=server, decode_responses=True)
+        print("使用fakeredis")
+
+    pool.client.set('trade_mul', '1.5')
+
+    # 旧方式: 每次新建客户端并读取
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        r = new_client()
+        float(r.get('trade_mul') or 1)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        pool.get_float('trade_mul', 1.0)
+    pooled = time.perf_counter() - start
+    print(f"读取trade_mul {args.reads}次: 每次新建连接 {legacy * 1000:.1f}毫秒, 共享连接池 {pooled * 1000:.1f}毫秒, 统计 {pool.stats}")
+
+    ok = True
+    print("功能校验:")
+    pool.client.mset({'k1': 'a', 'k2': 'b'})
+    ok &= check("mget 一次pipeline读取多个键", pool.mget(['k1', 'k2', 'k3']) == {'k1': 'a', 'k2': 'b', 'k3': None})
+    ok &= check("set 后本进程立即读到新值", pool.set('trade_mul', 2) and pool.get_float('trade_mul', 1.0) == 2.0)
+    new_client().set('trade_mul', '3')
+    ok &= check("本地缓存期内返回缓存值", pool.get_float('trade_mul', 1.0) == 2.0)
+    time.sleep(0.25)
+    ok &= check("本地缓存过期后重新读取", pool.get_float('trade_mul', 1.0) == 3.0)
+
+    # 降级模式: 指向没有服务的端口
+    down = RedisPool({'ADDR': '127.0.0.1:1', 'PASSWORD': '', 'RETRY_INTERVAL': 1, 'CONNECT_TIMEOUT': 0.2, 'SOCKET_TIMEOUT': 0.2})
+    start = time.perf_counter()
+    value = down.get_float('trade_mul', 1.0)
+    first = time.perf_counter() - start
+    ok &= check(f"Redis不可用时返回默认值（首次 {first * 1000:.0f}毫秒）", value == 1.0 and down.degraded)
+    start = time.perf_counter()
+    for _ in range(100):
+        down.get('trade_mul')
+    ok &= check(f"降级期间不再尝试连接（100次读取 {(time.perf_counter() - start) * 1000:.1f}毫秒）", down.stats['degraded_skips'] == 100)
+    ok &= check("降级期间写入返回False", down.set('trade_mul', 2) is False)
+
+    # 已缓存的值在Redis断开后继续使用
+    pool.invalidate()
+    pool.get('trade_mul', local_ttl=0.01)
+    pool._client = down.client
+    pool._down_until = 0.0
+    time.sleep(0.02)
+    ok &= check("Redis断开后返回本地缓存中的旧值", pool.get('trade_mul', local_ttl=0.01) == '3')
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
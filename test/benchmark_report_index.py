@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+报告查看器解析缓存基准测试（合成交易信号，不需要网络）
+    - 用策略的 save_multi_timeframe_analysis 生成包含N个交易机会的txt报告和 .jsonl 结构化报告
+    - 对比原方式（每个请求都用正则解析txt，筛选时再解析一遍）与 ReportControl 缓存索引处理同一批请求的耗时
+    - 校验 .jsonl 与正则解析txt得到的数据相同、筛选结果与原实现一致、报告更新后重新加载、
+      .jsonl 过期或损坏时回退到解析txt
+
+用法:
+    python test/benchmark_report_index.py
+    python test/benchmark_report_index.py --opportunities 1000 --requests 300
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 直接导入report_control，不经过control包（包中的okx_control依赖交易所连接）
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'report_viewer_python', 'control'))
+
+from report_control import ReportControl
+from lib.tool.report_artifact import artifact_path
+from strategies.test3 import MultiTimeframeStrategy
+
+ACTIONS = ['买入', '卖出', '观望']
+SIGNALS = ['强烈买入', '买入', '观望', '卖出', '强烈卖出']
+
+
+def generate_signals(count, seed=11):
+    """生成合成交易信号（字段与MultiTimeframeSignal相同）"""
+    rng = random.Random(seed)
+    signals = []
+    for i in range(count):
+        price = rng.lognormvariate(0, 3)
+        atr = price * rng.uniform(0.005, 0.05)
+        action = rng.choice(ACTIONS)
+        direction = -1 if action == '卖出' else 1
+        reasoning = [f"{tf}:{rng.choice(SIGNALS)}" for tf in ('4h', '1h', '15m') if rng.random() < 0.7]
+        signals.append(SimpleNamespace(
+            symbol=f"{rng.choice(['BTC', 'ETH', 'SOL', 'DOGE', 'PEPE', 'X'])}{i}/USDT", overall_action=action,
+            confidence_level='高' if action != '观望' else '低', total_score=rng.uniform(-1, 1) * direction,
+            entry_price=price, target_short=price + direction * 2 * atr, stop_loss=price - direction * 1.5 * atr,
+            weekly_trend='观望', daily_trend='观望', h4_signal=rng.choice(SIGNALS), h1_signal=rng.choice(SIGNALS),
+            m15_signal=rng.choice(SIGNALS), reasoning=reasoning))
+    return signals
+
+
+def write_report(report_dir, signals):
+    """调用策略的报告生成方法（报告写入当前目录下的reports）"""
+    cwd = os.getcwd()
+    os.chdir(report_dir)
+    try:
+        owner = SimpleNamespace(get_name=lambda: 'MultiTimeframeStrategy')
+        return os.path.join(report_dir, MultiTimeframeStrategy.save_multi_timeframe_analysis(owner, list(signals)))
+    finally:
+        os.chdir(cwd)
+
+
+def legacy_filter(control, report_path, filter_type, search_term):
+    """原 filter_opportunities: 重新解析报告后逐个比较"""
+    report_data = control._parse_text_report(report_path)
+    search_term = search_term.lower().strip()
+    return [opp for opp in report_data['opportunities']
+            if (filter_type == 'all' or filter_type in opp.get('action', ''))
+            and (search_term == '' or search_term in opp.get('symbol', '').lower())]
+
+
+def normalized(opportunities):
+    """正则解析txt时，分析依据为空的机会会匹配到下一行的分隔线（原解析器的问题），结构化报告中为空字符串"""
+    return [{**opp, 'analysisReason': '' if set(opp['analysisReason']) == {'='} else opp['analysisReason']}
+            for opp in opportunities]
+
+
+def make_requests(count, seed=13):
+    """模拟查看器请求: 主页、/api/data、/api/filter（不同的筛选条件）"""
+    rng = random.Random(seed)
+    return [rng.choice([('page', None, None), ('data', None, None),
+                        ('filter', rng.choice(['all'] + ACTIONS), rng.choice(['', 'btc', 'eth1', 'pepe', 'x9']))])
+            for _ in range(count)]
+
+
+def serve(control, report_path, requests, legacy):
+    for kind, filter_type, search_term in requests:
+        if kind == 'filter':
+            if legacy:
+                legacy_filter(control, report_path, filter_type, search_term)
+            else:
+                control.filter_opportunities(report_path, filter_type, search_term)
+        elif legacy:
+            control._parse_text_report(report_path)
+        else:
+            control.parse_report_content(report_path)
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告查看器解析缓存基准测试')
+    parser.add_argument('--opportunities', type=int, default=1000, help='报告中的交易机会数量')
+    parser.add_argument('--requests', type=int, default=200, help='模拟的查看器请求数量')
+    args = parser.parse_args()
+
+    report_dir = tempfile.mkdtemp(prefix='report_index_')
+    signals = generate_signals(args.opportunities)
+    report_path = write_report(report_dir, signals)
+    requests = make_requests(args.requests)
+
+    # 抑制解析txt时的调试输出
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        start = time.perf_counter()
+        serve(ReportControl(report_path), report_path, requests, legacy=True)
+        legacy_time = time.perf_counter() - start
+        control = ReportControl(report_path)
+        start = time.perf_counter()
+        serve(control, report_path, requests, legacy=False)
+        cached_time = time.perf_counter() - start
+        text_data = control._parse_text_report(report_path)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    print(f"{args.opportunities}个交易机会的报告，{args.requests}个请求: 每次解析txt {legacy_time * 1000:.0f}毫秒, "
+          f"缓存索引 {cached_time * 1000:.1f}毫秒（{legacy_time / max(cached_time, 1e-9):.0f}倍），统计 {control.stats}")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("同时生成了结构化报告", os.path.exists(artifact_path(report_path)))
+    ok &= check("只加载一次且来自结构化报告", control.stats['jsonl'] == 1 and control.stats['txt'] == 0)
+    jsonl_data = control.parse_report_content(report_path)
+    ok &= check("结构化报告与正则解析txt的数据相同",
+                jsonl_data['opportunities'] == normalized(text_data['opportunities'])
+                and all(jsonl_data[k] == text_data[k] for k in ('analysisTime', 'timeframeDimensions', 'totalOpportunities')))
+    same_filter = True
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        for _, filter_type, search_term in [r for r in requests if r[0] == 'filter'][:30]:
+            result = control.filter_opportunities(report_path, filter_type, search_term)
+            same_filter &= result['opportunities'] == normalized(legacy_filter(control, report_path, filter_type, search_term))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    ok &= check("筛选结果与原实现一致", same_filter)
+    prefix = control.filter_opportunities(report_path, 'all', 'btc', match='prefix')['opportunities']
+    ok &= check("交易对前缀筛选", prefix and all(o['symbol'].lower().startswith('btc') for o in prefix)
+                and len(prefix) == sum(o['symbol'].lower().startswith('btc') for o in text_data['opportunities']))
+    index = control.get_report_index(report_path)
+    ok &= check("按评分排序", [text_data['opportunities'][i]['totalScore'] for i in index.by_score]
+                == sorted((o['totalScore'] for o in text_data['opportunities']), reverse=True))
+    ok &= check("返回的数据是副本", control.parse_report_content(report_path)['opportunities'].pop() is not None
+                and len(control.parse_report_content(report_path)['opportunities']) == args.opportunities)
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        # 报告更新后重新加载
+        time.sleep(0.01)
+        write_report(report_dir, signals[:10])
+        updated = control.parse_report_content(report_path)
+        # 只更新了txt（例如旧版本策略），.jsonl已过期，回退到解析txt
+        time.sleep(0.01)
+        with open(report_path, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        txt_only = control.get_report_index(report_path)
+        # .jsonl损坏时回退到解析txt
+        time.sleep(0.01)
+        with open(artifact_path(report_path), 'w', encoding='utf-8') as f:
+            f.write("not json\n")
+        corrupt = control.get_report_index(report_path)
+        missing = control.parse_report_content(os.path.join(report_dir, 'missing.txt'))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    ok &= check("报告更新后重新加载", updated['totalOpportunities'] == 10)
+    ok &= check("结构化报告比txt旧时解析txt", txt_only.source == 'txt' and txt_only.report_data['totalOpportunities'] == 10)
+    ok &= check("结构化报告损坏时解析txt", corrupt.source == 'txt' and corrupt.report_data['totalOpportunities'] == 10)
+    ok &= check("报告不存在时返回错误信息", 'error' in missing and missing['opportunities'] == [])
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+报告查询接口（/api/filter）基准测试（合成交易信号，不需要网络）
+    - 对比返回全部筛选结果与分页+字段投影+gzip的响应大小和耗时
+    - 校验多字段排序、游标翻页覆盖全部结果且不重复、字段投影、facets统计、报告更新后游标失效
+
+用法:
+    python test/benchmark_report_query.py
+    python test/benchmark_report_query.py --opportunities 5000 --size 50
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 直接导入report_control，不经过control包（包中的okx_control依赖交易所连接）
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'report_viewer_python', 'control'))
+
+from report_control import ReportControl, SORT_FIELDS
+from benchmark_report_index import generate_signals, write_report
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def encoded(payload, use_gzip):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(body, compresslevel=5) if use_gzip else body
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告查询接口基准测试')
+    parser.add_argument('--opportunities', type=int, default=2000, help='报告中的交易机会数量')
+    parser.add_argument('--size', type=int, default=50, help='每页数量')
+    parser.add_argument('--repeat', type=int, default=50, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    report_dir = tempfile.mkdtemp(prefix='report_query_')
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        signals = generate_signals(args.opportunities)
+        report_path = write_report(report_dir, signals)
+        control = ReportControl(report_path)
+        index = control.get_report_index(report_path)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    opportunities = index.report_data['opportunities']
+    fields = ['symbol', 'action', 'totalScore', 'shortPct', 'stopPct']
+
+    full, full_t = timed(lambda: encoded(control.filter_opportunities(report_path, 'all', ''), False), args.repeat)
+    paged, paged_t = timed(lambda: encoded(control.query_opportunities(
+        report_path, sort='-absScore', fields=fields, size=args.size), True), args.repeat)
+    print(f"{args.opportunities}个交易机会: 全部返回 {len(full) / 1024:.0f}KB {full_t * 1000:.1f}毫秒, "
+          f"分页({args.size})+投影+gzip {len(paged) / 1024:.1f}KB {paged_t * 1000:.2f}毫秒")
+
+    ok = True
+    print("功能校验:")
+    # 多字段排序
+    result = control.query_opportunities(report_path, sort='action,-absScore,symbol')
+    expected = sorted(opportunities, key=lambda o: (o['action'], -abs(o['totalScore']), o['symbol']))
+    ok &= check("多字段排序", result['opportunities'] == expected)
+
+    # 游标翻页
+    pages, cursor, first = [], None, True
+    while first or cursor:
+        page = control.query_opportunities(report_path, filter_type='买入', sort='-shortPct', size=args.size, cursor=cursor)
+        pages.extend(page['opportunities'])
+        cursor, first = page['nextCursor'], False
+    expected = sorted([o for o in opportunities if '买入' in o['action']], key=lambda o: -o['shortPct'])
+    ok &= check("游标翻页覆盖全部结果且不重复", [o['symbol'] for o in pages] == [o['symbol'] for o in expected])
+    page3 = control.query_opportunities(report_path, filter_type='买入', sort='-shortPct', size=args.size, page=3)
+    ok &= check("页码分页", page3['opportunities'] == expected[2 * args.size:3 * args.size] and page3['page'] == 3)
+
+    # 字段投影
+    projected = control.query_opportunities(report_path, fields=['symbol', 'totalScore'], size=5)
+    ok &= check("字段投影", all(set(o) == {'symbol', 'totalScore'} for o in projected['opportunities']))
+
+    # facets: 搜索后各操作类型的数量，不受操作类型筛选影响
+    facets = control.query_opportunities(report_path, filter_type='卖出', search_term='btc', size=1)['facets']
+    searched = [o for o in opportunities if 'btc' in o['symbol'].lower()]
+    ok &= check("facets统计", facets == {'买入': sum(o['action'] == '买入' for o in searched),
+                                         '卖出': sum(o['action'] == '卖出' for o in searched),
+                                         '观望': sum(o['action'] == '观望' for o in searched), 'all': len(searched)})
+    ok &= check("页面统计使用预计算的数量", index.count('买入') == sum('买入' in o['action'] for o in opportunities))
+    ok &= check("不分页时与原筛选接口结果相同",
+                control.query_opportunities(report_path, filter_type='观望', search_term='eth')['opportunities']
+                == control.filter_opportunities(report_path, '观望', 'eth')['opportunities'])
+
+    # 参数错误
+    try:
+        control.query_opportunities(report_path, sort='unknown')
+        bad_sort = False
+    except ValueError:
+        bad_sort = True
+    ok &= check(f"不支持的排序字段报错（可选: {', '.join(SORT_FIELDS)}）", bad_sort)
+
+    # 报告更新后旧游标失效，版本号变化（ETag随之变化）
+    old_version = index.version
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        cursor = control.query_opportunities(report_path, size=args.size)['nextCursor']
+        time.sleep(0.01)
+        write_report(report_dir, signals[:args.size * 3])
+        new_version = control.get_report_index(report_path).version
+        try:
+            control.query_opportunities(report_path, size=args.size, cursor=cursor)
+            stale = False
+        except ValueError:
+            stale = True
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    ok &= check("报告更新后版本变化、旧游标失效", new_version != old_version and stale)
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
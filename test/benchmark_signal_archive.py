@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+交易信号归档基准测试（合成信号，不需要网络和MySQL）
+    - 生成N天的扫描结果，批量写入归档，统计写入速度
+    - 对比原方式（遍历所有 trade_signals_*.txt 用正则查找）与归档索引查询"最近30天某币种的买入信号"的耗时
+    - 校验查询结果与直接筛选相同、币种前缀匹配、各周期信号条件、按天统计、翻页覆盖全部结果且不重复、
+      导入txt文件与扫描归档的记录去重、重复导入同一文件不产生重复记录
+
+用法:
+    python test/benchmark_signal_archive.py
+    python test/benchmark_signal_archive.py --days 60 --symbols 300 --scans-per-day 24
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# 与models中的脚本一样，把models目录加入路径后直接导入（不触发models/__init__.py中的全局模型实例化）
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+sys.path.append(os.path.dirname(MODELS_DIR))
+sys.path.append(MODELS_DIR)
+
+from signal_archive import SignalArchive
+
+SIGNALS = ['强烈买入', '买入', '观望', '卖出', '强烈卖出']
+TIMEFRAMES = ('4h', '1h', '15m')
+
+
+def generate_scans(days, symbol_count, scans_per_day, seed=17):
+    """生成每轮扫描的分析结果（字段与MultiTimeframeSignal相同），返回 [(扫描时间, 信号列表)]"""
+    rng = random.Random(seed)
+    symbols = [f"{base}{i}/USDT" for i, base in enumerate(rng.choice(['BTC', 'ETH', 'SOL', 'DOGE', 'X']) for _ in range(symbol_count))]
+    symbols[0] = 'SOL/USDT'
+    start = datetime.now().replace(microsecond=0) - timedelta(days=days)
+    scans = []
+    for n in range(days * scans_per_day):
+        scan_time = start + timedelta(seconds=n * 86400 // scans_per_day)
+        signals = []
+        for symbol in symbols:
+            timeframe_signals = {tf: rng.choice(SIGNALS) for tf in TIMEFRAMES}
+            score = rng.uniform(-1, 1)
+            action = '买入' if score > 0.3 else '卖出' if score < -0.3 else '观望'
+            price = rng.lognormvariate(0, 2)
+            signals.append(SimpleNamespace(
+                symbol=symbol, overall_action=action, confidence_level='高', total_score=score, entry_price=price,
+                target_short=price * 1.02, stop_loss=price * 0.98, timestamp=scan_time, timeframe_signals=timeframe_signals,
+                reasoning=[f"{tf}:{signal}" for tf, signal in timeframe_signals.items() if signal != '观望']))
+        scans.append((scan_time, signals))
+    return scans
+
+
+def write_signal_file(directory, scan_time, signals, strategy):
+    """按策略 save_trade_signals 的格式写入交易信号文件"""
+    path = os.path.join(directory, f"trade_signals_{scan_time.strftime('%Y%m%d_%H%M%S')}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("=" * 80 + "\n")
+        f.write("📊 交易信号记录\n")
+        f.write("=" * 80 + "\n")
+        f.write(f"记录时间: {scan_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"记录信号: {len(signals)} 个\n")
+        f.write(f"策略名称: {strategy}\n")
+        f.write("=" * 80 + "\n\n")
+        for i, signal in enumerate(signals, 1):
+            f.write(f"【信号 {i}】 {signal.symbol}\n")
+            f.write("-" * 60 + "\n")
+            f.write(f"操作: {signal.overall_action}\n")
+            f.write(f"评分: {signal.total_score:.3f}\n")
+            f.write(f"当前价格: {signal.entry_price:.6f} USDT\n")
+            f.write(f"短期目标 (1.5倍ATR): {signal.target_short:.6f} USDT\n")
+            f.write(f"止损价格 (1倍ATR反向价格): {signal.stop_loss:.6f} USDT\n")
+            f.write(f"时间戳: {signal.timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"分析依据: {'; '.join(signal.reasoning)}\n")
+            f.write("\n" + "=" * 80 + "\n\n")
+    return path
+
+
+def legacy_search(directory, base, action, since):
+    """原方式: 遍历所有txt文件，用正则找出某币种在某时间之后的信号"""
+    block_re = re.compile(r'【信号 \d+】\s*(\S+)\n.*?操作: (\S+)\n.*?时间戳: ([\d\- :]+)\n', re.DOTALL)
+    found = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            for symbol, op, ts in block_re.findall(f.read()):
+                if symbol.split('/')[0] == base and action in op and datetime.strptime(ts.strip(), '%Y-%m-%d %H:%M:%S') >= since:
+                    found.append((symbol, ts.strip()))
+    return found
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易信号归档基准测试')
+    parser.add_argument('--days', type=int, default=45, help='模拟的天数')
+    parser.add_argument('--symbols', type=int, default=200, help='每轮扫描的交易对数量')
+    parser.add_argument('--scans-per-day', type=int, default=24, help='每天的扫描次数')
+    parser.add_argument('--repeat', type=int, default=20, help='查询的重复次数')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='signal_archive_')
+    signal_dir = os.path.join(workdir, 'trade_signals')
+    os.makedirs(signal_dir)
+    strategy = 'MultiTimeframeStrategy'
+    scans = generate_scans(args.days, args.symbols, args.scans_per_day)
+
+    archive = SignalArchive(os.path.join(workdir, 'signal_archive.db'), config={'INCLUDE_NEUTRAL': True})
+    traded_files = []
+    start = time.perf_counter()
+    total_rows = 0
+    for scan_time, signals in scans:
+        traded = [s for s in signals if s.overall_action == '买入' and s.total_score > 0.9]
+        total_rows += archive.append(strategy, signals, traded=traded)
+        if traded:
+            traded_files.append(write_signal_file(signal_dir, scan_time, traded, strategy))
+    write_time = time.perf_counter() - start
+    print(f"{len(scans)}轮扫描 × {args.symbols}个交易对: 归档 {total_rows} 条 {write_time:.2f}秒"
+          f"（{total_rows / max(write_time, 1e-9):.0f}条/秒，每轮 {write_time / len(scans) * 1000:.1f}毫秒）")
+
+    since = datetime.now().replace(microsecond=0) - timedelta(days=30)
+    all_signals = [s for _, signals in scans for s in signals]
+    legacy, legacy_time = timed(lambda: legacy_search(signal_dir, 'SOL', '买入', since))
+    indexed, indexed_time = timed(lambda: archive.query(symbol='SOL', action='买入', start=since, traded=True, limit=100000), args.repeat)
+    print(f"最近30天SOL已下单的买入信号（{len(traded_files)}个txt文件）: 遍历txt {legacy_time * 1000:.1f}毫秒, "
+          f"归档索引 {indexed_time * 1000:.2f}毫秒（{legacy_time / max(indexed_time, 1e-9):.0f}倍）")
+    _, daily_time = timed(lambda: archive.daily_counts(timeframe='4h', timeframe_signal='强烈买入'), args.repeat)
+    print(f"按天统计4小时强烈买入: {daily_time * 1000:.1f}毫秒")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("与遍历txt的结果相同", sorted((r['symbol'], r['time']) for r in indexed) == sorted(legacy))
+    expected = [s for s in all_signals if s.symbol == 'SOL/USDT' and '买入' in s.overall_action and s.timestamp >= since]
+    rows = archive.query(symbol='sol-usdt', action='买入', start=since, limit=100000)
+    ok &= check("交易对任意写法、时间范围和操作条件", len(rows) == len(expected)
+                and all(r['symbol'] == 'SOL/USDT' and r['ts'] >= since.timestamp() for r in rows))
+    ok &= check("结果按时间倒序", [r['ts'] for r in rows] == sorted((r['ts'] for r in rows), reverse=True))
+    base_rows = archive.query(symbol='SOL', limit=100000)
+    sol_symbols = {s.symbol for s in all_signals if s.symbol.split('/')[0] == 'SOL'}
+    ok &= check("只写币种时匹配该币种的所有交易对", {r['symbol'] for r in base_rows} == sol_symbols
+                and len(base_rows) == sum(s.symbol in sol_symbols for s in all_signals))
+
+    daily = archive.daily_counts(timeframe='4h', timeframe_signal='强烈买入')
+    expected_daily = {}
+    for s in all_signals:
+        if s.timeframe_signals['4h'] == '强烈买入':
+            day = s.timestamp.strftime('%Y-%m-%d')
+            expected_daily[day] = expected_daily.get(day, 0) + 1
+    ok &= check("按天统计各周期信号", {d['day']: d['count'] for d in daily} == expected_daily)
+
+    # 翻页
+    pages, before = [], None
+    while True:
+        page = archive.query(symbol='SOL/USDT', limit=97, before=before)
+        pages.extend(page)
+        if len(page) < 97:
+            break
+        before = (page[-1]['ts'], page[-1]['id'])
+    ok &= check("翻页覆盖全部结果且不重复", len(pages) == sum(s.symbol == 'SOL/USDT' for s in all_signals)
+                and len({r['id'] for r in pages}) == len(pages))
+
+    # 导入txt: 与扫描归档的记录相同（同一策略、交易对、时间、操作），全部被去重
+    imported, import_time = timed(lambda: archive.ingest_directory(signal_dir))
+    ok &= check("导入txt与扫描归档的记录去重", imported == {'files': len(traded_files), 'rows': 0})
+    ok &= check("重复导入同一文件不产生重复记录", archive.ingest_directory(signal_dir)['rows'] == 0
+                and archive.summary()['total'] == total_rows)
+
+    # 导入到新的归档: 字段与信号对象一致
+    fresh = SignalArchive(':memory:')
+    result = fresh.ingest_directory(signal_dir)
+    traded_count = sum(1 for _, signals in scans for s in signals if s.overall_action == '买入' and s.total_score > 0.9)
+    print(f"导入 {result['files']} 个txt文件 {result['rows']} 条信号: {import_time * 1000:.0f}毫秒（去重）")
+    row = fresh.query(limit=1)[0]
+    source = next(s for _, signals in scans for s in signals
+                  if s.symbol == row['symbol'] and int(s.timestamp.timestamp()) == row['ts'])
+    ok &= check("导入txt的字段与原信号一致", result['rows'] == traded_count and row['traded'] == 1 and row['source'] == 'txt'
+                and row['strategy'] == strategy and abs(row['total_score'] - source.total_score) < 1e-3
+                and row['timeframe_signals'] == {tf: v for tf, v in source.timeframe_signals.items() if v != '观望'})
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+交易信号发送队列测试（使用本地下单接口桩服务器，见 order_stub_server.py）
+    - 对比逐个阻塞 requests.post 与 SignalDispatcher 在慢接口下的扫描阻塞时间和总耗时
+    - 校验默认只重试连接失败，503不重试；开启IDEMPOTENT_RECEIVER时503重试使用同一幂等键、服务器只下单一次，400不重试
+    - 校验磁盘队列: 关闭时未发送完成的请求默认不再发送；开启IDEMPOTENT_RECEIVER时下次启动时重新发送，超过有效期的信号丢弃
+    - 输出请求延迟直方图
+
+用法:
+    python test/benchmark_signal_dispatch.py
+    python test/benchmark_signal_dispatch.py --signals 40 --delay 0.3 --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from lib.tool.signal_dispatcher import SignalDispatcher
+from order_stub_server import OrderStubServer
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def make_payload(i):
+    return {'name': f"COIN{i}-USDT", 'mechanism_id': 13, 'stop_win_price': 1.5, 'stop_loss_price': 0.9, 'ac_type': 'o_l', 'loss': 1}
+
+
+def make_dispatcher(url, spool_path, **overrides):
+    config = {'URL': url, 'SPOOL_PATH': spool_path, 'BACKOFF_BASE': 0.05, 'BACKOFF_MAX': 0.2}
+    config.update(overrides)
+    return SignalDispatcher(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易信号发送队列测试')
+    parser.add_argument('--signals', type=int, default=20, help='每轮扫描发送的信号数量')
+    parser.add_argument('--delay', type=float, default=0.2, help='下单接口响应延迟（秒）')
+    parser.add_argument('--workers', type=int, default=4, help='发送线程数')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='signal_dispatch_')
+    stub = OrderStubServer(delay=args.delay)
+    url = stub.start_in_thread()
+
+    # 旧方式: save_trade_signals 循环中逐个阻塞发送
+    start = time.perf_counter()
+    for i in range(args.signals):
+        requests.post(url, data=make_payload(i), timeout=10)
+    legacy = time.perf_counter() - start
+
+    stub.orders.clear()
+    stub.duplicates = 0
+    dispatcher = make_dispatcher(url, os.path.join(work_dir, 'spool.jsonl'), WORKERS=args.workers)
+    start = time.perf_counter()
+    for i in range(args.signals):
+        dispatcher.dispatch(make_payload(i), description=f"COIN{i}")
+    blocked = time.perf_counter() - start
+    dispatcher.flush(30)
+    total = time.perf_counter() - start
+    print(f"{args.signals}个信号（接口延迟 {args.delay}秒）: 逐个阻塞发送 {legacy:.2f}秒, "
+          f"发送队列阻塞扫描 {blocked * 1000:.0f}毫秒, 全部发送完成 {total:.2f}秒")
+
+    ok = True
+    print("功能校验:")
+    ok &= check("全部发送成功", dispatcher.stats['sent'] == args.signals and len(stub.orders) == args.signals)
+    ok &= check("完成后磁盘队列为空", len(dispatcher.spool) == 0)
+
+    # 默认（接收端不去重）: 503可能已经下单，不重试；连接失败时请求没有发出，重试
+    stub.delay, stub.fail_first = 0.01, 1
+    stub.attempts.clear()
+    once = make_dispatcher(url, os.path.join(work_dir, 'once.jsonl'), ASYNC=False)
+    ok &= check("默认503不重试", once.dispatch(make_payload(0)) is False
+                and once.stats['retries'] == 0 and sum(stub.attempts.values()) == 1)
+    refused = make_dispatcher('http://127.0.0.1:1/myOrder', os.path.join(work_dir, 'refused.jsonl'), ASYNC=False, MAX_RETRIES=2)
+    ok &= check("默认连接失败按退避重试", refused.dispatch(make_payload(0)) is False
+                and refused.stats['retries'] == 2 and refused.stats['failed'] == 1)
+
+    # 接收端按幂等键去重: 每个幂等键前2次返回503
+    stub.fail_first = 2
+    stub.attempts.clear()
+    stub.orders.clear()
+    retry = make_dispatcher(url, os.path.join(work_dir, 'retry.jsonl'), WORKERS=args.workers, IDEMPOTENT_RECEIVER=True)
+    for i in range(10):
+        retry.dispatch(make_payload(i))
+    retry.flush(30)
+    ok &= check("503按退避重试后成功", retry.stats['sent'] == 10 and retry.stats['retries'] == 20)
+    ok &= check("重试使用同一幂等键、服务器只下单一次",
+                len(stub.orders) == 10 and stub.duplicates == 0 and all(stub.attempts[key] == 3 for key in stub.orders))
+
+    # 400不重试
+    stub.fail_first, stub.status = 0, 400
+    sync = make_dispatcher(url, os.path.join(work_dir, 'rejected.jsonl'), ASYNC=False)
+    ok &= check("同步模式返回发送结果，400不重试", sync.dispatch(make_payload(0)) is False
+                and sync.stats['failed'] == 1 and sync.stats['retries'] == 0)
+    stub.status = 200
+
+    # 磁盘队列: 接口不可用时关闭，重启后重新发送
+    spool_path = os.path.join(work_dir, 'restart.jsonl')
+    down = make_dispatcher('http://127.0.0.1:1/myOrder', spool_path, MAX_RETRIES=100, CONNECT_TIMEOUT=0.2)
+    for i in range(5):
+        down.dispatch(make_payload(i))
+    time.sleep(0.3)
+    down.close(timeout=0.1)
+    ok &= check("关闭时未发送的请求保留在磁盘队列中", len(down.spool) == 5)
+    with open(spool_path, 'a', encoding='utf-8') as f:
+        old_job = {'id': 'expired-job', 'kind': '交易信号', 'payload': make_payload(99), 'description': '', 'created': time.time() - 3600}
+        f.write(json.dumps({'op': 'add', 'id': old_job['id'], 'job': old_job}) + '\n')
+        f.write('{"op": "add", "id": "torn')  # 模拟崩溃时写了一半的行
+    default_spool_path = os.path.join(work_dir, 'restart_default.jsonl')
+    shutil.copyfile(spool_path, default_spool_path)
+    stub.orders.clear()
+    cautious = make_dispatcher(url, default_spool_path)
+    cautious.start()
+    cautious.flush(10)
+    ok &= check("默认重启后不再发送未完成的请求", cautious.stats['dropped'] == 6 and cautious.stats['sent'] == 0
+                and len(stub.orders) == 0 and len(cautious.spool.load()) == 0)
+    restarted = make_dispatcher(url, spool_path, IDEMPOTENT_RECEIVER=True)
+    restarted.start()
+    restarted.flush(10)
+    ok &= check("开启IDEMPOTENT_RECEIVER时重启后重新发送未完成的请求", restarted.stats['recovered'] == 6 and restarted.stats['sent'] == 5 and len(stub.orders) == 5)
+    ok &= check("超过有效期的信号不再发送", restarted.stats['expired'] == 1 and 'expired-job' not in stub.orders)
+    restarted.start()
+    ok &= check("磁盘队列已清空", len(restarted.spool) == 0 and len(restarted.spool.load()) == 0)
+
+    latency = dispatcher.summary()['latency']
+    print(f"请求延迟: {latency['request']}")
+    print(f"入队到完成: {latency['end_to_end']}")
+
+    for d in (dispatcher, once, refused, retry, sync, cautious, restarted):
+        d.close(timeout=1)
+    stub.stop()
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+策略执行器扩展性基准测试
+使用合成K线，对比 inline / thread / process 三种执行方式在 1~N 个工作单元下执行策略分析的耗时，
+并校验各方式得到的结果与inline一致（不一致时以非0状态退出）
+
+用法:
+    python test/benchmark_strategy_executor.py --symbols 200
+    python test/benchmark_strategy_executor.py --symbols 300 --max-workers 8 --modes thread,process
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.strategy_executor import StrategyExecutor
+
+TIMEFRAME_MINUTES = {'4h': 240, '1h': 60, '15m': 15}
+
+
+def generate_data(symbol_count, bars, seed=3):
+    """生成每个交易对各时间框架的合成K线（与扫描器的DataFrame格式一致）"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now().floor('15min')
+    all_data = {}
+    for i in range(symbol_count):
+        symbol = f"SYN{i}/USDT"
+        all_data[symbol] = {}
+        for tf, minutes in TIMEFRAME_MINUTES.items():
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+            df = pd.DataFrame({
+                'open': np.roll(close, 1), 'high': close * 1.003, 'low': close * 0.997, 'close': close,
+                'volume': rng.lognormal(3, 1, bars),
+            }, index=pd.DatetimeIndex(pd.date_range(end=end, periods=bars, freq=f'{minutes}min'), name='timestamp'))
+            all_data[symbol][tf] = df
+    return all_data
+
+
+def summarize(results):
+    """把结果转换为可比较的形式：(交易对, 策略) → (操作, 总评分)"""
+    summary = {}
+    for task, (result, error) in results.items():
+        if result is None:
+            summary[task] = (None, error)
+        else:
+            summary[task] = (getattr(result, 'overall_action', None), round(float(getattr(result, 'total_score', 0)), 10))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='策略执行器扩展性基准测试')
+    parser.add_argument('--strategy', default='test3', help='strategies目录下的策略模块名')
+    parser.add_argument('--class-name', default='MultiTimeframeStrategy', help='策略类名')
+    parser.add_argument('--symbols', type=int, default=200, help='合成交易对数量')
+    parser.add_argument('--bars', type=int, default=309, help='每个时间框架的K线数量')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='最大工作单元数量')
+    parser.add_argument('--modes', default='inline,thread,process', help='要测试的执行方式，逗号分隔')
+    args = parser.parse_args()
+
+    module_path = f'strategies.{args.strategy}'
+    module = __import__(module_path, fromlist=[args.class_name])
+    strategies = {args.class_name: getattr(module, args.class_name)()}
+    specs = {args.class_name: (module_path, args.class_name)}
+    all_data = generate_data(args.symbols, args.bars)
+    tasks = [(symbol, args.class_name) for symbol in all_data]
+    print(f"任务数量: {len(tasks)}，CPU核心数: {os.cpu_count()}")
+
+    modes = args.modes.split(',')
+    worker_counts = sorted({1, 2, 4, args.max_workers} & set(range(1, args.max_workers + 1)))
+    baseline = None
+    baseline_time = None
+    ok = True
+    for mode in modes:
+        for workers in ([1] if mode == 'inline' else worker_counts):
+            executor = StrategyExecutor(strategies, specs, {'MODE': mode, 'MAX_WORKERS': workers})
+            if mode == 'process':
+                # 先执行一次预热，排除进程启动和策略实例化的耗时
+                executor.run(tasks[:workers], all_data)
+            start = time.time()
+            results = executor.run(tasks, all_data)
+            elapsed = time.time() - start
+            executor.shutdown()
+
+            summary = summarize(results)
+            if baseline is None:
+                baseline, baseline_time = summary, elapsed
+            mismatches = sum(1 for task in tasks if summary.get(task) != baseline.get(task))
+            failed = sum(1 for result, error in results.values() if error is not None)
+            ok &= mismatches == 0 and failed == 0
+            print(f"{mode:8s} 工作单元 {workers:2d}: {elapsed:7.2f}秒, 相对{modes[0]}加速 {baseline_time / max(elapsed, 1e-9):5.2f}倍, "
+                  f"结果不一致 {mismatches}, 执行失败 {failed}")
+
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+多时间框架对齐基准测试
+对比回测主循环中旧的逐根K线线性扫描+copy取窗口方式与TimeframeAligner预计算索引+视图取窗口方式的耗时，
+并校验两种方式得到的窗口完全一致
+
+用法:
+    python test/benchmark_timeframe_alignment.py --days 90
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.timeframe_alignment import TimeframeAligner
+
+TIMEFRAME_MINUTES = {'15m': 15, '1H': 60, '4H': 240}
+WINDOW_SIZES = {'15m': 299, '1H': 299, '4H': 299}
+
+
+def generate_frames(days, start='2024-01-01'):
+    """生成各时间框架的合成K线DataFrame"""
+    frames = {}
+    rng = np.random.default_rng(7)
+    for tf, minutes in TIMEFRAME_MINUTES.items():
+        n = days * 24 * 60 // minutes
+        close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+        frames[tf] = pd.DataFrame({
+            'datetime': pd.date_range(start, periods=n, freq=f'{minutes}min'),
+            'open': close, 'high': close * 1.001, 'low': close * 0.999, 'close': close,
+            'volume': rng.uniform(10, 1000, n),
+        })
+    return frames
+
+
+def legacy_windows(frames, base_df, index_maps, i):
+    """旧实现：每根基准K线线性扫描所有时间戳并复制窗口"""
+    current_time = base_df['datetime'].iloc[i]
+    result = {}
+    for tf, df in frames.items():
+        valid_times = [dt for dt in index_maps[tf].keys() if dt <= current_time]
+        if not valid_times:
+            continue
+        closest_idx = index_maps[tf][max(valid_times)]
+        start_idx = max(0, closest_idx - WINDOW_SIZES[tf] + 1)
+        result[tf] = df.iloc[start_idx:closest_idx + 1].copy()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多时间框架对齐基准测试')
+    parser.add_argument('--days', type=int, default=60, help='数据天数')
+    parser.add_argument('--legacy-bars', type=int, default=300, help='旧实现只测量的基准K线数量（避免耗时过长）')
+    args = parser.parse_args()
+
+    frames = generate_frames(args.days)
+    base_df = frames['15m']
+    bars = range(168, len(base_df))
+    print(f"基准K线数量: {len(base_df)}")
+
+    index_maps = {tf: {dt: idx for idx, dt in enumerate(df['datetime'])} for tf, df in frames.items()}
+    legacy_sample = list(bars)[-args.legacy_bars:]
+    start = time.time()
+    legacy = {i: legacy_windows(frames, base_df, index_maps, i) for i in legacy_sample}
+    legacy_per_bar = (time.time() - start) / len(legacy_sample)
+    print(f"旧实现: {legacy_per_bar * 1000:.2f}毫秒/根, 推算全量 {legacy_per_bar * len(bars):.1f}秒")
+
+    start = time.time()
+    aligner = TimeframeAligner(base_df['datetime'], frames, WINDOW_SIZES)
+    build_time = time.time() - start
+    start = time.time()
+    for i in bars:
+        aligner.windows(i)
+    aligned_total = time.time() - start
+    print(f"TimeframeAligner: 预计算 {build_time * 1000:.1f}毫秒, 全量 {aligned_total:.2f}秒 ({aligned_total / len(bars) * 1e6:.1f}微秒/根)")
+
+    # 校验窗口一致
+    for i in legacy_sample:
+        new = aligner.windows(i)
+        for tf, df in legacy[i].items():
+            pd.testing.assert_frame_equal(df, new[tf])
+    print("窗口校验通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+下单接口桩服务器
+模拟 /myOrder 表单接口：可设置响应延迟、每个幂等键前N次返回503、固定返回某个状态码，
+按 Idempotency-Key 请求头记录收到的请求，同一幂等键只"下单"一次，用于测试SignalDispatcher的重试和幂等
+
+用法:
+    python test/order_stub_server.py --port 8081 --delay 0.2 --fail-first 1
+"""
+
+import time
+import argparse
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class OrderStubServer:
+    """可控制延迟和失败的下单接口"""
+
+    def __init__(self, delay=0.0, fail_first=0, status=200):
+        """
+        Args:
+            delay: 每个请求的响应延迟（秒）
+            fail_first: 每个幂等键前几次请求返回503
+            status: 其余请求返回的状态码
+        """
+        self.delay = delay
+        self.fail_first = fail_first
+        self.status = status
+        self.attempts = {}      # 幂等键 -> 收到的请求次数
+        self.orders = {}        # 幂等键 -> 表单参数（只记录第一次成功的请求）
+        self.duplicates = 0     # 成功后又收到的同一幂等键请求
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def handle(self, key, form):
+        """返回 (状态码, 响应内容)"""
+        with self.lock:
+            self.requests += 1
+            attempt = self.attempts.get(key, 0) + 1
+            self.attempts[key] = attempt
+        time.sleep(self.delay)
+        if attempt <= self.fail_first:
+            return 503, 'busy'
+        if self.status != 200:
+            return self.status, 'rejected'
+        with self.lock:
+            if key in self.orders:
+                self.duplicates += 1
+            else:
+                self.orders[key] = form
+        return 200, 'ok'
+
+    def start_in_thread(self, host='127.0.0.1', port=0):
+        """在后台线程启动，返回接口地址"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+                status, body = stub.handle(self.headers.get('Idempotency-Key', ''), form)
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.httpd.server_address[1]}/myOrder"
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='下单接口桩服务器')
+    parser.add_argument('--port', type=int, default=8081, help='监听端口')
+    parser.add_argument('--delay', type=float, default=0.2, help='响应延迟（秒）')
+    parser.add_argument('--fail-first', type=int, default=0, help='每个幂等键前几次请求返回503')
+    parser.add_argument('--status', type=int, default=200, help='其余请求返回的状态码')
+    args = parser.parse_args()
+
+    stub = OrderStubServer(args.delay, args.fail_first, args.status)
+    url = stub.start_in_thread(port=args.port)
+    print(f"下单接口桩服务器已启动: {url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"请求 {stub.requests}, 订单 {len(stub.orders)}, 重复 {stub.duplicates}")
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+批量分析模式一致性测试
+在同一份多时间框架K线上，逐根K线调用 analyze 与一次性调用 analyze_series，
+对比每根基准K线的综合操作、总评分和止损/止盈价格，并输出两种方式的耗时
+
+用法:
+    python test/parity_analyze_series.py --days 30
+    python test/parity_analyze_series.py --strategy test3 --days 90 --tolerance 1e-9
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.timeframe_alignment import TimeframeAligner
+
+TIMEFRAME_MINUTES = {'4h': 240, '1h': 60, '15m': 15}
+
+
+def generate_data(days, seed=11, start='2024-01-01'):
+    """生成带趋势和波动切换的合成K线，保证各类信号都会出现"""
+    rng = np.random.default_rng(seed)
+    minutes_total = days * 24 * 60
+    # 先生成1分钟价格路径，再聚合为各时间框架，保证不同时间框架之间价格一致
+    drift = np.repeat(rng.normal(0, 0.0004, minutes_total // 600 + 1), 600)[:minutes_total]
+    close_1m = 40000 * np.exp(np.cumsum(drift + rng.normal(0, 0.0015, minutes_total)))
+    volume_1m = rng.lognormal(3, 1, minutes_total)
+    index_1m = pd.date_range(start, periods=minutes_total, freq='1min')
+    frame_1m = pd.DataFrame({'close': close_1m, 'volume': volume_1m}, index=index_1m)
+
+    data = {}
+    for tf, minutes in TIMEFRAME_MINUTES.items():
+        grouped = frame_1m.resample(f'{minutes}min')
+        df = pd.DataFrame({
+            'open': grouped['close'].first(),
+            'high': grouped['close'].max(),
+            'low': grouped['close'].min(),
+            'close': grouped['close'].last(),
+            'volume': grouped['volume'].sum(),
+        }).reset_index(names='datetime')
+        df['timestamp'] = df['datetime'].astype('int64') // 10 ** 6
+        data[tf] = df
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量分析模式一致性测试')
+    parser.add_argument('--strategy', default='test3', help='strategies目录下的策略模块名')
+    parser.add_argument('--class-name', default='MultiTimeframeStrategy', help='策略类名')
+    parser.add_argument('--days', type=int, default=30, help='合成数据天数')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='数值比较的相对容差')
+    parser.add_argument('--max-mismatch-rate', type=float, default=0.001,
+                        help='允许的操作不一致比例（EMA窗口换算存在浮点误差，阈值附近极少数K线可能不同）')
+    args = parser.parse_args()
+
+    module = importlib.import_module(f'strategies.{args.strategy}')
+    strategy = getattr(module, args.class_name)()
+    data = generate_data(args.days)
+    base_tf = '15m'
+    base_times = data[base_tf]['datetime']
+    window_sizes = strategy.get_required_timeframes()
+    aligner = TimeframeAligner(base_times, data, window_sizes)
+    bars = range(168, len(base_times))
+    print(f"基准K线数量: {len(base_times)}，对比区间: {len(bars)} 根")
+
+    start = time.time()
+    series = strategy.analyze_series('SYN/USDT', data, base_times)
+    series_time = time.time() - start
+    if series is None:
+        print("策略未实现analyze_series")
+        sys.exit(1)
+
+    start = time.time()
+    per_bar = {i: strategy.analyze('SYN/USDT', aligner.windows(i)) for i in bars}
+    per_bar_time = time.time() - start
+    print(f"逐根分析: {per_bar_time:.2f}秒，批量分析: {series_time:.3f}秒，加速 {per_bar_time / max(series_time, 1e-9):.0f}倍")
+
+    action_mismatch = 0
+    value_mismatch = 0
+    actionable = 0
+    for i in bars:
+        expected = per_bar[i]
+        if expected is None:
+            continue
+        if expected.overall_action != series['overall_action'][i] or not series['valid'][i]:
+            action_mismatch += 1
+            if action_mismatch <= 5:
+                print(f"  操作不一致 #{i}: analyze={expected.overall_action}({expected.total_score:.6f}) "
+                      f"analyze_series={series['overall_action'][i]}({series['total_score'][i]:.6f})")
+            continue
+        if expected.overall_action == "观望":
+            continue
+        actionable += 1
+        for field in ('total_score', 'entry_price', 'stop_loss', 'target_short', 'atr_one'):
+            a, b = getattr(expected, field), series[field][i]
+            if not np.isclose(a, b, rtol=args.tolerance, atol=args.tolerance):
+                value_mismatch += 1
+                if value_mismatch <= 5:
+                    print(f"  数值不一致 #{i} {field}: analyze={a} analyze_series={b}")
+                break
+        built = strategy.build_signal_from_series('SYN/USDT', series, i)
+        if built is None or built.timeframe_signals != expected.timeframe_signals:
+            value_mismatch += 1
+
+    mismatch_rate = action_mismatch / max(len(bars), 1)
+    print(f"有交易操作的K线: {actionable}，操作不一致: {action_mismatch} ({mismatch_rate:.4%})，数值不一致: {value_mismatch}")
+    if mismatch_rate > args.max_mismatch_rate or value_mismatch > 0:
+        print("一致性测试失败")
+        sys.exit(1)
+    print("一致性测试通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+增量指标一致性测试
+模拟扫描器每轮获取最近N根K线（最后一根未收盘）的过程，对比增量指标引擎与批量计算的结果和耗时
+
+用法:
+    python test/parity_incremental_indicators.py --scans 500 --window 309
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.incremental_indicators import IncrementalIndicatorEngine
+
+
+def batch_rsi(df, window):
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def batch_atr(df, period):
+    prev_close = df['close'].shift(1)
+    tr = np.maximum(df['high'] - df['low'], np.maximum(abs(df['high'] - prev_close), abs(df['low'] - prev_close)))
+    return tr.rolling(window=period).mean()
+
+
+INDICATORS = {
+    ('sma', ('close', 20)): lambda df: df['close'].rolling(20).mean(),
+    ('std', ('close', 20)): lambda df: df['close'].rolling(20).std(),
+    ('min', ('low', 9)): lambda df: df['low'].rolling(9).min(),
+    ('max', ('high', 9)): lambda df: df['high'].rolling(9).max(),
+    ('sma', ('volume', 20)): lambda df: df['volume'].rolling(20).mean(),
+    ('ema', ('close', 50)): lambda df: df['close'].ewm(span=50, adjust=False).mean(),
+    ('rsi', (14,)): lambda df: batch_rsi(df, 14),
+    ('atr', (14,)): lambda df: batch_atr(df, 14),
+}
+
+
+def generate_data(n, seed=5):
+    """生成合成15分钟K线"""
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    high = close * (1 + rng.uniform(0, 0.004, n))
+    low = close * (1 - rng.uniform(0, 0.004, n))
+    index = pd.date_range('2024-01-01', periods=n, freq='15min')
+    return pd.DataFrame({'open': np.roll(close, 1), 'high': high, 'low': low, 'close': close,
+                         'volume': rng.lognormal(3, 1, n)}, index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量指标一致性测试')
+    parser.add_argument('--scans', type=int, default=500, help='模拟扫描轮数（每轮新收盘一根K线）')
+    parser.add_argument('--window', type=int, default=309, help='每轮获取的K线数量')
+    parser.add_argument('--tolerance', type=float, default=1e-8, help='相对容差')
+    args = parser.parse_args()
+
+    data = generate_data(args.window + args.scans + 1)
+    engine = IncrementalIndicatorEngine({'ENABLED': True})
+    batch_time = 0.0
+    incremental_time = 0.0
+    failures = 0
+
+    for scan in range(args.scans):
+        # 每轮的窗口：最后一根是未收盘K线（用一个扰动后的收盘价模拟）
+        df = data.iloc[scan:scan + args.window].copy()
+        df.iloc[-1, df.columns.get_loc('close')] *= 1.0005
+        df.attrs.update(symbol='SYN/USDT', timeframe='15m', live=True)
+
+        for (name, params), batch_fn in INDICATORS.items():
+            start = time.perf_counter()
+            expected = batch_fn(df)
+            batch_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = engine.series(df, name, params, lambda: batch_fn(df))
+            incremental_time += time.perf_counter() - start
+
+            # 整个窗口逐根比较（包括窗口开头的NaN和EMA的初始化）
+            actual_values, expected_values = actual.to_numpy(), expected.to_numpy()
+            if not np.allclose(actual_values, expected_values, rtol=args.tolerance, atol=args.tolerance, equal_nan=True):
+                failures += 1
+                if failures <= 5:
+                    diff = np.nanmax(np.abs(actual_values - expected_values))
+                    print(f"  不一致: 第{scan}轮 {name}{params} 最大差值 {diff}")
+
+    print(f"批量计算: {batch_time:.2f}秒，增量计算: {incremental_time:.2f}秒，加速 {batch_time / max(incremental_time, 1e-9):.1f}倍")
+    print(f"引擎统计: {engine.get_stats()}")
+    if failures:
+        print(f"一致性测试失败: {failures} 处不一致")
+        sys.exit(1)
+    print("一致性测试通过")
+
+
+if __name__ == '__main__':
+    main()
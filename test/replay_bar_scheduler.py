@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+K线收盘调度测试（模拟时钟，不需要等待真实时间）
+    - 模拟运行一天，校验每次唤醒的时刻与收盘的时间框架（00:00 UTC 15m/1h/4h同时收盘，00:15 只有15m收盘）
+    - 校验收盘延迟期内仍属于刚收盘的时刻、stop_event可以中断等待
+    - 对比每15分钟全量评估所有策略与只评估刚收盘时间框架策略的评估次数
+
+用法:
+    python test/replay_bar_scheduler.py
+    python test/replay_bar_scheduler.py --days 7 --close-delay 3
+"""
+
+import os
+import sys
+import argparse
+import threading
+from collections import Counter
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.bar_scheduler import BarCloseScheduler, RefreshTimer, due_strategies
+
+
+class FakeClock:
+    """模拟时钟: wait() 直接把时间向前推进"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEvent:
+    """wait(timeout) 推进模拟时钟的stop_event"""
+
+    def __init__(self, clock, stop_at=None):
+        self.clock = clock
+        self.stop_at = stop_at
+
+    def wait(self, timeout):
+        if self.stop_at is not None and self.clock.now + timeout >= self.stop_at:
+            self.clock.now = self.stop_at
+            return True
+        self.clock.now += timeout
+        return False
+
+
+def check(name, condition):
+    print(f"  {'通过' if condition else '失败'}: {name}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线收盘调度测试')
+    parser.add_argument('--days', type=int, default=1, help='模拟运行的天数')
+    parser.add_argument('--close-delay', type=float, default=2, help='收盘后延迟唤醒的秒数')
+    parser.add_argument('--scan-seconds', type=float, default=20, help='模拟每轮扫描的耗时（秒）')
+    args = parser.parse_args()
+
+    # 示例策略及其时间框架
+    strategies = {
+        'test3': ['15m', '1h', '4h'],
+        'trend_1h': ['1h', '4h'],
+        'swing_4h': ['4h'],
+    }
+    start = 1700006400  # 2023-11-15 00:00:00 UTC
+    clock = FakeClock(start + 5)
+    scheduler = BarCloseScheduler({tf for tfs in strategies.values() for tf in tfs}, args.close_delay, clock=clock)
+    event = FakeEvent(clock)
+
+    wakeups = []
+    evaluations = Counter()
+    end = start + args.days * 86400
+    while clock.now < end:
+        close_ts, due = scheduler.wait_next(event)
+        wakeups.append((close_ts, due, clock.now - close_ts))
+        for name in due_strategies(strategies, due):
+            evaluations[name] += 1
+        clock.now += args.scan_seconds
+
+    ok = True
+    print("功能校验:")
+    ok &= check("每15分钟唤醒一次", len(wakeups) == args.days * 96 and all(b[0] - a[0] == 900 for a, b in zip(wakeups, wakeups[1:])))
+    ok &= check("在收盘后close_delay秒唤醒", all(abs(lag - args.close_delay) < 1e-6 for _, _, lag in wakeups))
+    by_time = {close_ts % 86400: due for close_ts, due, _ in wakeups}
+    ok &= check("00:00 UTC 15m/1h/4h同时收盘", by_time[0] == ['15m', '1h', '4h'])
+    ok &= check("00:15 只有15m收盘", by_time[900] == ['15m'])
+    ok &= check("01:00 15m/1h收盘", by_time[3600] == ['15m', '1h'])
+    ok &= check("只评估使用刚收盘时间框架的策略",
+                evaluations == Counter({'test3': args.days * 96, 'trend_1h': args.days * 24, 'swing_4h': args.days * 6}))
+
+    clock.now = start + 900 + 1
+    ok &= check("收盘延迟期内仍返回刚收盘的时刻", scheduler.next_close()[0] == start + 900)
+    clock.now = start + 900 + args.close_delay
+    ok &= check("唤醒后返回下一个收盘时刻", scheduler.next_close()[0] == start + 1800)
+    ok &= check("stop_event设置后停止等待", scheduler.wait_next(FakeEvent(clock, stop_at=clock.now + 60)) is None)
+    ok &= check("真实Event立即停止", BarCloseScheduler(['15m'], 2).wait_next(_set_event()) is None)
+
+    timer_clock = FakeClock(0)
+    timer = RefreshTimer(300, clock=timer_clock)
+    first = timer.due()
+    timer.mark()
+    timer_clock.now = 299
+    early = timer.due()
+    timer_clock.now = 300
+    ok &= check("RefreshTimer按间隔到期", first and not early and timer.due())
+
+    full = len(wakeups) * len(strategies)
+    print(f"模拟 {args.days} 天: 唤醒 {len(wakeups)} 次, 每轮评估所有策略 {full} 次, 只评估刚收盘策略 {sum(evaluations.values())} 次")
+    if not ok:
+        print("校验失败")
+        sys.exit(1)
+    print("校验通过")
+
+
+def _set_event():
+    event = threading.Event()
+    event.set()
+    return event
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+WebSocket K线行情回放测试
+启动本地回放桩服务器推送K线/ticker消息（中途主动断开连接），验证WsCandleFeed:
+    1. 首次获取通过REST补齐，之后直接读取缓冲区
+    2. 断线后自动重连并重新订阅，重连后重新补齐
+    3. 缓冲区中的K线与REST数据一致，ticker转换为ccxt格式
+
+用法:
+    python test/replay_ws_candle_feed.py
+    python test/replay_ws_candle_feed.py --frames recorded.jsonl --symbols BTC/USDT,ETH/USDT   # 回放录制的真实消息（只检查重连与缓冲区命中）
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.kline_fetcher import KlineFetcher
+from lib.tool.ws_candle_feed import WsCandleFeed, to_inst_id, to_candle_channel
+from ws_replay_server import ReplayServer, load_frames
+
+TIMEFRAME = '15m'
+TF_MS = 15 * 60 * 1000
+
+
+class StubRestExchange:
+    """REST桩：返回与推送消息一致的完整K线历史"""
+
+    def __init__(self, history):
+        self.history = history
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        with self._lock:
+            self.calls += 1
+        bars = self.history.get(symbol, [])
+        return [list(bar) for bar in bars[-limit:]] if limit else [list(bar) for bar in bars]
+
+
+def generate(symbols, bars=400, pushed_bars=20):
+    """生成K线历史和对应的推送消息（最后pushed_bars根K线每根推送3次：两次未收盘更新和一次收盘）"""
+    current_open = int(time.time() * 1000) // TF_MS * TF_MS
+    history = {}
+    frames = []
+    for n, symbol in enumerate(symbols):
+        price = 100.0 * (n + 1)
+        rows = []
+        for i in range(bars):
+            ts = current_open - (bars - 1 - i) * TF_MS
+            close = price * (1 + 0.001 * ((i * 7 + n) % 11 - 5))
+            rows.append([ts, price, max(price, close) * 1.002, min(price, close) * 0.998, close, 10.0 + i % 5])
+            price = close
+        history[symbol] = rows
+
+    channel = to_candle_channel(TIMEFRAME)
+    for i in range(bars - pushed_bars, bars):
+        for symbol in symbols:
+            ts, o, h, l, c, v = history[symbol][i]
+            updates = [(o, max(o, c), min(o, c), (o + c) / 2, v / 3, '0'),
+                       (o, h, l, (o + c) / 2, v / 2, '0'),
+                       (o, h, l, c, v, '1')]
+            for uo, uh, ul, uc, uv, confirm in updates:
+                row = [str(ts), str(uo), str(uh), str(ul), str(uc), str(uv), '0', '0', confirm]
+                frames.append(json.dumps({'arg': {'channel': channel, 'instId': to_inst_id(symbol)}, 'data': [row]}))
+    for symbol in symbols:
+        last = history[symbol][-1]
+        ticker = {'instId': to_inst_id(symbol), 'last': str(last[4]), 'vol24h': '1000', 'volCcy24h': '250000', 'ts': str(last[0])}
+        frames.append(json.dumps({'arg': {'channel': 'tickers', 'instId': to_inst_id(symbol)}, 'data': [ticker]}))
+    return history, frames
+
+
+def wait_for(condition, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket K线行情回放测试')
+    parser.add_argument('--frames', default=None, help='录制的JSONL文件，不提供时使用合成消息')
+    parser.add_argument('--symbols', default='BTC/USDT,ETH/USDT,SOL/USDT', help='交易对列表，逗号分隔')
+    parser.add_argument('--limit', type=int, default=100, help='每次获取的K线数量')
+    parser.add_argument('--drop-after', type=int, default=40, help='每个连接推送多少条消息后断开')
+    parser.add_argument('--timeout', type=float, default=60, help='等待回放完成的最长时间（秒）')
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(',')
+    history, frames = generate(symbols)
+    if args.frames:
+        frames = load_frames(args.frames)
+    server = ReplayServer(frames, interval=0.005, drop_after=args.drop_after)
+    url = server.start_in_thread()
+
+    rest = StubRestExchange(history)
+    fetcher = KlineFetcher(rest, {'RATE_PER_SECOND': 1000, 'BURST': 1000})
+    feed = WsCandleFeed({'CANDLE_URL': url, 'TICKER_URL': url, 'PING_INTERVAL': 1, 'RECONNECT_MAX_DELAY': 1})
+    feed.start()
+    failures = []
+    try:
+        wait_for(lambda: feed.connected, 10)
+        feed.track_tickers(symbols)
+        first = feed.fetch_all(symbols, {TIMEFRAME: args.limit}, fetcher)
+        if rest.calls != len(symbols):
+            failures.append(f"首次获取应全部走REST: {rest.calls}")
+
+        if not wait_for(lambda: server.position >= len(frames), args.timeout):
+            failures.append(f"回放未完成: {server.position}/{len(frames)}")
+        if server.connections < 2:
+            failures.append(f"没有发生重连: 连接次数 {server.connections}")
+        channels = len(symbols) * 2
+        if len(server.subscribe_requests) <= channels:
+            failures.append(f"重连后没有重新订阅: 订阅请求 {len(server.subscribe_requests)}")
+
+        # 断线期间可能漏推，重连后的第一次获取需要重新补齐，之后直接读取缓冲区
+        wait_for(lambda: feed.connected, 10)
+        feed.fetch_all(symbols, {TIMEFRAME: args.limit}, fetcher)
+        calls_before = rest.calls
+        final = feed.fetch_all(symbols, {TIMEFRAME: args.limit}, fetcher)
+        if rest.calls != calls_before:
+            failures.append(f"补齐后仍然请求REST: {rest.calls - calls_before} 次")
+
+        if not args.frames:
+            for symbol in symbols:
+                expected = history[symbol][-args.limit:]
+                if final[symbol][TIMEFRAME] != expected or first[symbol][TIMEFRAME] != expected:
+                    failures.append(f"{symbol} 缓冲区K线与REST数据不一致")
+            tickers = feed.get_tickers(symbols)
+            if sorted(tickers) != sorted(symbols) or any(t['quoteVolume'] != 250000 for t in tickers.values()):
+                failures.append(f"ticker不完整: {tickers}")
+    finally:
+        feed.stop()
+        server.stop()
+
+    print(f"连接次数: {server.connections}, 推送消息: {server.sent}, REST请求: {rest.calls}, 行情统计: {feed.stats}")
+    if failures:
+        for failure in failures:
+            print(f"  失败: {failure}")
+        sys.exit(1)
+    print("WebSocket行情测试通过")
+
+
+if __name__ == '__main__':
+    main()
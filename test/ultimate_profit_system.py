@@ -24,6 +24,12 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import statistics
 from dataclasses import dataclass
 import sqlite3
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.tool.market_universe import get_market_universe
 
 warnings.filterwarnings('ignore')
 
@@ -347,34 +353,25 @@ class UltimateProfitSystem:
         logger.info("开始筛选最佳交易机会...")
         
         try:
-            # 获取所有USDT交易对
-            markets = self.exchange.load_markets()
-            usdt_pairs = [symbol for symbol in markets.keys() 
-                         if symbol.endswith('/USDT') and markets[symbol]['active']]
-            
-            # 获取ticker数据
-            tickers = self.exchange.fetch_tickers()
+            # 交易对池与扫描器共用同一个快照: 交易对元数据和ticker在有效期内不重复请求，
+            # 返回的交易对已按成交量降序排列（日成交量>100万）
+            universe = get_market_universe(self.exchange)
+            tickers = universe.tickers(universe.liquid_symbols(1000000))
             
             # 初步筛选
             candidates = []
-            for symbol in usdt_pairs:
-                if symbol in tickers:
-                    ticker = tickers[symbol]
-                    if (ticker['quoteVolume'] and ticker['quoteVolume'] > 1000000 and  # 日成交量>100万
-                        ticker['bid'] and ticker['ask'] and ticker['last']):
-                        
-                        spread = (ticker['ask'] - ticker['bid']) / ticker['last']
-                        if spread < 0.01:  # 价差<1%
-                            candidates.append({
-                                'symbol': symbol,
-                                'volume': ticker['quoteVolume'],
-                                'price': ticker['last'],
-                                'change': ticker['percentage'],
-                                'spread': spread
-                            })
-            
-            # 按成交量排序
-            candidates.sort(key=lambda x: x['volume'], reverse=True)
+            for symbol, ticker in tickers.items():
+                if ticker['bid'] and ticker['ask'] and ticker['last']:
+                    spread = (ticker['ask'] - ticker['bid']) / ticker['last']
+                    if spread < 0.01:  # 价差<1%
+                        candidates.append({
+                            'symbol': symbol,
+                            'volume': ticker['quoteVolume'],
+                            'price': ticker['last'],
+                            'change': ticker['percentage'],
+                            'spread': spread
+                        })
+            
             top_candidates = candidates[:30]  # 分析前30个
             
             logger.info(f"初步筛选出{len(top_candidates)}个候选")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+WebSocket回放桩服务器
+模拟OKX公共WebSocket：响应subscribe/unsubscribe/ping，按录制顺序回放已订阅频道的推送消息，
+可以在推送指定数量的消息后主动断开连接，用于测试WsCandleFeed的重连和重新订阅
+
+录制文件为JSONL，每行 {"conn": 连接名, "recv_ts": 接收时间, "msg": 原始消息}（WS_CANDLE_FEED_CONFIG['RECORD_PATH']录制的格式）
+使用 websockets>=13.0 的 websockets.asyncio.server 接口
+
+用法:
+    python test/ws_replay_server.py --frames frames.jsonl --port 8765 --interval 0.01 --drop-after 200
+"""
+
+import json
+import asyncio
+import argparse
+import threading
+
+from websockets.asyncio.server import serve
+
+
+class ReplayServer:
+    """按订阅过滤并回放录制消息的WebSocket服务器"""
+
+    def __init__(self, frames, interval=0.01, drop_after=None):
+        """
+        Args:
+            frames: 原始消息字符串列表（按回放顺序）
+            interval: 两条消息之间的间隔（秒）
+            drop_after: 每个连接推送多少条消息后主动断开，None表示不断开
+        """
+        self.frames = frames
+        self.interval = interval
+        self.drop_after = drop_after
+        # 回放进度在所有连接间共享，断线重连后从断开处继续
+        self.position = 0
+        self.connections = 0
+        self.subscribe_requests = []
+        self.sent = 0
+        self.loop = None
+        self.server = None
+        self.port = None
+
+    @staticmethod
+    def _frame_key(frame):
+        arg = json.loads(frame).get('arg') or {}
+        return arg.get('channel'), arg.get('instId')
+
+    async def handler(self, websocket):
+        self.connections += 1
+        subscribed = set()
+        sent_on_connection = 0
+
+        async def receive():
+            async for message in websocket:
+                if message == 'ping':
+                    await websocket.send('pong')
+                    continue
+                request = json.loads(message)
+                for arg in request.get('args', []):
+                    key = (arg.get('channel'), arg.get('instId'))
+                    if request.get('op') == 'subscribe':
+                        subscribed.add(key)
+                        self.subscribe_requests.append(key)
+                    else:
+                        subscribed.discard(key)
+                    await websocket.send(json.dumps({'event': request.get('op'), 'arg': arg, 'connId': 'replay'}))
+
+        receiver = asyncio.ensure_future(receive())
+        try:
+            while self.position < len(self.frames):
+                frame = self.frames[self.position]
+                if self._frame_key(frame) not in subscribed:
+                    # 频道尚未订阅时等待订阅（录制文件中的消息都属于客户端会订阅的频道）
+                    await asyncio.sleep(self.interval)
+                    if receiver.done():
+                        return
+                    continue
+                await websocket.send(frame)
+                self.position += 1
+                self.sent += 1
+                sent_on_connection += 1
+                if self.drop_after and sent_on_connection >= self.drop_after:
+                    return
+                await asyncio.sleep(self.interval)
+            await receiver
+        finally:
+            receiver.cancel()
+            await websocket.close()
+
+    def start_in_thread(self, host='127.0.0.1', port=0, timeout=10):
+        """在后台线程中启动服务器，返回 ws:// 地址；timeout秒内未启动成功时抛出RuntimeError"""
+        started = threading.Event()
+        errors = []
+
+        async def start_server():
+            # 在事件循环中创建服务器
+            return await serve(self.handler, host, port)
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.server = self.loop.run_until_complete(start_server())
+                self.port = list(self.server.sockets)[0].getsockname()[1]
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                self.loop.close()
+                return
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, name='ws-replay-server', daemon=True).start()
+        if not started.wait(timeout):
+            raise RuntimeError(f"回放服务器{timeout}秒内未启动")
+        if errors:
+            raise RuntimeError(f"回放服务器启动失败: {errors[0]}")
+        return f"ws://{host}:{self.port}"
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def load_frames(path):
+    """读取录制文件中的原始消息"""
+    frames = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frames.append(json.loads(line)['msg'])
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket回放桩服务器')
+    parser.add_argument('--frames', required=True, help='录制的JSONL文件')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=0.01, help='消息间隔（秒）')
+    parser.add_argument('--drop-after', type=int, default=None, help='每个连接推送多少条消息后断开')
+    args = parser.parse_args()
+
+    server = ReplayServer(load_frames(args.frames), args.interval, args.drop_after)
+    url = server.start_in_thread(args.host, args.port)
+    print(f"回放服务器已启动: {url}，共 {len(server.frames)} 条消息，按Ctrl+C退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()